@@ -25,6 +25,7 @@ from chronicle_mcp.database import (
 )
 from chronicle_mcp.paths import (
     BROWSER_PATHS,
+    discover_profiles,
     expand_path,
     find_glob_path,
     get_all_browser_paths,
@@ -40,6 +41,7 @@ __all__ = [
     "find_glob_path",
     "get_browser_path",
     "get_available_browsers",
+    "discover_profiles",
     "get_all_browser_paths",
     "sanitize_url",
     "format_chrome_timestamp",
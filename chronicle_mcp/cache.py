@@ -1,91 +1,521 @@
-import hashlib
-import json
+"""In-memory cache of query results.
+
+``HistoryService`` caches the results of its read operations here, keyed by
+operation, parameters and the state of every source database read (see
+``source_state``), so a result is reused until its TTL expires or one of
+its browsers' databases changes.
+
+Keys are plain tuples built from the parameters, so a lookup costs one
+hash. Entries are tagged (``HistoryService`` tags them with their
+browsers) and can be dropped by tag or by operation. When the cache is
+full, a TinyLFU admission policy keeps the entries that are asked for more
+often: a count-min sketch estimates how often each key has been looked up
+recently, and a new entry only displaces least recently used ones that are
+looked up less often than itself. A one-off query, such as a large export,
+therefore never pushes out results that are in regular use.
+
+With ``[cache] persistent = true``, a ``DiskCache`` (see ``disk_cache``)
+sits under the in-memory cache with the same keys and tags, so results
+outlive the process and are shared with other processes.
+"""
+
+import asyncio
+import atexit
+import functools
 import logging
-from collections.abc import Callable
-from datetime import timedelta
-from typing import Any
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass
+from typing import Any, cast
 
-from cachetools import TTLCache
+from chronicle_mcp.config import CacheConfig, apply_env_overrides, load_config
+from chronicle_mcp.disk_cache import DiskCache
+from chronicle_mcp.snapshot import SQLITE_HEADER, fingerprint_source
 
 logger = logging.getLogger(__name__)
 
+# Offset and size of the file change counter in an SQLite database header
+CHANGE_COUNTER_OFFSET = 24
+CHANGE_COUNTER_SIZE = 4
+
+# Rows of the frequency sketch, and the value its 4-bit counters saturate at
+SKETCH_DEPTH = 4
+SKETCH_MAX_COUNT = 15
+
+# Counters are halved once this many lookups per cache entry were recorded
+SKETCH_SAMPLE_FACTOR = 10
+
+# Odd 64-bit multipliers hashing a key to one counter per sketch row
+SKETCH_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+HASH_MASK = (1 << 64) - 1
+
+# Translation table halving every counter of a sketch row
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+def source_state(source_path: str) -> tuple[int, ...]:
+    """State of a source database that changes whenever its contents do.
+
+    Combines the file fingerprint (size and mtime of the database and its
+    WAL) with the change counter in the database header, which SQLite bumps
+    on every commit outside WAL mode, so writes that leave the size and a
+    coarse mtime unchanged are still noticed. In WAL mode, commits grow the
+    WAL until a checkpoint rewrites the main file.
+
+    Args:
+        source_path: Path to the browser's history database
+
+    Returns:
+        Tuple that is equal for two calls only if the database is unchanged
+
+    Raises:
+        OSError: If the database file cannot be read
+    """
+    fingerprint = fingerprint_source(source_path)
+    with open(source_path, "rb") as f:
+        header = f.read(CHANGE_COUNTER_OFFSET + CHANGE_COUNTER_SIZE)
+    counter = 0
+    if (
+        header.startswith(SQLITE_HEADER)
+        and len(header) == CHANGE_COUNTER_OFFSET + CHANGE_COUNTER_SIZE
+    ):
+        counter = int.from_bytes(header[CHANGE_COUNTER_OFFSET:], "big")
+    return (*fingerprint, counter)
+
+
+def freeze(value: Any) -> Hashable:
+    """Turn nested dicts, lists and sets into an equal hashable value.
+
+    Dicts become sorted item tuples (marked so they never equal a list of
+    pairs), lists and tuples become tuples and sets become frozensets.
+    Other values are returned as they are.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return cast(Hashable, value)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a result, in bytes, including its containers' items."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+class FrequencySketch:
+    """Approximate recent lookup counts of cache keys (a count-min sketch).
+
+    Each key maps to one 4-bit counter per row; its frequency is the
+    smallest of them. Once ``SKETCH_SAMPLE_FACTOR`` lookups per cache entry
+    have been recorded, every counter is halved, so popularity fades.
+    """
+
+    def __init__(self, capacity: int):
+        self._bits = max(4, (max(1, capacity) * 4 - 1).bit_length())
+        self._rows = [bytearray(1 << self._bits) for _ in range(SKETCH_DEPTH)]
+        self._sample_size = max(1, capacity) * SKETCH_SAMPLE_FACTOR
+        self._additions = 0
+
+    def _slots(self, key: Hashable) -> Iterable[tuple[bytearray, int]]:
+        h = hash(key) & HASH_MASK
+        shift = 64 - self._bits
+        for row, seed in zip(self._rows, SKETCH_SEEDS, strict=True):
+            yield row, ((h * seed) & HASH_MASK) >> shift
+
+    def increment(self, key: Hashable) -> None:
+        """Record a lookup of a key."""
+        for row, slot in self._slots(key):
+            if row[slot] < SKETCH_MAX_COUNT:
+                row[slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            for row in self._rows:
+                row[:] = row.translate(_HALVE)
+            self._additions //= 2
+
+    def frequency(self, key: Hashable) -> int:
+        """Estimated recent lookups of a key."""
+        return min(row[slot] for row, slot in self._slots(key))
+
+
+def _unindex(index: dict[Any, set[Any]], name: Hashable, key: Hashable) -> None:
+    """Remove a key from an index of keys by tag or operation."""
+    keys = index[name]
+    keys.discard(key)
+    if not keys:
+        del index[name]
+
+
+@dataclass
+class CacheEntry:
+    """A cached result and its bookkeeping."""
+
+    result: Any
+    query_type: str
+    expires_at: float
+    size_bytes: int
+    tags: tuple[Hashable, ...] = ()
+
 
 class QueryCache:
-    def __init__(self, ttl_seconds: int = 300, max_size: int = 1000):
-        self.ttl = timedelta(seconds=ttl_seconds)
-        self.cache: TTLCache[str, dict[str, Any]] = TTLCache(max_size, ttl_seconds * 1000)
+    """Thread-safe cache of query results with TTL, tags and TinyLFU admission.
 
-    def _make_key(self, query_type: str, params: dict[str, Any]) -> str:
+    Args:
+        ttl_seconds: Seconds a result is served for
+        max_size: Maximum number of entries
+        max_bytes: Maximum estimated size of all entries, or None for no limit
+        timer: Monotonic clock, in seconds
+        disk: Persistent cache kept under this one, shared with other processes
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_size: int = 1000,
+        max_bytes: int | None = None,
+        timer: Callable[[], float] = time.monotonic,
+        disk: DiskCache | None = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._timer = timer
+        # Least recently used first
+        self._entries: OrderedDict[tuple[str, Hashable], CacheEntry] = OrderedDict()
+        # Earliest expiry first: with one TTL, that is insertion order
+        self._expiry: OrderedDict[tuple[str, Hashable], None] = OrderedDict()
+        self._by_tag: dict[Hashable, set[tuple[str, Hashable]]] = {}
+        self._by_type: dict[str, set[tuple[str, Hashable]]] = {}
+        self._versions: dict[Hashable, Hashable] = {}
+        self._sketch = FrequencySketch(max_size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
+        self.invalidations = 0
+        self.disk = disk
+        self.disk_hits = 0
+        # Services run on thread pools
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: CacheConfig) -> "QueryCache":
+        """Create a cache from the ``[cache]`` configuration section."""
+        max_bytes = config.max_size_mb * 1024 * 1024 if config.max_size_mb > 0 else None
+        disk = None
+        if config.persistent:
+            disk = DiskCache(
+                path=os.path.expanduser(config.persistent_path) if config.persistent_path else None,
+                ttl_seconds=config.ttl_seconds,
+                max_bytes=config.persistent_max_mb * 1024 * 1024,
+            )
+        return cls(
+            ttl_seconds=config.ttl_seconds,
+            max_size=config.max_entries,
+            max_bytes=max_bytes,
+            disk=disk,
+        )
+
+    @staticmethod
+    def make_key(query_type: str, params: dict[str, Any]) -> tuple[str, Hashable]:
         """Create a cache key from query type and parameters."""
-        key_data = {"type": query_type, "params": params}
-        key_str = json.dumps(key_data, sort_keys=True)
-        return hashlib.sha256(key_str.encode()).hexdigest()
+        return query_type, freeze(params)
+
+    def _remove(self, key: tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(key)
+        del self._expiry[key]
+        self._bytes -= entry.size_bytes
+        _unindex(self._by_type, entry.query_type, key)
+        for tag in entry.tags:
+            _unindex(self._by_tag, tag, key)
+
+    def _expire(self, now: float) -> None:
+        while self._expiry:
+            key = next(iter(self._expiry))
+            if self._entries[key].expires_at > now:
+                break
+            self._remove(key)
+            self.expirations += 1
 
     def get(self, query_type: str, params: dict[str, Any]) -> Any | None:
-        """Get cached result."""
-        key = self._make_key(query_type, params)
-        if key in self.cache:
+        """Get a cached result, recording the lookup for admission.
+
+        Results missing from memory are looked up in the disk cache, if
+        any, and brought into memory for the rest of their TTL.
+
+        Raises:
+            TypeError: If the parameters are not hashable
+        """
+        key = self.make_key(query_type, params)
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._timer():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
             logger.debug(f"Cache hit for {query_type}")
-            return self.cache[key]["result"]
-        logger.debug(f"Cache miss for {query_type}")
-        return None
-
-    def set(self, query_type: str, params: dict[str, Any], result: Any) -> None:
-        """Cache a result."""
-        key = self._make_key(query_type, params)
-        self.cache[key] = {
-            "result": result,
-            "cached_at": __import__("datetime").datetime.now(),
-        }
-        logger.debug(f"Cached result for {query_type}")
-
-    def invalidate(self, query_type: str | None = None) -> None:
-        """Invalidate cache entries."""
-        if query_type:
-            keys_to_remove = [k for k, v in self.cache.items() if v.get("type") == query_type]
-            for key in keys_to_remove:
-                del self.cache[key]
-            logger.info(f"Invalidated {len(keys_to_remove)} cache entries for {query_type}")
+            return entry.result
+
+        stored = self.disk.get(query_type, params) if self.disk is not None else None
+        if stored is None:
+            logger.debug(f"Cache miss for {query_type}")
+            return None
+        logger.debug(f"Disk cache hit for {query_type}")
+        with self._lock:
+            self.disk_hits += 1
+            self._admit(key, query_type, stored.result, stored.tags, stored.remaining_seconds)
+        return stored.result
+
+    def set(
+        self,
+        query_type: str,
+        params: dict[str, Any],
+        result: Any,
+        tags: Iterable[Hashable] = (),
+    ) -> bool:
+        """Cache a result, if the admission policy lets it in.
+
+        A full cache only takes the result if every entry it would evict
+        has been looked up less often than the result's own key. The disk
+        cache, if any, stores it either way.
+
+        Args:
+            query_type: Operation that produced the result
+            params: Parameters of the operation
+            result: Result to cache
+            tags: Tags to invalidate the entry by, e.g. browser names
+
+        Returns:
+            True if the result was cached in memory
+
+        Raises:
+            TypeError: If the parameters are not hashable
+        """
+        key = self.make_key(query_type, params)
+        entry_tags = tuple(tags)
+        with self._lock:
+            admitted = self._admit(key, query_type, result, entry_tags, self.ttl_seconds)
+        if self.disk is not None:
+            self.disk.set(query_type, params, result, entry_tags)
+        if admitted:
+            logger.debug(f"Cached result for {query_type}")
         else:
-            self.cache.clear()
+            logger.debug(f"Cache declined result for {query_type}")
+        return admitted
+
+    def _admit(
+        self,
+        key: tuple[str, Hashable],
+        query_type: str,
+        result: Any,
+        tags: tuple[Hashable, ...],
+        ttl: float,
+    ) -> bool:
+        """Store an entry if the admission policy lets it in; called with the lock held."""
+        size = estimate_size(result)
+        now = self._timer()
+        if key in self._entries:
+            self._remove(key)
+        self._expire(now)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejections += 1
+            return False
+
+        frequency = self._sketch.frequency(key)
+        count, total = len(self._entries) + 1, self._bytes + size
+        victims = []
+        for victim, entry in self._entries.items():
+            if count <= self.max_size and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            if self._sketch.frequency(victim) >= frequency:
+                self.rejections += 1
+                return False
+            victims.append(victim)
+            count -= 1
+            total -= entry.size_bytes
+        for victim in victims:
+            self._remove(victim)
+        self.evictions += len(victims)
+
+        # Entries from the disk cache may expire before earlier ones; get() checks each
+        self._entries[key] = CacheEntry(result, query_type, now + ttl, size, tags)
+        self._expiry[key] = None
+        self._bytes += size
+        self._by_type.setdefault(query_type, set()).add(key)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        return True
+
+    def _invalidate(self, keys: Iterable[tuple[str, Hashable]]) -> int:
+        removed = 0
+        for key in list(keys):
+            self._remove(key)
+            removed += 1
+        self.invalidations += removed
+        return removed
+
+    def invalidate(self, query_type: str | None = None, tag: Hashable | None = None) -> int:
+        """Invalidate cache entries.
+
+        Args:
+            query_type: Only drop results of this operation
+            tag: Only drop entries with this tag
+
+        Returns:
+            Number of entries dropped from memory; with neither argument, the
+            cache is cleared. Matching entries are dropped from the disk cache too.
+        """
+        if self.disk is not None:
+            self.disk.invalidate(query_type, tag)
+        with self._lock:
+            if query_type is None and tag is None:
+                removed = self._invalidate(self._entries)
+            else:
+                keys = self._by_type.get(query_type, set()) if query_type is not None else None
+                if tag is not None:
+                    tagged = self._by_tag.get(tag, set())
+                    keys = tagged if keys is None else keys & tagged
+                removed = self._invalidate(keys or ())
+        if query_type is None and tag is None:
             logger.info("Cache fully cleared")
+        else:
+            logger.info(f"Invalidated {removed} cache entries for {query_type or tag}")
+        return removed
+
+    def observe(self, tag: Hashable, version: Hashable) -> int:
+        """Record the current version of a tag's source, dropping entries of older versions.
+
+        Args:
+            tag: Tag of the entries that depend on the source
+            version: Value that changes whenever the source does
+
+        Returns:
+            Number of entries dropped
+        """
+        if self.disk is not None:
+            self.disk.observe(tag, version)
+        with self._lock:
+            previous = self._versions.get(tag)
+            self._versions[tag] = version
+            if previous is None or previous == version:
+                return 0
+            removed = self._invalidate(self._by_tag.get(tag, ()))
+        if removed:
+            logger.debug(f"Dropped {removed} cache entries for changed {tag}")
+        return removed
 
     def get_stats(self) -> dict[str, Any]:
         """Get cache statistics."""
-        return {
-            "size": len(self.cache),
-            "max_size": self.cache.maxsize,
-            "ttl_seconds": self.ttl.total_seconds(),
-        }
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats: dict[str, Any] = {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejections": self.rejections,
+                "invalidations": self.invalidations,
+                "disk_hits": self.disk_hits,
+            }
+        stats["disk"] = self.disk.get_stats() if self.disk is not None else None
+        return stats
+
+    def close(self) -> None:
+        """Close the disk cache, if any."""
+        if self.disk is not None:
+            self.disk.close()
 
 
 default_cache = QueryCache(ttl_seconds=300, max_size=1000)
 
+_query_cache: QueryCache | None = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache | None:
+    """Returns the process-wide result cache, or None if ``[cache] enabled`` is false."""
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            config = apply_env_overrides(load_config())
+            if not config.cache.enabled:
+                return None
+            _query_cache = QueryCache.from_config(config.cache)
+            atexit.register(_query_cache.close)
+        return _query_cache
+
 
-def cached_query(ttl_seconds: int = 300) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
-    """Decorator to cache query results."""
+def cached_query(
+    ttl_seconds: int = 300, max_size: int = 1000
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator to cache query results.
+
+    Results are keyed by the function and its arguments; calls with
+    unhashable arguments are not cached.
+    """
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
-        cache = QueryCache(ttl_seconds=ttl_seconds)
+        cache = QueryCache(ttl_seconds=ttl_seconds, max_size=max_size)
+        name = func.__qualname__
+
+        def lookup(args: tuple[Any, ...], kwargs: dict[str, Any]) -> tuple[Any, Any]:
+            params = {"args": args, "kwargs": kwargs}
+            try:
+                return params, cache.get(name, params)
+            except TypeError:
+                return None, None
 
+        @functools.wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
-            cached = cache.get(func.__name__, {"args": str(args), "kwargs": str(kwargs)})
+            params, cached = lookup(args, kwargs)
             if cached is not None:
                 return cached
             result = await func(*args, **kwargs)
-            cache.set(func.__name__, {"args": str(args), "kwargs": str(kwargs)}, result)
+            if params is not None:
+                cache.set(name, params, result)
             return result
 
+        @functools.wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
-            cached = cache.get(func.__name__, {"args": str(args), "kwargs": str(kwargs)})
+            params, cached = lookup(args, kwargs)
             if cached is not None:
                 return cached
             result = func(*args, **kwargs)
-            cache.set(func.__name__, {"args": str(args), "kwargs": str(kwargs)}, result)
+            if params is not None:
+                cache.set(name, params, result)
             return result
 
-        import asyncio
-
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
         return sync_wrapper
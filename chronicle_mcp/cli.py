@@ -10,7 +10,7 @@ from pathlib import Path
 import click
 
 from chronicle_mcp.config import get_version, setup_logging
-from chronicle_mcp.paths import get_available_browsers
+from chronicle_mcp.paths import discover_profiles, get_available_browsers
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -254,5 +254,9 @@ def list_browsers_command(ctx: click.Context) -> None:
         click.echo("Available browsers:")
         for browser in browsers:
             click.echo(f"  - {browser}")
+            profiles = discover_profiles(browser)
+            if len(profiles) > 1:
+                for profile in profiles:
+                    click.echo(f"      {profile.target} ({profile.name})")
     else:
         click.echo("No browsers with history found on this system")
@@ -0,0 +1,233 @@
+"""Coalescing of identical concurrent operations ("single flight").
+
+When several callers ask for the same thing at the same moment - the same
+operation, with the same normalised parameters, against the same state of
+the same source databases - only the first one (the leader) computes it;
+the others wait for its result and share it, including any exception.
+
+``SingleFlight`` serves threads: followers block until the leader's
+computation finishes. ``AsyncSingleFlight`` serves coroutines: the
+computation runs as a task that every caller awaits through
+``asyncio.shield``, so a caller that is cancelled leaves, while the
+computation keeps running for the others and is only cancelled once no
+caller is left. If a leader thread is cancelled, its followers start over
+instead of inheriting the cancellation.
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar, cast
+
+from chronicle_mcp.config import apply_env_overrides, load_config
+from chronicle_mcp.connection import get_cancel_event
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds between cancellation checks of a thread waiting for a leader
+FOLLOWER_POLL_SECONDS = 0.05
+
+
+class OperationCancelledError(Exception):
+    """Raised in a follower thread whose own cancellation event was set while waiting."""
+
+
+class _Call(Generic[T]):
+    """One in-flight computation and its outcome."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    """Shares one computation between threads asking for the same key at once."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call[Any]] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Run ``func``, or wait for the run already in flight for ``key``.
+
+        Args:
+            key: Identity of the computation
+            func: Computation to run if none is in flight
+
+        Returns:
+            Return value of the computation
+
+        Raises:
+            OperationCancelledError: If this thread was cancelled while waiting
+            Exception: Whatever the computation raised
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self.executions += 1
+                else:
+                    self.shared += 1
+            if leader:
+                return self._lead(key, cast(_Call[T], call), func)
+            self._wait(call)
+            if call.cancelled:
+                # The leader's caller gave up, which says nothing about this one
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+    def _lead(self, key: Hashable, call: _Call[T], func: Callable[[], T]) -> T:
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            cancel_event = get_cancel_event()
+            call.cancelled = cancel_event is not None and cancel_event.is_set()
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @staticmethod
+    def _wait(call: _Call[Any]) -> None:
+        cancel_event = get_cancel_event()
+        if cancel_event is None:
+            call.done.wait()
+            return
+        while not call.done.wait(FOLLOWER_POLL_SECONDS):
+            if cancel_event.is_set():
+                raise OperationCancelledError("Cancelled while waiting for a shared query")
+
+    def get_stats(self) -> dict[str, int]:
+        """Get counts of computations run and of calls that shared one."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "shared": self.shared,
+            }
+
+
+class _Flight:
+    """A computation shared by the coroutines awaiting it."""
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Shares one computation between coroutines asking for the same key at once.
+
+    Flights are kept per event loop, so one instance can serve several loops.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """Await ``factory()``, or the computation already in flight for ``key``.
+
+        Args:
+            key: Identity of the computation
+            factory: Function starting the computation if none is in flight
+
+        Returns:
+            Result of the computation
+
+        Raises:
+            asyncio.CancelledError: If this caller is cancelled
+            Exception: Whatever the computation raised
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+            self.executions += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)  # type: ignore[no-any-return]
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Nobody else wants the result: stop the computation
+                self._forget(flight_key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(
+        self, flight_key: tuple[asyncio.AbstractEventLoop, Hashable], flight: _Flight
+    ) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    def get_stats(self) -> dict[str, int]:
+        """Get counts of computations run and of calls that shared one."""
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "shared": self.shared,
+        }
+
+
+_single_flight: SingleFlight | None = None
+_async_single_flight: AsyncSingleFlight | None = None
+_coalesce_enabled: bool | None = None
+_single_flight_lock = threading.Lock()
+
+
+def _load() -> None:
+    """Create the process-wide flights, if ``[advanced] coalesce_queries`` allows."""
+    global _single_flight, _async_single_flight, _coalesce_enabled
+    if _coalesce_enabled is None:
+        _coalesce_enabled = apply_env_overrides(load_config()).advanced.coalesce_queries
+        if _coalesce_enabled:
+            _single_flight = SingleFlight()
+            _async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight() -> SingleFlight | None:
+    """Returns the process-wide thread coalescer, or None if coalescing is off."""
+    with _single_flight_lock:
+        _load()
+        return _single_flight
+
+
+def get_async_single_flight() -> AsyncSingleFlight | None:
+    """Returns the process-wide coroutine coalescer, or None if coalescing is off."""
+    with _single_flight_lock:
+        _load()
+        return _async_single_flight
+
+
+def get_coalescing_stats() -> dict[str, Any]:
+    """Get statistics of both coalescers, with ``enabled`` False if coalescing is off."""
+    single_flight, async_single_flight = get_single_flight(), get_async_single_flight()
+    if single_flight is None or async_single_flight is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "threads": single_flight.get_stats(),
+        "coroutines": async_single_flight.get_stats(),
+    }
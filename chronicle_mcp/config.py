@@ -41,6 +41,52 @@ class CacheConfig:
     enabled: bool = True
     ttl_seconds: int = 300
     max_entries: int = 1000
+    max_size_mb: int = 64
+    persistent: bool = False
+    persistent_path: str | None = None
+    persistent_max_mb: int = 256
+
+
+@dataclass
+class SnapshotConfig:
+    """Browser database snapshot configuration."""
+
+    reuse: bool = True
+    max_staleness_seconds: float = 60.0
+    disk_budget_mb: int = 2048
+    directory: str | None = None
+    strategy: str = "copy"
+    memory_browsers: list[str] = field(default_factory=list)
+    memory_cap_mb: int = 512
+    copy_method: str = "auto"
+
+
+@dataclass
+class PoolConfig:
+    """Read-only connection pool configuration."""
+
+    enabled: bool = True
+    max_connections: int = 4
+    checkout_timeout_seconds: float = 10.0
+
+
+@dataclass
+class IndexConfig:
+    """Local history index configuration."""
+
+    enabled: bool = True
+    path: str | None = None
+    batch_size: int = 1000
+    session_idle_minutes: int = 30
+
+
+@dataclass
+class ScanConfig:
+    """Parallel history scan configuration."""
+
+    processes: int = 0
+    chunk_rows: int = 50_000
+    min_rows: int = 100_000
 
 
 @dataclass
@@ -82,6 +128,8 @@ class AdvancedConfig:
     fuzzy_threshold: float = 0.6
     parallel_queries: bool = True
     max_query_limit: int = 1000
+    max_workers: int = 8
+    coalesce_queries: bool = True
 
 
 @dataclass
@@ -94,6 +142,10 @@ class Config:
     log_level: str = "INFO"
     logging: LoggingConfig = field(default_factory=LoggingConfig)
     cache: CacheConfig = field(default_factory=CacheConfig)
+    snapshot: SnapshotConfig = field(default_factory=SnapshotConfig)
+    pool: PoolConfig = field(default_factory=PoolConfig)
+    index: IndexConfig = field(default_factory=IndexConfig)
+    scan: ScanConfig = field(default_factory=ScanConfig)
     security: SecurityConfig = field(default_factory=SecurityConfig)
     advanced: AdvancedConfig = field(default_factory=AdvancedConfig)
 
@@ -170,6 +222,62 @@ def load_config(config_path: str | None = None) -> Config:
                 config.cache.ttl_seconds = cache_section["ttl_seconds"]
             if "max_entries" in cache_section:
                 config.cache.max_entries = cache_section["max_entries"]
+            if "max_size_mb" in cache_section:
+                config.cache.max_size_mb = cache_section["max_size_mb"]
+            if "persistent" in cache_section:
+                config.cache.persistent = cache_section["persistent"]
+            if "persistent_path" in cache_section:
+                config.cache.persistent_path = cache_section["persistent_path"]
+            if "persistent_max_mb" in cache_section:
+                config.cache.persistent_max_mb = cache_section["persistent_max_mb"]
+
+        if "snapshot" in data:
+            snapshot_section = data["snapshot"]
+            if "reuse" in snapshot_section:
+                config.snapshot.reuse = snapshot_section["reuse"]
+            if "max_staleness_seconds" in snapshot_section:
+                config.snapshot.max_staleness_seconds = snapshot_section["max_staleness_seconds"]
+            if "disk_budget_mb" in snapshot_section:
+                config.snapshot.disk_budget_mb = snapshot_section["disk_budget_mb"]
+            if "directory" in snapshot_section:
+                config.snapshot.directory = snapshot_section["directory"]
+            if "strategy" in snapshot_section:
+                config.snapshot.strategy = snapshot_section["strategy"]
+            if "memory_browsers" in snapshot_section:
+                config.snapshot.memory_browsers = snapshot_section["memory_browsers"]
+            if "memory_cap_mb" in snapshot_section:
+                config.snapshot.memory_cap_mb = snapshot_section["memory_cap_mb"]
+            if "copy_method" in snapshot_section:
+                config.snapshot.copy_method = snapshot_section["copy_method"]
+
+        if "pool" in data:
+            pool_section = data["pool"]
+            if "enabled" in pool_section:
+                config.pool.enabled = pool_section["enabled"]
+            if "max_connections" in pool_section:
+                config.pool.max_connections = pool_section["max_connections"]
+            if "checkout_timeout_seconds" in pool_section:
+                config.pool.checkout_timeout_seconds = pool_section["checkout_timeout_seconds"]
+
+        if "index" in data:
+            index_section = data["index"]
+            if "enabled" in index_section:
+                config.index.enabled = index_section["enabled"]
+            if "path" in index_section:
+                config.index.path = index_section["path"]
+            if "batch_size" in index_section:
+                config.index.batch_size = index_section["batch_size"]
+            if "session_idle_minutes" in index_section:
+                config.index.session_idle_minutes = index_section["session_idle_minutes"]
+
+        if "scan" in data:
+            scan_section = data["scan"]
+            if "processes" in scan_section:
+                config.scan.processes = scan_section["processes"]
+            if "chunk_rows" in scan_section:
+                config.scan.chunk_rows = scan_section["chunk_rows"]
+            if "min_rows" in scan_section:
+                config.scan.min_rows = scan_section["min_rows"]
 
         if "security" in data:
             security_section = data["security"]
@@ -188,6 +296,10 @@ def load_config(config_path: str | None = None) -> Config:
                 config.advanced.parallel_queries = advanced_section["parallel_queries"]
             if "max_query_limit" in advanced_section:
                 config.advanced.max_query_limit = advanced_section["max_query_limit"]
+            if "coalesce_queries" in advanced_section:
+                config.advanced.coalesce_queries = advanced_section["coalesce_queries"]
+            if "max_workers" in advanced_section:
+                config.advanced.max_workers = advanced_section["max_workers"]
 
         logger.info(f"Loaded configuration from {config_path}")
     except Exception as e:
@@ -1,23 +1,39 @@
 """Database connection management for ChronicleMCP.
 
 This module provides a centralized way to connect to browser history databases
-while avoiding 'Database Locked' errors by using temporary copies.
+while avoiding 'Database Locked' errors by using snapshots and temporary copies.
 """
 
+import atexit
 import logging
 import os
-import shutil
 import sqlite3
 import tempfile
+import threading
 import time
 from collections.abc import Callable, Generator
-from contextlib import contextmanager
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
 from typing import Any
 
-from chronicle_mcp.paths import get_browser_path
+from chronicle_mcp.config import PoolConfig, apply_env_overrides, load_config
+from chronicle_mcp.paths import get_browser_path, split_browser
+from chronicle_mcp.snapshot import (
+    MemorySnapshot,
+    Snapshot,
+    SnapshotManager,
+    fast_copy_file,
+    get_snapshot_manager,
+    readonly_uri,
+)
 
 logger = logging.getLogger(__name__)
 
+# SQLite VM instructions between checks for cancellation
+CANCEL_CHECK_INSTRUCTIONS = 10_000
+
+_cancel_event: ContextVar[threading.Event | None] = ContextVar("cancel_event", default=None)
+
 
 class ConnectionError(Exception):
     """Base exception for connection errors."""
@@ -73,6 +89,40 @@ class DatabaseLockedError(ConnectionError):
         )
 
 
+class PoolTimeoutError(ConnectionError):
+    """Raised when no pooled connection becomes available in time."""
+
+    def __init__(self, browser: str, timeout: float):
+        super().__init__(
+            message=f"Timed out after {timeout}s waiting for a {browser} history connection",
+            browser=browser,
+            details="Too many concurrent requests; retry later or raise [pool] max_connections",
+        )
+
+
+@contextmanager
+def cancellation_scope(event: threading.Event) -> Generator[None, None, None]:
+    """Abort queries on connections opened in this scope once ``event`` is set.
+
+    Connections from ``get_history_connection`` check the event every
+    ``CANCEL_CHECK_INSTRUCTIONS`` SQLite instructions and interrupt the
+    running statement (raising ``sqlite3.OperationalError``) when it is set.
+
+    Args:
+        event: Event that signals cancellation
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def get_cancel_event() -> threading.Event | None:
+    """Returns the cancellation event of the enclosing ``cancellation_scope``, if any."""
+    return _cancel_event.get()
+
+
 def get_temp_filename(browser: str) -> str:
     """Generate a unique temporary filename for the database copy.
 
@@ -85,7 +135,7 @@ def get_temp_filename(browser: str) -> str:
     temp_dir = tempfile.gettempdir()
     return os.path.join(
         temp_dir,
-        f"chronicle_{browser}_temp_{os.getpid()}_{int(time.time() * 1000)}.db",
+        f"chronicle_{split_browser(browser)[0]}_temp_{os.getpid()}_{int(time.time() * 1000)}.db",
     )
 
 
@@ -103,18 +153,336 @@ def cleanup_temp_file(temp_path: str) -> None:
         logger.warning(f"Failed to clean up temp file {temp_path}: {e}")
 
 
+class HistoryConnection(sqlite3.Connection):
+    """SQLite connection that remembers the snapshot it reads from."""
+
+    snapshot: Snapshot | MemorySnapshot | None = None
+    snapshot_version: int = 0
+
+
+def connect_readonly(
+    path: str, immutable: bool = False, check_same_thread: bool = True
+) -> HistoryConnection:
+    """Open a read-only connection to a database file.
+
+    Args:
+        path: Path to the database file
+        immutable: Open with ``immutable=1`` (only safe if nothing writes the file)
+        check_same_thread: If False, the connection may be handed between threads
+
+    Returns:
+        Read-only HistoryConnection
+    """
+    return sqlite3.connect(
+        readonly_uri(path, immutable),
+        uri=True,
+        factory=HistoryConnection,
+        check_same_thread=check_same_thread,
+    )
+
+
+class ConnectionPool:
+    """Bounded pool of read-only connections to history snapshots.
+
+    Connections are pooled per browser/profile and keep their page cache and
+    statement cache between checkouts. At most ``max_connections`` are
+    checked out per browser/profile at a time; further callers wait up to
+    ``checkout_timeout`` seconds. A pooled connection is only handed out for
+    the exact snapshot (and in-place refresh version) it was opened on, so
+    connections to refreshed or retired snapshots are closed instead of
+    reused.
+    """
+
+    def __init__(self, max_connections: int = 4, checkout_timeout: float = 10.0):
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self.max_connections = max_connections
+        self.checkout_timeout = checkout_timeout
+        self._idle: dict[tuple[str, str], list[HistoryConnection]] = {}
+        self._in_use: dict[tuple[str, str], int] = {}
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._reused = 0
+        self._created = 0
+        self._closed = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+
+    @classmethod
+    def from_config(cls, config: PoolConfig) -> "ConnectionPool":
+        """Create a pool from a PoolConfig."""
+        return cls(
+            max_connections=config.max_connections,
+            checkout_timeout=config.checkout_timeout_seconds,
+        )
+
+    @staticmethod
+    def _is_current(conn: HistoryConnection, snapshot: Snapshot) -> bool:
+        return (
+            conn.snapshot is snapshot
+            and conn.snapshot_version == snapshot.version
+            and not snapshot.retired
+        )
+
+    def _close(self, conns: list[HistoryConnection]) -> None:
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Failed to close pooled connection: {e}")
+        if conns:
+            with self._cond:
+                self._closed += len(conns)
+
+    def checkout(self, snapshot: Snapshot) -> HistoryConnection:
+        """Check out a read-only connection to ``snapshot``.
+
+        The caller must hold a reference to the snapshot until the
+        connection is returned with ``checkin``.
+
+        Args:
+            snapshot: Snapshot acquired from the snapshot manager
+
+        Returns:
+            HistoryConnection, reused from the pool when possible
+
+        Raises:
+            PoolTimeoutError: If no connection becomes available in time
+        """
+        key = (snapshot.browser, snapshot.source_path)
+        start = time.monotonic()
+        stale: list[HistoryConnection] = []
+        conn = None
+        with self._cond:
+            waited = False
+            while self._in_use.get(key, 0) >= self.max_connections:
+                remaining = self.checkout_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(snapshot.browser, self.checkout_timeout)
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            self._checkouts += 1
+            if waited:
+                wait = time.monotonic() - start
+                self._waits += 1
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate = idle.pop()
+                if self._is_current(candidate, snapshot):
+                    conn = candidate
+                    self._reused += 1
+                    break
+                stale.append(candidate)
+
+        self._close(stale)
+        if conn is not None:
+            return conn
+
+        try:
+            conn = connect_readonly(snapshot.path, snapshot.immutable, check_same_thread=False)
+        except BaseException:
+            with self._cond:
+                self._in_use[key] -= 1
+                self._cond.notify()
+            raise
+        conn.snapshot = snapshot
+        conn.snapshot_version = snapshot.version
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def checkin(self, conn: HistoryConnection) -> None:
+        """Return a connection obtained from ``checkout`` to the pool."""
+        snapshot = conn.snapshot
+        if not isinstance(snapshot, Snapshot):
+            raise ValueError("Connection was not checked out from a ConnectionPool")
+        key = (snapshot.browser, snapshot.source_path)
+
+        reusable = self._is_current(conn, snapshot)
+        if reusable:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                reusable = False
+
+        with self._cond:
+            self._in_use[key] -= 1
+            idle = self._idle.setdefault(key, [])
+            keep = reusable and len(idle) < self.max_connections
+            if keep:
+                idle.append(conn)
+            self._cond.notify()
+        if not keep:
+            self._close([conn])
+
+    def discard_snapshot(self, snapshot: Snapshot) -> None:
+        """Close idle connections to a snapshot that is being refreshed or removed."""
+        closing: list[HistoryConnection] = []
+        with self._cond:
+            idle = self._idle.get((snapshot.browser, snapshot.source_path), [])
+            closing = [conn for conn in idle if conn.snapshot is snapshot]
+            idle[:] = [conn for conn in idle if conn.snapshot is not snapshot]
+        self._close(closing)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._cond:
+            closing = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        self._close(closing)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get pool statistics."""
+        with self._cond:
+            return {
+                "max_connections": self.max_connections,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "in_use": sum(self._in_use.values()),
+                "checkouts": self._checkouts,
+                "reused": self._reused,
+                "created": self._created,
+                "closed": self._closed,
+                "waits": self._waits,
+                "wait_seconds_total": self._wait_seconds,
+                "max_wait_seconds": self._max_wait_seconds,
+                "timeouts": self._timeouts,
+            }
+
+
+_default_pool: ConnectionPool | None = None
+_default_pool_loaded = False
+_default_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool | None:
+    """Returns the process-wide connection pool, or None if pooling is disabled."""
+    global _default_pool, _default_pool_loaded
+    with _default_pool_lock:
+        if not _default_pool_loaded:
+            _default_pool_loaded = True
+            config = apply_env_overrides(load_config())
+            if config.pool.enabled:
+                _default_pool = ConnectionPool.from_config(config.pool)
+                get_snapshot_manager().add_listener(_default_pool.discard_snapshot)
+                atexit.register(_default_pool.close)
+        return _default_pool
+
+
+@contextmanager
+def _private_copy_connection(
+    browser: str, history_path: str, copy_method: str = "auto"
+) -> Generator[HistoryConnection, None, None]:
+    """Open a writable connection to a private, per-call copy of the database."""
+    temp_path = get_temp_filename(browser)
+    try:
+        logger.debug(f"Copying {browser} history to temp file: {temp_path}")
+        fast_copy_file(history_path, temp_path, copy_method)
+        conn = sqlite3.connect(temp_path, factory=HistoryConnection)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    finally:
+        cleanup_temp_file(temp_path)
+
+
+@contextmanager
+def _snapshot_connection(
+    manager: SnapshotManager, browser: str, history_path: str
+) -> Generator[HistoryConnection, None, None]:
+    """Open a read-only connection to the shared snapshot of the database."""
+    with manager.snapshot(browser, history_path) as snapshot:
+        conn = connect_readonly(snapshot.path, snapshot.immutable)
+        conn.snapshot = snapshot
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+@contextmanager
+def _pooled_connection(
+    pool: ConnectionPool, manager: SnapshotManager, browser: str, history_path: str
+) -> Generator[HistoryConnection, None, None]:
+    """Check out a pooled read-only connection to the shared snapshot."""
+    with manager.snapshot(browser, history_path) as snapshot:
+        conn = pool.checkout(snapshot)
+        try:
+            yield conn
+        finally:
+            pool.checkin(conn)
+
+
+@contextmanager
+def _memory_connection(
+    manager: SnapshotManager, browser: str, history_path: str
+) -> Generator[sqlite3.Connection, None, None]:
+    """Borrow the in-memory snapshot's connection, falling back to disk if it does not fit."""
+    entry = manager.memory.acquire(browser, history_path, factory=HistoryConnection)
+    if entry is None:
+        with _snapshot_connection(manager, browser, history_path) as conn:
+            yield conn
+        return
+
+    try:
+        with entry.lock:
+            if isinstance(entry.conn, HistoryConnection):
+                entry.conn.snapshot = entry
+            yield entry.conn
+    finally:
+        manager.memory.release(entry)
+
+
+def resolve_history_path(browser: str) -> str:
+    """Returns the path of a browser's history database, checking that it exists.
+
+    Args:
+        browser: Browser name (lowercase)
+
+    Returns:
+        Path to the history database
+
+    Raises:
+        BrowserNotFoundError: If the browser is not recognized
+        BrowserPathNotFoundError: If the history path doesn't exist
+    """
+    history_path = get_browser_path(browser)
+
+    if not history_path:
+        raise BrowserNotFoundError(browser)
+
+    if not os.path.exists(history_path):
+        raise BrowserPathNotFoundError(browser, history_path)
+
+    return history_path
+
+
 @contextmanager
 def get_history_connection(
     browser: str = "chrome",
+    writable: bool = False,
 ) -> Generator[sqlite3.Connection, None, None]:
-    """Creates a temporary copy of the history database to avoid 'Database Locked' errors.
+    """Opens a snapshot of the history database to avoid 'Database Locked' errors.
 
-    This function copies the browser's history database to a temporary file,
-    opens it, and ensures cleanup after the context exits. This prevents
-    database locking issues when the browser is running.
+    By default the connection is read-only and points at a snapshot shared
+    with other readers, which is only re-copied when the browser's database
+    changes (see ``chronicle_mcp.snapshot``), through a pooled connection
+    unless ``[pool] enabled`` is false. Browsers listed in the
+    ``memory_browsers`` snapshot setting are served from an in-memory copy.
+    Callers that modify the database get a private copy that is removed when
+    the context exits.
 
     Args:
         browser: Browser name (chrome, edge, firefox) - case insensitive
+        writable: If True, open a private writable copy instead of the shared snapshot
 
     Yields:
         SQLite connection to the history database
@@ -126,46 +494,44 @@ def get_history_connection(
         DatabaseLockedError: If the database is locked
     """
     browser_lower = browser.lower()
-
-    history_path = get_browser_path(browser_lower)
-
-    if not history_path:
-        raise BrowserNotFoundError(browser_lower)
-
-    if not os.path.exists(history_path):
-        raise BrowserPathNotFoundError(browser_lower, history_path)
-
-    temp_path = get_temp_filename(browser_lower)
-
+    history_path = resolve_history_path(browser_lower)
+
+    manager = get_snapshot_manager()
+    opened: AbstractContextManager[sqlite3.Connection]
+    if writable or not manager.reuse:
+        opened = _private_copy_connection(browser_lower, history_path, manager.copy_method)
+    elif manager.memory.enabled_for(browser_lower):
+        opened = _memory_connection(manager, browser_lower, history_path)
+    elif (pool := get_connection_pool()) is not None:
+        opened = _pooled_connection(pool, manager, browser_lower, history_path)
+    else:
+        opened = _snapshot_connection(manager, browser_lower, history_path)
+
+    cancel_event = get_cancel_event()
     try:
-        logger.debug(f"Copying {browser} history to temp file: {temp_path}")
-        shutil.copy2(history_path, temp_path)
-
-        conn = sqlite3.connect(temp_path)
-        try:
-            yield conn
-        except sqlite3.OperationalError as e:
-            if "locked" in str(e).lower():
-                raise DatabaseLockedError(browser_lower, history_path) from e
-            raise
-        finally:
-            conn.close()
-            cleanup_temp_file(temp_path)
+        with opened as conn:
+            if cancel_event is not None:
+                conn.set_progress_handler(cancel_event.is_set, CANCEL_CHECK_INSTRUCTIONS)
+            try:
+                yield conn
+            except sqlite3.OperationalError as e:
+                if "locked" in str(e).lower():
+                    raise DatabaseLockedError(browser_lower, history_path) from e
+                raise
+            finally:
+                if cancel_event is not None:
+                    conn.set_progress_handler(None, 0)
 
     except PermissionError:
         raise
     except OSError as e:
         if "permission" in str(e).lower():
             raise PermissionError(browser_lower, history_path) from e
-        cleanup_temp_file(temp_path)
         raise ConnectionError(
             f"Failed to access {browser} history: {e}",
             browser=browser_lower,
             details=str(e),
         ) from e
-    except Exception:
-        cleanup_temp_file(temp_path)
-        raise
 
 
 def execute_with_connection(browser: str, func: Callable[[sqlite3.Connection], Any]) -> Any:
@@ -5,6 +5,7 @@ validation, and formatting. Protocol adapters (MCP, HTTP) consume these
 services to provide their respective interfaces.
 """
 
+from chronicle_mcp.core.async_services import AsyncHistoryService
 from chronicle_mcp.core.exceptions import (
     BrowserNotFoundError,
     BrowserPathNotFoundError,
@@ -36,16 +37,21 @@ from chronicle_mcp.core.formatters import (
 from chronicle_mcp.core.services import HistoryService
 from chronicle_mcp.core.validation import (
     validate_browser,
+    validate_browsers,
     validate_browsers_different,
     validate_date_range,
+    validate_days,
     validate_domain,
     validate_exclude_domains,
     validate_format_type,
     validate_fuzzy_threshold,
+    validate_group_by,
     validate_hours,
     validate_limit,
     validate_merge_strategy,
     validate_query,
+    validate_regex,
+    validate_search_mode,
     validate_search_options,
     validate_sort_by,
 )
@@ -53,6 +59,7 @@ from chronicle_mcp.core.validation import (
 __all__ = [
     # Service
     "HistoryService",
+    "AsyncHistoryService",
     # Exceptions
     "ServiceError",
     "ValidationError",
@@ -65,15 +72,20 @@ __all__ = [
     "InvalidDateRangeError",
     # Validation
     "validate_browser",
+    "validate_browsers",
     "validate_query",
     "validate_limit",
     "validate_hours",
+    "validate_days",
     "validate_format_type",
     "validate_domain",
     "validate_date_range",
     "validate_sort_by",
     "validate_fuzzy_threshold",
     "validate_search_options",
+    "validate_regex",
+    "validate_group_by",
+    "validate_search_mode",
     "validate_merge_strategy",
     "validate_browsers_different",
     "validate_exclude_domains",
@@ -0,0 +1,146 @@
+"""Async facade over the HistoryService.
+
+The HistoryService is synchronous: it copies database files and runs SQLite
+queries on the calling thread. Protocol adapters run on an asyncio event
+loop, so calling it directly would block every other request while one
+query runs. AsyncHistoryService runs each operation on a bounded worker
+thread pool instead. If the awaiting task is cancelled (for example because
+the client disconnected), queued work is dropped and running SQLite
+statements are interrupted.
+
+Identical read operations that are in flight at the same time (see
+``operation_key``) share a single worker thread and result; each caller can
+still be cancelled on its own.
+"""
+
+import asyncio
+import atexit
+import functools
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from chronicle_mcp.cache import QueryCache
+from chronicle_mcp.coalesce import get_async_single_flight
+from chronicle_mcp.config import apply_env_overrides, load_config
+from chronicle_mcp.connection import cancellation_scope
+from chronicle_mcp.core.services import HistoryService, operation_key
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the worker pool for blocking service calls, creating it from config."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = max(1, apply_env_overrides(load_config()).advanced.max_workers)
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="chronicle-worker"
+            )
+            atexit.register(shutdown_executor)
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the worker pool, dropping work that has not started yet."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function on the worker pool.
+
+    Cancelling the awaiting task removes the call from the queue if it has
+    not started, and otherwise interrupts the SQLite statement it is running.
+
+    Args:
+        func: Blocking function to run
+        *args: Positional arguments for ``func``
+        **kwargs: Keyword arguments for ``func``
+
+    Returns:
+        Return value of ``func``
+    """
+    cancel_event = threading.Event()
+
+    def call() -> T:
+        with cancellation_scope(cancel_event):
+            return func(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), call)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        logger.debug(f"Cancelled {getattr(func, '__name__', func)}")
+        raise
+
+
+def _delegate(name: str) -> Any:
+    """Build an async classmethod that runs ``HistoryService.<name>`` on the worker pool."""
+
+    async def method(cls: type, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        # Look the method up per call so HistoryService can be patched at runtime
+        service_method = getattr(HistoryService, name)
+        call = functools.partial(service_method, *args, **kwargs)
+        single_flight = get_async_single_flight()
+        if single_flight is None:
+            return await run_blocking(call)
+        # Resolving browsers and reading their state blocks, so keep it off the loop
+        key = await run_blocking(operation_key, name, args, kwargs)
+        if key is None:
+            return await run_blocking(call)
+        # Identical calls in flight on this loop share one worker thread
+        result = await single_flight.do(
+            QueryCache.make_key(name, key.params), lambda: run_blocking(call)
+        )
+        return dict(result)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncHistoryService.{name}"
+    method.__doc__ = f"Async version of ``HistoryService.{name}``."
+    return classmethod(method)
+
+
+class AsyncHistoryService:
+    """Async counterpart of HistoryService for use on an event loop.
+
+    Every method takes the same arguments and returns the same data as the
+    HistoryService method of the same name, and raises the same exceptions.
+    """
+
+    list_available_browsers = _delegate("list_available_browsers")
+    search_history = _delegate("search_history")
+    get_recent_history = _delegate("get_recent_history")
+    count_visits = _delegate("count_visits")
+    list_top_domains = _delegate("list_top_domains")
+    search_history_by_date = _delegate("search_history_by_date")
+    delete_history = _delegate("delete_history")
+    search_by_domain = _delegate("search_by_domain")
+    get_browser_stats = _delegate("get_browser_stats")
+    get_most_visited_pages = _delegate("get_most_visited_pages")
+    get_visit_timeline = _delegate("get_visit_timeline")
+    get_visit_histogram = _delegate("get_visit_histogram")
+    get_browsing_sessions = _delegate("get_browsing_sessions")
+    export_history = _delegate("export_history")
+    search_history_advanced = _delegate("search_history_advanced")
+    sync_history = _delegate("sync_history")
+    list_available_bookmarks = _delegate("list_available_bookmarks")
+    list_available_downloads = _delegate("list_available_downloads")
+    get_bookmarks = _delegate("get_bookmarks")
+    get_downloads = _delegate("get_downloads")
+    get_snapshot_stats = _delegate("get_snapshot_stats")
+    get_connection_pool_stats = _delegate("get_connection_pool_stats")
+    get_index_stats = _delegate("get_index_stats")
+    get_cache_stats = _delegate("get_cache_stats")
@@ -10,8 +10,35 @@ from io import StringIO
 from typing import Any
 
 
+def _history_items(
+    rows: list[tuple[str, str, str]], sources: list[str] | None = None
+) -> list[dict[str, Any]]:
+    """JSON items for history rows, with the browser of each row if given."""
+    items: list[dict[str, Any]] = [
+        {"title": title, "url": url, "timestamp": ts} for title, url, ts in rows
+    ]
+    if sources is not None:
+        for item, source in zip(items, sources):
+            item["browser"] = source
+    return items
+
+
+def _history_entries(
+    rows: list[tuple[str, str, str]], sources: list[str] | None = None
+) -> list[str]:
+    """Markdown entries for history rows, with the browser of each row if given."""
+    entries = [f"- **{title}**\n  URL: {url}\n  Timestamp: {ts}" for title, url, ts in rows]
+    if sources is not None:
+        entries = [f"{entry}\n  Browser: {source}" for entry, source in zip(entries, sources)]
+    return entries
+
+
 def format_search_results(
-    rows: list[tuple[str, str, str]], query: str, format_type: str = "markdown"
+    rows: list[tuple[str, str, str]],
+    query: str,
+    format_type: str = "markdown",
+    snippets: list[str | None] | None = None,
+    sources: list[str] | None = None,
 ) -> str:
     """Format search results for output.
 
@@ -19,6 +46,8 @@ def format_search_results(
         rows: List of (title, url, timestamp) tuples
         query: Original search query (for 'not found' message)
         format_type: 'markdown' or 'json'
+        snippets: Optional highlighted match snippet per row (full-text search)
+        sources: Optional browser per row (searches across browsers)
 
     Returns:
         Formatted string output
@@ -27,16 +56,27 @@ def format_search_results(
         return f"No history found for: {query}"
 
     if format_type == "json":
-        items = [{"title": title, "url": url, "timestamp": ts} for title, url, ts in rows]
+        items = _history_items(rows, sources)
+        if snippets is not None:
+            for item, snippet in zip(items, snippets):
+                item["snippet"] = snippet
         return json.dumps({"results": items, "count": len(items)})
 
     # Markdown format
-    results = [f"- **{title}**\n  URL: {url}\n  Timestamp: {ts}" for title, url, ts in rows]
+    results = _history_entries(rows, sources)
+    if snippets is not None:
+        results = [
+            f"{entry}\n  Match: {snippet}" if snippet else entry
+            for entry, snippet in zip(results, snippets)
+        ]
     return "\n\n".join(results)
 
 
 def format_recent_results(
-    rows: list[tuple[str, str, str]], hours: int, format_type: str = "markdown"
+    rows: list[tuple[str, str, str]],
+    hours: int,
+    format_type: str = "markdown",
+    sources: list[str] | None = None,
 ) -> str:
     """Format recent history results for output.
 
@@ -44,19 +84,20 @@ def format_recent_results(
         rows: List of (title, url, timestamp) tuples
         hours: Number of hours queried
         format_type: 'markdown' or 'json'
+        sources: Optional browser per row (history across browsers)
 
     Returns:
         Formatted string output
     """
     if format_type == "json":
-        items = [{"title": title, "url": url, "timestamp": ts} for title, url, ts in rows]
+        items = _history_items(rows, sources)
         return json.dumps({"results": items, "count": len(items)})
 
     if not rows:
         return f"No history found in the last {hours} hours"
 
     # Markdown format
-    results = [f"- **{title}**\n  URL: {url}\n  Timestamp: {ts}" for title, url, ts in rows]
+    results = _history_entries(rows, sources)
     return f"History from last {hours} hours:\n\n" + "\n\n".join(results)
 
 
@@ -124,8 +165,99 @@ def format_most_visited_pages(
     return "Most visited pages:\n\n" + "\n\n".join(results)
 
 
+def format_visit_timeline(
+    rows: list[tuple[str, str, str]],
+    start: str,
+    end: str,
+    format_type: str = "markdown",
+    sources: list[str] | None = None,
+) -> str:
+    """Format the visits of a time window for output.
+
+    Args:
+        rows: List of (title, url, timestamp) tuples, one per visit
+        start: Start of the window as given
+        end: End of the window as given
+        format_type: 'markdown' or 'json'
+        sources: Optional browser per row (visits across browsers)
+
+    Returns:
+        Formatted string output
+    """
+    if format_type == "json":
+        items = _history_items(rows, sources)
+        return json.dumps({"visits": items, "count": len(items)})
+
+    if not rows:
+        return f"No visits between {start} and {end}"
+
+    results = _history_entries(rows, sources)
+    return f"Visits between {start} and {end}:\n\n" + "\n\n".join(results)
+
+
+def format_visit_histogram(
+    histogram: dict[str, Any], weekdays: tuple[str, ...], format_type: str = "markdown"
+) -> str:
+    """Format visits per hour of the day and day of the week.
+
+    Args:
+        histogram: Dictionary from ``visit_histogram``
+        weekdays: Names of the days of the week, Monday first
+        format_type: 'markdown' or 'json'
+
+    Returns:
+        Formatted string output
+    """
+    if format_type == "json":
+        return json.dumps(histogram)
+
+    if not histogram["total_visits"]:
+        return "No visits found"
+
+    hours = [f"- {hour:02d}:00 {count}" for hour, count in enumerate(histogram["hour_of_day"])]
+    days = [f"- {day}: {count}" for day, count in zip(weekdays, histogram["day_of_week"])]
+    return (
+        f"{histogram['total_visits']} visits\n\nBy hour of day:\n"
+        + "\n".join(hours)
+        + "\n\nBy day of week:\n"
+        + "\n".join(days)
+    )
+
+
+def format_sessions(sessions: list[dict[str, Any]], format_type: str = "markdown") -> str:
+    """Format browsing sessions for output.
+
+    Args:
+        sessions: Session summaries from ``get_sessions``, newest first
+        format_type: 'markdown' or 'json'
+
+    Returns:
+        Formatted string output
+    """
+    if format_type == "json":
+        return json.dumps({"sessions": sessions, "count": len(sessions)})
+
+    if not sessions:
+        return "No browsing sessions found"
+
+    results = []
+    for session in sessions:
+        hosts = ", ".join(f"{host} ({visits})" for host, visits in session["top_hosts"])
+        entry = f"\n  Started at: {session['entry_url']}" if session["entry_url"] else ""
+        results.append(
+            f"- **{session['start']} – {session['end']}** "
+            f"({session['duration_minutes']} min, {session['visits']} visits)"
+            f"{entry}\n  Top sites: {hosts or 'none'}"
+        )
+    return "Browsing sessions:\n\n" + "\n\n".join(results)
+
+
 def format_domain_search_results(
-    rows: list[tuple[str, str, str]], domain: str, query: str | None, format_type: str = "markdown"
+    rows: list[tuple[str, str, str]],
+    domain: str,
+    query: str | None,
+    format_type: str = "markdown",
+    sources: list[str] | None = None,
 ) -> str:
     """Format domain-specific search results.
 
@@ -134,6 +266,7 @@ def format_domain_search_results(
         domain: Domain searched
         query: Optional search query within domain
         format_type: 'markdown' or 'json'
+        sources: Optional browser per row (searches across browsers)
 
     Returns:
         Formatted string output
@@ -142,9 +275,7 @@ def format_domain_search_results(
         return json.dumps(
             {
                 "domain": domain,
-                "results": [
-                    {"title": title, "url": url, "timestamp": ts} for title, url, ts in rows
-                ],
+                "results": _history_items(rows, sources),
                 "count": len(rows),
             }
         )
@@ -154,7 +285,7 @@ def format_domain_search_results(
 
     # Markdown format
     search_desc = f"'{query}' in {domain}" if query else domain
-    results = [f"- **{title}**\n  URL: {url}\n  Timestamp: {ts}" for title, url, ts in rows]
+    results = _history_entries(rows, sources)
     return f"History for {search_desc}:\n\n" + "\n\n".join(results)
 
 
@@ -163,6 +294,8 @@ def format_advanced_search_results(
     query: str,
     format_type: str = "markdown",
     options: dict[str, Any] | None = None,
+    snippets: list[str | None] | None = None,
+    sources: list[str] | None = None,
 ) -> str:
     """Format advanced search results.
 
@@ -171,17 +304,21 @@ def format_advanced_search_results(
         query: Search query
         format_type: 'markdown' or 'json'
         options: Search options used
+        snippets: Optional highlighted match snippet per row (full-text search)
+        sources: Optional browser per row (searches across browsers)
 
     Returns:
         Formatted string output
     """
     if format_type == "json":
+        items = _history_items(rows, sources)
+        if snippets is not None:
+            for item, snippet in zip(items, snippets):
+                item["snippet"] = snippet
         return json.dumps(
             {
                 "query": query,
-                "results": [
-                    {"title": title, "url": url, "timestamp": ts} for title, url, ts in rows
-                ],
+                "results": items,
                 "count": len(rows),
                 "options": options or {},
             }
@@ -190,9 +327,7 @@ def format_advanced_search_results(
     if not rows:
         return f"No history found for: {query}"
 
-    # Markdown format
-    results = [f"- **{title}**\n  URL: {url}\n  Timestamp: {ts}" for title, url, ts in rows]
-    return "\n\n".join(results)
+    return format_search_results(rows, query, format_type, snippets, sources)
 
 
 def format_browser_stats(stats: dict[str, Any]) -> str:
@@ -262,7 +397,21 @@ def format_delete_result(query: str, browser: str, count: int) -> str:
     return f"Deleted {count} history entries matching '{query}' from {browser}"
 
 
-def format_sync_preview(source: str, target: str, entries_count: int, merge_strategy: str) -> str:
+def _sync_breakdown(new_entries: int | None, updated_entries: int | None) -> str:
+    """Parenthesised new/updated counts of a sync, if known."""
+    if new_entries is None or updated_entries is None:
+        return ""
+    return f" ({new_entries} new, {updated_entries} updated)"
+
+
+def format_sync_preview(
+    source: str,
+    target: str,
+    entries_count: int,
+    merge_strategy: str,
+    new_entries: int | None = None,
+    updated_entries: int | None = None,
+) -> str:
     """Format sync dry-run preview message.
 
     Args:
@@ -270,31 +419,44 @@ def format_sync_preview(source: str, target: str, entries_count: int, merge_stra
         target: Target browser
         entries_count: Number of entries to sync
         merge_strategy: Merge strategy name
+        new_entries: Entries the target does not have yet
+        updated_entries: Entries of the target that would change
 
     Returns:
         Preview message string
     """
     return (
-        f"Dry run: Would sync {entries_count} entries from {source} to {target} "
+        f"Dry run: Would sync {entries_count} entries"
+        f"{_sync_breakdown(new_entries, updated_entries)} from {source} to {target} "
         f"using '{merge_strategy}' strategy"
     )
 
 
-def format_sync_result(source: str, target: str, entries_count: int, merge_strategy: str) -> str:
-    """Format sync success message.
+def format_sync_result(
+    source: str,
+    target: str,
+    entries_count: int,
+    merge_strategy: str,
+    new_entries: int | None = None,
+    updated_entries: int | None = None,
+) -> str:
+    """Format the plan of a merge, which is not written to the target.
 
     Args:
         source: Source browser
         target: Target browser
-        entries_count: Number of entries synced
+        entries_count: Number of entries the merge adds or updates
         merge_strategy: Merge strategy name
+        new_entries: Entries the target does not have yet
+        updated_entries: Entries of the target the merge updates
 
     Returns:
-        Success message string
+        Result message string, stating that the target was not written to
     """
     return (
-        f"Synced {entries_count} entries from {source} to {target} "
-        f"using '{merge_strategy}' strategy"
+        f"Merge plan: {entries_count} entries"
+        f"{_sync_breakdown(new_entries, updated_entries)} from {source} into {target} "
+        f"using '{merge_strategy}' strategy. Nothing was written to {target}'s history"
     )
 
 
@@ -5,10 +5,23 @@ It handles validation, database operations, and returns structured data.
 Protocol adapters (MCP, HTTP) consume these services and format responses.
 """
 
+import atexit
+import contextvars
+import functools
+import heapq
+import inspect
+import itertools
 import logging
-from collections.abc import Callable
-from typing import Any
-
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from typing import Any, NamedTuple, cast
+
+from chronicle_mcp.cache import QueryCache, get_query_cache, source_state
+from chronicle_mcp.coalesce import get_coalescing_stats, get_single_flight
+from chronicle_mcp.config import apply_env_overrides, load_config
 from chronicle_mcp.connection import (
     BrowserNotFoundError as ConnBrowserNotFoundError,
 )
@@ -22,13 +35,17 @@ from chronicle_mcp.connection import (
     PermissionError as ConnPermissionError,
 )
 from chronicle_mcp.connection import (
+    get_connection_pool,
     get_history_connection,
+    resolve_history_path,
 )
 from chronicle_mcp.core.exceptions import (
     BrowserNotFoundError,
     DatabaseError,
     DatabaseLockedError,
     PermissionDeniedError,
+    ServiceError,
+    ValidationError,
 )
 from chronicle_mcp.core.formatters import (
     format_advanced_search_results,
@@ -43,30 +60,37 @@ from chronicle_mcp.core.formatters import (
     format_most_visited_pages,
     format_recent_results,
     format_search_results,
+    format_sessions,
     format_sync_preview,
     format_sync_result,
     format_top_domains,
+    format_visit_histogram,
+    format_visit_timeline,
 )
 from chronicle_mcp.core.validation import (
     validate_browser,
+    validate_browsers,
     validate_browsers_different,
     validate_date_range,
+    validate_days,
     validate_domain,
     validate_exclude_domains,
     validate_format_type,
     validate_fuzzy_threshold,
+    validate_group_by,
     validate_hours,
     validate_limit,
     validate_merge_strategy,
     validate_query,
+    validate_regex,
+    validate_search_mode,
     validate_search_options,
     validate_sort_by,
 )
 from chronicle_mcp.database import (
-    count_domain_visits,
+    chrome_cutoff,
     query_bookmarks,
     query_downloads,
-    query_history,
     query_recent_history,
 )
 from chronicle_mcp.database import (
@@ -75,25 +99,25 @@ from chronicle_mcp.database import (
 from chronicle_mcp.database import (
     export_history as db_export_history,
 )
-from chronicle_mcp.database import (
-    get_browser_stats as db_get_browser_stats,
-)
-from chronicle_mcp.database import (
-    get_most_visited_pages as db_get_most_visited_pages,
-)
-from chronicle_mcp.database import (
-    get_top_domains as db_get_top_domains,
-)
 from chronicle_mcp.database import (
     search_by_date as db_search_by_date,
 )
-from chronicle_mcp.database import (
-    search_by_domain as db_search_by_domain,
-)
 from chronicle_mcp.database import (
     search_history_advanced as db_search_history_advanced,
 )
+from chronicle_mcp.index import (
+    count_host_visits,
+    get_history_index,
+    get_top_hosts,
+    search_by_host,
+    search_fulltext,
+    search_fuzzy,
+    search_regex,
+    search_substring,
+)
+from chronicle_mcp.parallel import search_fuzzy_parallel, search_regex_parallel
 from chronicle_mcp.paths import (
+    ALL_PROFILES,
     get_available_bookmarks,
     get_available_browsers,
     get_available_downloads,
@@ -101,21 +125,231 @@ from chronicle_mcp.paths import (
     get_browser_path,
     get_browser_schema,
     get_download_path,
+    get_profile_targets,
+    split_browser,
+)
+from chronicle_mcp.rollups import get_history_stats, get_top_pages
+from chronicle_mcp.sessions import get_sessions
+from chronicle_mcp.snapshot import get_snapshot_manager
+from chronicle_mcp.sync import SYNC_TARGET_SCHEMAS, merge_history
+from chronicle_mcp.timeline import (
+    WEEKDAY_NAMES,
+    get_visits,
+    to_chrome_timestamp,
+    visit_histogram,
 )
 
 logger = logging.getLogger(__name__)
 
+# Browser argument that selects every browser with a history database
+ALL_BROWSERS = "all"
+
+# Sort key for rows of per-browser results; None interleaves them by rank
+MergeKey = Callable[[Any], Any] | None
+
+_fanout_executor: ThreadPoolExecutor | None = None
+_fanout_lock = threading.Lock()
+
+
+def get_fanout_executor() -> ThreadPoolExecutor | None:
+    """Returns the pool that queries browsers concurrently, or None if
+    ``[advanced] parallel_queries`` is false."""
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            advanced = apply_env_overrides(load_config()).advanced
+            if not advanced.parallel_queries:
+                return None
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=max(1, advanced.max_workers), thread_name_prefix="chronicle-fanout"
+            )
+            atexit.register(shutdown_fanout_executor)
+        return _fanout_executor
+
+
+def shutdown_fanout_executor() -> None:
+    """Shut down the browser fan-out pool."""
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is not None:
+            _fanout_executor.shutdown(wait=False, cancel_futures=True)
+            _fanout_executor = None
+
+
+class BrowserResults(NamedTuple):
+    """Rows from one or more browsers.
+
+    ``sources`` names the browser of each row and ``failed`` the browsers
+    that could not be read, with the reason; both are None for a single
+    browser.
+    """
+
+    rows: list[Any]
+    sources: list[str] | None = None
+    failed: dict[str, str] | None = None
+
+    def fields(self, browsers: list[str]) -> dict[str, Any]:
+        """Extra result fields describing a search across browsers."""
+        if self.sources is None:
+            return {}
+        return {"browsers": browsers, "sources": self.sources, "failed": self.failed or {}}
+
+
+def by_recency(row: tuple[Any, ...]) -> Any:
+    """Merge key for (title, url, timestamp, ...) rows sorted newest first.
+
+    Timestamps from every browser are normalised to the same UTC ISO 8601
+    format, so they compare chronologically as strings.
+    """
+    return row[2]
+
+
+def by_title(row: tuple[Any, ...]) -> Any:
+    """Merge key for rows sorted by title, untitled rows first as in SQLite."""
+    return (row[0] is not None, row[0] or "")
+
+
+def merge_key(sort_by: str) -> tuple[MergeKey, bool]:
+    """Returns the merge key for a sort order and whether it sorts descending."""
+    if sort_by == "date":
+        return by_recency, True
+    if sort_by == "title":
+        return by_title, False
+    # Visit counts and relevance scores are not part of the rows
+    return None, False
+
+
+class OperationKey(NamedTuple):
+    """Normalised arguments of a read operation and the sources it reads.
+
+    ``params`` holds the arguments with defaults filled in, its ``browser``
+    replaced by ``sources``: the (browser, database path, ``source_state``)
+    of every browser read.
+    """
+
+    params: dict[str, Any]
+    sources: list[tuple[str, str, tuple[int, ...]]]
+
+    @property
+    def browsers(self) -> list[str]:
+        """Browsers the operation reads."""
+        return [target for target, _, _ in self.sources]
+
+
+# Signatures of the operations decorated with cached_operation, by name
+_SHARED_OPERATIONS: dict[str, inspect.Signature] = {}
+
+
+def operation_key(name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> OperationKey | None:
+    """Key of a ``HistoryService`` read operation called with some arguments.
+
+    Two calls get equal keys if they would compute the same result: the
+    same operation and normalised arguments, against the same state of the
+    same databases.
+
+    Args:
+        name: Name of the operation
+        args: Positional arguments, without ``cls``
+        kwargs: Keyword arguments
+
+    Returns:
+        The key, or None if the operation is not a cached one or its
+        arguments or browsers cannot be resolved
+    """
+    signature = _SHARED_OPERATIONS.get(name)
+    if signature is None:
+        return None
+    try:
+        bound = signature.bind(HistoryService, *args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    params = {param: value for param, value in bound.arguments.items() if param != "cls"}
+    try:
+        sources = [
+            (target, path, source_state(path))
+            for target in HistoryService._resolve_browsers(params["browser"])
+            for path in [resolve_history_path(target)]
+        ]
+    except (ServiceError, ConnConnectionError, OSError):
+        return None
+    params["browser"] = sources
+    return OperationKey(params, sources)
+
+
+def cached_operation(method: Callable[..., dict[str, Any]]) -> Callable[..., dict[str, Any]]:
+    """Serve a read operation of ``HistoryService`` from the query cache,
+    sharing computations between identical concurrent calls.
+
+    Results are keyed by ``operation_key``: the operation, its arguments
+    with defaults filled in, and for each browser read, its database path
+    and ``source_state``, so any change to a source database misses the
+    cache. Entries are tagged with their browsers, and a browser's entries
+    are dropped as soon as a changed state is seen. Results of calls that
+    raise are not cached, and calls whose key cannot be built run as they
+    are so the operation reports the error itself. Time windows relative
+    to now (e.g. recent history) can lag by up to ``[cache] ttl_seconds``.
+
+    Calls that miss the cache while an identical call is running wait for
+    its result instead of computing it again (see ``chronicle_mcp.coalesce``),
+    unless ``[advanced] coalesce_queries`` is false.
+
+    Args:
+        method: Classmethod function whose arguments include ``browser``
+
+    Returns:
+        Wrapped method, to be decorated with ``@classmethod``
+    """
+    name = method.__name__
+    _SHARED_OPERATIONS[name] = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(cls: type["HistoryService"], *args: Any, **kwargs: Any) -> dict[str, Any]:
+        query_cache = get_query_cache()
+        single_flight = get_single_flight()
+        if query_cache is None and single_flight is None:
+            return method(cls, *args, **kwargs)
+        key = operation_key(name, args, kwargs)
+        if key is None:
+            return method(cls, *args, **kwargs)
+
+        if query_cache is not None:
+            for target, path, state in key.sources:
+                query_cache.observe(target, (path, state))
+            cached = query_cache.get(name, key.params)
+            if cached is not None:
+                return dict(cached)
+
+        def compute() -> dict[str, Any]:
+            result = method(cls, *args, **kwargs)
+            if query_cache is not None:
+                query_cache.set(name, key.params, result, tags=key.browsers)
+            return result
+
+        if single_flight is None:
+            return dict(compute())
+        return dict(single_flight.do(QueryCache.make_key(name, key.params), compute))
+
+    return wrapper
+
 
 class HistoryService:
     """Service layer for browser history operations."""
 
     @staticmethod
-    def _with_connection(browser: str, operation: Callable[..., Any]) -> Any:
+    def _with_connection(
+        browser: str, operation: Callable[..., Any], writable: bool = False
+    ) -> Any:
         """Execute an operation with a database connection.
 
+        Reads go to the local history index (refreshed from the browser's
+        database first) unless ``[index] enabled`` is false, in which case
+        they read a snapshot of the browser's database directly.
+
         Args:
             browser: Browser name
             operation: Function that takes a connection and returns data
+            writable: If True, run against a private writable copy of the browser's database
 
         Returns:
             Result of the operation
@@ -127,8 +361,17 @@ class HistoryService:
             DatabaseError: For other database errors
         """
         try:
-            with get_history_connection(browser) as conn:
+            index = None if writable else get_history_index()
+            opened: AbstractContextManager[sqlite3.Connection]
+            if index is not None:
+                opened = index.connection(browser)
+            else:
+                opened = get_history_connection(browser, writable=writable)
+            with opened as conn:
                 return operation(conn)
+        except ServiceError:
+            # Raised by the operation itself, e.g. a nested connection
+            raise
         except ConnBrowserNotFoundError:
             raise BrowserNotFoundError(browser)
         except ConnDatabaseLockedError:
@@ -142,6 +385,164 @@ class HistoryService:
             logger.exception("Unexpected database error")
             raise DatabaseError(f"Database operation failed: {e}")
 
+    @staticmethod
+    def _resolve_browsers(browser: str | list[str]) -> list[str]:
+        """Browsers selected by a browser argument: a name, several names, or 'all'.
+
+        'all' selects every profile of every browser found, and
+        'browser:*' every profile of one browser.
+
+        Raises:
+            BrowserNotFoundError: If 'all' is given and no browser history is found
+            ValidationError: If a browser is not supported
+        """
+        if isinstance(browser, str) and browser.strip().lower() == ALL_BROWSERS:
+            available = [
+                target for name in get_available_browsers() for target in get_profile_targets(name)
+            ]
+            if not available:
+                raise BrowserNotFoundError("any browser")
+            return available
+
+        targets: list[str] = []
+        for name in validate_browsers(browser):
+            browser_lower, profile = split_browser(name)
+            expanded = get_profile_targets(browser_lower) if profile == ALL_PROFILES else [name]
+            # A browser without any profile is left in, to be reported as not found
+            targets.extend(t for t in expanded or [browser_lower] if t not in targets)
+        return targets
+
+    @classmethod
+    def _query_browsers(
+        cls,
+        browsers: list[str],
+        operation: Callable[[sqlite3.Connection], list[Any]],
+        limit: int,
+        key: MergeKey = by_recency,
+        reverse: bool = True,
+    ) -> BrowserResults:
+        """Run a query on each browser and merge the sorted results.
+
+        Browsers are queried concurrently on the fan-out pool, unless
+        ``[advanced] parallel_queries`` is false. Each browser's rows must
+        already be sorted by ``key`` (descending if ``reverse``) and hold
+        at most ``limit`` rows; a k-way merge then takes the first
+        ``limit`` rows overall. Rows without a comparable key are taken in
+        turns, by rank. Browsers that cannot be read are skipped, unless
+        none can.
+
+        Args:
+            browsers: Browser names from ``_resolve_browsers``
+            operation: Query to run on each browser's connection
+            limit: Maximum rows overall
+            key: Sort key of the rows, or None to interleave by rank
+            reverse: Whether ``key`` sorts descending
+
+        Returns:
+            Merged rows, with the browser of each row
+
+        Raises:
+            ServiceError: The first error, if no browser could be read
+        """
+        if len(browsers) == 1:
+            return BrowserResults(cls._with_connection(browsers[0], operation))
+
+        def query(browser: str) -> list[Any]:
+            return cast(list[Any], cls._with_connection(browser, operation))
+
+        executor = get_fanout_executor()
+        outcomes: Iterator[tuple[str, Callable[[], list[Any]]]]
+        if executor is not None:
+            # Each query runs in a copy of this context, so cancellation reaches it
+            futures = {
+                browser: executor.submit(contextvars.copy_context().run, query, browser)
+                for browser in browsers
+            }
+            outcomes = ((browser, future.result) for browser, future in futures.items())
+        else:
+            outcomes = ((browser, functools.partial(query, browser)) for browser in browsers)
+
+        results: dict[str, list[Any]] = {}
+        failed: dict[str, str] = {}
+        errors: list[ServiceError] = []
+        for browser, outcome in outcomes:
+            try:
+                results[browser] = outcome()
+            except ValidationError:
+                raise
+            except ServiceError as e:
+                logger.warning(f"Skipping {browser}: {e.message}")
+                failed[browser] = e.message
+                errors.append(e)
+        if not results:
+            raise errors[0]
+
+        merged: Iterator[tuple[Any, ...]]
+        if key is None:
+            merged = heapq.merge(
+                *(
+                    [(rank, row, browser) for rank, row in enumerate(rows)]
+                    for browser, rows in results.items()
+                ),
+                key=lambda item: item[0],
+            )
+            taken = [(row, browser) for _, row, browser in itertools.islice(merged, limit)]
+        else:
+            merged = heapq.merge(
+                *([(row, browser) for row in rows] for browser, rows in results.items()),
+                key=lambda item: key(item[0]),
+                reverse=reverse,
+            )
+            taken = list(itertools.islice(merged, limit))
+        return BrowserResults([row for row, _ in taken], [browser for _, browser in taken], failed)
+
+    @classmethod
+    def get_snapshot_stats(cls) -> dict[str, Any]:
+        """Get snapshot statistics, including the copy methods used.
+
+        Returns:
+            Dictionary of snapshot manager statistics
+        """
+        return get_snapshot_manager().get_stats()
+
+    @classmethod
+    def get_index_stats(cls) -> dict[str, Any]:
+        """Get local history index statistics.
+
+        Returns:
+            Dictionary of index statistics, with ``enabled`` False if the index is off
+        """
+        index = get_history_index()
+        if index is None:
+            return {"enabled": False}
+        return {"enabled": True, **index.get_stats(), "sources": index.sources()}
+
+    @classmethod
+    def get_cache_stats(cls) -> dict[str, Any]:
+        """Get query result cache statistics.
+
+        Returns:
+            Dictionary of cache statistics, with ``enabled`` False if caching is
+            off, and the statistics of request coalescing under ``coalescing``
+        """
+        query_cache = get_query_cache()
+        coalescing = get_coalescing_stats()
+        if query_cache is None:
+            return {"enabled": False, "coalescing": coalescing}
+        return {"enabled": True, **query_cache.get_stats(), "coalescing": coalescing}
+
+    @classmethod
+    def get_connection_pool_stats(cls) -> dict[str, Any]:
+        """Get read-only connection pool statistics.
+
+        Returns:
+            Dictionary of pool statistics, with ``enabled`` False if pooling is off
+        """
+        pool = get_connection_pool()
+        if pool is None:
+            return {"enabled": False}
+        return {"enabled": True, **pool.get_stats()}
+
     @classmethod
     def list_available_browsers(cls) -> dict[str, Any]:
         """Get list of available browsers.
@@ -153,44 +554,83 @@ class HistoryService:
         return {"browsers": browsers, "message": format_available_browsers(browsers)}
 
     @classmethod
+    @cached_operation
     def search_history(
-        cls, query: str, limit: int = 5, browser: str = "chrome", format_type: str = "markdown"
+        cls,
+        query: str,
+        limit: int = 5,
+        browser: str | list[str] = "chrome",
+        format_type: str = "markdown",
+        search_mode: str = "like",
     ) -> dict[str, Any]:
         """Search browser history.
 
         Args:
             query: Search term
             limit: Maximum results (1-100)
-            browser: Browser to search
+            browser: Browser to search, a list of browsers, or "all"
             format_type: 'markdown' or 'json'
+            search_mode: 'like' for substring matching newest first, or 'fts'
+                for full-text search ranked by relevance
 
         Returns:
             Dictionary with results and formatted message
         """
-        browser_lower = validate_browser(browser)
+        browsers = cls._resolve_browsers(browser)
         query_clean = validate_query(query)
         limit_val = validate_limit(limit, 1, 100)
         format_clean = validate_format_type(format_type)
+        mode = validate_search_mode(search_mode)
 
-        logger.info(f"Searching history for '{query_clean}' in {browser_lower} (limit={limit_val})")
+        logger.info(
+            f"Searching history for '{query_clean}' in {', '.join(browsers)} "
+            f"(limit={limit_val}, mode={mode})"
+        )
 
-        rows = cls._with_connection(
-            browser_lower, lambda conn: query_history(conn, query_clean, limit_val)
+        if mode == "fts":
+            # Relevance ranks of different browsers are interleaved
+            merged = cls._query_browsers(
+                browsers,
+                lambda conn: search_fulltext(conn, query_clean, limit_val),
+                limit_val,
+                None,
+            )
+            rows = [(title, url, ts) for title, url, ts, _ in merged.rows]
+            snippets = [snippet for _, _, _, snippet in merged.rows]
+            return {
+                "results": rows,
+                "snippets": snippets,
+                "count": len(rows),
+                "query": query_clean,
+                "search_mode": mode,
+                **merged.fields(browsers),
+                "message": format_search_results(
+                    rows, query_clean, format_clean, snippets, merged.sources
+                ),
+            }
+
+        merged = cls._query_browsers(
+            browsers, lambda conn: search_substring(conn, query_clean, limit_val), limit_val
         )
 
         return {
-            "results": rows,
-            "count": len(rows),
+            "results": merged.rows,
+            "count": len(merged.rows),
             "query": query_clean,
-            "message": format_search_results(rows, query_clean, format_clean),
+            "search_mode": mode,
+            **merged.fields(browsers),
+            "message": format_search_results(
+                merged.rows, query_clean, format_clean, sources=merged.sources
+            ),
         }
 
     @classmethod
+    @cached_operation
     def get_recent_history(
         cls,
         hours: int = 24,
         limit: int = 20,
-        browser: str = "chrome",
+        browser: str | list[str] = "chrome",
         format_type: str = "markdown",
     ) -> dict[str, Any]:
         """Get recent browsing history.
@@ -198,29 +638,31 @@ class HistoryService:
         Args:
             hours: Hours to look back
             limit: Maximum results (1-100)
-            browser: Browser to search
+            browser: Browser to search, a list of browsers, or "all"
             format_type: 'markdown' or 'json'
 
         Returns:
             Dictionary with results and formatted message
         """
-        browser_lower = validate_browser(browser)
+        browsers = cls._resolve_browsers(browser)
         hours_val = validate_hours(hours)
         limit_val = validate_limit(limit, 1, 100)
         format_clean = validate_format_type(format_type)
 
-        rows = cls._with_connection(
-            browser_lower, lambda conn: query_recent_history(conn, hours_val, limit_val)
+        merged = cls._query_browsers(
+            browsers, lambda conn: query_recent_history(conn, hours_val, limit_val), limit_val
         )
 
         return {
-            "results": rows,
-            "count": len(rows),
+            "results": merged.rows,
+            "count": len(merged.rows),
             "hours": hours_val,
-            "message": format_recent_results(rows, hours_val, format_clean),
+            **merged.fields(browsers),
+            "message": format_recent_results(merged.rows, hours_val, format_clean, merged.sources),
         }
 
     @classmethod
+    @cached_operation
     def count_visits(cls, domain: str, browser: str = "chrome") -> dict[str, Any]:
         """Count visits to a domain.
 
@@ -235,7 +677,7 @@ class HistoryService:
         domain_clean = validate_domain(domain)
 
         count = cls._with_connection(
-            browser_lower, lambda conn: count_domain_visits(conn, domain_clean)
+            browser_lower, lambda conn: count_host_visits(conn, domain_clean)
         )
 
         return {
@@ -246,8 +688,14 @@ class HistoryService:
         }
 
     @classmethod
+    @cached_operation
     def list_top_domains(
-        cls, limit: int = 10, browser: str = "chrome", format_type: str = "markdown"
+        cls,
+        limit: int = 10,
+        browser: str = "chrome",
+        format_type: str = "markdown",
+        group_by: str = "host",
+        days: int | None = None,
     ) -> dict[str, Any]:
         """Get most visited domains.
 
@@ -255,6 +703,8 @@ class HistoryService:
             limit: Maximum results (1-50)
             browser: Browser to search
             format_type: 'markdown' or 'json'
+            group_by: 'host' for full host names, 'domain' for registrable domains
+            days: Only count visits from the last N days (default: all history)
 
         Returns:
             Dictionary with domains and formatted message
@@ -262,18 +712,23 @@ class HistoryService:
         browser_lower = validate_browser(browser)
         limit_val = validate_limit(limit, 1, 50)
         format_clean = validate_format_type(format_type)
+        group_clean = validate_group_by(group_by)
+        days_val = validate_days(days)
+        since = chrome_cutoff(days_val * 24) if days_val else None
 
         domains = cls._with_connection(
-            browser_lower, lambda conn: db_get_top_domains(conn, limit_val)
+            browser_lower, lambda conn: get_top_hosts(conn, limit_val, group_clean, since)
         )
 
         return {
             "domains": domains,
+            "days": days_val,
             "count": len(domains),
             "message": format_top_domains(domains, format_clean),
         }
 
     @classmethod
+    @cached_operation
     def search_history_by_date(
         cls,
         query: str,
@@ -338,7 +793,7 @@ class HistoryService:
         if not confirm:
             # Preview mode - just count matches
             rows = cls._with_connection(
-                browser_lower, lambda conn: query_history(conn, query_clean, limit_val)
+                browser_lower, lambda conn: search_substring(conn, query_clean, limit_val)
             )
             count = len(rows)
 
@@ -351,7 +806,9 @@ class HistoryService:
 
         # Actually delete
         deleted = cls._with_connection(
-            browser_lower, lambda conn: db_delete_history(conn, query_clean, limit_val)
+            browser_lower,
+            lambda conn: db_delete_history(conn, query_clean, limit_val),
+            writable=True,
         )
 
         return {
@@ -362,12 +819,13 @@ class HistoryService:
         }
 
     @classmethod
+    @cached_operation
     def search_by_domain(
         cls,
         domain: str,
         query: str | None = None,
         limit: int = 20,
-        browser: str = "chrome",
+        browser: str | list[str] = "chrome",
         format_type: str = "markdown",
         exclude_domains: list[str] | None = None,
     ) -> dict[str, Any]:
@@ -377,51 +835,64 @@ class HistoryService:
             domain: Domain to search within
             query: Optional search term within domain
             limit: Maximum results (1-100)
-            browser: Browser to search
+            browser: Browser to search, a list of browsers, or "all"
             format_type: 'markdown' or 'json'
             exclude_domains: Domains to exclude
 
         Returns:
             Dictionary with results and formatted message
         """
-        browser_lower = validate_browser(browser)
+        browsers = cls._resolve_browsers(browser)
         domain_clean = validate_domain(domain)
         limit_val = validate_limit(limit, 1, 100)
         format_clean = validate_format_type(format_type)
         exclude_clean = validate_exclude_domains(exclude_domains)
 
-        rows = cls._with_connection(
-            browser_lower,
-            lambda conn: db_search_by_domain(conn, domain_clean, query, limit_val, exclude_clean),
+        merged = cls._query_browsers(
+            browsers,
+            lambda conn: search_by_host(conn, domain_clean, query, limit_val, exclude_clean),
+            limit_val,
         )
 
         return {
-            "results": rows,
-            "count": len(rows),
+            "results": merged.rows,
+            "count": len(merged.rows),
             "domain": domain_clean,
             "query": query,
-            "message": format_domain_search_results(rows, domain_clean, query, format_clean),
+            **merged.fields(browsers),
+            "message": format_domain_search_results(
+                merged.rows, domain_clean, query, format_clean, merged.sources
+            ),
         }
 
     @classmethod
-    def get_browser_stats(cls, browser: str = "chrome") -> dict[str, Any]:
+    @cached_operation
+    def get_browser_stats(cls, browser: str = "chrome", days: int | None = None) -> dict[str, Any]:
         """Get browser statistics.
 
         Args:
             browser: Browser to analyze
+            days: Only cover the last N days (default: all history)
 
         Returns:
             Dictionary with statistics and formatted message
         """
         browser_lower = validate_browser(browser)
+        days_val = validate_days(days)
+        since = chrome_cutoff(days_val * 24) if days_val else None
 
-        stats = cls._with_connection(browser_lower, db_get_browser_stats)
+        stats = cls._with_connection(browser_lower, lambda conn: get_history_stats(conn, since))
 
-        return {"stats": stats, "message": format_browser_stats(stats)}
+        return {"stats": stats, "days": days_val, "message": format_browser_stats(stats)}
 
     @classmethod
+    @cached_operation
     def get_most_visited_pages(
-        cls, limit: int = 20, browser: str = "chrome", format_type: str = "markdown"
+        cls,
+        limit: int = 20,
+        browser: str = "chrome",
+        format_type: str = "markdown",
+        days: int | None = None,
     ) -> dict[str, Any]:
         """Get most visited individual pages.
 
@@ -429,6 +900,7 @@ class HistoryService:
             limit: Maximum results (1-100)
             browser: Browser to search
             format_type: 'markdown' or 'json'
+            days: Only count visits from the last N days (default: all history)
 
         Returns:
             Dictionary with pages and formatted message
@@ -436,18 +908,151 @@ class HistoryService:
         browser_lower = validate_browser(browser)
         limit_val = validate_limit(limit, 1, 100)
         format_clean = validate_format_type(format_type)
+        days_val = validate_days(days)
+        since = chrome_cutoff(days_val * 24) if days_val else None
 
         pages = cls._with_connection(
-            browser_lower, lambda conn: db_get_most_visited_pages(conn, limit_val)
+            browser_lower, lambda conn: get_top_pages(conn, limit_val, since)
         )
 
         return {
             "pages": pages,
+            "days": days_val,
             "count": len(pages),
             "message": format_most_visited_pages(pages, format_clean),
         }
 
     @classmethod
+    @cached_operation
+    def get_visit_timeline(
+        cls,
+        start: str,
+        end: str,
+        query: str | None = None,
+        limit: int = 100,
+        browser: str | list[str] = "chrome",
+        format_type: str = "markdown",
+    ) -> dict[str, Any]:
+        """Get every visit in a time window, one row per visit.
+
+        Args:
+            start: Start of the window, ISO 8601 (local time unless an offset is given)
+            end: End of the window (exclusive), ISO 8601
+            query: Optional term the title or URL must contain
+            limit: Maximum results (1-1000)
+            browser: Browser to search, a list of browsers, or "all"
+            format_type: 'markdown' or 'json'
+
+        Returns:
+            Dictionary with visits and formatted message
+        """
+        browsers = cls._resolve_browsers(browser)
+        start_clean, end_clean = validate_date_range(start, end)
+        query_clean = validate_query(query) if query else None
+        limit_val = validate_limit(limit, 1, 1000)
+        format_clean = validate_format_type(format_type)
+        start_ts = to_chrome_timestamp(start_clean)
+        end_ts = to_chrome_timestamp(end_clean)
+
+        merged = cls._query_browsers(
+            browsers,
+            lambda conn: get_visits(conn, start_ts, end_ts, query_clean, limit_val),
+            limit_val,
+        )
+
+        return {
+            "results": merged.rows,
+            "count": len(merged.rows),
+            "start": start_clean,
+            "end": end_clean,
+            **merged.fields(browsers),
+            "message": format_visit_timeline(
+                merged.rows, start_clean, end_clean, format_clean, merged.sources
+            ),
+        }
+
+    @classmethod
+    @cached_operation
+    def get_visit_histogram(
+        cls,
+        browser: str = "chrome",
+        days: int | None = None,
+        format_type: str = "markdown",
+    ) -> dict[str, Any]:
+        """Get visits per hour of the day and per day of the week.
+
+        Hours and days are counted in the machine's time zone, each visit at
+        the UTC offset in force when it happened (so across DST changes).
+
+        Args:
+            browser: Browser to analyze
+            days: Only count visits from the last N days (default: all history)
+            format_type: 'markdown' or 'json'
+
+        Returns:
+            Dictionary with the histogram and formatted message
+        """
+        browser_lower = validate_browser(browser)
+        days_val = validate_days(days)
+        format_clean = validate_format_type(format_type)
+        since = chrome_cutoff(days_val * 24) if days_val else None
+        histogram = cls._with_connection(
+            browser_lower, lambda conn: visit_histogram(conn, since, utc_offset_minutes=None)
+        )
+
+        return {
+            "histogram": histogram,
+            "days": days_val,
+            "message": format_visit_histogram(histogram, WEEKDAY_NAMES, format_clean),
+        }
+
+    @classmethod
+    @cached_operation
+    def get_browsing_sessions(
+        cls,
+        browser: str = "chrome",
+        days: int | None = None,
+        limit: int = 20,
+        format_type: str = "markdown",
+    ) -> dict[str, Any]:
+        """Get browsing sessions: runs of visits without a long idle gap.
+
+        The idle gap is ``[index] session_idle_minutes``.
+
+        Args:
+            browser: Browser to analyze
+            days: Only sessions from the last N days (default: all history)
+            limit: Maximum sessions (1-500)
+            format_type: 'markdown' or 'json'
+
+        Returns:
+            Dictionary with session summaries, newest first, and formatted message
+        """
+        browser_lower = validate_browser(browser)
+        days_val = validate_days(days)
+        limit_val = validate_limit(limit, 1, 500)
+        format_clean = validate_format_type(format_type)
+        since = chrome_cutoff(days_val * 24) if days_val else None
+        index = get_history_index()
+        idle_minutes = (
+            index.session_idle_minutes
+            if index is not None
+            else apply_env_overrides(load_config()).index.session_idle_minutes
+        )
+
+        sessions = cls._with_connection(
+            browser_lower, lambda conn: get_sessions(conn, since, limit_val, idle_minutes)
+        )
+
+        return {
+            "sessions": sessions,
+            "count": len(sessions),
+            "days": days_val,
+            "message": format_sessions(sessions, format_clean),
+        }
+
+    @classmethod
+    @cached_operation
     def export_history(
         cls,
         format_type: str = "csv",
@@ -477,52 +1082,130 @@ class HistoryService:
         return {"content": content, "format": format_clean, "browser": browser_lower}
 
     @classmethod
+    @cached_operation
     def search_history_advanced(
         cls,
         query: str,
         limit: int = 20,
-        browser: str = "chrome",
+        browser: str | list[str] = "chrome",
         format_type: str = "markdown",
         exclude_domains: list[str] | None = None,
         sort_by: str = "date",
         use_regex: bool = False,
         use_fuzzy: bool = False,
         fuzzy_threshold: float = 0.6,
+        search_mode: str = "like",
+        parallel: bool = False,
     ) -> dict[str, Any]:
         """Advanced search with multiple options.
 
         Args:
             query: Search term
             limit: Maximum results (1-100)
-            browser: Browser to search
+            browser: Browser to search, a list of browsers, or "all"
             format_type: 'markdown' or 'json'
             exclude_domains: Domains to exclude
-            sort_by: Sort order ('date', 'visit_count', 'title')
+            sort_by: Sort order ('date', 'visit_count', 'title', 'relevance')
             use_regex: Use regex matching
             use_fuzzy: Use fuzzy matching
             fuzzy_threshold: Minimum similarity (0.0-1.0)
+            search_mode: 'like' or 'fts' (full-text search with BM25 relevance)
+            parallel: Scan the whole history across worker processes for regex
+                and fuzzy matching, instead of narrowing it with the index first
 
         Returns:
             Dictionary with results and formatted message
         """
-        browser_lower = validate_browser(browser)
+        browsers = cls._resolve_browsers(browser)
         query_clean = validate_query(query)
         limit_val = validate_limit(limit, 1, 100)
         format_clean = validate_format_type(format_type)
         sort_clean = validate_sort_by(sort_by)
         exclude_clean = validate_exclude_domains(exclude_domains)
         threshold_val = validate_fuzzy_threshold(fuzzy_threshold)
-        validate_search_options(use_regex, use_fuzzy)
+        mode = validate_search_mode(search_mode)
+        validate_search_options(use_regex, use_fuzzy, mode)
+        if use_regex:
+            validate_regex(query_clean)
 
         options = {
             "sort_by": sort_clean,
             "use_regex": use_regex,
             "use_fuzzy": use_fuzzy,
             "fuzzy_threshold": threshold_val if use_fuzzy else None,
+            "search_mode": mode,
+            "parallel": parallel and (use_regex or use_fuzzy),
         }
 
-        rows = cls._with_connection(
-            browser_lower,
+        if mode == "fts":
+            merged = cls._query_browsers(
+                browsers,
+                lambda conn: search_fulltext(
+                    conn, query_clean, limit_val, exclude_clean, sort_clean
+                ),
+                limit_val,
+                *merge_key(sort_clean),
+            )
+            rows = [(title, url, ts) for title, url, ts, _ in merged.rows]
+            snippets = [snippet for _, _, _, snippet in merged.rows]
+            return {
+                "results": rows,
+                "snippets": snippets,
+                "count": len(rows),
+                "query": query_clean,
+                "options": options,
+                **merged.fields(browsers),
+                "message": format_advanced_search_results(
+                    rows, query_clean, format_clean, options, snippets, merged.sources
+                ),
+            }
+
+        if use_regex:
+            merged = cls._query_browsers(
+                browsers,
+                lambda conn: (search_regex_parallel if parallel else search_regex)(
+                    conn, query_clean, limit_val
+                ),
+                limit_val,
+            )
+            return {
+                "results": merged.rows,
+                "count": len(merged.rows),
+                "query": query_clean,
+                "options": options,
+                **merged.fields(browsers),
+                "message": format_advanced_search_results(
+                    merged.rows, query_clean, format_clean, options, sources=merged.sources
+                ),
+            }
+
+        if use_fuzzy:
+            merged = cls._query_browsers(
+                browsers,
+                lambda conn: (search_fuzzy_parallel if parallel else search_fuzzy)(
+                    conn, query_clean, threshold_val, limit_val
+                ),
+                limit_val,
+                # Best score first, newest first among equal scores
+                lambda row: (row[3], row[2]),
+            )
+            rows = [(title, url, ts) for title, url, ts, _ in merged.rows]
+            return {
+                "results": rows,
+                "scores": [score for _, _, _, score in merged.rows],
+                "count": len(rows),
+                "query": query_clean,
+                "options": options,
+                **merged.fields(browsers),
+                "message": format_advanced_search_results(
+                    rows, query_clean, format_clean, options, sources=merged.sources
+                ),
+            }
+
+        # Substring matches are sorted by date unless sorted by visit count or title
+        key, reverse = merge_key(sort_clean if sort_clean != "relevance" else "date")
+        merged = cls._query_browsers(
+            browsers,
             lambda conn: db_search_history_advanced(
                 conn,
                 query_clean,
@@ -533,14 +1216,20 @@ class HistoryService:
                 use_fuzzy,
                 threshold_val,
             ),
+            limit_val,
+            key,
+            reverse,
         )
 
         return {
-            "results": rows,
-            "count": len(rows),
+            "results": merged.rows,
+            "count": len(merged.rows),
             "query": query_clean,
             "options": options,
-            "message": format_advanced_search_results(rows, query_clean, format_clean, options),
+            **merged.fields(browsers),
+            "message": format_advanced_search_results(
+                merged.rows, query_clean, format_clean, options, sources=merged.sources
+            ),
         }
 
     @classmethod
@@ -557,15 +1246,19 @@ class HistoryService:
             source_browser: Source browser name
             target_browser: Target browser name
             merge_strategy: How to merge ('latest', 'combine', 'dedupe')
-            dry_run: If True, preview only
+            dry_run: If True, report the merge as a preview; otherwise as a
+                plan. Neither mode writes to the target browser's history.
 
         Returns:
-            Dictionary with sync info and formatted message
+            Dictionary with sync info and formatted message; ``written`` is
+            always False
         """
         source = validate_browser(source_browser)
         target = validate_browser(target_browser)
         validate_browsers_different(source, target)
         strategy = validate_merge_strategy(merge_strategy)
+        if get_browser_schema(target) not in SYNC_TARGET_SCHEMAS:
+            raise ValidationError(f"Cannot sync into {target} history", field="target_browser")
 
         # Check paths exist
         source_path = get_browser_path(source)
@@ -577,33 +1270,31 @@ class HistoryService:
         if not target_path:
             raise BrowserNotFoundError(target)
 
-        # Get source entries count
-        import json
-
-        entries_json = cls._with_connection(
-            source, lambda conn: db_export_history(conn, "json", 10000)
+        # The merge is only planned, against a snapshot that includes the
+        # target's WAL: applying it to a copy no caller can see is wasted work
+        counts = cls._with_connection(
+            source,
+            lambda source_conn: cls._with_connection(
+                target,
+                lambda target_conn: merge_history(source_conn, target_conn, strategy, apply=False),
+            ),
         )
-        entries_data = json.loads(entries_json)
-        entries_count = len(entries_data.get("entries", []))
-
-        if dry_run:
-            return {
-                "dry_run": True,
-                "source": source,
-                "target": target,
-                "entries_count": entries_count,
-                "merge_strategy": strategy,
-                "message": format_sync_preview(source, target, entries_count, strategy),
-            }
+        entries_count = counts.new_entries + counts.updated_entries
+        format_message = format_sync_preview if dry_run else format_sync_result
 
-        # TODO: Implement actual sync logic
         return {
-            "dry_run": False,
+            "dry_run": dry_run,
             "source": source,
             "target": target,
             "entries_count": entries_count,
+            "source_entries": counts.source_entries,
+            "new_entries": counts.new_entries,
+            "updated_entries": counts.updated_entries,
             "merge_strategy": strategy,
-            "message": format_sync_result(source, target, entries_count, strategy),
+            "written": False,
+            "message": format_message(
+                source, target, entries_count, strategy, counts.new_entries, counts.updated_entries
+            ),
         }
 
     @classmethod
@@ -4,24 +4,32 @@ This module provides validation functions for all service inputs.
 Validation functions raise ValidationError on failure.
 """
 
+import re
+
 from chronicle_mcp.core.exceptions import InvalidDateRangeError, ValidationError
+from chronicle_mcp.paths import PROFILE_SEPARATOR, split_browser
 
 VALID_BROWSERS = ["chrome", "edge", "firefox", "brave", "safari", "vivaldi", "opera"]
 
 VALID_FORMATS = ["markdown", "json"]
 VALID_EXPORT_FORMATS = ["csv", "json"]
-VALID_SORT_ORDERS = ["date", "visit_count", "title"]
+VALID_SORT_ORDERS = ["date", "visit_count", "title", "relevance"]
+VALID_SEARCH_MODES = ["like", "fts"]
+VALID_DOMAIN_GROUPINGS = ["host", "domain"]
 VALID_MERGE_STRATEGIES = ["latest", "combine", "dedupe"]
 
 
 def validate_browser(browser: str) -> str:
     """Validate browser name and return lowercase version.
 
+    A profile may follow the name after a colon ('chrome:Profile 1'); it is
+    returned unchanged.
+
     Args:
         browser: Browser name to validate
 
     Returns:
-        Lowercase browser name
+        Lowercase browser name, with the profile if one was given
 
     Raises:
         ValidationError: If browser is not supported
@@ -29,14 +37,40 @@ def validate_browser(browser: str) -> str:
     if not browser or not isinstance(browser, str):
         raise ValidationError("Browser cannot be empty", field="browser")
 
-    browser_lower = browser.lower()
+    browser_lower, profile = split_browser(browser)
     if browser_lower not in VALID_BROWSERS:
         raise ValidationError(
             f"Invalid browser '{browser}'. Valid options: {', '.join(VALID_BROWSERS)}",
             field="browser",
         )
 
-    return browser_lower
+    return browser_lower if profile is None else f"{browser_lower}{PROFILE_SEPARATOR}{profile}"
+
+
+def validate_browsers(browsers: str | list[str]) -> list[str]:
+    """Validate a browser name, a comma-separated list of names, or a list of names.
+
+    Args:
+        browsers: Browser name(s) to validate
+
+    Returns:
+        Lowercase browser names in the given order, without duplicates
+
+    Raises:
+        ValidationError: If the list is empty or a browser is not supported
+    """
+    names = browsers.split(",") if isinstance(browsers, str) else browsers
+    if not isinstance(names, list):
+        raise ValidationError("Browser cannot be empty", field="browser")
+
+    validated: list[str] = []
+    for name in names:
+        browser_lower = validate_browser(name.strip() if isinstance(name, str) else name)
+        if browser_lower not in validated:
+            validated.append(browser_lower)
+    if not validated:
+        raise ValidationError("Browser cannot be empty", field="browser")
+    return validated
 
 
 def validate_query(query: str | None, field_name: str = "query") -> str:
@@ -107,6 +141,30 @@ def validate_hours(hours: int) -> int:
     return hours
 
 
+def validate_days(days: int | None) -> int | None:
+    """Validate an optional time window in days.
+
+    Args:
+        days: Number of days to look back, or None for the whole history
+
+    Returns:
+        Validated days value
+
+    Raises:
+        ValidationError: If days is invalid
+    """
+    if days is None:
+        return None
+
+    if not isinstance(days, int) or isinstance(days, bool):
+        raise ValidationError("Days must be an integer", field="days")
+
+    if days < 1:
+        raise ValidationError("Days must be a positive integer", field="days")
+
+    return days
+
+
 def validate_format_type(format_type: str, export: bool = False) -> str:
     """Validate output format type.
 
@@ -238,20 +296,95 @@ def validate_fuzzy_threshold(threshold: float) -> float:
     return float(threshold)
 
 
-def validate_search_options(use_regex: bool, use_fuzzy: bool) -> None:
-    """Validate that regex and fuzzy are not both enabled.
+def validate_regex(pattern: str) -> str:
+    """Validate a regex search pattern.
+
+    Args:
+        pattern: Python regex pattern
+
+    Returns:
+        The pattern
+
+    Raises:
+        ValidationError: If the pattern does not compile
+    """
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise ValidationError(f"Invalid regex pattern: {e}", field="query")
+    return pattern
+
+
+def validate_search_options(use_regex: bool, use_fuzzy: bool, search_mode: str = "like") -> None:
+    """Validate that at most one matching option is enabled.
 
     Args:
         use_regex: Whether regex matching is enabled
         use_fuzzy: Whether fuzzy matching is enabled
+        search_mode: Validated search mode
 
     Raises:
-        ValidationError: If both are enabled
+        ValidationError: If more than one matching option is enabled
     """
     if use_regex and use_fuzzy:
         raise ValidationError(
             "Cannot use both regex and fuzzy matching simultaneously", field="search_options"
         )
+    if search_mode != "like" and (use_regex or use_fuzzy):
+        raise ValidationError(
+            f"Cannot combine search_mode '{search_mode}' with regex or fuzzy matching",
+            field="search_options",
+        )
+
+
+def validate_search_mode(search_mode: str) -> str:
+    """Validate search mode parameter.
+
+    Args:
+        search_mode: Search mode to validate ('like' or 'fts')
+
+    Returns:
+        Lowercase search mode
+
+    Raises:
+        ValidationError: If search mode is invalid
+    """
+    if not search_mode or not isinstance(search_mode, str):
+        raise ValidationError("Search mode cannot be empty", field="search_mode")
+
+    mode_lower = search_mode.lower()
+    if mode_lower not in VALID_SEARCH_MODES:
+        raise ValidationError(
+            f"Invalid search_mode '{search_mode}'. Valid options: {', '.join(VALID_SEARCH_MODES)}",
+            field="search_mode",
+        )
+
+    return mode_lower
+
+
+def validate_group_by(group_by: str) -> str:
+    """Validate top-domain grouping parameter.
+
+    Args:
+        group_by: Grouping to validate ('host' or 'domain')
+
+    Returns:
+        Lowercase grouping
+
+    Raises:
+        ValidationError: If grouping is invalid
+    """
+    if not group_by or not isinstance(group_by, str):
+        raise ValidationError("Group by cannot be empty", field="group_by")
+
+    group_lower = group_by.lower()
+    if group_lower not in VALID_DOMAIN_GROUPINGS:
+        raise ValidationError(
+            f"Invalid group_by '{group_by}'. Valid options: {', '.join(VALID_DOMAIN_GROUPINGS)}",
+            field="group_by",
+        )
+
+    return group_lower
 
 
 def validate_merge_strategy(strategy: str) -> str:
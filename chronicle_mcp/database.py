@@ -1,9 +1,13 @@
+import functools
+import heapq
 import re
 import sqlite3
 from datetime import datetime, timedelta, timezone
 from typing import Any
 from urllib.parse import urlparse
 
+from chronicle_mcp.fuzzy import FuzzyMatcher, bounded_edit_distance
+
 
 def sanitize_url(url: str) -> str:
     """Removes sensitive query parameters from URLs."""
@@ -63,6 +67,32 @@ def format_chrome_timestamp(microseconds: int) -> str:
         return f"microseconds={microseconds}"
 
 
+def _native_history(conn: sqlite3.Connection) -> Any:
+    """Native-schema queries for a Firefox or Safari connection, else None."""
+    # Imported here: chronicle_mcp.schemas builds on this module
+    from chronicle_mcp.schemas import get_native_history
+
+    return get_native_history(conn)
+
+
+def urls_source(conn: sqlite3.Connection) -> str:
+    """
+    Returns the FROM source of a connection's history, in Chrome's ``urls`` layout.
+
+    Chrome databases and history index connections have a ``urls`` table or
+    view. Firefox and Safari databases are read through a subquery over
+    their own tables, aliased ``urls``.
+
+    Args:
+        conn: SQLite connection
+
+    Returns:
+        SQL table expression
+    """
+    native = _native_history(conn)
+    return "urls" if native is None else f"{native.relation} AS urls"
+
+
 def query_history(
     conn: sqlite3.Connection, query: str, limit: int = 10
 ) -> list[tuple[str, str, str]]:
@@ -79,8 +109,10 @@ def query_history(
     """
     cursor = conn.cursor()
     search_query = f"%{query}%"
+    # nosec B608 - the source is a table name or a subquery over resolved columns
     cursor.execute(
-        "SELECT title, url, last_visit_time FROM urls WHERE title LIKE ? OR url LIKE ? ORDER BY last_visit_time DESC LIMIT ?",
+        f"SELECT title, url, last_visit_time FROM {urls_source(conn)} "  # nosec B608
+        "WHERE title LIKE ? OR url LIKE ? ORDER BY last_visit_time DESC LIMIT ?",
         (search_query, search_query, limit),
     )
     return [
@@ -89,6 +121,21 @@ def query_history(
     ]
 
 
+def chrome_cutoff(hours: float) -> int:
+    """
+    Returns the Chrome timestamp of the moment N hours ago.
+
+    Args:
+        hours: Number of hours to look back
+
+    Returns:
+        Microseconds since 1601-01-01 UTC
+    """
+    chrome_epoch = datetime(1601, 1, 1, tzinfo=timezone.utc)
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return int((cutoff - chrome_epoch).total_seconds() * 1_000_000)
+
+
 def query_recent_history(
     conn: sqlite3.Connection, hours: int = 24, limit: int = 20
 ) -> list[tuple[str, str, str]]:
@@ -103,21 +150,16 @@ def query_recent_history(
     Returns:
         List of (title, url, timestamp) tuples
     """
-    from datetime import datetime, timedelta, timezone
-
-    cursor = conn.cursor()
-    chrome_epoch = datetime(1601, 1, 1, tzinfo=timezone.utc)
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    cutoff_microseconds = int((cutoff - chrome_epoch).total_seconds() * 1_000_000)
-
-    cursor.execute(
-        "SELECT title, url, last_visit_time FROM urls WHERE last_visit_time > ? ORDER BY last_visit_time DESC LIMIT ?",
-        (cutoff_microseconds, limit),
-    )
-    return [
-        (title, sanitize_url(url), format_chrome_timestamp(ts))
-        for title, url, ts in cursor.fetchall()
-    ]
+    cutoff_microseconds = chrome_cutoff(hours)
+    native = _native_history(conn)
+    if native is not None:
+        rows = native.recent(cutoff_microseconds, limit)
+    else:
+        rows = conn.execute(
+            "SELECT title, url, last_visit_time FROM urls WHERE last_visit_time > ? ORDER BY last_visit_time DESC LIMIT ?",
+            (cutoff_microseconds, limit),
+        ).fetchall()
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
 
 
 def count_domain_visits(conn: sqlite3.Connection, domain: str) -> int:
@@ -132,25 +174,34 @@ def count_domain_visits(conn: sqlite3.Connection, domain: str) -> int:
         Number of visits to the domain
     """
     cursor = conn.cursor()
-    cursor.execute("SELECT SUM(visit_count) FROM urls WHERE url LIKE ?", (f"%{domain}%",))
+    # nosec B608 - the source is a table name or a subquery over resolved columns
+    cursor.execute(
+        f"SELECT SUM(visit_count) FROM {urls_source(conn)} WHERE url LIKE ?",  # nosec B608
+        (f"%{domain}%",),
+    )
     result = cursor.fetchone()
     return int(result[0]) if result and result[0] else 0
 
 
-def get_top_domains(conn: sqlite3.Connection, limit: int = 10) -> list[tuple[str, int]]:
+def get_top_domains(
+    conn: sqlite3.Connection, limit: int = 10, since: int | None = None
+) -> list[tuple[str, int]]:
     """
     Gets most visited domains.
 
     Args:
         conn: SQLite connection
         limit: Maximum number of domains to return
+        since: Only count pages last visited at or after this Chrome timestamp
 
     Returns:
         List of (domain, visit_count) tuples
     """
     cursor = conn.cursor()
+    window = "AND last_visit_time >= ?" if since is not None else ""
+    # nosec B608 - window is a constant SQL fragment, the source a table or subquery
     cursor.execute(
-        """
+        f"""
         SELECT SUBSTR(
             SUBSTR(url, INSTR(url, '://') + 3),
             1,
@@ -160,13 +211,13 @@ def get_top_domains(conn: sqlite3.Connection, limit: int = 10) -> list[tuple[str
                 ELSE 100
             END
         ) as domain, SUM(visit_count) as total
-        FROM urls
-        WHERE url LIKE 'http%'
+        FROM {urls_source(conn)}
+        WHERE url LIKE 'http%' {window}
         GROUP BY domain
         ORDER BY total DESC
         LIMIT ?
-    """,
-        (limit,),
+    """,  # nosec B608
+        (limit,) if since is None else (since, limit),
     )
     return [(row[0], row[1]) for row in cursor.fetchall()]
 
@@ -208,6 +259,11 @@ def search_by_date(
         return []
 
     search_query = f"%{query}%"
+    native = _native_history(conn)
+    if native is not None:
+        rows = native.in_range(search_query, start_microseconds, end_microseconds, limit)
+        return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
+
     cursor.execute(
         """SELECT title, url, last_visit_time FROM urls
            WHERE (title LIKE ? OR url LIKE ?)
@@ -312,7 +368,7 @@ def search_by_domain(
 
     where_clause = " AND ".join(sql_conditions)
     # nosec B608 - where_clause is built from controlled literals, not user input
-    sql = f"SELECT title, url, last_visit_time FROM urls WHERE {where_clause} ORDER BY last_visit_time DESC LIMIT ?"  # nosec B608
+    sql = f"SELECT title, url, last_visit_time FROM {urls_source(conn)} WHERE {where_clause} ORDER BY last_visit_time DESC LIMIT ?"  # nosec B608
     params.append(limit)
 
     cursor.execute(sql, params)
@@ -322,59 +378,70 @@ def search_by_domain(
     ]
 
 
-def get_browser_stats(conn: sqlite3.Connection) -> dict[str, Any]:
+def get_browser_stats(conn: sqlite3.Connection, since: int | None = None) -> dict[str, Any]:
     """
     Gets browsing statistics for the database.
 
     Args:
         conn: SQLite connection
+        since: Only count pages last visited at or after this Chrome timestamp
 
     Returns:
         Dictionary with browsing statistics
     """
     cursor = conn.cursor()
 
-    cursor.execute("SELECT COUNT(*) FROM urls")
-    total_entries = cursor.fetchone()[0]
-
-    cursor.execute("SELECT SUM(visit_count) FROM urls")
-    total_visits = cursor.fetchone()[0] or 0
-
-    cursor.execute("SELECT MAX(last_visit_time) FROM urls")
-    last_visit_timestamp = cursor.fetchone()[0]
+    # One pass over urls for all five figures
+    window = "WHERE last_visit_time >= ?" if since is not None else ""
+    # nosec B608 - window is a constant SQL fragment
+    cursor.execute(
+        "SELECT COUNT(*), SUM(visit_count), MIN(last_visit_time), MAX(last_visit_time), "  # nosec B608
+        f"SUM(url LIKE 'http%') FROM {urls_source(conn)} {window}",
+        () if since is None else (since,),
+    )
+    total_entries, total_visits, first_visit_timestamp, last_visit_timestamp, unique_urls = (
+        cursor.fetchone()
+    )
     last_visit = format_chrome_timestamp(last_visit_timestamp) if last_visit_timestamp else None
-
-    cursor.execute("SELECT MIN(last_visit_time) FROM urls")
-    first_visit_timestamp = cursor.fetchone()[0]
     first_visit = format_chrome_timestamp(first_visit_timestamp) if first_visit_timestamp else None
 
-    cursor.execute("SELECT DISTINCT COUNT(*) FROM urls WHERE url LIKE 'http%'")
-    unique_urls = cursor.fetchone()[0]
-
     return {
         "total_entries": total_entries,
-        "total_visits": total_visits,
-        "unique_urls": unique_urls,
+        "total_visits": total_visits or 0,
+        "unique_urls": unique_urls or 0,
         "first_visit": first_visit,
         "last_visit": last_visit,
     }
 
 
-def get_most_visited_pages(conn: sqlite3.Connection, limit: int = 20) -> list[tuple[str, str, int]]:
+def get_most_visited_pages(
+    conn: sqlite3.Connection, limit: int = 20, since: int | None = None
+) -> list[tuple[str, str, int]]:
     """
     Gets most visited individual pages (not just domains).
 
     Args:
         conn: SQLite connection
         limit: Maximum number of pages to return
+        since: Only include pages last visited at or after this Chrome timestamp
 
     Returns:
         List of (title, url, visit_count) tuples
     """
+    native = _native_history(conn)
+    if native is not None:
+        return [
+            (title, sanitize_url(url), count)
+            for title, url, count in native.top_pages(limit, since)
+        ]
+
     cursor = conn.cursor()
+    window = "AND last_visit_time >= ?" if since is not None else ""
+    # nosec B608 - window is a constant SQL fragment
     cursor.execute(
-        "SELECT title, url, visit_count FROM urls WHERE title IS NOT NULL AND url LIKE 'http%' ORDER BY visit_count DESC LIMIT ?",
-        (limit,),
+        "SELECT title, url, visit_count FROM urls WHERE title IS NOT NULL AND url LIKE 'http%' "  # nosec B608
+        f"{window} ORDER BY visit_count DESC LIMIT ?",
+        (limit,) if since is None else (since, limit),
     )
     return [(row[0], sanitize_url(row[1]), row[2]) for row in cursor.fetchall()]
 
@@ -403,7 +470,7 @@ def export_history(
 
     cursor = conn.cursor()
     params: list[str | int] = []
-    sql = "SELECT title, url, last_visit_time FROM urls"
+    sql = f"SELECT title, url, last_visit_time FROM {urls_source(conn)}"  # nosec B608
 
     if query:
         search_query = f"%{query}%"
@@ -432,40 +499,165 @@ def export_history(
         raise ValueError(f"Unsupported export format: {format_type}")
 
 
+# Characters with a special meaning in Python regular expressions
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]()|\\")
+
+# A repetition quantifier such as {3}, {2,5} or {,4}, capturing its minimum if given
+REGEX_QUANTIFIER = re.compile(r"\{(?:(\d+)(?:,\d*)?|,\d*)\}")
+
+
+@functools.lru_cache(maxsize=64)
+def compile_regex(pattern: str) -> re.Pattern[str]:
+    """Compiles a case-insensitive search pattern, caching recent patterns.
+
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
+    """
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}")
+
+
+def _regexp(pattern: str, value: str | None) -> bool:
+    """SQLite REGEXP function: ``value REGEXP pattern`` calls ``regexp(pattern, value)``."""
+    return value is not None and compile_regex(pattern).search(value) is not None
+
+
+def register_regexp(conn: sqlite3.Connection) -> None:
+    """Registers the REGEXP function on a connection."""
+    conn.create_function("regexp", 2, _regexp, deterministic=True)
+
+
+def regex_literal(pattern: str) -> str | None:
+    """Returns the longest literal every match of a pattern must contain.
+
+    Only literals outside groups, character classes and alternations are
+    considered, and only ASCII ones, since they pre-filter with SQLite's
+    ``LIKE``, which folds ASCII case only. LIKE wildcards are never part of
+    the literal.
+
+    Args:
+        pattern: Python regex pattern
+
+    Returns:
+        Literal text, or None if none could be extracted
+    """
+    if "|" in pattern or re.search(r"\(\?[aiLmsux]", pattern):
+        # Alternation, or inline flags that change what characters mean
+        return None
+
+    runs: list[str] = []
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and depth == 0 and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char, i = pattern[i + 1], i + 1
+        elif char == "\\":
+            # Class escapes (\d, \w), anchors (\b) and backreferences end a run
+            runs.append(run)
+            run = ""
+            i += 2
+            continue
+        elif char == "[":
+            # Skip the character class, including a leading "]" or "^]"
+            end = i + 1
+            if end < len(pattern) and pattern[end] == "^":
+                end += 1
+            if end < len(pattern) and pattern[end] == "]":
+                end += 1
+            while end < len(pattern) and pattern[end] != "]":
+                end += 2 if pattern[end] == "\\" else 1
+            runs.append(run)
+            run = ""
+            i = end + 1
+            continue
+        elif char == "{" and (quantifier := REGEX_QUANTIFIER.match(pattern, i)):
+            if not int(quantifier.group(1) or 0):
+                # {0,n}: the previous character is optional
+                run = run[:-1]
+            runs.append(run)
+            run = ""
+            i = quantifier.end()
+            continue
+        elif char in "{}":
+            # Not a quantifier, so Python matches the brace literally
+            pass
+        elif char in REGEX_METACHARACTERS:
+            if char in "?*" and depth == 0:
+                # The previous character is optional
+                run = run[:-1]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(0, depth - 1)
+            runs.append(run)
+            run = ""
+            i += 1
+            continue
+        if depth == 0:
+            if char in "%_" or not char.isascii():
+                runs.append(run)
+                run = ""
+            else:
+                run += char
+        i += 1
+    runs.append(run)
+    literal = max(runs, key=len)
+    return literal or None
+
+
 def search_with_regex(
     conn: sqlite3.Connection, pattern: str, limit: int = 20
 ) -> list[tuple[str, str, str]]:
     """
-    Searches history using regex patterns.
+    Searches the whole history using a regex pattern.
+
+    The pattern is matched by a REGEXP function inside SQLite, and rows are
+    read newest first, so the query stops as soon as ``limit`` rows have
+    matched. When the pattern contains a literal, a ``LIKE`` test on it
+    runs first and the regex only sees rows that contain the literal.
 
     Args:
         conn: SQLite connection
-        pattern: Python regex pattern
+        pattern: Python regex pattern (case-insensitive)
         limit: Maximum results
 
     Returns:
-        List of (title, url, timestamp) tuples
+        List of (title, url, timestamp) tuples, newest first
+
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
     """
-    cursor = conn.cursor()
-    try:
-        compiled = re.compile(pattern, re.IGNORECASE)
-        cursor.execute(
-            "SELECT title, url, last_visit_time FROM urls ORDER BY last_visit_time DESC LIMIT ?",
-            (limit,),
-        )
-        matches = []
-        for title, url, ts in cursor.fetchall():
-            if compiled.search(title or "") or compiled.search(url or ""):
-                matches.append((title, sanitize_url(url), format_chrome_timestamp(ts)))
-        return matches[:limit]
-    except re.error as e:
-        raise ValueError(f"Invalid regex pattern: {e}")
+    compile_regex(pattern)
+    register_regexp(conn)
+
+    conditions = ["(title REGEXP ? OR url REGEXP ?)"]
+    params: list[str | int] = [pattern, pattern]
+    literal = regex_literal(pattern)
+    if literal:
+        conditions.insert(0, "(title LIKE ? OR url LIKE ?)")
+        params[:0] = [f"%{literal}%", f"%{literal}%"]
+    params.append(limit)
+
+    # nosec B608 - the conditions are literals
+    cursor = conn.execute(
+        f"SELECT title, url, last_visit_time FROM {urls_source(conn)} "  # nosec B608
+        f"WHERE {' AND '.join(conditions)} ORDER BY last_visit_time DESC LIMIT ?",
+        params,
+    )
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in cursor]
 
 
 def fuzzy_match_score(s1: str, s2: str) -> float:
     """
     Calculates fuzzy match similarity score between two strings.
 
+    The score is one minus the edit distance (with adjacent transpositions)
+    divided by the length of the longer string.
+
     Args:
         s1: First string
         s2: Second string
@@ -478,16 +670,9 @@ def fuzzy_match_score(s1: str, s2: str) -> float:
 
     s1_lower = s1.lower()
     s2_lower = s2.lower()
-
-    if s1_lower == s2_lower:
-        return 1.0
-
-    from difflib import SequenceMatcher
-
-    score1 = SequenceMatcher(None, s1_lower, s2_lower).ratio()
-    score2 = SequenceMatcher(None, s2_lower, s1_lower).ratio()
-
-    return max(score1, score2)
+    longest = max(len(s1_lower), len(s2_lower))
+    distance = bounded_edit_distance(s1_lower, s2_lower, longest)
+    return 1.0 - (distance if distance is not None else longest) / longest
 
 
 def search_with_fuzzy(
@@ -496,6 +681,11 @@ def search_with_fuzzy(
     """
     Searches history with fuzzy matching for typos.
 
+    Every word of the query must be within a few edits of a word of the
+    title or URL (see ``chronicle_mcp.fuzzy``). This scans the whole
+    history; index connections answer fuzzy searches from the vocabulary
+    index instead (``chronicle_mcp.index.search_fuzzy``).
+
     Args:
         conn: SQLite connection
         query: Search term to match
@@ -503,29 +693,29 @@ def search_with_fuzzy(
         limit: Maximum results
 
     Returns:
-        List of (title, url, timestamp, score) tuples
+        List of (title, url, timestamp, score) tuples, best matches first
     """
+    matcher = FuzzyMatcher(query, threshold)
+    if not matcher.terms:
+        return []
+
     cursor = conn.cursor()
-    search_query = f"%{query}%"
     cursor.execute(
-        "SELECT title, url, last_visit_time FROM urls WHERE title LIKE ? OR url LIKE ? ORDER BY last_visit_time DESC LIMIT ?",
-        (search_query, search_query, limit * 3),
+        f"SELECT title, url, last_visit_time FROM {urls_source(conn)} "  # nosec B608
+        "ORDER BY last_visit_time DESC, id DESC"
     )
 
-    matches = []
-    for title, url, ts in cursor.fetchall():
-        score = fuzzy_match_score(query, title or "")
-        if score >= threshold:
-            matches.append((title, sanitize_url(url), format_chrome_timestamp(ts), round(score, 3)))
-        elif url:
-            score = fuzzy_match_score(query, url)
-            if score >= threshold:
-                matches.append(
-                    (title, sanitize_url(url), format_chrome_timestamp(ts), round(score, 3))
-                )
+    matches: list[tuple[float, int, tuple[str, str, str, float]]] = []
+    for position, (title, url, ts) in enumerate(cursor):
+        score = matcher.score(title, url)
+        if score is not None:
+            row = (title, sanitize_url(url), format_chrome_timestamp(ts), score)
+            # Best score first, newest first among equal scores
+            heapq.heappush(matches, (score, -position, row))
+            if len(matches) > limit:
+                heapq.heappop(matches)
 
-    matches.sort(key=lambda x: x[3], reverse=True)
-    return matches[:limit]
+    return [row for _, _, row in sorted(matches, reverse=True)]
 
 
 def search_history_advanced(
@@ -581,7 +771,7 @@ def search_history_advanced(
     }.get(sort_by, "last_visit_time DESC")
 
     # nosec B608 - both where_clause and order_by are built from controlled literals
-    sql = f"SELECT title, url, last_visit_time FROM urls WHERE {where_clause} ORDER BY {order_by} LIMIT ?"  # nosec B608
+    sql = f"SELECT title, url, last_visit_time FROM {urls_source(conn)} WHERE {where_clause} ORDER BY {order_by} LIMIT ?"  # nosec B608
     params.append(limit)
 
     cursor.execute(sql, params)
@@ -601,18 +791,31 @@ def detect_schema(conn: sqlite3.Connection) -> str:
     Returns:
         Schema type: 'chrome', 'firefox', or 'safari'
     """
+    # Snapshot connections cache the detected schema for the snapshot's lifetime
+    snapshot = getattr(conn, "snapshot", None)
+    if snapshot is not None and snapshot.schema is not None:
+        return str(snapshot.schema)
+
+    # Views count too: index connections expose history through temp views
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+        "UNION ALL SELECT name FROM sqlite_temp_master WHERE type IN ('table', 'view')"
+    )
     tables = [row[0] for row in cursor.fetchall()]
 
     if "urls" in tables:
-        return "chrome"
+        schema = "chrome"
     elif "moz_places" in tables:
-        return "firefox"
+        schema = "firefox"
     elif "history_items" in tables:
-        return "safari"
+        schema = "safari"
     else:
-        return "unknown"
+        schema = "unknown"
+
+    if snapshot is not None:
+        snapshot.schema = schema
+    return schema
 
 
 def format_firefox_timestamp(microseconds: int) -> str:
@@ -0,0 +1,364 @@
+"""Persistent query result cache shared between processes.
+
+A second cache level under ``QueryCache``: results are stored in an SQLite
+database in the user cache directory, so a restarted server, or a sibling
+process (an MCP stdio server next to the HTTP daemon), reuses them.
+
+Entries use the same keys as the in-memory cache - the operation and its
+parameters, which include the state of every source database read - and
+the same tags, so a changed browser database invalidates them here too.
+The key is hashed from a canonical JSON encoding of the parameters, which
+is the same in every process. Results are stored as JSON, with tuples and
+dicts marked so they round-trip unchanged; results that are not plain data
+stay in memory only. Cached results hold unsanitized history, so the
+database is readable by the current user only.
+
+The database runs in WAL mode with a busy timeout, so processes read it
+concurrently and queue their writes behind SQLite's own file locks.
+Failures to read or write it are logged and treated as misses: the cache
+never fails a query.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any, NamedTuple
+
+from chronicle_mcp.snapshot import prepare_private_database
+
+logger = logging.getLogger(__name__)
+
+DISK_CACHE_SCHEMA_VERSION = 1
+
+# Seconds a process waits for another one's write lock
+DISK_CACHE_BUSY_TIMEOUT = 5.0
+
+DISK_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    key BLOB NOT NULL UNIQUE,
+    query_type TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_query_type ON entries (query_type);
+CREATE TABLE IF NOT EXISTS entry_tags (
+    tag TEXT NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, entry_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entry_tags_entry ON entry_tags (entry_id);
+CREATE TABLE IF NOT EXISTS tag_versions (
+    tag TEXT PRIMARY KEY,
+    version TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class StoredResult(NamedTuple):
+    """A result read from the disk cache."""
+
+    result: Any
+    remaining_seconds: float
+    tags: tuple[Hashable, ...]
+
+
+def default_disk_cache_path() -> str:
+    """Returns the default location of the persistent result cache."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "chronicle-mcp", "cache", "results.db")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "chronicle-mcp", "results.db")
+
+
+def _encode(value: Any) -> Any:
+    """JSON-ready copy of a result; tuples and dicts become marked objects.
+
+    Raises:
+        TypeError: If the result holds anything but plain data
+    """
+    if isinstance(value, tuple):
+        return {"t": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {"d": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"Cannot store {type(value).__name__} in the disk cache")
+
+
+def _decode(value: Any) -> Any:
+    """Inverse of ``_encode``."""
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if "t" in value:
+            return tuple(_decode(v) for v in value["t"])
+        return {_decode(k): _decode(v) for k, v in value["d"]}
+    return value
+
+
+def _canonical(value: Any) -> str:
+    """JSON text of a key or tag that is the same in every process."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+def _tag_text(tag: Hashable) -> str:
+    """Stored form of a tag, which decodes back to an equal value."""
+    return json.dumps(_encode(tag), sort_keys=True, separators=(",", ":"))
+
+
+def disk_key(query_type: str, params: dict[str, Any]) -> bytes:
+    """Key of a result in the disk cache."""
+    return hashlib.sha256(f"{query_type}\0{_canonical(params)}".encode()).digest()
+
+
+class DiskCache:
+    """SQLite-backed result cache, safe to share between processes.
+
+    Args:
+        path: Path to the cache database, or None for the user cache directory
+        ttl_seconds: Seconds a result is served for
+        max_bytes: Maximum size of all stored results; the entries closest to
+            expiry are dropped beyond it
+        clock: Wall clock, in seconds since the epoch, shared by all processes
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl_seconds: int = 300,
+        max_bytes: int = 256 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path or default_disk_cache_path()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._conn: sqlite3.Connection | None = None
+        self._versions: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection, creating the cache database if needed."""
+        if self._conn is None:
+            prepare_private_database(self.path)
+            conn = sqlite3.connect(
+                self.path,
+                timeout=DISK_CACHE_BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA foreign_keys=ON")
+                if conn.execute("PRAGMA user_version").fetchone()[0] < DISK_CACHE_SCHEMA_VERSION:
+                    conn.executescript(DISK_CACHE_SCHEMA)
+                    conn.execute(f"PRAGMA user_version = {DISK_CACHE_SCHEMA_VERSION}")
+            except BaseException:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _failed(self, action: str, error: Exception) -> None:
+        self._stats["errors"] += 1
+        logger.warning(f"Disk cache {action} failed: {error}")
+
+    def get(self, query_type: str, params: dict[str, Any]) -> StoredResult | None:
+        """Get a stored result.
+
+        Returns:
+            The result, the seconds it has left to live and its tags, or None on a miss
+        """
+        key = disk_key(query_type, params)
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT id, result, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                remaining = row[2] - self._clock() if row is not None else 0.0
+                tags = []
+                if remaining > 0:
+                    tags = [
+                        tag
+                        for (tag,) in conn.execute(
+                            "SELECT tag FROM entry_tags WHERE entry_id = ?", (row[0],)
+                        )
+                    ]
+            except (sqlite3.Error, OSError) as e:
+                self._failed("read", e)
+                return None
+            if remaining <= 0:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+        return StoredResult(
+            _decode(json.loads(row[1])), remaining, tuple(_decode(json.loads(t)) for t in tags)
+        )
+
+    def set(
+        self,
+        query_type: str,
+        params: dict[str, Any],
+        result: Any,
+        tags: Iterable[Hashable] = (),
+    ) -> bool:
+        """Store a result, replacing any stored under the same key.
+
+        Returns:
+            True if the result was stored; False if it is not plain data,
+            too large, or the database could not be written
+        """
+        try:
+            text = json.dumps(_encode(result), separators=(",", ":"))
+            tag_texts = [_tag_text(tag) for tag in tags]
+        except (TypeError, ValueError):
+            return False
+        size = len(text)
+        if size > self.max_bytes:
+            return False
+        key = disk_key(query_type, params)
+        with self._lock:
+            try:
+                conn = self._connect()
+                now = self._clock()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("DELETE FROM entries WHERE key = ? OR expires_at <= ?", (key, now))
+                    entry_id = conn.execute(
+                        "INSERT INTO entries (key, query_type, result, size_bytes, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, query_type, text, size, now + self.ttl_seconds),
+                    ).lastrowid
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO entry_tags (tag, entry_id) VALUES (?, ?)",
+                        [(tag_text, entry_id) for tag_text in tag_texts],
+                    )
+                    self._make_room(conn)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            except (sqlite3.Error, OSError) as e:
+                self._failed("write", e)
+                return False
+            self._stats["writes"] += 1
+        return True
+
+    def _make_room(self, conn: sqlite3.Connection) -> None:
+        """Drop the entries closest to expiry until the results fit in ``max_bytes``."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for entry_id, size in conn.execute(
+            "SELECT id, size_bytes FROM entries ORDER BY expires_at"
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append((entry_id,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE id = ?", doomed)
+        self._stats["evictions"] += len(doomed)
+
+    def invalidate(self, query_type: str | None = None, tag: Hashable | None = None) -> int:
+        """Drop stored results of an operation, with a tag, or all of them.
+
+        Returns:
+            Number of entries dropped
+        """
+        where, args = [], []
+        if query_type is not None:
+            where.append("query_type = ?")
+            args.append(query_type)
+        if tag is not None:
+            where.append("id IN (SELECT entry_id FROM entry_tags WHERE tag = ?)")
+            args.append(_tag_text(tag))
+        # nosec B608 - the conditions are fixed strings
+        statement = "DELETE FROM entries"  # nosec B608
+        if where:
+            statement += " WHERE " + " AND ".join(where)
+        with self._lock:
+            try:
+                return self._connect().execute(statement, args).rowcount
+            except (sqlite3.Error, OSError) as e:
+                self._failed("invalidation", e)
+                return 0
+
+    def observe(self, tag: Hashable, version: Hashable) -> int:
+        """Record the current version of a tag's source, dropping entries of older versions.
+
+        The version is kept in the database, so entries left by another
+        process, or before a restart, are dropped too.
+
+        Returns:
+            Number of entries dropped
+        """
+        tag_text, version_text = _tag_text(tag), _canonical(version)
+        if self._versions.get(tag_text) == version_text:
+            return 0
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(
+                        "SELECT version FROM tag_versions WHERE tag = ?", (tag_text,)
+                    ).fetchone()
+                    removed = 0
+                    if row is not None and row[0] != version_text:
+                        removed = conn.execute(
+                            "DELETE FROM entries WHERE id IN "
+                            "(SELECT entry_id FROM entry_tags WHERE tag = ?)",
+                            (tag_text,),
+                        ).rowcount
+                    if row is None or row[0] != version_text:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO tag_versions (tag, version) VALUES (?, ?)",
+                            (tag_text, version_text),
+                        )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            except (sqlite3.Error, OSError) as e:
+                self._failed("version check", e)
+                return 0
+            self._versions[tag_text] = version_text
+        return removed
+
+    def close(self) -> None:
+        """Close the connection to the cache database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get disk cache statistics."""
+        with self._lock:
+            stats: dict[str, Any] = {"path": self.path, **self._stats}
+            try:
+                entries, size = (
+                    self._connect()
+                    .execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM entries")
+                    .fetchone()
+                )
+            except (sqlite3.Error, OSError) as e:
+                self._failed("stats query", e)
+                return stats
+        return {**stats, "size": entries, "bytes": size, "max_bytes": self.max_bytes}
@@ -0,0 +1,180 @@
+"""Host and registrable-domain parsing for history URLs.
+
+Domain queries match on hosts rather than on URL substrings, so that
+``hub.com`` does not match ``github.com`` while ``github.com`` still matches
+``gist.github.com``. Hosts are indexed reversed (``moc.buhtig.tsig``) so that
+"this domain and its subdomains" is a single B-tree range.
+
+The registrable domain (eTLD+1) is the public suffix plus one label, e.g.
+``bbc.co.uk`` for ``news.bbc.co.uk``. Rather than shipping the full Public
+Suffix List, ``PUBLIC_SUFFIXES`` covers the multi-label suffixes that show up
+in browsing history most often; any other host falls back to its last two
+labels.
+"""
+
+import ipaddress
+from urllib.parse import urlsplit
+
+# Schemes whose URLs have a network host
+HOST_SCHEMES = ("http", "https")
+
+# Multi-label public suffixes; single-label TLDs need no entry
+PUBLIC_SUFFIXES = frozenset(
+    {
+        # Country-code second-level domains
+        "ac.uk",
+        "co.uk",
+        "gov.uk",
+        "ltd.uk",
+        "me.uk",
+        "net.uk",
+        "nhs.uk",
+        "org.uk",
+        "plc.uk",
+        "sch.uk",
+        "com.au",
+        "edu.au",
+        "gov.au",
+        "net.au",
+        "org.au",
+        "co.nz",
+        "govt.nz",
+        "org.nz",
+        "co.jp",
+        "ne.jp",
+        "or.jp",
+        "ac.jp",
+        "go.jp",
+        "co.kr",
+        "or.kr",
+        "com.br",
+        "gov.br",
+        "net.br",
+        "org.br",
+        "com.cn",
+        "edu.cn",
+        "gov.cn",
+        "net.cn",
+        "org.cn",
+        "com.hk",
+        "com.sg",
+        "com.tw",
+        "com.mx",
+        "com.ar",
+        "com.tr",
+        "co.in",
+        "net.in",
+        "org.in",
+        "gov.in",
+        "co.za",
+        "org.za",
+        "co.il",
+        "com.ua",
+        "com.pl",
+        "co.id",
+        "com.my",
+        "com.ph",
+        "com.vn",
+        "com.eg",
+        "com.sa",
+        # Hosting platforms that hand out subdomains to users
+        "github.io",
+        "gitlab.io",
+        "pages.dev",
+        "workers.dev",
+        "netlify.app",
+        "vercel.app",
+        "herokuapp.com",
+        "blogspot.com",
+        "appspot.com",
+        "cloudfront.net",
+        "azurewebsites.net",
+        "s3.amazonaws.com",
+        "readthedocs.io",
+    }
+)
+
+
+def url_host(url: str | None) -> str | None:
+    """Returns the lowercase host of an http(s) URL, without port or credentials.
+
+    Args:
+        url: URL from a history database
+
+    Returns:
+        Host name, or None for other schemes and unparsable URLs
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in HOST_SCHEMES:
+        return None
+    try:
+        host = parts.hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return host.rstrip(".") or None
+
+
+def reverse_host(host: str) -> str:
+    """Reverses a host name so that a domain's subdomains share its prefix."""
+    return host[::-1]
+
+
+def registrable_domain(host: str) -> str:
+    """Returns the registrable domain (eTLD+1) of a host.
+
+    IP addresses and single-label hosts are returned unchanged.
+
+    Args:
+        host: Lowercase host name
+
+    Returns:
+        Registrable domain, e.g. ``bbc.co.uk`` for ``news.bbc.co.uk``
+    """
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return host
+    except ValueError:
+        pass
+    labels = host.split(".")
+    if len(labels) <= 2:
+        return host
+    for size in (3, 2):
+        if ".".join(labels[-size:]) in PUBLIC_SUFFIXES and len(labels) > size:
+            return ".".join(labels[-size - 1 :])
+    return ".".join(labels[-2:])
+
+
+def normalize_domain(domain: str) -> str:
+    """Turns user input such as ``https://GitHub.com/x`` or ``.github.com`` into a host.
+
+    Args:
+        domain: Domain as given by the user
+
+    Returns:
+        Lowercase host name
+    """
+    value = domain.strip().lower()
+    if "://" in value:
+        value = url_host(value) or value.split("://", 1)[1]
+    value = value.split("/", 1)[0]
+    return value.strip(".")
+
+
+def host_matches(host: str | None, domain: str) -> bool:
+    """True if ``host`` is ``domain`` or one of its subdomains.
+
+    Args:
+        host: Host of a URL, or None
+        domain: Normalized domain from ``normalize_domain``
+
+    Returns:
+        Whether the host belongs to the domain
+    """
+    return host is not None and (host == domain or host.endswith("." + domain))
@@ -0,0 +1,248 @@
+"""Typo-tolerant term matching for fuzzy history search.
+
+Fuzzy search matches every word of the query against the words of titles
+and URLs, allowing a few edits per word (insertions, deletions,
+substitutions and swaps of adjacent characters). A word of length ``n``
+may differ in at most ``(1 - threshold) * n`` edits, capped at
+``MAX_EDITS``, and scores ``1 - edits / n``. A page's score is the mean
+score of the query words.
+
+Candidate words come from a ``TermIndex``: a bigram index over the words
+of the history. An edit changes at most three bigrams of a word (two for
+insertions, deletions and substitutions, three for a swap), so a word
+within ``k`` edits of the query word shares all but ``3k`` of its bigrams;
+only words passing that count are verified with ``bounded_edit_distance``,
+which gives up as soon as the distance is known to exceed ``k``.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable
+
+# Upper bound on edits per word, whatever the threshold
+MAX_EDITS = 3
+
+# Only the first words of a query are matched
+MAX_QUERY_TERMS = 4
+
+GRAM_SIZE = 2
+GRAM_PAD = "\x00"
+
+# Most bigrams a single edit can change (swapping "ab" in "xaby")
+GRAMS_PER_EDIT = 3
+
+# Same word boundaries as the unicode61 tokenizer of the full-text index
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+
+def fold(text: str) -> str:
+    """Lowercases text and strips diacritics, like unicode61 with remove_diacritics."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fuzzy_terms(text: str | None) -> list[str]:
+    """Splits text into folded words.
+
+    Args:
+        text: Title, URL or query
+
+    Returns:
+        Words in order of appearance
+    """
+    if not text:
+        return []
+    return TERM_PATTERN.findall(fold(text))
+
+
+def max_edits(term: str, threshold: float) -> int:
+    """Returns the number of edits a word may have and still score ``threshold``."""
+    return min(MAX_EDITS, int((1.0 - threshold) * len(term) + 1e-9))
+
+
+def term_score(term: str, edits: int) -> float:
+    """Similarity of a query word to a word ``edits`` edits away from it."""
+    return 1.0 - edits / len(term) if term else 0.0
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int | None:
+    """Optimal string alignment distance between two strings, if it is small.
+
+    Counts insertions, deletions, substitutions and transpositions of
+    adjacent characters. Only a band of ``2 * max_distance + 1`` cells is
+    computed per row, and the computation stops as soon as a whole row
+    exceeds ``max_distance``.
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Largest distance of interest
+
+    Returns:
+        The distance, or None if it is greater than ``max_distance``
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    if lb - la > max_distance:
+        return None
+
+    beyond = max_distance + 1
+    before: list[int] = []
+    previous = [j if j <= max_distance else beyond for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        current = [beyond] * (lb + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        ca = a[i - 1]
+        for j in range(max(1, i - max_distance), min(lb, i + max_distance) + 1):
+            cb = b[j - 1]
+            # Plain comparisons rather than min(): this is the innermost loop
+            value = previous[j - 1] if ca == cb else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and before[j - 2] + 1 < value:
+                value = before[j - 2] + 1
+            if value > beyond:
+                value = beyond
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return None
+        before, previous = previous, current
+    distance = previous[lb]
+    return distance if distance <= max_distance else None
+
+
+class FuzzyMatcher:
+    """Scores titles and URLs against a fuzzy query.
+
+    The edit distance of each query word to each history word is computed
+    once and remembered, since the same words recur across many rows.
+    """
+
+    def __init__(self, query: str, threshold: float):
+        self.terms = fuzzy_terms(query)[:MAX_QUERY_TERMS]
+        self._budgets = [max_edits(term, threshold) for term in self.terms]
+        self._distances: list[dict[str, int | None]] = [{} for _ in self.terms]
+
+    def score(self, *texts: str | None) -> float | None:
+        """Returns the mean score of the query words, or None if one has no match.
+
+        Args:
+            texts: Title and URL of a history entry
+
+        Returns:
+            Score between 0 and 1, rounded to three places
+        """
+        if not self.terms:
+            return None
+        words = {word for text in texts for word in fuzzy_terms(text)}
+        total = 0.0
+        for term, budget, known in zip(self.terms, self._budgets, self._distances):
+            best: int | None = None
+            for word in words:
+                if word not in known:
+                    known[word] = bounded_edit_distance(term, word, budget)
+                distance = known[word]
+                if distance is not None and (best is None or distance < best):
+                    best = distance
+            if best is None:
+                return None
+            total += term_score(term, best)
+        return round(total / len(self.terms), 3)
+
+
+def _grams(term: str) -> list[str]:
+    """Padded bigrams of a word; a word of length n has n + 1 of them."""
+    padded = f"{GRAM_PAD}{term}{GRAM_PAD}"
+    return [padded[i : i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)]
+
+
+class TermIndex:
+    """Bigram index over a vocabulary of words.
+
+    Words are only ever added. Additions are single dict and list
+    operations, so searches may run while another thread adds words.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self._terms: list[str] = []
+        self._distinct: list[int] = []
+        self._ids: dict[str, int] = {}
+        self._grams: dict[str, list[int]] = {}
+        self._lengths: dict[int, list[int]] = {}
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, term: str) -> None:
+        """Add a word to the vocabulary."""
+        if not term or term in self._ids:
+            return
+        term_id = len(self._terms)
+        grams = set(_grams(term))
+        self._distinct.append(len(grams))
+        self._terms.append(term)
+        self._ids[term] = term_id
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(term_id)
+        self._lengths.setdefault(len(term), []).append(term_id)
+
+    def add_text(self, *texts: str | None) -> None:
+        """Add the words of titles or URLs to the vocabulary."""
+        for text in texts:
+            for term in fuzzy_terms(text):
+                self.add(term)
+
+    def search(self, term: str, max_distance: int) -> dict[str, int]:
+        """Find the words within ``max_distance`` edits of a word.
+
+        Args:
+            term: Folded query word
+            max_distance: Maximum number of edits
+
+        Returns:
+            Mapping of matching words to their edit distance
+        """
+        grams = _grams(term)
+        distinct = set(grams)
+        # Common bigrams needed, counting repeated bigrams of the query once
+        required = len(grams) - max_distance * GRAMS_PER_EDIT - (len(grams) - len(distinct))
+
+        candidates: Iterable[int]
+        if required > 0:
+            counts: Counter[int] = Counter()
+            for gram in distinct:
+                counts.update(self._grams.get(gram, ()))
+            # The same bound holds from the candidate word's side
+            slack = max_distance * GRAMS_PER_EDIT
+            candidates = [
+                term_id
+                for term_id, count in counts.items()
+                if count >= required and count >= self._distinct[term_id] - slack
+            ]
+        else:
+            # Too short for the bigram filter to exclude anything
+            candidates = [
+                term_id
+                for length in range(len(term) - max_distance, len(term) + max_distance + 1)
+                for term_id in self._lengths.get(length, ())
+            ]
+
+        matches: dict[str, int] = {}
+        for term_id in candidates:
+            word = self._terms[term_id]
+            distance = bounded_edit_distance(term, word, max_distance)
+            if distance is not None:
+                matches[word] = distance
+        return matches
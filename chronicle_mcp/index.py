@@ -0,0 +1,1288 @@
+"""Local mirror index of browser history.
+
+Reading a browser's own history database means taking a snapshot of it and
+scanning it cold on every request. The history index keeps a copy of the
+history of every browser that has been queried in a single SQLite database
+owned by ChronicleMCP (``~/.local/share/chronicle-mcp/index.db`` by default,
+readable by the current user only).
+Queries then read from the index instead of the browser files.
+
+The index is refreshed incrementally. Each source database records
+watermarks: the highest url id, the highest visit id, and the newest
+last-visit timestamp it has ingested. A refresh only reads rows beyond those
+watermarks, and only runs when the source file has changed since the last
+one. Rows the browser has deleted below a watermark (expired or cleared
+history) are deleted from the index too; if rows appear below a watermark,
+or a different url sits under an indexed id (the file was replaced), the
+source is re-ingested from scratch.
+
+Timestamps from all browsers are stored as Chrome timestamps (microseconds
+since 1601-01-01), and every source is exposed to queries through
+temporary ``urls`` and ``visits`` views with the Chrome column names. The
+query functions in ``chronicle_mcp.database`` therefore work unchanged on
+index connections.
+"""
+
+import atexit
+import itertools
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Generator, Iterable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from chronicle_mcp.config import IndexConfig, apply_env_overrides, load_config
+from chronicle_mcp.connection import (
+    CANCEL_CHECK_INSTRUCTIONS,
+    get_cancel_event,
+    get_history_connection,
+    resolve_history_path,
+)
+from chronicle_mcp.database import (
+    compile_regex,
+    detect_schema,
+    format_chrome_timestamp,
+    get_top_domains,
+    query_history,
+    regex_literal,
+    register_regexp,
+    sanitize_url,
+    search_history_advanced,
+    search_with_fuzzy,
+    search_with_regex,
+)
+from chronicle_mcp.domains import (
+    host_matches,
+    normalize_domain,
+    registrable_domain,
+    reverse_host,
+    url_host,
+)
+from chronicle_mcp.fuzzy import (
+    MAX_QUERY_TERMS,
+    TermIndex,
+    fuzzy_terms,
+    max_edits,
+    term_score,
+)
+from chronicle_mcp.rollups import (
+    ROLLUP_SCHEMA,
+    clear_rollups,
+    remove_rollups,
+    top_hosts_since,
+    update_rollups,
+    update_source_stats,
+)
+from chronicle_mcp.schemas import (
+    TIMESTAMP_CONVERSIONS,
+    SourceLayout,
+    get_native_history,
+    resolve_layout,
+    table_columns,
+)
+from chronicle_mcp.sessions import (
+    DEFAULT_IDLE_MINUTES,
+    SESSION_SCHEMA,
+    clear_sessions,
+    regroup_sessions,
+    remove_session_visits,
+    update_sessions,
+)
+from chronicle_mcp.snapshot import (
+    SourceFingerprint,
+    fingerprint_source,
+    prepare_private_database,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA_VERSION = 6
+
+# Maximum number of host parameters in one "IN (...)" lookup
+LOOKUP_CHUNK_SIZE = 500
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    browser TEXT NOT NULL,
+    path TEXT NOT NULL,
+    schema TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    wal_size INTEGER,
+    wal_mtime_ns INTEGER,
+    url_watermark INTEGER NOT NULL DEFAULT 0,
+    visit_watermark INTEGER NOT NULL DEFAULT 0,
+    time_watermark INTEGER NOT NULL DEFAULT 0,
+    last_ingest REAL,
+    UNIQUE (browser, path)
+);
+CREATE TABLE IF NOT EXISTS index_urls (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    source_url_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    last_visit_time INTEGER,
+    UNIQUE (source_id, source_url_id)
+);
+CREATE INDEX IF NOT EXISTS index_urls_last_visit ON index_urls(source_id, last_visit_time);
+CREATE TABLE IF NOT EXISTS index_visits (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    source_visit_id INTEGER NOT NULL,
+    source_url_id INTEGER NOT NULL,
+    visit_time INTEGER,
+    from_visit INTEGER,
+    transition INTEGER,
+    UNIQUE (source_id, source_visit_id)
+);
+CREATE INDEX IF NOT EXISTS index_visits_time ON index_visits(source_id, visit_time);
+CREATE INDEX IF NOT EXISTS index_visits_url ON index_visits(source_id, source_url_id);
+"""
+
+# Full-text index over index_urls, kept in sync by triggers. The unicode61
+# tokenizer splits URLs on punctuation, so hosts and path segments are terms.
+FULLTEXT_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS index_fts USING fts5(
+    title, url,
+    content='index_urls', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS index_urls_fts_insert AFTER INSERT ON index_urls BEGIN
+    INSERT INTO index_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+END;
+CREATE TRIGGER IF NOT EXISTS index_urls_fts_delete AFTER DELETE ON index_urls BEGIN
+    INSERT INTO index_fts(index_fts, rowid, title, url)
+    VALUES ('delete', old.id, old.title, old.url);
+END;
+CREATE TRIGGER IF NOT EXISTS index_urls_fts_update AFTER UPDATE OF title, url ON index_urls
+WHEN old.title IS NOT new.title OR old.url IS NOT new.url BEGIN
+    INSERT INTO index_fts(index_fts, rowid, title, url)
+    VALUES ('delete', old.id, old.title, old.url);
+    INSERT INTO index_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+END;
+INSERT INTO index_fts(index_fts) VALUES ('rebuild');
+INSERT INTO index_fts(index_fts, rank) VALUES ('rank', 'bm25({title_weight}, 1.0)');
+"""
+
+# Title matches count this many times as much as URL matches in BM25 ranking
+FULLTEXT_TITLE_WEIGHT = 4.0
+
+# Markers placed around matched terms by snippet()
+SNIPPET_MARKERS = ("**", "**")
+SNIPPET_TOKENS = 12
+
+
+# Trigram index over index_urls for substring (LIKE) searches. Tokens are
+# case-folded, so it returns a superset of LIKE's ASCII-only case folding;
+# matches are verified against index_urls.
+SUBSTRING_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS index_trigram USING fts5(
+    title, url,
+    content='index_urls', content_rowid='id',
+    tokenize='trigram case_sensitive 0', detail='none'
+);
+CREATE TRIGGER IF NOT EXISTS index_urls_trigram_insert AFTER INSERT ON index_urls BEGIN
+    INSERT INTO index_trigram(rowid, title, url) VALUES (new.id, new.title, new.url);
+END;
+CREATE TRIGGER IF NOT EXISTS index_urls_trigram_delete AFTER DELETE ON index_urls BEGIN
+    INSERT INTO index_trigram(index_trigram, rowid, title, url)
+    VALUES ('delete', old.id, old.title, old.url);
+END;
+CREATE TRIGGER IF NOT EXISTS index_urls_trigram_update AFTER UPDATE OF title, url ON index_urls
+WHEN old.title IS NOT new.title OR old.url IS NOT new.url BEGIN
+    INSERT INTO index_trigram(index_trigram, rowid, title, url)
+    VALUES ('delete', old.id, old.title, old.url);
+    INSERT INTO index_trigram(rowid, title, url) VALUES (new.id, new.title, new.url);
+END;
+INSERT INTO index_trigram(index_trigram) VALUES ('rebuild');
+"""
+
+# Shortest run of literal characters the trigram index can look up
+TRIGRAM_LENGTH = 3
+
+# Parsed host columns on index_urls. Hosts are stored reversed as well, so a
+# domain and its subdomains are one range of the rev_host index; visit_count
+# is in the indexes so domain counts never touch the table rows.
+HOST_COLUMNS = ("host", "rev_host", "registrable_domain")
+HOST_INDEXES = """
+CREATE INDEX IF NOT EXISTS index_urls_host ON index_urls(source_id, host, visit_count);
+CREATE INDEX IF NOT EXISTS index_urls_rev_host ON index_urls(source_id, rev_host, visit_count);
+CREATE INDEX IF NOT EXISTS index_urls_domain
+    ON index_urls(source_id, registrable_domain, visit_count);
+"""
+
+# Matches a domain and its subdomains as one range of the rev_host index.
+# [rev, rev + "/") holds the reversed domain, its subdomains (rev + ".") and
+# hosts such as "x-github.com" (rev + "-"), which the inner test drops.
+HOST_MATCH = "(u.rev_host >= ? AND u.rev_host < ? AND (u.rev_host = ? OR u.rev_host >= ?))"
+
+# Top-domain groupings and the index_urls column behind each
+DOMAIN_GROUPINGS = {"host": "host", "domain": "registrable_domain"}
+
+
+def _probe_fts5(tokenizer: str) -> bool:
+    """True if the sqlite3 module was built with FTS5 and the given tokenizer."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='{tokenizer}')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+FTS5_SUPPORTED = _probe_fts5("unicode61")
+# The trigram tokenizer needs SQLite 3.34 or later
+TRIGRAM_SUPPORTED = _probe_fts5("trigram")
+
+
+def default_index_path() -> str:
+    """Returns the default location of the index database."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "chronicle-mcp", "index.db")
+
+
+@dataclass
+class SourceState:
+    """Ingestion state of one source database, as stored in ``sources``."""
+
+    id: int
+    browser: str
+    path: str
+    fingerprint: SourceFingerprint | None
+    url_watermark: int = 0
+    visit_watermark: int = 0
+    time_watermark: int = 0
+
+
+class IndexConnection(sqlite3.Connection):
+    """Read-only connection to the history index, scoped to one source.
+
+    ``fulltext`` is True if the index has a full-text table to search, and
+    ``substring`` if it has a trigram table for substring searches.
+    ``vocabulary`` returns the word index used by fuzzy search.
+    """
+
+    source_id: int | None = None
+    fulltext: bool = False
+    substring: bool = False
+    vocabulary: Callable[[], TermIndex] | None = None
+
+
+class HistoryIndex:
+    """SQLite mirror of browser history databases.
+
+    Each source is refreshed by one thread at a time, under a lock of its
+    own, so snapshots of different browsers and profiles are taken in
+    parallel. Ingestion then goes through a single writer connection
+    guarded by a shared lock; readers open their own connections, which WAL
+    mode lets run alongside an ingest.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        batch_size: int = 1000,
+        session_idle_minutes: int = DEFAULT_IDLE_MINUTES,
+    ):
+        self.path = path or default_index_path()
+        self.batch_size = max(1, batch_size)
+        self.session_idle_minutes = max(1, session_idle_minutes)
+        self._writer: sqlite3.Connection | None = None
+        self._vocabulary: TermIndex | None = None
+        self._lock = threading.Lock()
+        self._source_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._stats = {
+            "refreshes": 0,
+            "skipped": 0,
+            "resets": 0,
+            "deleted": 0,
+            "urls": 0,
+            "visits": 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: IndexConfig) -> "HistoryIndex":
+        """Create a history index from the ``[index]`` configuration section."""
+        path = os.path.expanduser(config.path) if config.path else None
+        return cls(
+            path=path,
+            batch_size=config.batch_size,
+            session_idle_minutes=config.session_idle_minutes,
+        )
+
+    def _open_writer(self) -> sqlite3.Connection:
+        """Returns the writer connection, creating the index database if needed."""
+        if self._writer is None:
+            prepare_private_database(self.path)
+            writer = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            writer.execute("PRAGMA journal_mode=WAL")
+            writer.execute("PRAGMA synchronous=NORMAL")
+            version = writer.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                writer.executescript(INDEX_SCHEMA)
+            if version < 2 and FTS5_SUPPORTED:
+                # Builds the full-text index from rows ingested before it existed
+                writer.executescript(
+                    FULLTEXT_SCHEMA.replace("{title_weight}", str(FULLTEXT_TITLE_WEIGHT))
+                )
+            if version < 3 and TRIGRAM_SUPPORTED:
+                writer.executescript(SUBSTRING_SCHEMA)
+            if version < 4:
+                writer.execute("BEGIN IMMEDIATE")
+                try:
+                    existing = table_columns(writer, "index_urls")
+                    for column in HOST_COLUMNS:
+                        if column not in existing:
+                            writer.execute(f"ALTER TABLE index_urls ADD COLUMN {column} TEXT")
+                    self._backfill_hosts(writer)
+                    writer.execute("COMMIT")
+                except BaseException:
+                    writer.execute("ROLLBACK")
+                    raise
+                writer.executescript(HOST_INDEXES)
+            if version < 5:
+                writer.executescript(ROLLUP_SCHEMA)
+                writer.execute("BEGIN IMMEDIATE")
+                try:
+                    for (source_id,) in writer.execute("SELECT id FROM sources").fetchall():
+                        clear_rollups(writer, source_id)
+                        update_rollups(writer, source_id, 0)
+                        update_source_stats(writer, source_id)
+                    writer.execute("COMMIT")
+                except BaseException:
+                    writer.execute("ROLLBACK")
+                    raise
+            if version < 6:
+                writer.executescript(SESSION_SCHEMA)
+                writer.execute("BEGIN IMMEDIATE")
+                try:
+                    for (source_id,) in writer.execute("SELECT id FROM sources").fetchall():
+                        update_sessions(
+                            writer, source_id, self.session_idle_minutes, self.batch_size
+                        )
+                    writer.execute("COMMIT")
+                except BaseException:
+                    writer.execute("ROLLBACK")
+                    raise
+            if version < INDEX_SCHEMA_VERSION:
+                writer.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION}")
+            self._writer = writer
+        return self._writer
+
+    def _backfill_hosts(self, writer: sqlite3.Connection) -> None:
+        """Fill the host columns of url rows ingested before they existed."""
+        rows = writer.execute("SELECT id, url FROM index_urls")
+        while batch := rows.fetchmany(self.batch_size):
+            writer.executemany(
+                "UPDATE index_urls SET host = ?, rev_host = ?, registrable_domain = ? WHERE id = ?",
+                ((*_host_columns(url), row_id) for row_id, url in batch),
+            )
+
+    def _load_source(self, writer: sqlite3.Connection, browser: str, path: str) -> SourceState:
+        """Returns the stored state of a source, registering it if it is new."""
+        writer.execute(
+            "INSERT OR IGNORE INTO sources (browser, path) VALUES (?, ?)", (browser, path)
+        )
+        row = writer.execute(
+            "SELECT id, size, mtime_ns, wal_size, wal_mtime_ns, url_watermark, "
+            "visit_watermark, time_watermark FROM sources WHERE browser = ? AND path = ?",
+            (browser, path),
+        ).fetchone()
+        fingerprint = SourceFingerprint(*row[1:5]) if row[1] is not None else None
+        return SourceState(row[0], browser, path, fingerprint, row[5], row[6], row[7])
+
+    def refresh(self, browser: str) -> SourceState:
+        """Bring the index up to date with a browser's history database.
+
+        Does nothing beyond a stat() of the source if it has not changed
+        since the last refresh.
+
+        Args:
+            browser: Browser name
+
+        Returns:
+            The source's ingestion state after the refresh
+
+        Raises:
+            BrowserNotFoundError: If the browser is not recognized
+            BrowserPathNotFoundError: If the history path doesn't exist
+            ConnectionError: If the source database cannot be read
+        """
+        browser_lower = browser.lower()
+        history_path = resolve_history_path(browser_lower)
+
+        # Sources are snapshotted independently; only the writer is shared
+        with self._source_lock(browser_lower, history_path):
+            with self._lock:
+                writer = self._open_writer()
+                state = self._load_source(writer, browser_lower, history_path)
+                if state.fingerprint == fingerprint_source(history_path):
+                    self._stats["skipped"] += 1
+                    return state
+
+            with get_history_connection(browser_lower) as source:
+                # Record the fingerprint of the data actually read, not the live file
+                snapshot = getattr(source, "snapshot", None)
+                fingerprint = getattr(snapshot, "fingerprint", None) or fingerprint_source(
+                    history_path
+                )
+                with self._lock:
+                    writer = self._open_writer()
+                    writer.execute("BEGIN IMMEDIATE")
+                    try:
+                        # Another process sharing the index may have ingested since
+                        # the state was read; ingesting the same rows again would
+                        # count their visits twice in the rollups
+                        current = self._load_source(writer, browser_lower, history_path)
+                        if current != state:
+                            writer.execute("ROLLBACK")
+                            self._stats["skipped"] += 1
+                            return current
+                        self._ingest(writer, source, state)
+                        writer.execute(
+                            "UPDATE sources SET size = ?, mtime_ns = ?, wal_size = ?, "
+                            "wal_mtime_ns = ?, url_watermark = ?, visit_watermark = ?, "
+                            "time_watermark = ?, last_ingest = ? WHERE id = ?",
+                            (
+                                *fingerprint,
+                                state.url_watermark,
+                                state.visit_watermark,
+                                state.time_watermark,
+                                time.time(),
+                                state.id,
+                            ),
+                        )
+                        writer.execute("COMMIT")
+                    except BaseException:
+                        writer.execute("ROLLBACK")
+                        raise
+                    self._stats["refreshes"] += 1
+            state.fingerprint = fingerprint
+            return state
+
+    @contextmanager
+    def _source_lock(self, browser: str, path: str) -> Generator[None, None, None]:
+        """Hold the lock of one source, so each source is refreshed by one thread at a time."""
+        with self._lock:
+            lock = self._source_locks.setdefault((browser, path), threading.Lock())
+        with lock:
+            yield
+
+    def _ingest(
+        self, writer: sqlite3.Connection, source: sqlite3.Connection, state: SourceState
+    ) -> None:
+        """Copy rows beyond the source's watermarks into the index."""
+        schema = detect_schema(source)
+        layout = resolve_layout(source, schema)
+        writer.execute("UPDATE sources SET schema = ? WHERE id = ?", (schema, state.id))
+
+        deleted = self._deleted_rows(writer, source, layout, state)
+        if deleted is None:
+            logger.info(f"Re-indexing {state.browser} history from {state.path}")
+            writer.execute("DELETE FROM index_urls WHERE source_id = ?", (state.id,))
+            writer.execute("DELETE FROM index_visits WHERE source_id = ?", (state.id,))
+            clear_rollups(writer, state.id)
+            clear_sessions(writer, state.id)
+            state.url_watermark = state.visit_watermark = state.time_watermark = 0
+            self._stats["resets"] += 1
+        else:
+            self._delete_rows(writer, state, *deleted)
+
+        rolled_up = state.visit_watermark
+        touched: set[int] = set()
+        if layout.visits_table:
+            touched = self._ingest_visits(writer, source, layout, state)
+
+        url_select = (
+            f"SELECT u.id, u.url, {layout.title}, {layout.visit_count}, {layout.last_visit}"
+            f"{', u.' + layout.last_visit_column if layout.last_visit_column else ', NULL'} "
+            f"FROM {layout.urls_table} u"
+        )
+        if layout.last_visit_column:
+            rows = source.execute(
+                f"{url_select} WHERE u.id > ? OR u.{layout.last_visit_column} > ?",
+                (state.url_watermark, state.time_watermark),
+            )
+        else:
+            rows = source.execute(f"{url_select} WHERE u.id > ?", (state.url_watermark,))
+        seen = self._upsert_urls(writer, rows, state)
+
+        # Urls with new visits but no change the watermarks can see (e.g. Safari)
+        pending = sorted(touched - seen)
+        for start in range(0, len(pending), LOOKUP_CHUNK_SIZE):
+            chunk = pending[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            self._upsert_urls(
+                writer, source.execute(f"{url_select} WHERE u.id IN ({placeholders})", chunk), state
+            )
+
+        # Visits are rolled up once their urls (and hosts) are in the index
+        update_rollups(writer, state.id, rolled_up)
+        update_source_stats(writer, state.id)
+        update_sessions(writer, state.id, self.session_idle_minutes, self.batch_size)
+
+    def _deleted_rows(
+        self,
+        writer: sqlite3.Connection,
+        source: sqlite3.Connection,
+        layout: SourceLayout,
+        state: SourceState,
+    ) -> tuple[list[int], list[int]] | None:
+        """Ids of the urls and visits deleted from the source below its watermarks.
+
+        Browsers delete old and cleared history as a matter of course, so
+        missing rows are expected. Rows that appear below a watermark, or a
+        different url under the newest id still indexed, mean the file was
+        replaced or rewritten.
+
+        Returns:
+            (deleted url ids, deleted visit ids), or None if the source has
+            to be re-ingested from scratch
+        """
+        deleted_urls = self._missing_ids(
+            writer,
+            source,
+            layout.urls_table,
+            "index_urls",
+            "source_url_id",
+            state.id,
+            state.url_watermark,
+        )
+        if deleted_urls is None:
+            return None
+        if state.url_watermark:
+            newest = source.execute(
+                f"SELECT id, url FROM {layout.urls_table} WHERE id <= ? ORDER BY id DESC LIMIT 1",
+                (state.url_watermark,),
+            ).fetchone()
+            if newest is not None:
+                indexed = writer.execute(
+                    "SELECT url FROM index_urls WHERE source_id = ? AND source_url_id = ?",
+                    (state.id, newest[0]),
+                ).fetchone()
+                if indexed is None or indexed[0] != newest[1]:
+                    return None
+        deleted_visits: list[int] | None = []
+        if layout.visits_table:
+            deleted_visits = self._missing_ids(
+                writer,
+                source,
+                layout.visits_table,
+                "index_visits",
+                "source_visit_id",
+                state.id,
+                state.visit_watermark,
+            )
+        if deleted_visits is None:
+            return None
+        return deleted_urls, deleted_visits
+
+    def _missing_ids(
+        self,
+        writer: sqlite3.Connection,
+        source: sqlite3.Connection,
+        source_table: str,
+        index_table: str,
+        id_column: str,
+        source_id: int,
+        watermark: int,
+    ) -> list[int] | None:
+        """Indexed ids at or below the watermark that the source no longer has.
+
+        Returns:
+            Sorted missing ids, or None if the source has ids there the
+            index does not
+        """
+        if not watermark:
+            return []
+        # nosec B608 - tables and columns are module constants or resolved layouts
+        source_count = source.execute(
+            f"SELECT COUNT(*) FROM {source_table} WHERE id <= ?",  # nosec B608
+            (watermark,),
+        ).fetchone()[0]
+        index_query = f"FROM {index_table} WHERE source_id = ? AND {id_column} <= ?"  # nosec B608
+        index_count = writer.execute(
+            f"SELECT COUNT(*) {index_query}", (source_id, watermark)
+        ).fetchone()[0]
+        if source_count == index_count:
+            return []
+        source_ids = {
+            row[0]
+            for row in source.execute(
+                f"SELECT id FROM {source_table} WHERE id <= ?",  # nosec B608
+                (watermark,),
+            )
+        }
+        index_ids = {
+            row[0]
+            for row in writer.execute(f"SELECT {id_column} {index_query}", (source_id, watermark))
+        }
+        if source_ids - index_ids:
+            return None
+        return sorted(index_ids - source_ids)
+
+    def _delete_rows(
+        self,
+        writer: sqlite3.Connection,
+        state: SourceState,
+        url_ids: list[int],
+        visit_ids: list[int],
+    ) -> None:
+        """Remove urls and visits the source has deleted, with their rollups and sessions."""
+        # Visits leave the rollups while their urls still give them a host
+        spans: list[tuple[int, int]] = []
+        for start in range(0, len(visit_ids), LOOKUP_CHUNK_SIZE):
+            chunk = visit_ids[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            remove_rollups(writer, state.id, chunk)
+            spans += remove_session_visits(writer, state.id, chunk, self.session_idle_minutes)
+            writer.execute(
+                "DELETE FROM index_visits WHERE source_id = ? "
+                f"AND source_visit_id IN ({placeholders})",
+                (state.id, *chunk),
+            )
+        for start in range(0, len(url_ids), LOOKUP_CHUNK_SIZE):
+            chunk = url_ids[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            writer.execute(
+                f"DELETE FROM index_urls WHERE source_id = ? AND source_url_id IN ({placeholders})",
+                (state.id, *chunk),
+            )
+        regroup_sessions(writer, state.id, spans, self.session_idle_minutes)
+        self._stats["deleted"] += len(url_ids) + len(visit_ids)
+
+    def _upsert_urls(
+        self, writer: sqlite3.Connection, rows: sqlite3.Cursor, state: SourceState
+    ) -> set[int]:
+        """Insert or update url rows in batches, advancing the url watermarks."""
+        seen: set[int] = set()
+        while batch := rows.fetchmany(self.batch_size):
+            writer.executemany(
+                "INSERT INTO index_urls "
+                "(source_id, source_url_id, url, title, visit_count, last_visit_time, "
+                "host, rev_host, registrable_domain) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source_id, source_url_id) DO UPDATE SET url = excluded.url, "
+                "title = excluded.title, visit_count = excluded.visit_count, "
+                "last_visit_time = excluded.last_visit_time, host = excluded.host, "
+                "rev_host = excluded.rev_host, "
+                "registrable_domain = excluded.registrable_domain",
+                ((state.id, *row[:5], *_host_columns(row[1])) for row in batch),
+            )
+            for row in batch:
+                if self._vocabulary is not None:
+                    self._vocabulary.add_text(row[2], row[1])
+                seen.add(row[0])
+                state.url_watermark = max(state.url_watermark, row[0])
+                if row[5] is not None:
+                    state.time_watermark = max(state.time_watermark, row[5])
+            self._stats["urls"] += len(batch)
+        return seen
+
+    def _ingest_visits(
+        self,
+        writer: sqlite3.Connection,
+        source: sqlite3.Connection,
+        layout: SourceLayout,
+        state: SourceState,
+    ) -> set[int]:
+        """Copy visits beyond the visit watermark; returns the url ids they belong to."""
+        convert = TIMESTAMP_CONVERSIONS[layout.schema]
+        rows = source.execute(
+            f"SELECT v.id, v.{layout.visit_url_column}, "
+            f"{convert.format('v.' + layout.visit_time_column)}, "
+            f"{layout.from_visit}, {layout.transition} "
+            f"FROM {layout.visits_table} v WHERE v.id > ? ORDER BY v.id",
+            (state.visit_watermark,),
+        )
+        touched: set[int] = set()
+        while batch := rows.fetchmany(self.batch_size):
+            writer.executemany(
+                "INSERT OR REPLACE INTO index_visits "
+                "(source_id, source_visit_id, source_url_id, visit_time, from_visit, transition) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((state.id, *row) for row in batch),
+            )
+            touched.update(row[1] for row in batch)
+            state.visit_watermark = max(state.visit_watermark, batch[-1][0])
+            self._stats["visits"] += len(batch)
+        return touched
+
+    @contextmanager
+    def connection(self, browser: str) -> Generator["IndexConnection", None, None]:
+        """Open a read-only connection to a browser's history in the index.
+
+        The index is refreshed first. The connection exposes the browser's
+        rows through temporary ``urls`` and ``visits`` views with Chrome's
+        column names and timestamps.
+
+        Args:
+            browser: Browser name
+
+        Yields:
+            SQLite connection to the index
+
+        Raises:
+            BrowserNotFoundError: If the browser is not recognized
+            BrowserPathNotFoundError: If the history path doesn't exist
+            ConnectionError: If the source database cannot be read
+        """
+        state = self.refresh(browser)
+        conn = sqlite3.connect(
+            f"{Path(self.path).resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            factory=IndexConnection,
+        )
+        cancel_event = get_cancel_event()
+        try:
+            _create_source_views(conn, state.id)
+            conn.source_id = state.id
+            search_tables = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name IN ('index_fts', 'index_trigram')"
+                )
+            }
+            conn.fulltext = FTS5_SUPPORTED and "index_fts" in search_tables
+            conn.substring = TRIGRAM_SUPPORTED and "index_trigram" in search_tables
+            conn.vocabulary = self.vocabulary
+            if cancel_event is not None:
+                conn.set_progress_handler(cancel_event.is_set, CANCEL_CHECK_INSTRUCTIONS)
+            yield conn
+        finally:
+            conn.close()
+
+    def vocabulary(self) -> TermIndex:
+        """Returns the words of all indexed titles and URLs, for fuzzy search.
+
+        Loaded from the full-text index on first use, then kept up to date
+        by ingestion.
+        """
+        with self._lock:
+            if self._vocabulary is None:
+                writer = self._open_writer()
+                vocabulary = TermIndex()
+                if FTS5_SUPPORTED:
+                    writer.execute(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS temp.index_vocab "
+                        "USING fts5vocab(main, index_fts, row)"
+                    )
+                    for (term,) in writer.execute("SELECT term FROM temp.index_vocab"):
+                        vocabulary.add(term)
+                self._vocabulary = vocabulary
+            return self._vocabulary
+
+    def sources(self) -> list[dict[str, Any]]:
+        """Returns the indexed sources with their watermarks and stored totals.
+
+        Reads one row per source on a connection of its own, so it does not
+        wait for an ingest in progress. ``urls`` and ``visits`` are the totals
+        recorded at the source's last ingest.
+        """
+        if not os.path.exists(self.path):
+            return []
+        conn = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT s.id, s.browser, s.path, s.schema, s.url_watermark, s.visit_watermark, "
+                "s.last_ingest, COALESCE(t.total_entries, 0), COALESCE(t.total_visits, 0) "
+                "FROM sources s LEFT JOIN source_stats t ON t.source_id = s.id ORDER BY s.id"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Created, but not yet given its schema by the first writer
+            return []
+        finally:
+            conn.close()
+        keys = (
+            "id",
+            "browser",
+            "path",
+            "schema",
+            "url_watermark",
+            "visit_watermark",
+            "last_ingest",
+            "urls",
+            "visits",
+        )
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Returns ingestion counters and the index size, without waiting for an ingest."""
+        # Copying the dict is atomic, so counters never need the writer lock
+        stats: dict[str, Any] = dict(self._stats)
+        try:
+            stats["size_bytes"] = os.path.getsize(self.path)
+        except OSError:
+            stats["size_bytes"] = 0
+        stats["path"] = self.path
+        return stats
+
+    def close(self) -> None:
+        """Close the writer connection."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._vocabulary = None
+
+
+def _host_columns(url: str | None) -> tuple[str | None, str | None, str | None]:
+    """Returns the (host, rev_host, registrable_domain) columns for a url."""
+    host = url_host(url)
+    if host is None:
+        return None, None, None
+    return host, reverse_host(host), registrable_domain(host)
+
+
+def _create_source_views(conn: sqlite3.Connection, source_id: int) -> None:
+    """Expose one source's rows as Chrome-style ``urls`` and ``visits`` temp views."""
+    source_id = int(source_id)
+    conn.execute(
+        "CREATE TEMP VIEW urls AS SELECT source_url_id AS id, url, title, visit_count, "
+        f"last_visit_time FROM main.index_urls WHERE source_id = {source_id}"
+    )
+    conn.execute(
+        "CREATE TEMP VIEW visits AS SELECT source_visit_id AS id, source_url_id AS url, "
+        "visit_time, from_visit, transition "
+        f"FROM main.index_visits WHERE source_id = {source_id}"
+    )
+
+
+def build_match_expression(query: str) -> str:
+    """Turn a user search string into an FTS5 MATCH expression.
+
+    Every whitespace-separated chunk becomes a phrase of its word tokens, so
+    ``claude-code`` or ``docs.python.org`` match those words next to each
+    other, and FTS5 operators in user input are treated as plain text. A
+    chunk ending in ``*`` is a prefix query on its last token. Chunks are
+    combined with AND.
+
+    Args:
+        query: Search string as typed by the user
+
+    Returns:
+        MATCH expression, or an empty string if the query has no word tokens
+    """
+    phrases = []
+    for chunk in query.split():
+        tokens = re.findall(r"\w+", chunk)
+        if tokens:
+            suffix = " *" if chunk.endswith("*") else ""
+            phrases.append(f'"{" ".join(tokens)}"{suffix}')
+    return " AND ".join(phrases)
+
+
+def search_fulltext(
+    conn: sqlite3.Connection,
+    query: str,
+    limit: int = 20,
+    exclude_domains: list[str] | None = None,
+    sort_by: str = "relevance",
+) -> list[tuple[str, str, str, str | None]]:
+    """Search titles and URLs through the full-text index, ranked by BM25.
+
+    Falls back to the LIKE search of ``search_history_advanced`` (without
+    snippets) if the connection is not an index connection with a
+    full-text table, for example when the index is disabled.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        query: Search string; a trailing ``*`` on a word makes it a prefix query
+        limit: Maximum results
+        exclude_domains: Domains to exclude
+        sort_by: 'relevance', 'date', 'visit_count' or 'title'
+
+    Returns:
+        List of (title, url, timestamp, snippet) tuples; snippets are
+        taken from the title (URLs may hold secrets that sanitizing would
+        otherwise remove) and mark matched terms with ``**``
+    """
+    if not getattr(conn, "fulltext", False):
+        logger.debug("Full-text index unavailable, falling back to LIKE search")
+        like_sort = "date" if sort_by == "relevance" else sort_by
+        rows = search_history_advanced(conn, query, limit, exclude_domains, like_sort)
+        return [(title, url, ts, None) for title, url, ts in rows]
+
+    match = build_match_expression(query)
+    if not match:
+        return []
+
+    conditions = ["index_fts MATCH ?", "u.source_id = ?"]
+    params: list[str | int] = [match, int(getattr(conn, "source_id", 0))]
+    for domain in exclude_domains or []:
+        conditions.append("u.url NOT LIKE ?")
+        params.append(f"%{domain}%")
+
+    order_by = {
+        "relevance": "index_fts.rank",
+        "date": "u.last_visit_time DESC",
+        "visit_count": "u.visit_count DESC",
+        "title": "u.title ASC",
+    }.get(sort_by, "index_fts.rank")
+    start, end = SNIPPET_MARKERS
+    sql = (
+        "SELECT u.title, u.url, u.last_visit_time, "
+        f"snippet(index_fts, 0, '{start}', '{end}', '…', {SNIPPET_TOKENS}) "
+        "FROM main.index_fts JOIN main.index_urls u ON u.id = index_fts.rowid "
+        f"WHERE {' AND '.join(conditions)} ORDER BY {order_by} LIMIT ?"
+    )
+    params.append(limit)
+    return [
+        (title, sanitize_url(url), format_chrome_timestamp(ts), snippet)
+        for title, url, ts, snippet in conn.execute(sql, params)
+    ]
+
+
+def _any_term(terms: list[str]) -> str:
+    """FTS5 expression matching any of the given index terms."""
+    return "(" + " OR ".join(f'"{term}"' for term in sorted(terms)) + ")"
+
+
+def search_fuzzy(
+    conn: sqlite3.Connection, query: str, threshold: float = 0.6, limit: int = 20
+) -> list[tuple[str, str, str, float]]:
+    """Typo-tolerant search over the whole history.
+
+    Each query word is looked up in the vocabulary index, which returns the
+    history words within its edit budget grouped by edit distance. Pages
+    are then fetched from the full-text index one combination of distances
+    at a time, best combined score first, with the closer words of each
+    query word excluded so that every page is found under its best score.
+    Connections without a full-text index use ``search_with_fuzzy``.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        query: Search term, possibly misspelled
+        threshold: Minimum similarity score (0-1)
+        limit: Maximum results
+
+    Returns:
+        List of (title, url, timestamp, score) tuples, best matches first,
+        newest first among equal scores
+    """
+    vocabulary = getattr(conn, "vocabulary", None)
+    if not getattr(conn, "fulltext", False) or vocabulary is None:
+        return search_with_fuzzy(conn, query, threshold, limit)
+
+    terms = fuzzy_terms(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+    words = vocabulary()
+    tiers: list[dict[int, list[str]]] = []
+    for term in terms:
+        by_distance: dict[int, list[str]] = {}
+        for word, distance in words.search(term, max_edits(term, threshold)).items():
+            by_distance.setdefault(distance, []).append(word)
+        if not by_distance:
+            return []
+        tiers.append(by_distance)
+
+    def combined_score(distances: tuple[int, ...]) -> float:
+        return round(sum(map(term_score, terms, distances)) / len(terms), 3)
+
+    combinations = sorted(
+        itertools.product(*(sorted(by_distance) for by_distance in tiers)),
+        key=lambda distances: (-combined_score(distances), distances),
+    )
+    source_id = int(getattr(conn, "source_id", 0))
+    results: list[tuple[str, str, str, float]] = []
+    for distances in combinations:
+        if len(results) >= limit:
+            break
+        parts = []
+        for by_distance, distance in zip(tiers, distances):
+            part = _any_term(by_distance[distance])
+            closer = [word for d, group in by_distance.items() if d < distance for word in group]
+            parts.append(f"({part} NOT {_any_term(closer)})" if closer else part)
+        score = combined_score(distances)
+        rows = conn.execute(
+            "SELECT u.title, u.url, u.last_visit_time "
+            "FROM main.index_fts JOIN main.index_urls u ON u.id = index_fts.rowid "
+            "WHERE index_fts MATCH ? AND +u.source_id = ? "
+            "ORDER BY u.last_visit_time DESC LIMIT ?",
+            (" AND ".join(parts), source_id, limit - len(results)),
+        )
+        results.extend(
+            (title, sanitize_url(url), format_chrome_timestamp(ts), score)
+            for title, url, ts in rows
+        )
+    return results
+
+
+def _has_trigram_run(query: str) -> bool:
+    """True if a LIKE query has a run of literal characters the trigram index can use."""
+    return any(len(run) >= TRIGRAM_LENGTH for run in re.split(r"[%_]", query))
+
+
+def search_substring(
+    conn: sqlite3.Connection, query: str, limit: int = 10
+) -> list[tuple[str, str, str]]:
+    """Substring search with exactly the results of ``query_history``.
+
+    Candidate rows are looked up in the trigram index, then checked with the
+    same ``title LIKE '%query%' OR url LIKE '%query%'`` test, so the result
+    set is identical to a full LIKE scan. Queries without a run of three
+    literal characters, and connections without a trigram index, use
+    ``query_history`` directly.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        query: Search term (supports LIKE wildcards)
+        limit: Maximum results
+
+    Returns:
+        List of (title, url, timestamp) tuples, newest first
+    """
+    if not getattr(conn, "substring", False) or not _has_trigram_run(query):
+        return query_history(conn, query, limit)
+
+    pattern = f"%{query}%"
+    # "+u.source_id" keeps the planner on rowid lookups of the candidates
+    # instead of walking every row of the source in last_visit_time order
+    rows = conn.execute(
+        "SELECT u.title, u.url, u.last_visit_time FROM main.index_urls u "
+        "WHERE u.id IN (SELECT rowid FROM main.index_trigram WHERE title LIKE ? "
+        "UNION SELECT rowid FROM main.index_trigram WHERE url LIKE ?) "
+        "AND +u.source_id = ? AND (u.title LIKE ? OR u.url LIKE ?) "
+        "ORDER BY u.last_visit_time DESC LIMIT ?",
+        (pattern, pattern, int(getattr(conn, "source_id", 0)), pattern, pattern, limit),
+    )
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
+
+
+def search_regex(
+    conn: sqlite3.Connection, pattern: str, limit: int = 20
+) -> list[tuple[str, str, str]]:
+    """Regex search over the whole history with the results of ``search_with_regex``.
+
+    If the pattern contains a literal of three or more characters, only
+    rows the trigram index finds for it are read and matched against the
+    pattern. Otherwise ``search_with_regex`` streams rows newest first.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        pattern: Python regex pattern (case-insensitive)
+        limit: Maximum results
+
+    Returns:
+        List of (title, url, timestamp) tuples, newest first
+
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
+    """
+    literal = regex_literal(pattern)
+    if not getattr(conn, "substring", False) or not literal or len(literal) < TRIGRAM_LENGTH:
+        return search_with_regex(conn, pattern, limit)
+
+    compile_regex(pattern)
+    register_regexp(conn)
+    like = f"%{literal}%"
+    rows = conn.execute(
+        "SELECT u.title, u.url, u.last_visit_time FROM main.index_urls u "
+        "WHERE u.id IN (SELECT rowid FROM main.index_trigram WHERE title LIKE ? "
+        "UNION SELECT rowid FROM main.index_trigram WHERE url LIKE ?) "
+        "AND +u.source_id = ? AND (u.title REGEXP ? OR u.url REGEXP ?) "
+        "ORDER BY u.last_visit_time DESC LIMIT ?",
+        (like, like, int(getattr(conn, "source_id", 0)), pattern, pattern, limit),
+    )
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
+
+
+def _host_range(domain: str) -> tuple[str, str, str, str]:
+    """Returns the ``HOST_MATCH`` parameters for a normalized domain."""
+    reversed_domain = reverse_host(domain)
+    return reversed_domain, reversed_domain + "/", reversed_domain, reversed_domain + "."
+
+
+def count_host_visits(conn: sqlite3.Connection, domain: str) -> int:
+    """Count visits to a domain and its subdomains.
+
+    On an index connection this sums ``visit_count`` over one range of the
+    reversed-host index. Other connections pre-filter with ``url LIKE`` and
+    check each url's host in Python.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        domain: Domain to count (e.g., 'github.com')
+
+    Returns:
+        Number of visits to the domain
+    """
+    domain = normalize_domain(domain)
+    source_id = getattr(conn, "source_id", None)
+    if source_id is None:
+        native = get_native_history(conn)
+        rows: Iterable[tuple[str, int]]
+        if native is not None:
+            rows = ((url, count) for _, url, _, count in native.host_candidates(domain))
+        else:
+            rows = conn.execute(
+                "SELECT url, visit_count FROM urls WHERE url LIKE ?", (f"%{domain}%",)
+            )
+        return sum(count or 0 for url, count in rows if host_matches(url_host(url), domain))
+
+    row = conn.execute(
+        f"SELECT SUM(u.visit_count) FROM main.index_urls u WHERE u.source_id = ? AND {HOST_MATCH}",
+        (int(source_id), *_host_range(domain)),
+    ).fetchone()
+    return int(row[0]) if row and row[0] else 0
+
+
+def search_by_host(
+    conn: sqlite3.Connection,
+    domain: str,
+    query: str | None = None,
+    limit: int = 20,
+    exclude_domains: list[str] | None = None,
+) -> list[tuple[str, str, str]]:
+    """Search history within a domain and its subdomains.
+
+    ``exclude_domains`` removes those domains and their subdomains, so
+    excluding ``gist.github.com`` keeps the rest of ``github.com``.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        domain: Domain to search within (e.g., 'github.com')
+        query: Optional search term within the domain
+        limit: Maximum results
+        exclude_domains: Domains to exclude from results
+
+    Returns:
+        List of (title, url, timestamp) tuples, newest first
+    """
+    domain = normalize_domain(domain)
+    excluded = [normalize_domain(d) for d in exclude_domains or [] if normalize_domain(d)]
+    pattern = f"%{query}%" if query else None
+    source_id = getattr(conn, "source_id", None)
+
+    if source_id is None:
+        native = get_native_history(conn)
+        candidates: Iterable[tuple[str, str, int]]
+        if native is not None:
+            candidates = (row[:3] for row in native.host_candidates(domain, pattern))
+        else:
+            sql = "SELECT title, url, last_visit_time FROM urls WHERE url LIKE ?"
+            params: list[str | int] = [f"%{domain}%"]
+            if pattern:
+                sql += " AND (title LIKE ? OR url LIKE ?)"
+                params.extend([pattern, pattern])
+            candidates = conn.execute(sql + " ORDER BY last_visit_time DESC", params)
+        results = []
+        for title, url, ts in candidates:
+            host = url_host(url)
+            if not host_matches(host, domain) or any(host_matches(host, d) for d in excluded):
+                continue
+            results.append((title, sanitize_url(url), format_chrome_timestamp(ts)))
+            if len(results) >= limit:
+                break
+        return results
+
+    conditions = ["u.source_id = ?", HOST_MATCH]
+    params = [int(source_id), *_host_range(domain)]
+    if pattern:
+        conditions.append("(u.title LIKE ? OR u.url LIKE ?)")
+        params.extend([pattern, pattern])
+    for excluded_domain in excluded:
+        conditions.append(f"NOT {HOST_MATCH}")
+        params.extend(_host_range(excluded_domain))
+    params.append(limit)
+    # "+u.last_visit_time" keeps the planner on the rev_host range rather
+    # than walking the whole source in last_visit_time order
+    # nosec B608 - conditions are built from constant SQL fragments
+    rows = conn.execute(
+        "SELECT u.title, u.url, u.last_visit_time FROM main.index_urls u "  # nosec B608
+        f"WHERE {' AND '.join(conditions)} ORDER BY +u.last_visit_time DESC LIMIT ?",
+        params,
+    )
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
+
+
+def get_top_hosts(
+    conn: sqlite3.Connection, limit: int = 10, group_by: str = "host", since: int | None = None
+) -> list[tuple[str, int]]:
+    """Most visited hosts, or registrable domains, by total visit count.
+
+    On an index connection the totals come from a scan of the source's
+    slice of the host index, or with ``since`` from the visit rollups.
+    Other connections use ``get_top_domains``. Without rollups, ``since``
+    keeps the urls last visited inside the window.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        limit: Maximum number of domains to return
+        group_by: 'host' (``www.bbc.co.uk``) or 'domain' (``bbc.co.uk``)
+        since: Only count visits at or after this Chrome timestamp
+
+    Returns:
+        List of (domain, visit_count) tuples
+    """
+    if since is not None:
+        rolled_up = top_hosts_since(conn, since, limit, group_by)
+        if rolled_up is not None:
+            return rolled_up
+
+    column = DOMAIN_GROUPINGS[group_by]
+    window = "" if since is None else " AND last_visit_time >= ?"
+    window_params = () if since is None else (since,)
+    source_id = getattr(conn, "source_id", None)
+    if source_id is None:
+        native = get_native_history(conn)
+        totals: dict[str, int] = {}
+        if native is not None:
+            for name, count in native.host_totals(since).items():
+                key = name if group_by == "host" else registrable_domain(name)
+                totals[key] = totals.get(key, 0) + count
+            return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        if group_by == "host":
+            return get_top_domains(conn, limit, since)
+        # nosec B608 - window is a constant SQL fragment
+        rows = conn.execute(f"SELECT url, visit_count FROM urls WHERE 1{window}", window_params)  # nosec B608
+        for url, count in rows:
+            host = url_host(url)
+            if host is not None:
+                key = registrable_domain(host)
+                totals[key] = totals.get(key, 0) + (count or 0)
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    # nosec B608 - column comes from DOMAIN_GROUPINGS, window is a constant SQL fragment
+    rows = conn.execute(
+        f"SELECT u.{column}, SUM(u.visit_count) AS total FROM main.index_urls u "  # nosec B608
+        f"WHERE u.source_id = ? AND u.{column} IS NOT NULL{window} "
+        f"GROUP BY u.{column} ORDER BY total DESC LIMIT ?",
+        (int(source_id), *window_params, limit),
+    )
+    return [(name, int(total or 0)) for name, total in rows]
+
+
+_default_index: HistoryIndex | None = None
+_default_index_lock = threading.Lock()
+
+
+def get_history_index() -> HistoryIndex | None:
+    """Returns the process-wide history index, or None if ``[index] enabled`` is false."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            config = apply_env_overrides(load_config())
+            if not config.index.enabled:
+                return None
+            _default_index = HistoryIndex.from_config(config.index)
+            atexit.register(_default_index.close)
+        return _default_index
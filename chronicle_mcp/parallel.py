@@ -0,0 +1,271 @@
+"""Parallel full-history scans for regex and fuzzy matching.
+
+Regex and fuzzy matching are CPU-bound Python work. A scan of the whole
+history is split into rowid ranges, each range is matched in a worker
+process against the same database file (the history index, or a snapshot
+of the browser's database), and every worker returns only its best
+``limit`` rows. The parent merges those partial results with a heap, so
+the result is the same as a serial scan's.
+
+Small histories, connections without a database file (in-memory
+snapshots) and ``[scan] processes = 1`` are scanned serially, since
+starting the work in other processes would cost more than it saves.
+Snapshots of Firefox and Safari databases are scanned serially too.
+"""
+
+import atexit
+import heapq
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import NamedTuple
+
+from chronicle_mcp.config import ScanConfig, apply_env_overrides, load_config
+from chronicle_mcp.database import (
+    compile_regex,
+    format_chrome_timestamp,
+    regex_literal,
+    register_regexp,
+    sanitize_url,
+    search_with_fuzzy,
+    search_with_regex,
+)
+from chronicle_mcp.fuzzy import FuzzyMatcher
+from chronicle_mcp.schemas import get_native_history
+
+logger = logging.getLogger(__name__)
+
+
+class ScanChunk(NamedTuple):
+    """One rowid range of a parallel scan, as sent to a worker process."""
+
+    path: str
+    source_id: int | None
+    first_id: int
+    last_id: int
+    mode: str
+    query: str
+    threshold: float
+    limit: int
+
+
+# (score, last_visit_time, id, title, url); regex matches all score 1.0
+ScanMatch = tuple[float, int, int, str, str]
+
+
+def _chunk_rows(chunk: ScanChunk) -> sqlite3.Cursor:
+    """Opens the chunk's database read-only and selects its rows."""
+    conn = sqlite3.connect(f"{Path(chunk.path).as_uri()}?mode=ro", uri=True)
+    if chunk.source_id is None:
+        id_column = "id"
+        select = "SELECT id, title, url, last_visit_time FROM urls WHERE id BETWEEN ? AND ?"
+        params: tuple[int | str, ...] = (chunk.first_id, chunk.last_id)
+    else:
+        # Index rows are identified by their id in the browser, like the urls view
+        id_column = "source_url_id"
+        select = (
+            "SELECT source_url_id, title, url, last_visit_time FROM index_urls "
+            "WHERE id BETWEEN ? AND ? AND source_id = ?"
+        )
+        params = (chunk.first_id, chunk.last_id, chunk.source_id)
+    if chunk.mode == "regex":
+        register_regexp(conn)
+        literal = regex_literal(chunk.query)
+        if literal:
+            select += " AND (title LIKE ? OR url LIKE ?)"
+            params = (*params, f"%{literal}%", f"%{literal}%")
+        select += " AND (title REGEXP ? OR url REGEXP ?)"
+        return conn.execute(
+            f"{select} ORDER BY last_visit_time DESC, {id_column} DESC LIMIT ?",
+            (*params, chunk.query, chunk.query, chunk.limit),
+        )
+    return conn.execute(select, params)
+
+
+def scan_chunk(chunk: ScanChunk) -> list[ScanMatch]:
+    """Matches one rowid range and returns its best ``chunk.limit`` rows.
+
+    Runs in a worker process.
+    """
+    rows = _chunk_rows(chunk)
+    try:
+        if chunk.mode == "regex":
+            return [(1.0, ts or 0, row_id, title, url) for row_id, title, url, ts in rows]
+
+        matcher = FuzzyMatcher(chunk.query, chunk.threshold)
+        best: list[ScanMatch] = []
+        for row_id, title, url, ts in rows:
+            score = matcher.score(title, url)
+            if score is not None:
+                heapq.heappush(best, (score, ts or 0, row_id, title, url))
+                if len(best) > chunk.limit:
+                    heapq.heappop(best)
+        return best
+    finally:
+        rows.connection.close()
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def scan_processes(config: ScanConfig) -> int:
+    """Number of worker processes for a scan config (0 means one per CPU)."""
+    return config.processes if config.processes > 0 else os.cpu_count() or 1
+
+
+def get_scan_pool(config: ScanConfig) -> ProcessPoolExecutor:
+    """Returns the process pool for parallel scans, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the server process has threads
+            _pool = ProcessPoolExecutor(
+                max_workers=scan_processes(config),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(shutdown_scan_pool)
+        return _pool
+
+
+def shutdown_scan_pool() -> None:
+    """Shut down the scan process pool, dropping scans that have not started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _database_file(conn: sqlite3.Connection) -> str | None:
+    """Path of the connection's main database, or None if it is in memory."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path or None
+    return None
+
+
+def _plan_chunks(
+    conn: sqlite3.Connection,
+    mode: str,
+    query: str,
+    threshold: float,
+    limit: int,
+    config: ScanConfig,
+) -> list[ScanChunk] | None:
+    """Splits the connection's history into rowid ranges, or None to scan serially."""
+    path = _database_file(conn)
+    processes = scan_processes(config)
+    if path is None or processes < 2:
+        return None
+
+    source_id = getattr(conn, "source_id", None)
+    if source_id is None and get_native_history(conn) is not None:
+        # Workers read Chrome's urls table; other schemas are scanned in place
+        return None
+    if source_id is None:
+        rows, first, last = conn.execute("SELECT COUNT(*), MIN(id), MAX(id) FROM urls").fetchone()
+    else:
+        source_id = int(source_id)
+        rows, first, last = conn.execute(
+            "SELECT COUNT(*), MIN(id), MAX(id) FROM main.index_urls WHERE source_id = ?",
+            (source_id,),
+        ).fetchone()
+    if rows < max(config.min_rows, 1):
+        return None
+
+    count = max(processes, -(-rows // max(config.chunk_rows, 1)))
+    span = -(-(last - first + 1) // count)
+    return [
+        ScanChunk(
+            path, source_id, start, min(start + span - 1, last), mode, query, threshold, limit
+        )
+        for start in range(first, last + 1, span)
+    ]
+
+
+def _scan(
+    conn: sqlite3.Connection,
+    mode: str,
+    query: str,
+    threshold: float,
+    limit: int,
+    config: ScanConfig | None,
+) -> list[ScanMatch] | None:
+    """Runs a parallel scan and merges its chunks, or returns None to scan serially."""
+    if config is None:
+        config = apply_env_overrides(load_config()).scan
+    chunks = _plan_chunks(conn, mode, query, threshold, limit, config)
+    if chunks is None:
+        return None
+    try:
+        partials = list(get_scan_pool(config).map(scan_chunk, chunks))
+    except BrokenProcessPool:
+        logger.warning("Scan process pool failed; scanning serially")
+        shutdown_scan_pool()
+        return None
+    return heapq.nlargest(limit, (match for partial in partials for match in partial))
+
+
+def search_regex_parallel(
+    conn: sqlite3.Connection, pattern: str, limit: int = 20, config: ScanConfig | None = None
+) -> list[tuple[str, str, str]]:
+    """Regex search over the whole history, scanned across worker processes.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+        pattern: Python regex pattern (case-insensitive)
+        limit: Maximum results
+        config: Scan settings; read from the config file if omitted
+
+    Returns:
+        List of (title, url, timestamp) tuples, newest first
+
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
+    """
+    compile_regex(pattern)
+    matches = _scan(conn, "regex", pattern, 1.0, limit, config)
+    if matches is None:
+        return search_with_regex(conn, pattern, limit)
+    return [
+        (title, sanitize_url(url), format_chrome_timestamp(ts)) for _, ts, _, title, url in matches
+    ]
+
+
+def search_fuzzy_parallel(
+    conn: sqlite3.Connection,
+    query: str,
+    threshold: float = 0.6,
+    limit: int = 20,
+    config: ScanConfig | None = None,
+) -> list[tuple[str, str, str, float]]:
+    """Fuzzy search over the whole history, scanned across worker processes.
+
+    Returns the same rows, in the same order, as ``search_with_fuzzy``.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+        query: Search term, possibly misspelled
+        threshold: Minimum similarity score (0-1)
+        limit: Maximum results
+        config: Scan settings; read from the config file if omitted
+
+    Returns:
+        List of (title, url, timestamp, score) tuples, best matches first,
+        newest first among equal scores
+    """
+    if not FuzzyMatcher(query, threshold).terms:
+        return []
+    matches = _scan(conn, "fuzzy", query, threshold, limit, config)
+    if matches is None:
+        return search_with_fuzzy(conn, query, threshold, limit)
+    return [
+        (title, sanitize_url(url), format_chrome_timestamp(ts), score)
+        for score, ts, _, title, url in matches
+    ]
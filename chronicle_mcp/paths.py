@@ -1,6 +1,23 @@
+import configparser
 import glob
+import json
+import logging
 import os
 import platform
+import threading
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Separates a browser from a profile in a browser argument ("chrome:Profile 1")
+PROFILE_SEPARATOR = ":"
+
+# Profile name selecting every profile of a browser ("chrome:*")
+ALL_PROFILES = "*"
+
+# Seconds a profile discovery result is reused while the profile list is unchanged
+PROFILE_CACHE_SECONDS = 30.0
 
 BROWSER_PATHS: dict[str, dict[str, str]] = {
     "chrome": {
@@ -48,6 +65,36 @@ BROWSER_SCHEMAS: dict[str, str] = {
     "safari": "safari",
 }
 
+# Directories listing a browser's profiles: the Chromium user data directory
+# (with a "Local State" file) or the Firefox directory with profiles.ini
+PROFILE_ROOTS: dict[str, dict[str, str]] = {
+    "chrome": {
+        "Windows": r"%LocalAppData%\Google\Chrome\User Data",
+        "Darwin": "~/Library/Application Support/Google/Chrome",
+        "Linux": "~/.config/google-chrome",
+    },
+    "edge": {
+        "Windows": r"%LocalAppData%\Microsoft\Edge\User Data",
+        "Darwin": "~/Library/Application Support/Microsoft Edge",
+        "Linux": "~/.config/microsoft-edge",
+    },
+    "brave": {
+        "Windows": r"%LocalAppData%\BraveSoftware\Brave-Browser\User Data",
+        "Darwin": "~/Library/Application Support/BraveSoftware/Brave-Browser",
+        "Linux": "~/.config/BraveSoftware/Brave-Browser",
+    },
+    "vivaldi": {
+        "Windows": r"%LocalAppData%\Vivaldi\User Data",
+        "Darwin": "~/Library/Application Support/Vivaldi",
+        "Linux": "~/.config/vivaldi",
+    },
+    "firefox": {
+        "Windows": r"%AppData%\Mozilla\Firefox",
+        "Darwin": "~/Library/Application Support/Firefox",
+        "Linux": "~/.mozilla/firefox",
+    },
+}
+
 BOOKMARK_PATHS: dict[str, dict[str, str]] = {
     "chrome": {
         "Windows": r"%LocalAppData%\Google\Chrome\User Data\Default\Bookmarks",
@@ -131,7 +178,22 @@ def get_browser_schema(browser: str) -> str:
     Returns:
         Schema type: 'chrome', 'firefox', or 'safari'
     """
-    return BROWSER_SCHEMAS.get(browser.lower(), "chrome")
+    return BROWSER_SCHEMAS.get(split_browser(browser)[0], "chrome")
+
+
+def split_browser(browser: str) -> tuple[str, str | None]:
+    """
+    Splits a browser argument into the browser and an optional profile.
+
+    Args:
+        browser: Browser name, optionally followed by ':' and a profile
+            directory or display name (e.g. 'chrome:Profile 1', 'firefox:*')
+
+    Returns:
+        Tuple of (lowercase browser name, profile or None)
+    """
+    name, separator, profile = browser.partition(PROFILE_SEPARATOR)
+    return name.strip().lower(), (profile.strip() or None) if separator else None
 
 
 def get_os_name() -> str:
@@ -155,12 +217,16 @@ def get_browser_path(browser: str) -> str | None:
     Gets the history database path for the specified browser.
 
     Args:
-        browser: Browser name (chrome, edge, firefox) - case insensitive
+        browser: Browser name (chrome, edge, firefox) - case insensitive,
+            optionally with a profile ('chrome:Profile 1'); without one, the
+            default profile is used
 
     Returns:
         Path to history database or None if not found
     """
-    browser_lower = browser.lower()
+    browser_lower, profile = split_browser(browser)
+    if profile is not None:
+        return _find_profile_path(browser_lower, profile)
 
     if browser_lower not in BROWSER_PATHS:
         return None
@@ -172,10 +238,193 @@ def get_browser_path(browser: str) -> str | None:
         return None
 
     if "*" in path_pattern:
-        return find_glob_path(path_pattern)
+        # Several profiles can match the pattern; profiles.ini names the default
+        marked = [p for p in _read_profiles(browser_lower) if p.default]
+        found = marked[0].path if marked else find_glob_path(path_pattern)
     else:
         expanded = expand_path(path_pattern)
-        return expanded if os.path.exists(expanded) else None
+        found = expanded if os.path.exists(expanded) else None
+    if found is None:
+        # e.g. Firefox profiles named *.default-release rather than *.default
+        profiles = _read_profiles(browser_lower)
+        defaults = [p for p in profiles if p.default] or profiles
+        found = defaults[0].path if defaults else None
+    return found
+
+
+class BrowserProfile(NamedTuple):
+    """A browser profile with a history database."""
+
+    browser: str
+    directory: str
+    name: str
+    path: str
+    default: bool
+
+    @property
+    def target(self) -> str:
+        """Browser argument selecting this profile: the browser alone for the default."""
+        if self.default:
+            return self.browser
+        return f"{self.browser}{PROFILE_SEPARATOR}{self.directory}"
+
+
+_profile_cache: dict[str, tuple[float, int | None, list[BrowserProfile]]] = {}
+_profile_cache_lock = threading.Lock()
+
+
+def _chromium_profiles(browser: str, root: str) -> list[BrowserProfile]:
+    """Profiles listed in a Chromium user data directory's Local State file."""
+    directories: dict[str, str] = {}
+    try:
+        with open(os.path.join(root, "Local State"), encoding="utf-8") as f:
+            info_cache = json.load(f).get("profile", {}).get("info_cache", {})
+        directories = {
+            directory: str(info.get("name") or directory)
+            for directory, info in info_cache.items()
+            if isinstance(info, dict)
+        }
+    except (OSError, ValueError, AttributeError) as e:
+        logger.debug(f"Could not read {browser} Local State: {e}")
+    if not directories:
+        # No usable Local State: look for the usual profile directories
+        for path in glob.glob(os.path.join(root, "Profile *")) + [os.path.join(root, "Default")]:
+            directories[os.path.basename(path)] = os.path.basename(path)
+
+    profiles = [
+        BrowserProfile(browser, directory, name, path, directory == "Default")
+        for directory, name in directories.items()
+        if os.path.isfile(path := os.path.join(root, directory, "History"))
+    ]
+    return sorted(profiles, key=lambda p: (not p.default, p.directory))
+
+
+def _firefox_profiles(browser: str, root: str) -> list[BrowserProfile]:
+    """Profiles listed in a Firefox profiles.ini file."""
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(os.path.join(root, "profiles.ini"), encoding="utf-8")
+    except configparser.Error as e:
+        logger.debug(f"Could not read {browser} profiles.ini: {e}")
+        return []
+
+    # Firefox 67+ records the profile each installation uses in [Install*]
+    installed = {
+        parser[section].get("Default")
+        for section in parser.sections()
+        if section.startswith("Install")
+    }
+    profiles = []
+    for section in parser.sections():
+        if not section.startswith("Profile") or "Path" not in parser[section]:
+            continue
+        entry = parser[section]
+        relative = entry.get("Path", "")
+        path = relative if entry.get("IsRelative", "1") == "0" else os.path.join(root, relative)
+        history = os.path.join(path, "places.sqlite")
+        if not os.path.isfile(history):
+            continue
+        default = relative in installed if installed - {None} else entry.get("Default") == "1"
+        profiles.append(
+            BrowserProfile(
+                browser,
+                os.path.basename(os.path.normpath(relative)),
+                entry.get("Name", relative),
+                history,
+                default,
+            )
+        )
+    return sorted(profiles, key=lambda p: (not p.default, p.directory))
+
+
+def _read_profiles(browser: str) -> list[BrowserProfile]:
+    """Profiles found under a browser's profile root, cached while it is unchanged.
+
+    A cached result is reused for ``PROFILE_CACHE_SECONDS`` unless the
+    Local State or profiles.ini file has been modified since.
+    """
+    pattern = PROFILE_ROOTS.get(browser, {}).get(get_os_name())
+    if not pattern:
+        return []
+    root = expand_path(pattern)
+    listing = os.path.join(root, "profiles.ini" if browser == "firefox" else "Local State")
+    try:
+        stamp: int | None = os.stat(listing).st_mtime_ns
+    except OSError:
+        stamp = None
+
+    now = time.monotonic()
+    with _profile_cache_lock:
+        cached = _profile_cache.get(root)
+        if cached is not None and cached[1] == stamp and now - cached[0] < PROFILE_CACHE_SECONDS:
+            return cached[2]
+
+    if not os.path.isdir(root):
+        profiles: list[BrowserProfile] = []
+    elif browser == "firefox":
+        profiles = _firefox_profiles(browser, root)
+    else:
+        profiles = _chromium_profiles(browser, root)
+    with _profile_cache_lock:
+        _profile_cache[root] = (now, stamp, profiles)
+    return profiles
+
+
+def clear_profile_cache() -> None:
+    """Forget cached profile discovery results."""
+    with _profile_cache_lock:
+        _profile_cache.clear()
+
+
+def _find_profile_path(browser: str, profile: str) -> str | None:
+    """History path of a browser's profile, by directory or display name."""
+    wanted = profile.casefold()
+    for candidate in discover_profiles(browser):
+        if wanted in (candidate.directory.casefold(), candidate.name.casefold()):
+            return candidate.path
+    return None
+
+
+def discover_profiles(browser: str) -> list[BrowserProfile]:
+    """
+    Finds every profile of a browser that has a history database.
+
+    Chromium profiles are read from the "Local State" file of the user data
+    directory and Firefox profiles from profiles.ini. Browsers without
+    profiles have a single default one.
+
+    Args:
+        browser: Browser name - case insensitive
+
+    Returns:
+        Profiles with the default profile first
+    """
+    browser_lower = split_browser(browser)[0]
+    profiles = _read_profiles(browser_lower)
+    default_path = get_browser_path(browser_lower)
+    if default_path is None:
+        return profiles
+    if not any(p.path == default_path for p in profiles):
+        default = BrowserProfile(browser_lower, "Default", "Default", default_path, True)
+        return [default, *(p._replace(default=False) for p in profiles)]
+    return sorted(
+        (p._replace(default=p.path == default_path) for p in profiles),
+        key=lambda p: (not p.default, p.directory),
+    )
+
+
+def get_profile_targets(browser: str) -> list[str]:
+    """
+    Browser arguments selecting each profile of a browser.
+
+    Args:
+        browser: Browser name - case insensitive
+
+    Returns:
+        The browser name for the default profile and 'browser:directory'
+        for every other profile
+    """
+    return [profile.target for profile in discover_profiles(browser)]
 
 
 def get_available_browsers() -> list[str]:
@@ -2,13 +2,17 @@
 
 This module provides HTTP endpoints using Starlette.
 All business logic is delegated to the HistoryService in the core layer.
+Blocking service calls run on a worker pool through AsyncHistoryService and
+are cancelled when the client disconnects.
 """
 
+import asyncio
 import contextlib
 import logging
 import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
@@ -19,6 +23,7 @@ from starlette.routing import Route
 
 from chronicle_mcp.config import get_version, setup_logging
 from chronicle_mcp.core import (
+    AsyncHistoryService,
     BrowserNotFoundError,
     DatabaseError,
     DatabaseLockedError,
@@ -37,6 +42,15 @@ REQUEST_COUNT = 0
 REQUEST_LATENCY_TOTAL = 0.0
 START_TIME = time.time()
 
+# How often a running service call checks whether the client went away
+DISCONNECT_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client disconnects before a service call completes."""
+
 
 def error_response(message: str, status_code: int = 400) -> JSONResponse:
     """Create a standardized error response."""
@@ -52,7 +66,10 @@ def handle_service_error_http(error: Exception) -> JSONResponse:
     Returns:
         JSONResponse with appropriate status code
     """
-    if isinstance(error, ValidationError):
+    if isinstance(error, ClientDisconnected):
+        # Nobody is listening; 499 is the conventional "client closed request" code
+        return error_response("Client closed request", 499)
+    elif isinstance(error, ValidationError):
         return error_response(error.message, 400)
     elif isinstance(error, BrowserNotFoundError):
         return error_response(error.message, 404)
@@ -69,6 +86,37 @@ def handle_service_error_http(error: Exception) -> JSONResponse:
         return error_response("An unexpected error occurred", 500)
 
 
+async def call_service(
+    request: Request, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+) -> T:
+    """Await an AsyncHistoryService call, cancelling it if the client disconnects.
+
+    Args:
+        request: Incoming request
+        func: AsyncHistoryService method
+        *args: Positional arguments for ``func``
+        **kwargs: Keyword arguments for ``func``
+
+    Returns:
+        Result of the service call
+
+    Raises:
+        ClientDisconnected: If the client disconnected first
+    """
+    task = asyncio.ensure_future(func(*args, **kwargs))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {request.url.path}")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 async def health_check(request: Request) -> JSONResponse:
     """Health check endpoint."""
     return JSONResponse(
@@ -106,12 +154,26 @@ async def ready_check(request: Request) -> JSONResponse:
         )
 
 
+async def service_stats() -> tuple[dict[str, Any], ...]:
+    """Snapshot, connection pool, index and cache statistics, read off the event loop."""
+    return tuple(
+        await asyncio.gather(
+            AsyncHistoryService.get_snapshot_stats(),
+            AsyncHistoryService.get_connection_pool_stats(),
+            AsyncHistoryService.get_index_stats(),
+            AsyncHistoryService.get_cache_stats(),
+        )
+    )
+
+
 async def metrics_check(request: Request) -> JSONResponse:
     """Basic metrics endpoint."""
     global REQUEST_COUNT, REQUEST_LATENCY_TOTAL, START_TIME
 
     uptime = time.time() - START_TIME
     avg_latency = REQUEST_LATENCY_TOTAL / REQUEST_COUNT if REQUEST_COUNT > 0 else 0
+    browsers = await AsyncHistoryService.list_available_browsers()
+    snapshot_stats, pool_stats, index_stats, cache_stats = await service_stats()
 
     return JSONResponse(
         {
@@ -119,7 +181,11 @@ async def metrics_check(request: Request) -> JSONResponse:
             "requests_total": REQUEST_COUNT,
             "requests_per_second": REQUEST_COUNT / uptime if uptime > 0 else 0,
             "average_latency_seconds": avg_latency,
-            "browsers_available": len(HistoryService.list_available_browsers()["browsers"]),
+            "browsers_available": len(browsers["browsers"]),
+            "snapshots": snapshot_stats,
+            "connection_pool": pool_stats,
+            "index": index_stats,
+            "cache": cache_stats,
         }
     )
 
@@ -132,10 +198,16 @@ async def prometheus_metrics(request: Request) -> Response:
     avg_latency = REQUEST_LATENCY_TOTAL / REQUEST_COUNT if REQUEST_COUNT > 0 else 0
 
     try:
-        browsers_count = len(HistoryService.list_available_browsers()["browsers"])
+        browsers_count = len((await AsyncHistoryService.list_available_browsers())["browsers"])
     except Exception:
         browsers_count = 0
 
+    snapshot_stats, pool_stats, index_stats, cache_stats = await service_stats()
+    copy_method_lines = "\n".join(
+        f'chronicle_snapshot_copies_total{{method="{method}"}} {count}'
+        for method, count in sorted(snapshot_stats["copy_methods_used"].items())
+    )
+
     metrics = f"""# HELP chronicle_uptime_seconds Server uptime in seconds
 # TYPE chronicle_uptime_seconds gauge
 chronicle_uptime_seconds {uptime}
@@ -155,6 +227,49 @@ chronicle_average_latency_seconds {avg_latency}
 # HELP chronicle_browsers_available Number of available browsers
 # TYPE chronicle_browsers_available gauge
 chronicle_browsers_available {browsers_count}
+
+# HELP chronicle_snapshot_refreshes_total Number of history snapshots taken or refreshed
+# TYPE chronicle_snapshot_refreshes_total counter
+chronicle_snapshot_refreshes_total {snapshot_stats["refreshes"]}
+
+# HELP chronicle_snapshot_copies_total Full snapshot copies by file copy method
+# TYPE chronicle_snapshot_copies_total counter
+{copy_method_lines}
+
+# HELP chronicle_pool_connections Pooled read-only connections by state
+# TYPE chronicle_pool_connections gauge
+chronicle_pool_connections{{state="idle"}} {pool_stats.get("idle", 0)}
+chronicle_pool_connections{{state="in_use"}} {pool_stats.get("in_use", 0)}
+
+# HELP chronicle_pool_checkouts_total Connection pool checkouts
+# TYPE chronicle_pool_checkouts_total counter
+chronicle_pool_checkouts_total {pool_stats.get("checkouts", 0)}
+
+# HELP chronicle_pool_wait_seconds_total Time spent waiting for a pooled connection
+# TYPE chronicle_pool_wait_seconds_total counter
+chronicle_pool_wait_seconds_total {pool_stats.get("wait_seconds_total", 0.0)}
+
+# HELP chronicle_index_refreshes_total Incremental ingests into the local history index
+# TYPE chronicle_index_refreshes_total counter
+chronicle_index_refreshes_total {index_stats.get("refreshes", 0)}
+
+# HELP chronicle_index_rows_ingested_total Rows copied into the local history index
+# TYPE chronicle_index_rows_ingested_total counter
+chronicle_index_rows_ingested_total{{table="urls"}} {index_stats.get("urls", 0)}
+chronicle_index_rows_ingested_total{{table="visits"}} {index_stats.get("visits", 0)}
+
+# HELP chronicle_cache_lookups_total Query result cache lookups
+# TYPE chronicle_cache_lookups_total counter
+chronicle_cache_lookups_total{{result="hit"}} {cache_stats.get("hits", 0)}
+chronicle_cache_lookups_total{{result="miss"}} {cache_stats.get("misses", 0)}
+
+# HELP chronicle_cache_evictions_total Cached results evicted to make room
+# TYPE chronicle_cache_evictions_total counter
+chronicle_cache_evictions_total {cache_stats.get("evictions", 0)}
+
+# HELP chronicle_cache_bytes Estimated size of cached results
+# TYPE chronicle_cache_bytes gauge
+chronicle_cache_bytes {cache_stats.get("bytes", 0)}
 """
     return Response(content=metrics, media_type="text/plain")
 
@@ -162,7 +277,7 @@ chronicle_browsers_available {browsers_count}
 async def list_browsers_endpoint(request: Request) -> JSONResponse:
     """List available browsers endpoint."""
     try:
-        result = HistoryService.list_available_browsers()
+        result = await call_service(request, AsyncHistoryService.list_available_browsers)
         return JSONResponse({"browsers": result["browsers"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -172,15 +287,24 @@ async def search_endpoint(request: Request) -> JSONResponse:
     """Search history endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.search_history(
+        result = await call_service(
+            request,
+            AsyncHistoryService.search_history,
             query=data.get("query", ""),
             limit=data.get("limit", 5),
             browser=data.get("browser", default_browser),
             format_type=data.get("format", "markdown"),
+            search_mode=data.get("search_mode", "like"),
         )
 
         if data.get("format") == "json":
-            return JSONResponse({"results": result["results"], "count": result["count"]})
+            response = {"results": result["results"], "count": result["count"]}
+            if "snippets" in result:
+                response["snippets"] = result["snippets"]
+            if "sources" in result:
+                response["sources"] = result["sources"]
+                response["failed"] = result["failed"]
+            return JSONResponse(response)
         return JSONResponse({"results": result["message"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -190,7 +314,9 @@ async def recent_endpoint(request: Request) -> JSONResponse:
     """Recent history endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.get_recent_history(
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_recent_history,
             hours=data.get("hours", 24),
             limit=data.get("limit", 20),
             browser=data.get("browser", default_browser),
@@ -198,7 +324,11 @@ async def recent_endpoint(request: Request) -> JSONResponse:
         )
 
         if data.get("format") == "json":
-            return JSONResponse({"results": result["results"], "count": result["count"]})
+            response = {"results": result["results"], "count": result["count"]}
+            if "sources" in result:
+                response["sources"] = result["sources"]
+                response["failed"] = result["failed"]
+            return JSONResponse(response)
         return JSONResponse({"results": result["message"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -208,8 +338,11 @@ async def count_endpoint(request: Request) -> JSONResponse:
     """Count visits endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.count_visits(
-            domain=data.get("domain", ""), browser=data.get("browser", default_browser)
+        result = await call_service(
+            request,
+            AsyncHistoryService.count_visits,
+            domain=data.get("domain", ""),
+            browser=data.get("browser", default_browser),
         )
         return JSONResponse(
             {"domain": result["domain"], "browser": result["browser"], "count": result["count"]}
@@ -222,10 +355,14 @@ async def top_domains_endpoint(request: Request) -> JSONResponse:
     """Top domains endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.list_top_domains(
+        result = await call_service(
+            request,
+            AsyncHistoryService.list_top_domains,
             limit=data.get("limit", 10),
             browser=data.get("browser", default_browser),
             format_type="json",  # Always return structured data
+            group_by=data.get("group_by", "host"),
+            days=data.get("days"),
         )
         return JSONResponse({"domains": [{"domain": d, "visits": v} for d, v in result["domains"]]})
     except Exception as e:
@@ -236,7 +373,9 @@ async def search_date_endpoint(request: Request) -> JSONResponse:
     """Search by date endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.search_history_by_date(
+        result = await call_service(
+            request,
+            AsyncHistoryService.search_history_by_date,
             query=data.get("query", ""),
             start_date=data.get("start_date", ""),
             end_date=data.get("end_date", ""),
@@ -256,7 +395,9 @@ async def delete_endpoint(request: Request) -> JSONResponse:
     """Delete history endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.delete_history(
+        result = await call_service(
+            request,
+            AsyncHistoryService.delete_history,
             query=data.get("query", ""),
             limit=data.get("limit", 100),
             browser=data.get("browser", default_browser),
@@ -288,7 +429,9 @@ async def domain_search_endpoint(request: Request) -> JSONResponse:
     """Search by domain endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.search_by_domain(
+        result = await call_service(
+            request,
+            AsyncHistoryService.search_by_domain,
             domain=data.get("domain", ""),
             query=data.get("query"),
             limit=data.get("limit", 20),
@@ -298,16 +441,16 @@ async def domain_search_endpoint(request: Request) -> JSONResponse:
         )
 
         if data.get("format") == "json":
-            return JSONResponse(
-                {
-                    "domain": result["domain"],
-                    "results": [
-                        {"title": title, "url": url, "timestamp": ts}
-                        for title, url, ts in result["results"]
-                    ],
-                    "count": result["count"],
-                }
-            )
+            items = [
+                {"title": title, "url": url, "timestamp": ts}
+                for title, url, ts in result["results"]
+            ]
+            response = {"domain": result["domain"], "results": items, "count": result["count"]}
+            if "sources" in result:
+                for item, source in zip(items, result["sources"]):
+                    item["browser"] = source
+                response["failed"] = result["failed"]
+            return JSONResponse(response)
         return JSONResponse({"results": result["message"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -317,7 +460,12 @@ async def browser_stats_endpoint(request: Request) -> JSONResponse:
     """Browser stats endpoint."""
     try:
         data = await request.json() if await request.body() else {}
-        result = HistoryService.get_browser_stats(browser=data.get("browser", default_browser))
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_browser_stats,
+            browser=data.get("browser", default_browser),
+            days=data.get("days"),
+        )
         return JSONResponse(result["stats"])
     except Exception as e:
         return handle_service_error_http(e)
@@ -327,10 +475,13 @@ async def most_visited_endpoint(request: Request) -> JSONResponse:
     """Most visited pages endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.get_most_visited_pages(
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_most_visited_pages,
             limit=data.get("limit", 20),
             browser=data.get("browser", default_browser),
             format_type="json",  # Always return structured data
+            days=data.get("days"),
         )
         return JSONResponse(
             {
@@ -344,11 +495,73 @@ async def most_visited_endpoint(request: Request) -> JSONResponse:
         return handle_service_error_http(e)
 
 
+async def timeline_endpoint(request: Request) -> JSONResponse:
+    """Visit timeline endpoint."""
+    try:
+        data = await request.json()
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_visit_timeline,
+            start=data.get("start", ""),
+            end=data.get("end", ""),
+            query=data.get("query"),
+            limit=data.get("limit", 100),
+            browser=data.get("browser", default_browser),
+            format_type="json",  # Always return structured data
+        )
+        visits = [
+            {"title": title, "url": url, "timestamp": ts} for title, url, ts in result["results"]
+        ]
+        response: dict[str, Any] = {"visits": visits, "count": result["count"]}
+        if "sources" in result:
+            for visit, source in zip(visits, result["sources"]):
+                visit["browser"] = source
+            response["failed"] = result["failed"]
+        return JSONResponse(response)
+    except Exception as e:
+        return handle_service_error_http(e)
+
+
+async def histogram_endpoint(request: Request) -> JSONResponse:
+    """Visit histogram endpoint."""
+    try:
+        data = await request.json()
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_visit_histogram,
+            browser=data.get("browser", default_browser),
+            days=data.get("days"),
+            format_type="json",  # Always return structured data
+        )
+        return JSONResponse({**result["histogram"], "days": result["days"]})
+    except Exception as e:
+        return handle_service_error_http(e)
+
+
+async def sessions_endpoint(request: Request) -> JSONResponse:
+    """Browsing sessions endpoint."""
+    try:
+        data = await request.json()
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_browsing_sessions,
+            browser=data.get("browser", default_browser),
+            days=data.get("days"),
+            limit=data.get("limit", 20),
+            format_type="json",  # Always return structured data
+        )
+        return JSONResponse({"sessions": result["sessions"], "count": result["count"]})
+    except Exception as e:
+        return handle_service_error_http(e)
+
+
 async def export_endpoint(request: Request) -> Response:
     """Export history endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.export_history(
+        result = await call_service(
+            request,
+            AsyncHistoryService.export_history,
             format_type=data.get("format_type", "csv"),
             limit=data.get("limit", 1000),
             query=data.get("query"),
@@ -366,7 +579,9 @@ async def advanced_search_endpoint(request: Request) -> JSONResponse:
     """Advanced search endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.search_history_advanced(
+        result = await call_service(
+            request,
+            AsyncHistoryService.search_history_advanced,
             query=data.get("query", ""),
             limit=data.get("limit", 20),
             browser=data.get("browser", default_browser),
@@ -376,20 +591,32 @@ async def advanced_search_endpoint(request: Request) -> JSONResponse:
             use_regex=data.get("use_regex", False),
             use_fuzzy=data.get("use_fuzzy", False),
             fuzzy_threshold=data.get("fuzzy_threshold", 0.6),
+            search_mode=data.get("search_mode", "like"),
+            parallel=data.get("parallel", False),
         )
 
         if data.get("format") == "json":
-            return JSONResponse(
-                {
-                    "query": result["query"],
-                    "results": [
-                        {"title": title, "url": url, "timestamp": ts}
-                        for title, url, ts in result["results"]
-                    ],
-                    "count": result["count"],
-                    "options": result["options"],
-                }
-            )
+            items = [
+                {"title": title, "url": url, "timestamp": ts}
+                for title, url, ts in result["results"]
+            ]
+            if "snippets" in result:
+                for item, snippet in zip(items, result["snippets"]):
+                    item["snippet"] = snippet
+            if "scores" in result:
+                for item, score in zip(items, result["scores"]):
+                    item["score"] = score
+            response = {
+                "query": result["query"],
+                "results": items,
+                "count": result["count"],
+                "options": result["options"],
+            }
+            if "sources" in result:
+                for item, source in zip(items, result["sources"]):
+                    item["browser"] = source
+                response["failed"] = result["failed"]
+            return JSONResponse(response)
         return JSONResponse({"results": result["message"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -399,7 +626,9 @@ async def sync_endpoint(request: Request) -> JSONResponse:
     """Sync history endpoint."""
     try:
         data = await request.json()
-        result = HistoryService.sync_history(
+        result = await call_service(
+            request,
+            AsyncHistoryService.sync_history,
             source_browser=data.get("source_browser", ""),
             target_browser=data.get("target_browser", ""),
             merge_strategy=data.get("merge_strategy", "latest"),
@@ -413,6 +642,7 @@ async def sync_endpoint(request: Request) -> JSONResponse:
                 "target": result["target"],
                 "entries_count": result["entries_count"],
                 "merge_strategy": result["merge_strategy"],
+                "written": result["written"],
                 "message": result["message"],
             }
         )
@@ -423,7 +653,7 @@ async def sync_endpoint(request: Request) -> JSONResponse:
 async def list_bookmarks_endpoint(request: Request) -> JSONResponse:
     """List available bookmarks endpoint."""
     try:
-        result = HistoryService.list_available_bookmarks()
+        result = await call_service(request, AsyncHistoryService.list_available_bookmarks)
         return JSONResponse({"browsers": result["browsers"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -432,7 +662,7 @@ async def list_bookmarks_endpoint(request: Request) -> JSONResponse:
 async def list_downloads_endpoint(request: Request) -> JSONResponse:
     """List available downloads endpoint."""
     try:
-        result = HistoryService.list_available_downloads()
+        result = await call_service(request, AsyncHistoryService.list_available_downloads)
         return JSONResponse({"browsers": result["browsers"]})
     except Exception as e:
         return handle_service_error_http(e)
@@ -442,7 +672,9 @@ async def bookmarks_endpoint(request: Request) -> JSONResponse:
     """Get bookmarks endpoint."""
     try:
         data = await request.json() if await request.body() else {}
-        result = HistoryService.get_bookmarks(
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_bookmarks,
             query=data.get("query"),
             limit=data.get("limit", 50),
             browser=data.get("browser", default_browser),
@@ -466,7 +698,9 @@ async def downloads_endpoint(request: Request) -> JSONResponse:
     """Get downloads endpoint."""
     try:
         data = await request.json() if await request.body() else {}
-        result = HistoryService.get_downloads(
+        result = await call_service(
+            request,
+            AsyncHistoryService.get_downloads,
             query=data.get("query"),
             limit=data.get("limit", 50),
             browser=data.get("browser", default_browser),
@@ -504,6 +738,9 @@ routes = [
     Route("/api/domain-search", domain_search_endpoint, methods=["POST"]),
     Route("/api/stats", browser_stats_endpoint, methods=["POST"]),
     Route("/api/most-visited", most_visited_endpoint, methods=["POST"]),
+    Route("/api/timeline", timeline_endpoint, methods=["POST"]),
+    Route("/api/histogram", histogram_endpoint, methods=["POST"]),
+    Route("/api/sessions", sessions_endpoint, methods=["POST"]),
     Route("/api/export", export_endpoint, methods=["POST"]),
     Route("/api/advanced-search", advanced_search_endpoint, methods=["POST"]),
     Route("/api/sync", sync_endpoint, methods=["POST"]),
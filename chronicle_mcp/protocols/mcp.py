@@ -1,7 +1,8 @@
 """MCP protocol adapter for ChronicleMCP.
 
 This module provides the MCP server interface using FastMCP.
-All business logic is delegated to the HistoryService in the core layer.
+All business logic is delegated to the HistoryService in the core layer,
+through AsyncHistoryService so that blocking SQLite work runs off the event loop.
 """
 
 import logging
@@ -11,10 +12,10 @@ from fastmcp import FastMCP
 
 from chronicle_mcp.config import setup_logging
 from chronicle_mcp.core import (
+    AsyncHistoryService,
     BrowserNotFoundError,
     DatabaseError,
     DatabaseLockedError,
-    HistoryService,
     PermissionDeniedError,
     ServiceError,
     ValidationError,
@@ -63,40 +64,48 @@ def handle_service_error(error: Exception) -> str:
 
 
 @tool
-def list_available_browsers() -> str:
+async def list_available_browsers() -> str:
     """Returns a list of browsers with detected history databases on this system.
 
     Returns:
         List of available browsers (chrome, edge, firefox)
     """
     try:
-        result = HistoryService.list_available_browsers()
+        result = await AsyncHistoryService.list_available_browsers()
         return cast(str, result["message"])
     except Exception as e:
         return handle_service_error(e)
 
 
 @tool
-def search_history(
+async def search_history(
     query: str,
     limit: int = 5,
-    browser: str = "chrome",
+    browser: str | list[str] = "chrome",
     format_type: str = "markdown",
+    search_mode: str = "like",
 ) -> str:
     """Searches browser history for keywords in titles or URLs.
 
     Args:
         query: Search term to look for in titles or URLs
         limit: Maximum number of results to return (1-100)
-        browser: Browser to search (chrome, edge, firefox) - case insensitive
+        browser: Browser to search (chrome, edge, firefox), a list of browsers,
+            or "all" for every installed browser
         format_type: Output format (markdown or json)
+        search_mode: 'like' (substring, newest first) or 'fts' (full-text,
+            ranked by relevance; end a word with * for a prefix match)
 
     Returns:
         Formatted list of matching history entries or error message
     """
     try:
-        result = HistoryService.search_history(
-            query=query, limit=limit, browser=browser, format_type=format_type
+        result = await AsyncHistoryService.search_history(
+            query=query,
+            limit=limit,
+            browser=browser,
+            format_type=format_type,
+            search_mode=search_mode,
         )
         return cast(str, result["message"])
     except Exception as e:
@@ -104,10 +113,10 @@ def search_history(
 
 
 @tool
-def get_recent_history(
+async def get_recent_history(
     hours: int = 24,
     limit: int = 20,
-    browser: str = "chrome",
+    browser: str | list[str] = "chrome",
     format_type: str = "markdown",
 ) -> str:
     """Gets recent browsing history from the last N hours.
@@ -115,14 +124,15 @@ def get_recent_history(
     Args:
         hours: Number of hours to look back (default: 24)
         limit: Maximum number of results (1-100, default: 20)
-        browser: Browser to search (chrome, edge, firefox)
+        browser: Browser to search (chrome, edge, firefox), a list of browsers,
+            or "all" for every installed browser
         format_type: Output format (markdown or json)
 
     Returns:
         Formatted list of recent history entries or error message
     """
     try:
-        result = HistoryService.get_recent_history(
+        result = await AsyncHistoryService.get_recent_history(
             hours=hours, limit=limit, browser=browser, format_type=format_type
         )
         return cast(str, result["message"])
@@ -131,8 +141,8 @@ def get_recent_history(
 
 
 @tool
-def count_visits(domain: str, browser: str = "chrome") -> str:
-    """Counts total visits to a specific domain.
+async def count_visits(domain: str, browser: str = "chrome") -> str:
+    """Counts total visits to a specific domain and its subdomains.
 
     Args:
         domain: Domain to count (e.g., 'github.com', 'stackoverflow.com')
@@ -142,17 +152,19 @@ def count_visits(domain: str, browser: str = "chrome") -> str:
         Number of visits to the domain or error message
     """
     try:
-        result = HistoryService.count_visits(domain=domain, browser=browser)
+        result = await AsyncHistoryService.count_visits(domain=domain, browser=browser)
         return cast(str, result["message"])
     except Exception as e:
         return handle_service_error(e)
 
 
 @tool
-def list_top_domains(
+async def list_top_domains(
     limit: int = 10,
     browser: str = "chrome",
     format_type: str = "markdown",
+    group_by: str = "host",
+    days: int | None = None,
 ) -> str:
     """Gets the most visited domains from browser history.
 
@@ -160,13 +172,15 @@ def list_top_domains(
         limit: Maximum number of domains to return (1-50, default: 10)
         browser: Browser to search (chrome, edge, firefox)
         format_type: Output format (markdown or json)
+        group_by: 'host' (e.g. 'mail.google.com') or 'domain' (e.g. 'google.com')
+        days: Only count visits from the last N days (default: all history)
 
     Returns:
         Formatted list of top domains or error message
     """
     try:
-        result = HistoryService.list_top_domains(
-            limit=limit, browser=browser, format_type=format_type
+        result = await AsyncHistoryService.list_top_domains(
+            limit=limit, browser=browser, format_type=format_type, group_by=group_by, days=days
         )
         return cast(str, result["message"])
     except Exception as e:
@@ -174,7 +188,7 @@ def list_top_domains(
 
 
 @tool
-def search_history_by_date(
+async def search_history_by_date(
     query: str,
     start_date: str,
     end_date: str,
@@ -196,7 +210,7 @@ def search_history_by_date(
         Formatted list of matching history entries or error message
     """
     try:
-        result = HistoryService.search_history_by_date(
+        result = await AsyncHistoryService.search_history_by_date(
             query=query,
             start_date=start_date,
             end_date=end_date,
@@ -210,7 +224,7 @@ def search_history_by_date(
 
 
 @tool
-def delete_history(
+async def delete_history(
     query: str,
     limit: int = 100,
     browser: str = "chrome",
@@ -228,7 +242,7 @@ def delete_history(
         Number of entries deleted or preview message
     """
     try:
-        result = HistoryService.delete_history(
+        result = await AsyncHistoryService.delete_history(
             query=query, limit=limit, browser=browser, confirm=confirm
         )
         return cast(str, result["message"])
@@ -237,11 +251,11 @@ def delete_history(
 
 
 @tool
-def search_by_domain(
+async def search_by_domain(
     domain: str,
     query: str | None = None,
     limit: int = 20,
-    browser: str = "chrome",
+    browser: str | list[str] = "chrome",
     format_type: str = "markdown",
     exclude_domains: list[str] | None = None,
 ) -> str:
@@ -251,7 +265,8 @@ def search_by_domain(
         domain: Domain to search within (e.g., 'github.com', 'docs.python.org')
         query: Optional search term within the domain
         limit: Maximum number of results (1-100)
-        browser: Browser to search (chrome, edge, firefox)
+        browser: Browser to search (chrome, edge, firefox), a list of browsers,
+            or "all" for every installed browser
         format_type: Output format (markdown or json)
         exclude_domains: Domains to exclude from results
 
@@ -259,7 +274,7 @@ def search_by_domain(
         Formatted list of matching history entries or error message
     """
     try:
-        result = HistoryService.search_by_domain(
+        result = await AsyncHistoryService.search_by_domain(
             domain=domain,
             query=query,
             limit=limit,
@@ -273,27 +288,29 @@ def search_by_domain(
 
 
 @tool
-def get_browser_stats(browser: str = "chrome") -> str:
+async def get_browser_stats(browser: str = "chrome", days: int | None = None) -> str:
     """Gets browsing statistics for the browser database.
 
     Args:
         browser: Browser to get stats for (chrome, edge, firefox)
+        days: Only cover the last N days (default: all history)
 
     Returns:
         JSON string with browsing statistics
     """
     try:
-        result = HistoryService.get_browser_stats(browser=browser)
+        result = await AsyncHistoryService.get_browser_stats(browser=browser, days=days)
         return cast(str, result["message"])
     except Exception as e:
         return handle_service_error(e)
 
 
 @tool
-def get_most_visited_pages(
+async def get_most_visited_pages(
     limit: int = 20,
     browser: str = "chrome",
     format_type: str = "markdown",
+    days: int | None = None,
 ) -> str:
     """Gets the most visited individual pages.
 
@@ -301,13 +318,14 @@ def get_most_visited_pages(
         limit: Maximum number of pages to return (1-100)
         browser: Browser to search (chrome, edge, firefox)
         format_type: Output format (markdown or json)
+        days: Only count visits from the last N days (default: all history)
 
     Returns:
         Formatted list of most visited pages or error message
     """
     try:
-        result = HistoryService.get_most_visited_pages(
-            limit=limit, browser=browser, format_type=format_type
+        result = await AsyncHistoryService.get_most_visited_pages(
+            limit=limit, browser=browser, format_type=format_type, days=days
         )
         return cast(str, result["message"])
     except Exception as e:
@@ -315,7 +333,99 @@ def get_most_visited_pages(
 
 
 @tool
-def export_history(
+async def get_visit_timeline(
+    start: str,
+    end: str,
+    query: str | None = None,
+    limit: int = 100,
+    browser: str | list[str] = "chrome",
+    format_type: str = "markdown",
+) -> str:
+    """Lists every visit in a time window, including pages visited again later.
+
+    Args:
+        start: Start of the window, ISO 8601 (e.g. 2024-03-05T14:00); local time
+            unless an offset is given
+        end: End of the window (exclusive), ISO 8601
+        query: Optional search term to filter by title or URL
+        limit: Maximum number of visits (1-1000)
+        browser: Browser to search (chrome, edge, firefox), a list of browsers,
+            or "all" for every installed browser
+        format_type: Output format (markdown or json)
+
+    Returns:
+        Formatted list of visits, newest first, or error message
+    """
+    try:
+        result = await AsyncHistoryService.get_visit_timeline(
+            start=start,
+            end=end,
+            query=query,
+            limit=limit,
+            browser=browser,
+            format_type=format_type,
+        )
+        return cast(str, result["message"])
+    except Exception as e:
+        return handle_service_error(e)
+
+
+@tool
+async def get_visit_histogram(
+    browser: str = "chrome",
+    days: int | None = None,
+    format_type: str = "markdown",
+) -> str:
+    """Counts visits per hour of the day and per day of the week.
+
+    Args:
+        browser: Browser to analyze (chrome, edge, firefox)
+        days: Only count visits from the last N days (default: all history)
+        format_type: Output format (markdown or json)
+
+    Returns:
+        Visit counts in the local time zone, each visit at the UTC offset in
+        force when it happened, or error message
+    """
+    try:
+        result = await AsyncHistoryService.get_visit_histogram(
+            browser=browser, days=days, format_type=format_type
+        )
+        return cast(str, result["message"])
+    except Exception as e:
+        return handle_service_error(e)
+
+
+@tool
+async def get_browsing_sessions(
+    browser: str = "chrome",
+    days: int | None = None,
+    limit: int = 20,
+    format_type: str = "markdown",
+) -> str:
+    """Groups visits into browsing sessions separated by idle time.
+
+    Args:
+        browser: Browser to analyze (chrome, edge, firefox)
+        days: Only sessions from the last N days (default: all history)
+        limit: Maximum number of sessions (1-500)
+        format_type: Output format (markdown or json)
+
+    Returns:
+        Sessions with their duration, visits and top sites, newest first,
+        or error message
+    """
+    try:
+        result = await AsyncHistoryService.get_browsing_sessions(
+            browser=browser, days=days, limit=limit, format_type=format_type
+        )
+        return cast(str, result["message"])
+    except Exception as e:
+        return handle_service_error(e)
+
+
+@tool
+async def export_history(
     format_type: str = "csv",
     limit: int = 1000,
     query: str | None = None,
@@ -333,7 +443,7 @@ def export_history(
         CSV or JSON formatted history data
     """
     try:
-        result = HistoryService.export_history(
+        result = await AsyncHistoryService.export_history(
             format_type=format_type, limit=limit, query=query, browser=browser
         )
         return cast(str, result["content"])
@@ -342,35 +452,41 @@ def export_history(
 
 
 @tool
-def search_history_advanced(
+async def search_history_advanced(
     query: str,
     limit: int = 20,
-    browser: str = "chrome",
+    browser: str | list[str] = "chrome",
     format_type: str = "markdown",
     exclude_domains: list[str] | None = None,
     sort_by: str = "date",
     use_regex: bool = False,
     use_fuzzy: bool = False,
     fuzzy_threshold: float = 0.6,
+    search_mode: str = "like",
+    parallel: bool = False,
 ) -> str:
     """Advanced search with multiple options.
 
     Args:
         query: Search term to look for in titles or URLs
         limit: Maximum number of results (1-100)
-        browser: Browser to search (chrome, edge, firefox)
+        browser: Browser to search (chrome, edge, firefox), a list of browsers,
+            or "all" for every installed browser
         format_type: Output format (markdown or json)
         exclude_domains: Domains to exclude from results
-        sort_by: Sort order (date, visit_count, title)
+        sort_by: Sort order (date, visit_count, title, relevance)
         use_regex: Use regex pattern matching
         use_fuzzy: Use fuzzy matching for typos
         fuzzy_threshold: Minimum similarity score for fuzzy matching (0.0-1.0)
+        search_mode: 'like' (substring) or 'fts' (full-text with BM25 relevance)
+        parallel: Scan the whole history on several CPU cores for regex or fuzzy
+            matching (for patterns the index cannot narrow down)
 
     Returns:
         Formatted list of matching history entries or error message
     """
     try:
-        result = HistoryService.search_history_advanced(
+        result = await AsyncHistoryService.search_history_advanced(
             query=query,
             limit=limit,
             browser=browser,
@@ -380,6 +496,8 @@ def search_history_advanced(
             use_regex=use_regex,
             use_fuzzy=use_fuzzy,
             fuzzy_threshold=fuzzy_threshold,
+            search_mode=search_mode,
+            parallel=parallel,
         )
         return cast(str, result["message"])
     except Exception as e:
@@ -387,25 +505,29 @@ def search_history_advanced(
 
 
 @tool
-def sync_history(
+async def sync_history(
     source_browser: str,
     target_browser: str,
     merge_strategy: str = "latest",
     dry_run: bool = True,
 ) -> str:
-    """Syncs history between browsers.
+    """Previews merging one browser's history into another's.
+
+    Nothing is written to the target browser's history: the merge is
+    planned against a snapshot of the target.
 
     Args:
         source_browser: Browser to copy history from
         target_browser: Browser to copy history to
         merge_strategy: How to handle duplicates (latest, combine, dedupe)
-        dry_run: If True, show what would be done without making changes
+        dry_run: If True, report the counts as a preview; if False, as a
+            merge plan
 
     Returns:
-        Summary of sync operation
+        Summary of the merge
     """
     try:
-        result = HistoryService.sync_history(
+        result = await AsyncHistoryService.sync_history(
             source_browser=source_browser,
             target_browser=target_browser,
             merge_strategy=merge_strategy,
@@ -417,35 +539,35 @@ def sync_history(
 
 
 @tool
-def list_available_bookmarks() -> str:
+async def list_available_bookmarks() -> str:
     """Returns a list of browsers with detected bookmarks on this system.
 
     Returns:
         List of available browsers with bookmarks
     """
     try:
-        result = HistoryService.list_available_bookmarks()
+        result = await AsyncHistoryService.list_available_bookmarks()
         return cast(str, result["message"])
     except Exception as e:
         return handle_service_error(e)
 
 
 @tool
-def list_available_downloads() -> str:
+async def list_available_downloads() -> str:
     """Returns a list of browsers with detected downloads history on this system.
 
     Returns:
         List of available browsers with downloads
     """
     try:
-        result = HistoryService.list_available_downloads()
+        result = await AsyncHistoryService.list_available_downloads()
         return cast(str, result["message"])
     except Exception as e:
         return handle_service_error(e)
 
 
 @tool
-def get_bookmarks(
+async def get_bookmarks(
     query: str | None = None,
     limit: int = 50,
     browser: str = "chrome",
@@ -463,7 +585,7 @@ def get_bookmarks(
         Formatted list of bookmarks or error message
     """
     try:
-        result = HistoryService.get_bookmarks(
+        result = await AsyncHistoryService.get_bookmarks(
             query=query,
             limit=limit,
             browser=browser,
@@ -475,7 +597,7 @@ def get_bookmarks(
 
 
 @tool
-def get_downloads(
+async def get_downloads(
     query: str | None = None,
     limit: int = 50,
     browser: str = "chrome",
@@ -493,7 +615,7 @@ def get_downloads(
         Formatted list of downloads or error message
     """
     try:
-        result = HistoryService.get_downloads(
+        result = await AsyncHistoryService.get_downloads(
             query=query,
             limit=limit,
             browser=browser,
@@ -0,0 +1,347 @@
+"""Time-bucketed visit rollups in the history index.
+
+Top-N and statistics queries over a time window ("top domains in the last
+7 days") would otherwise aggregate every visit in the window on each
+request. Instead, the index keeps visit counts per hour and per day, broken
+down by host, by page, and in total for each source. They are built from
+the visit rows a refresh ingests, i.e. the visits beyond the previous visit
+id watermark, so each visit is counted exactly once. Visits the browser
+deletes (history expiry, "clear recent history") are subtracted again
+before they leave the index.
+
+A window is answered from whole days where it can and from hours at its
+start, so a query reads at most a day's worth of hourly buckets plus one
+bucket per day. Windows start on an hour boundary.
+
+Per-source totals that are not tied to a window (number of urls, visit
+counts, first and last visit) are kept in ``source_stats``, recomputed at
+the end of each ingest.
+"""
+
+import sqlite3
+from typing import Any
+
+from chronicle_mcp.database import (
+    format_chrome_timestamp,
+    get_browser_stats,
+    get_most_visited_pages,
+    sanitize_url,
+)
+from chronicle_mcp.domains import registrable_domain
+
+HOUR_MICROSECONDS = 3_600_000_000
+DAY_MICROSECONDS = 24 * HOUR_MICROSECONDS
+
+# Bucket width of each rollup resolution, in Chrome microseconds
+RESOLUTIONS = {"hour": HOUR_MICROSECONDS, "day": DAY_MICROSECONDS}
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_totals (
+    source_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    visits INTEGER NOT NULL,
+    PRIMARY KEY (source_id, resolution, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_hosts (
+    source_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    visits INTEGER NOT NULL,
+    PRIMARY KEY (source_id, resolution, bucket, host)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_pages (
+    source_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    source_url_id INTEGER NOT NULL,
+    visits INTEGER NOT NULL,
+    PRIMARY KEY (source_id, resolution, bucket, source_url_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS source_stats (
+    source_id INTEGER PRIMARY KEY,
+    total_entries INTEGER NOT NULL,
+    total_visits INTEGER NOT NULL,
+    unique_urls INTEGER NOT NULL,
+    first_visit_time INTEGER,
+    last_visit_time INTEGER
+);
+"""
+
+ROLLUP_TABLES = ("rollup_totals", "rollup_hosts", "rollup_pages")
+
+# Rollup table -> (key column, expression for it over index_visits v / index_urls u)
+ROLLUP_KEYS: dict[str, tuple[str, str] | None] = {
+    "rollup_totals": None,
+    "rollup_hosts": ("host", "u.host"),
+    "rollup_pages": ("source_url_id", "v.source_url_id"),
+}
+
+
+def _count_visits(
+    writer: sqlite3.Connection, source_id: int, visits: str, params: tuple[Any, ...], sign: str
+) -> None:
+    """Add (``sign`` "+") or subtract ("-") the visits matching a condition in every rollup."""
+    for resolution, width in RESOLUTIONS.items():
+        bucket = f"v.visit_time - v.visit_time % {width}"
+        for table, key in ROLLUP_KEYS.items():
+            key_column = f", {key[0]}" if key else ""
+            key_value = f", {key[1]}" if key else ""
+            # nosec B608 - table, columns, widths and conditions are module constants
+            writer.execute(
+                f"INSERT INTO {table} (source_id, resolution, bucket{key_column}, visits) "  # nosec B608
+                f"SELECT v.source_id, ?, {bucket}{key_value}, {sign}COUNT(*) "
+                "FROM index_visits v LEFT JOIN index_urls u "
+                "ON u.source_id = v.source_id AND u.source_url_id = v.source_url_id "
+                f"WHERE v.source_id = ? AND {visits} AND v.visit_time IS NOT NULL "
+                f"{'AND u.host IS NOT NULL ' if key else ''}"
+                f"GROUP BY {bucket}{key_value} "
+                f"ON CONFLICT DO UPDATE SET visits = visits + excluded.visits",
+                (resolution, source_id, *params),
+            )
+
+
+def update_rollups(writer: sqlite3.Connection, source_id: int, after_visit_id: int) -> None:
+    """Add visits with a source visit id above ``after_visit_id`` to the rollups.
+
+    Must run after the urls of those visits have been ingested, since host
+    and page buckets only count visits whose url is known and has a host.
+
+    Args:
+        writer: Index writer connection, inside the ingest transaction
+        source_id: Index source id
+        after_visit_id: Visit watermark before the ingest
+    """
+    _count_visits(writer, source_id, "v.source_visit_id > ?", (after_visit_id,), "+")
+
+
+def remove_rollups(writer: sqlite3.Connection, source_id: int, visit_ids: list[int]) -> None:
+    """Take visits out of the rollups before they are deleted from the index.
+
+    Must run while the visits, and their urls, are still in the index, so
+    they are subtracted from the same buckets they were added to.
+
+    Args:
+        writer: Index writer connection, inside the ingest transaction
+        source_id: Index source id
+        visit_ids: Source visit ids about to be deleted
+    """
+    placeholders = ", ".join("?" * len(visit_ids))
+    _count_visits(
+        writer, source_id, f"v.source_visit_id IN ({placeholders})", tuple(visit_ids), "-"
+    )
+    for table in ROLLUP_TABLES:
+        # nosec B608 - table names are module constants
+        writer.execute(
+            f"DELETE FROM {table} WHERE source_id = ? AND visits <= 0",  # nosec B608
+            (source_id,),
+        )
+
+
+def clear_rollups(writer: sqlite3.Connection, source_id: int) -> None:
+    """Drop all rollups and stored stats of a source."""
+    for table in (*ROLLUP_TABLES, "source_stats"):
+        # nosec B608 - table names are module constants
+        writer.execute(f"DELETE FROM {table} WHERE source_id = ?", (source_id,))  # nosec B608
+
+
+def update_source_stats(writer: sqlite3.Connection, source_id: int) -> None:
+    """Recompute the whole-history statistics of a source in one pass over its urls."""
+    writer.execute(
+        "INSERT OR REPLACE INTO source_stats (source_id, total_entries, total_visits, "
+        "unique_urls, first_visit_time, last_visit_time) "
+        "SELECT ?, COUNT(*), COALESCE(SUM(visit_count), 0), COUNT(host), "
+        "MIN(last_visit_time), MAX(last_visit_time) FROM index_urls WHERE source_id = ?",
+        (source_id, source_id),
+    )
+
+
+def _rollup_source(conn: sqlite3.Connection, since: int | None) -> int | None:
+    """Returns the source id if the rollups can answer a query over ``since``.
+
+    Sources without visit rows (browsers that only keep per-url counts) have
+    no rollups, so windowed queries on them fall back to per-url data.
+    """
+    source_id = getattr(conn, "source_id", None)
+    if since is None or source_id is None:
+        return None
+    has_visits = conn.execute(
+        "SELECT 1 FROM main.index_visits WHERE source_id = ? LIMIT 1", (int(source_id),)
+    ).fetchone()
+    return int(source_id) if has_visits else None
+
+
+def _window(
+    conn: sqlite3.Connection,
+    source_id: int,
+    since: int,
+    table: str,
+    columns: str,
+    outer: str,
+    *params: Any,
+) -> sqlite3.Cursor:
+    """Run ``outer`` over a source's rollup rows covering the window from ``since``.
+
+    ``outer`` refers to the rows as ``{window}``. The window is widened to
+    start on an hour boundary; hourly buckets cover it up to the next day
+    boundary and daily buckets from there on.
+    """
+    hour_start = since - since % HOUR_MICROSECONDS
+    day_start = -(-hour_start // DAY_MICROSECONDS) * DAY_MICROSECONDS
+    # nosec B608 - table and columns are module constants
+    window = (
+        f"SELECT {columns} FROM main.{table} WHERE source_id = ? "  # nosec B608
+        "AND resolution = 'hour' AND bucket >= ? AND bucket < ? "
+        f"UNION ALL SELECT {columns} FROM main.{table} WHERE source_id = ? "
+        "AND resolution = 'day' AND bucket >= ?"
+    )
+    return conn.execute(
+        outer.format(window=window),
+        (source_id, hour_start, day_start, source_id, day_start, *params),
+    )
+
+
+def top_hosts_since(
+    conn: sqlite3.Connection, since: int, limit: int = 10, group_by: str = "host"
+) -> list[tuple[str, int]] | None:
+    """Most visited hosts, or registrable domains, since a Chrome timestamp.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        since: Start of the window, as a Chrome timestamp
+        limit: Maximum number of domains to return
+        group_by: 'host' or 'domain'
+
+    Returns:
+        List of (domain, visits) tuples, or None if the connection has no
+        rollups to answer from
+    """
+    source_id = _rollup_source(conn, since)
+    if source_id is None:
+        return None
+
+    if group_by == "host":
+        rows = _window(
+            conn,
+            source_id,
+            since,
+            "rollup_hosts",
+            "host, visits",
+            "SELECT host, SUM(visits) AS total FROM ({window}) "
+            "GROUP BY host ORDER BY total DESC, host LIMIT ?",
+            limit,
+        )
+        return [(host, int(total)) for host, total in rows]
+
+    totals: dict[str, int] = {}
+    rows = _window(
+        conn,
+        source_id,
+        since,
+        "rollup_hosts",
+        "host, visits",
+        "SELECT host, SUM(visits) FROM ({window}) GROUP BY host",
+    )
+    for host, visits in rows:
+        domain = registrable_domain(host)
+        totals[domain] = totals.get(domain, 0) + int(visits)
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def get_top_pages(
+    conn: sqlite3.Connection, limit: int = 20, since: int | None = None
+) -> list[tuple[str, str, int]]:
+    """Most visited pages, over the whole history or since a Chrome timestamp.
+
+    Windowed queries on an index connection are answered from the page
+    rollups and count the visits inside the window. Otherwise
+    ``get_most_visited_pages`` counts all visits of the pages last visited
+    inside the window.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        limit: Maximum number of pages to return
+        since: Start of the window, as a Chrome timestamp
+
+    Returns:
+        List of (title, url, visits) tuples
+    """
+    source_id = _rollup_source(conn, since)
+    if since is None or source_id is None:
+        return get_most_visited_pages(conn, limit, since)
+
+    rows = _window(
+        conn,
+        source_id,
+        since,
+        "rollup_pages",
+        "source_url_id, visits",
+        "SELECT u.title, u.url, t.total FROM "
+        "(SELECT source_url_id, SUM(visits) AS total FROM ({window}) GROUP BY source_url_id) t "
+        "JOIN main.index_urls u ON u.source_id = ? AND u.source_url_id = t.source_url_id "
+        "WHERE u.title IS NOT NULL ORDER BY t.total DESC, u.source_url_id LIMIT ?",
+        source_id,
+        limit,
+    )
+    return [(title, sanitize_url(url), int(total)) for title, url, total in rows]
+
+
+def get_history_stats(conn: sqlite3.Connection, since: int | None = None) -> dict[str, Any]:
+    """Browsing statistics, over the whole history or since a Chrome timestamp.
+
+    On an index connection, whole-history figures come from ``source_stats``
+    and windowed ones from the rollups: ``total_visits`` counts the visits
+    in the window, and ``total_entries`` and ``unique_urls`` the web pages
+    visited in it. Otherwise ``get_browser_stats`` computes them from the
+    urls last visited in the window.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection``
+        since: Start of the window, as a Chrome timestamp
+
+    Returns:
+        Dictionary with browsing statistics
+    """
+    source_id = getattr(conn, "source_id", None)
+    if since is None and source_id is not None:
+        row = conn.execute(
+            "SELECT total_entries, total_visits, unique_urls, first_visit_time, "
+            "last_visit_time FROM main.source_stats WHERE source_id = ?",
+            (int(source_id),),
+        ).fetchone()
+        if row is None:
+            return get_browser_stats(conn)
+        total_entries, total_visits, unique_urls, first_time, last_time = row
+    elif since is not None and (source_id := _rollup_source(conn, since)) is not None:
+        total_visits = _window(
+            conn,
+            source_id,
+            since,
+            "rollup_totals",
+            "visits",
+            "SELECT COALESCE(SUM(visits), 0) FROM ({window})",
+        ).fetchone()[0]
+        total_entries = unique_urls = _window(
+            conn,
+            source_id,
+            since,
+            "rollup_pages",
+            "source_url_id",
+            "SELECT COUNT(DISTINCT source_url_id) FROM ({window})",
+        ).fetchone()[0]
+        first_time, last_time = conn.execute(
+            "SELECT MIN(visit_time), MAX(visit_time) FROM main.index_visits "
+            "WHERE source_id = ? AND visit_time >= ?",
+            (source_id, since - since % HOUR_MICROSECONDS),
+        ).fetchone()
+    else:
+        return get_browser_stats(conn, since)
+
+    return {
+        "total_entries": total_entries,
+        "total_visits": total_visits,
+        "unique_urls": unique_urls,
+        "first_visit": format_chrome_timestamp(first_time) if first_time else None,
+        "last_visit": format_chrome_timestamp(last_time) if last_time else None,
+    }
@@ -0,0 +1,466 @@
+"""History queries in the browser's own database schema.
+
+The query functions in ``chronicle_mcp.database`` are written against
+Chrome's ``urls`` table. The history index exposes every browser that way,
+but with ``[index] enabled = false`` queries read a snapshot of the
+browser's own database. For Firefox and Safari databases, ``NativeHistory``
+answers the common operations on the native tables and their indexes:
+
+- Firefox: time windows on the indexed ``moz_places.last_visit_date``,
+  domain lookups as a range scan of the indexed ``rev_host`` column, top
+  domains per ``moz_origins`` host, and most visited pages in
+  ``visit_count`` index order.
+- Safari: time windows on ``history_visits.visit_time``, grouped per page.
+
+Everything else reads ``NativeHistory.relation``, a subquery with the
+columns of Chrome's ``urls`` table and timestamps converted to Chrome
+timestamps (microseconds since 1601-01-01).
+
+``resolve_layout`` works out which tables and columns hold the history;
+the history index uses it to ingest the same databases.
+"""
+
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from chronicle_mcp.database import detect_schema
+from chronicle_mcp.domains import reverse_host, url_host
+
+# Seconds between 1601-01-01 and 1970-01-01, and between 1970-01-01 and 2001-01-01
+UNIX_EPOCH_OFFSET_SECONDS = 11_644_473_600
+SAFARI_EPOCH_OFFSET_SECONDS = 978_307_200
+
+# Source timestamps converted to Chrome timestamps, as SQL expressions
+TIMESTAMP_CONVERSIONS = {
+    "chrome": "{}",
+    "firefox": f"({{}} + {UNIX_EPOCH_OFFSET_SECONDS * 1_000_000})",
+    "safari": (
+        f"CAST(({{}} + {SAFARI_EPOCH_OFFSET_SECONDS + UNIX_EPOCH_OFFSET_SECONDS}) "
+        "* 1000000 AS INTEGER)"
+    ),
+}
+
+
+def native_timestamp(schema: str, timestamp: int) -> int | float:
+    """Converts a Chrome timestamp to a schema's own epoch and unit.
+
+    Args:
+        schema: Schema type from ``detect_schema``
+        timestamp: Microseconds since 1601-01-01
+
+    Returns:
+        Microseconds since 1970 for Firefox, seconds since 2001 for Safari,
+        the timestamp unchanged for Chrome
+    """
+    if schema == "firefox":
+        return timestamp - UNIX_EPOCH_OFFSET_SECONDS * 1_000_000
+    if schema == "safari":
+        return timestamp / 1_000_000 - UNIX_EPOCH_OFFSET_SECONDS - SAFARI_EPOCH_OFFSET_SECONDS
+    return timestamp
+
+
+@dataclass(frozen=True)
+class SourceLayout:
+    """Where the history of one source database lives.
+
+    Column fields hold SQL expressions over the urls table (aliased ``u``)
+    or the visits table (aliased ``v``). ``last_visit_column`` is the raw
+    column used for the timestamp watermark, or None if the last visit
+    time is derived from the visits table.
+    """
+
+    schema: str
+    urls_table: str
+    title: str
+    visit_count: str
+    last_visit: str
+    last_visit_column: str | None
+    visits_table: str | None = None
+    visit_url_column: str = ""
+    visit_time_column: str = ""
+    from_visit: str = "NULL"
+    transition: str = "NULL"
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    """Returns the column names of a table, or an empty set if it doesn't exist."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _first_present(columns: set[str], *candidates: str) -> str | None:
+    """Returns the first candidate column name present in ``columns``."""
+    return next((name for name in candidates if name in columns), None)
+
+
+def resolve_layout(conn: sqlite3.Connection, schema: str) -> SourceLayout:
+    """Work out which tables and columns hold a source database's history.
+
+    Browser versions differ in table and column names (for example Firefox's
+    ``moz_historyvisits`` and Safari's ``history_item`` foreign key), so the
+    layout is resolved against the actual database.
+
+    Args:
+        conn: Connection to the source database
+        schema: Schema type from ``detect_schema``
+
+    Returns:
+        SourceLayout for the database
+
+    Raises:
+        ValueError: If the schema is not supported
+    """
+    convert = TIMESTAMP_CONVERSIONS.get(schema)
+    if convert is None:
+        raise ValueError(f"Unsupported history schema: {schema}")
+
+    visit_candidates: tuple[str, ...]
+    fk_candidates: tuple[str, ...]
+    last_visit_candidates: tuple[str, ...]
+    transition_candidates: tuple[str, ...]
+    if schema == "chrome":
+        urls_table, visit_candidates = "urls", ("visits",)
+        fk_candidates, time_candidates = ("url",), ("visit_time",)
+        last_visit_candidates = ("last_visit_time",)
+        from_candidates, transition_candidates = ("from_visit",), ("transition",)
+    elif schema == "firefox":
+        urls_table, visit_candidates = "moz_places", ("moz_historyvisits", "moz_visits")
+        fk_candidates, time_candidates = ("place_id",), ("visit_date",)
+        last_visit_candidates = ("last_visit_date",)
+        from_candidates, transition_candidates = ("from_visit",), ("visit_type", "transition")
+    else:
+        urls_table, visit_candidates = "history_items", ("history_visits",)
+        fk_candidates, time_candidates = ("history_item", "history_item_id"), ("visit_time",)
+        last_visit_candidates = ()
+        from_candidates, transition_candidates = ("redirect_source",), ()
+
+    url_columns = table_columns(conn, urls_table)
+    visits_table = visit_url_column = visit_time_column = None
+    visit_columns: set[str] = set()
+    for candidate in visit_candidates:
+        visit_columns = table_columns(conn, candidate)
+        visit_url_column = _first_present(visit_columns, *fk_candidates)
+        visit_time_column = _first_present(visit_columns, *time_candidates)
+        if "id" in visit_columns and visit_url_column and visit_time_column:
+            visits_table = candidate
+            break
+
+    title = "u.title" if "title" in url_columns else "NULL"
+    if title == "NULL" and visits_table and "title" in visit_columns:
+        title = (
+            f"(SELECT v.title FROM {visits_table} v WHERE v.{visit_url_column} = u.id "
+            f"ORDER BY v.{visit_time_column} DESC LIMIT 1)"
+        )
+
+    last_visit_column = _first_present(url_columns, *last_visit_candidates)
+    if last_visit_column:
+        last_visit = convert.format(f"u.{last_visit_column}")
+    elif visits_table:
+        last_visit = convert.format(
+            f"(SELECT MAX(v.{visit_time_column}) FROM {visits_table} v "
+            f"WHERE v.{visit_url_column} = u.id)"
+        )
+    else:
+        last_visit = "NULL"
+
+    if not visits_table:
+        return SourceLayout(
+            schema=schema,
+            urls_table=urls_table,
+            title=title,
+            visit_count="COALESCE(u.visit_count, 0)" if "visit_count" in url_columns else "0",
+            last_visit=last_visit,
+            last_visit_column=last_visit_column,
+        )
+
+    from_column = _first_present(visit_columns, *from_candidates)
+    transition_column = _first_present(visit_columns, *transition_candidates)
+    return SourceLayout(
+        schema=schema,
+        urls_table=urls_table,
+        title=title,
+        visit_count=(
+            "COALESCE(u.visit_count, 0)"
+            if "visit_count" in url_columns
+            else f"(SELECT COUNT(*) FROM {visits_table} v WHERE v.{visit_url_column} = u.id)"
+        ),
+        last_visit=last_visit,
+        last_visit_column=last_visit_column,
+        visits_table=visits_table,
+        visit_url_column=str(visit_url_column),
+        visit_time_column=str(visit_time_column),
+        from_visit=f"v.{from_column}" if from_column else "NULL",
+        transition=f"v.{transition_column}" if transition_column else "NULL",
+    )
+
+
+# (title, url, last visit as a Chrome timestamp)
+HistoryRow = tuple[str, str, int]
+
+
+class NativeHistory:
+    """History operations on a browser's own database.
+
+    The base class answers every operation from ``relation``; subclasses
+    use the native tables and indexes of their schema. Timestamps taken and
+    returned are Chrome timestamps.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, layout: SourceLayout):
+        self.conn = conn
+        self.layout = layout
+
+    @property
+    def relation(self) -> str:
+        """Subquery with the columns of Chrome's ``urls`` table."""
+        layout = self.layout
+        return (
+            f"(SELECT u.id AS id, u.url AS url, {layout.title} AS title, "
+            f"{layout.visit_count} AS visit_count, {layout.last_visit} AS last_visit_time "
+            f"FROM {layout.urls_table} u)"
+        )
+
+    def recent(self, since: int, limit: int) -> list[HistoryRow]:
+        """Pages last visited after ``since``, newest first."""
+        # nosec B608 - the relation is built from resolved column names
+        rows = self.conn.execute(
+            f"SELECT title, url, last_visit_time FROM {self.relation} "  # nosec B608
+            "WHERE last_visit_time > ? ORDER BY last_visit_time DESC LIMIT ?",
+            (since, limit),
+        )
+        return rows.fetchall()
+
+    def in_range(self, pattern: str, start: int, end: int, limit: int) -> list[HistoryRow]:
+        """Pages matching a LIKE pattern and last visited between ``start`` and ``end``."""
+        # nosec B608 - the relation is built from resolved column names
+        rows = self.conn.execute(
+            f"SELECT title, url, last_visit_time FROM {self.relation} "  # nosec B608
+            "WHERE (title LIKE ? OR url LIKE ?) AND last_visit_time >= ? "
+            "AND last_visit_time <= ? ORDER BY last_visit_time DESC LIMIT ?",
+            (pattern, pattern, start, end, limit),
+        )
+        return rows.fetchall()
+
+    def host_candidates(
+        self, domain: str, pattern: str | None = None
+    ) -> Iterable[tuple[str, str, int, int]]:
+        """Pages that may belong to a domain or its subdomains, newest first.
+
+        Callers check each url's host; this only narrows the rows down.
+
+        Args:
+            domain: Normalized domain
+            pattern: Optional LIKE pattern the title or url must match
+
+        Returns:
+            (title, url, last visit, visit count) rows
+        """
+        match = "" if pattern is None else " AND (title LIKE ? OR url LIKE ?)"
+        # nosec B608 - the relation is built from resolved column names
+        return self.conn.execute(
+            f"SELECT title, url, last_visit_time, visit_count FROM {self.relation} "  # nosec B608
+            f"WHERE url LIKE ?{match} ORDER BY last_visit_time DESC",
+            (f"%{domain}%",) if pattern is None else (f"%{domain}%", pattern, pattern),
+        )
+
+    def host_totals(self, since: int | None = None) -> dict[str, int]:
+        """Visit counts per host of the pages last visited at or after ``since``."""
+        window = "" if since is None else " AND last_visit_time >= ?"
+        # nosec B608 - the relation is built from resolved column names
+        rows = self.conn.execute(
+            f"SELECT url, visit_count FROM {self.relation} WHERE url LIKE 'http%'{window}",  # nosec B608
+            () if since is None else (since,),
+        )
+        totals: dict[str, int] = {}
+        for url, count in rows:
+            host = url_host(url)
+            if host is not None:
+                totals[host] = totals.get(host, 0) + (count or 0)
+        return totals
+
+    def top_pages(self, limit: int, since: int | None = None) -> list[tuple[str, str, int]]:
+        """Most visited pages, of those last visited at or after ``since``."""
+        window = "" if since is None else " AND last_visit_time >= ?"
+        # nosec B608 - the relation is built from resolved column names
+        rows = self.conn.execute(
+            f"SELECT title, url, visit_count FROM {self.relation} "  # nosec B608
+            f"WHERE title IS NOT NULL AND url LIKE 'http%'{window} "
+            "ORDER BY visit_count DESC LIMIT ?",
+            (limit,) if since is None else (since, limit),
+        )
+        return rows.fetchall()
+
+
+class FirefoxHistory(NativeHistory):
+    """Firefox ``places.sqlite`` history, read through its own indexes."""
+
+    OFFSET = UNIX_EPOCH_OFFSET_SECONDS * 1_000_000
+
+    def __init__(self, conn: sqlite3.Connection, layout: SourceLayout):
+        super().__init__(conn, layout)
+        columns = table_columns(conn, layout.urls_table)
+        self.has_rev_host = "rev_host" in columns
+        self.has_origins = "origin_id" in columns and {"host", "prefix"} <= table_columns(
+            conn, "moz_origins"
+        )
+
+    def _select(self, where: str, order: str) -> str:
+        """SELECT of (title, url, last visit) rows from moz_places, with raw filters."""
+        layout = self.layout
+        # nosec B608 - fragments are constants and resolved column names
+        return (
+            f"SELECT {layout.title}, u.url, {layout.last_visit} "  # nosec B608
+            f"FROM {layout.urls_table} u WHERE {where} ORDER BY {order}"
+        )
+
+    def recent(self, since: int, limit: int) -> list[HistoryRow]:
+        column = self.layout.last_visit_column
+        if column is None:
+            return super().recent(since, limit)
+        sql = self._select(f"u.{column} > ?", f"u.{column} DESC") + " LIMIT ?"
+        return self.conn.execute(sql, (since - self.OFFSET, limit)).fetchall()
+
+    def in_range(self, pattern: str, start: int, end: int, limit: int) -> list[HistoryRow]:
+        column = self.layout.last_visit_column
+        if column is None:
+            return super().in_range(pattern, start, end, limit)
+        sql = self._select(
+            f"u.{column} >= ? AND u.{column} <= ? AND ({self.layout.title} LIKE ? OR u.url LIKE ?)",
+            f"u.{column} DESC",
+        )
+        return self.conn.execute(
+            sql + " LIMIT ?", (start - self.OFFSET, end - self.OFFSET, pattern, pattern, limit)
+        ).fetchall()
+
+    def host_candidates(
+        self, domain: str, pattern: str | None = None
+    ) -> Iterable[tuple[str, str, int, int]]:
+        if not self.has_rev_host:
+            return super().host_candidates(domain, pattern)
+        # rev_host is the reversed host plus a dot, so a domain and its
+        # subdomains form one range of the rev_host index
+        reversed_domain = reverse_host(domain)
+        layout = self.layout
+        match = "" if pattern is None else f" AND ({layout.title} LIKE ? OR u.url LIKE ?)"
+        params = (reversed_domain + ".", reversed_domain + "/")
+        # "+" keeps the planner on the rev_host range rather than the date index
+        # nosec B608 - fragments are resolved column names
+        return self.conn.execute(
+            f"SELECT {layout.title}, u.url, {layout.last_visit}, {layout.visit_count} "  # nosec B608
+            f"FROM {layout.urls_table} u WHERE u.rev_host >= ? AND u.rev_host < ?{match} "
+            f"ORDER BY +{layout.last_visit} DESC",
+            params if pattern is None else (*params, pattern, pattern),
+        )
+
+    def host_totals(self, since: int | None = None) -> dict[str, int]:
+        column = self.layout.last_visit_column
+        if since is not None and column is None:
+            return super().host_totals(since)
+        window = "" if since is None else f" AND u.{column} >= ?"
+        params = () if since is None else (since - self.OFFSET,)
+        totals: dict[str, int] = {}
+        rows: Iterable[tuple[str, int]]
+        if self.has_origins:
+            # moz_origins.host may carry a port, so hosts are parsed from the origin
+            # nosec B608 - window is built from a resolved column name
+            rows = self.conn.execute(
+                "SELECT o.prefix || o.host, SUM(u.visit_count) FROM moz_places u "  # nosec B608
+                "JOIN moz_origins o ON o.id = u.origin_id "
+                f"WHERE o.prefix IN ('http://', 'https://'){window} GROUP BY o.id",
+                params,
+            )
+        elif self.has_rev_host:
+            # nosec B608 - window is built from a resolved column name
+            rows = self.conn.execute(
+                "SELECT u.rev_host, SUM(u.visit_count) FROM moz_places u "  # nosec B608
+                f"WHERE u.url LIKE 'http%'{window} GROUP BY u.rev_host",
+                params,
+            )
+            rows = (("http://" + rev[::-1].lstrip("."), count) for rev, count in rows if rev)
+        else:
+            return super().host_totals(since)
+        for origin, count in rows:
+            host = url_host(origin)
+            if host is not None:
+                totals[host] = totals.get(host, 0) + (count or 0)
+        return totals
+
+    def top_pages(self, limit: int, since: int | None = None) -> list[tuple[str, str, int]]:
+        column = self.layout.last_visit_column
+        if since is not None and column is None:
+            return super().top_pages(limit, since)
+        window = "" if since is None else f" AND u.{column} >= ?"
+        # Ordered on the raw column so that the visit_count index can be walked
+        # nosec B608 - fragments are resolved column names
+        rows = self.conn.execute(
+            f"SELECT {self.layout.title}, u.url, {self.layout.visit_count} "  # nosec B608
+            f"FROM {self.layout.urls_table} u WHERE {self.layout.title} IS NOT NULL "
+            f"AND u.url LIKE 'http%'{window} ORDER BY u.visit_count DESC LIMIT ?",
+            (limit,) if since is None else (since - self.OFFSET, limit),
+        )
+        return rows.fetchall()
+
+
+class SafariHistory(NativeHistory):
+    """Safari ``History.db``, with time windows read from its visits."""
+
+    def _visited(self, where: str, params: tuple[object, ...], limit: int) -> list[HistoryRow]:
+        """Pages with visits matching ``where``, by their latest such visit, newest first."""
+        layout = self.layout
+        last = TIMESTAMP_CONVERSIONS["safari"].format(f"MAX(v.{layout.visit_time_column})")
+        # nosec B608 - fragments are constants and resolved column names
+        rows = self.conn.execute(
+            f"SELECT {layout.title}, u.url, {last} AS last_visit_time "  # nosec B608
+            f"FROM {layout.visits_table} v JOIN {layout.urls_table} u "
+            f"ON u.id = v.{layout.visit_url_column} WHERE {where} "
+            f"GROUP BY v.{layout.visit_url_column} ORDER BY last_visit_time DESC LIMIT ?",
+            (*params, limit),
+        )
+        return rows.fetchall()
+
+    def recent(self, since: int, limit: int) -> list[HistoryRow]:
+        if self.layout.visits_table is None:
+            return super().recent(since, limit)
+        where = f"v.{self.layout.visit_time_column} > ?"
+        return self._visited(where, (native_timestamp("safari", since),), limit)
+
+    def in_range(self, pattern: str, start: int, end: int, limit: int) -> list[HistoryRow]:
+        if self.layout.visits_table is None:
+            return super().in_range(pattern, start, end, limit)
+        time_column = f"v.{self.layout.visit_time_column}"
+        where = (
+            f"{time_column} >= ? AND {time_column} <= ? "
+            f"AND (u.url LIKE ? OR {self.layout.title} LIKE ?)"
+        )
+        params = (
+            native_timestamp("safari", start),
+            native_timestamp("safari", end),
+            pattern,
+            pattern,
+        )
+        return self._visited(where, params, limit)
+
+
+NATIVE_HISTORIES: dict[str, type[NativeHistory]] = {
+    "firefox": FirefoxHistory,
+    "safari": SafariHistory,
+}
+
+
+def get_native_history(conn: sqlite3.Connection) -> NativeHistory | None:
+    """Native-schema queries for a connection to a Firefox or Safari database.
+
+    Args:
+        conn: History connection
+
+    Returns:
+        NativeHistory for the database, or None for Chrome's schema,
+        including history index connections
+    """
+    if getattr(conn, "source_id", None) is not None:
+        return None
+    schema = detect_schema(conn)
+    history_class = NATIVE_HISTORIES.get(schema)
+    if history_class is None:
+        return None
+    return history_class(conn, resolve_layout(conn, schema))
@@ -0,0 +1,515 @@
+"""Browsing sessions reconstructed from visit chains.
+
+A session is a run of visits with no idle gap longer than
+``session_idle_minutes`` between consecutive visits. A visit reached from
+a visit of the current session (Chrome's ``visits.from_visit``, Firefox's
+``moz_historyvisits.from_visit``) bridges a longer pause, up to
+``LINKED_GAP_FACTOR`` idle gaps: a page left open over lunch and then
+clicked through continues the session it was opened in. Subframe visits
+(Chrome's AUTO_SUBFRAME and MANUAL_SUBFRAME transitions, Firefox's EMBED
+and FRAMED_LINK visit types) are not navigations and are skipped.
+
+Sessions are built in a single pass over the visits in time order, which
+holds only the session being built. In the history index, sessions are
+stored in ``sessions`` and extended at each ingest from the last visit the
+previous pass saw, recorded in ``session_state``; the last session stays
+open and is continued by later visits. Visits the browser deletes are
+taken out of the count of visits seen, and the sessions they fell in are
+regrouped from their remaining visits. If visits appear below that point
+(e.g. history synced in from another device) or the idle gap changes, the
+source's sessions are rebuilt.
+
+Connections without stored sessions (snapshots, with the index disabled)
+compute them on the fly with the same pass, keeping only the newest
+``limit`` sessions.
+"""
+
+import json
+import sqlite3
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from chronicle_mcp.database import format_chrome_timestamp, sanitize_url
+from chronicle_mcp.domains import url_host
+from chronicle_mcp.schemas import native_timestamp, resolve_layout
+from chronicle_mcp.timeline import VisitLayout, visit_layout
+
+MINUTE_MICROSECONDS = 60_000_000
+
+DEFAULT_IDLE_MINUTES = 30
+
+# A visit linked from the current session may follow this many idle gaps later
+LINKED_GAP_FACTOR = 4
+
+# Hosts counted per session; visits to further hosts only count towards the total
+MAX_SESSION_HOSTS = 50
+
+# Hosts listed in a session summary
+SUMMARY_HOSTS = 3
+
+# Chrome keeps the core transition type in the low byte of ``transition``
+CHROME_CORE_MASK = 0xFF
+
+# Transition values of visits that load into a frame rather than navigate
+SUBFRAME_TRANSITIONS = {
+    "chrome": frozenset({3, 4}),  # AUTO_SUBFRAME, MANUAL_SUBFRAME
+    "firefox": frozenset({4, 8}),  # TRANSITION_EMBED, TRANSITION_FRAMED_LINK
+}
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    source_id INTEGER NOT NULL,
+    start_time INTEGER NOT NULL,
+    first_visit_id INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    last_visit_id INTEGER NOT NULL,
+    visits INTEGER NOT NULL,
+    entry_url_id INTEGER,
+    hosts TEXT NOT NULL,
+    PRIMARY KEY (source_id, start_time, first_visit_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS session_state (
+    source_id INTEGER PRIMARY KEY,
+    idle_minutes INTEGER NOT NULL,
+    visit_time INTEGER NOT NULL,
+    visit_id INTEGER NOT NULL,
+    visits_seen INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class Session:
+    """A browsing session being built or read back.
+
+    ``entry`` identifies the first page of the session: its source url id
+    in the index, or its (title, url) when computed on the fly.
+    ``last_visit_id`` is the highest visit id in the session, which bounds
+    the visits later ones can be linked from.
+    """
+
+    start_time: int
+    end_time: int
+    first_visit_id: int
+    last_visit_id: int
+    visits: int = 0
+    entry: Any = None
+    hosts: dict[str, int] = field(default_factory=dict)
+
+    def add_host(self, host: str | None) -> None:
+        """Count a visit to a host, up to ``MAX_SESSION_HOSTS`` distinct hosts."""
+        if host is None:
+            return
+        if host in self.hosts or len(self.hosts) < MAX_SESSION_HOSTS:
+            self.hosts[host] = self.hosts.get(host, 0) + 1
+
+
+class SessionBuilder:
+    """Groups visits, fed in time order, into sessions.
+
+    Args:
+        idle_minutes: Longest pause between visits of one session
+        schema: Schema of the source, which decides the transition values
+        current: Open session to continue, e.g. one read back from the index
+    """
+
+    def __init__(self, idle_minutes: int, schema: str, current: Session | None = None):
+        self.idle_gap = idle_minutes * MINUTE_MICROSECONDS
+        self.subframes = SUBFRAME_TRANSITIONS.get(schema, frozenset())
+        self.mask = CHROME_CORE_MASK if schema == "chrome" else -1
+        self.current = current
+
+    def _linked(self, from_visit: int | None) -> bool:
+        """True if ``from_visit`` is a visit of the current session."""
+        session = self.current
+        return (
+            session is not None
+            and bool(from_visit)
+            and session.first_visit_id <= from_visit <= session.last_visit_id  # type: ignore[operator]
+        )
+
+    def add(
+        self,
+        visit_id: int | None,
+        visit_time: int,
+        from_visit: int | None,
+        transition: int | None,
+        host: str | None,
+        entry: Any,
+    ) -> Session | None:
+        """Add the next visit.
+
+        Returns:
+            The session this visit closed, if it starts a new one
+        """
+        if transition is not None and (transition & self.mask) in self.subframes:
+            return None
+
+        visit_id = visit_id or 0
+        closed = None
+        session = self.current
+        if session is not None:
+            gap = visit_time - session.end_time
+            if gap > self.idle_gap and not (
+                gap <= self.idle_gap * LINKED_GAP_FACTOR and self._linked(from_visit)
+            ):
+                closed, session = session, None
+        if session is None:
+            session = Session(visit_time, visit_time, visit_id, visit_id, entry=entry)
+            self.current = session
+
+        session.end_time = visit_time
+        session.last_visit_id = max(session.last_visit_id, visit_id)
+        session.visits += 1
+        session.add_host(host)
+        return closed
+
+
+def clear_sessions(writer: sqlite3.Connection, source_id: int) -> None:
+    """Drop the stored sessions of a source."""
+    writer.execute("DELETE FROM sessions WHERE source_id = ?", (source_id,))
+    writer.execute("DELETE FROM session_state WHERE source_id = ?", (source_id,))
+
+
+def _store(writer: sqlite3.Connection, source_id: int, sessions: list[Session]) -> None:
+    """Insert sessions, or update them if they were stored while still open."""
+    writer.executemany(
+        "INSERT INTO sessions (source_id, start_time, first_visit_id, end_time, "
+        "last_visit_id, visits, entry_url_id, hosts) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT DO UPDATE SET end_time = excluded.end_time, "
+        "last_visit_id = excluded.last_visit_id, visits = excluded.visits, "
+        "hosts = excluded.hosts",
+        (
+            (
+                source_id,
+                session.start_time,
+                session.first_visit_id,
+                session.end_time,
+                session.last_visit_id,
+                session.visits,
+                session.entry,
+                json.dumps(session.hosts),
+            )
+            for session in sessions
+        ),
+    )
+
+
+def _load(row: tuple[Any, ...]) -> Session:
+    """Session from (start, end, first and last visit id, visits, entry url id, hosts)."""
+    start_time, end_time, first_visit_id, last_visit_id, visits, entry, hosts = row[:7]
+    return Session(
+        start_time, end_time, first_visit_id, last_visit_id, visits, entry, json.loads(hosts)
+    )
+
+
+def _resume_point(
+    writer: sqlite3.Connection, source_id: int, idle_minutes: int
+) -> tuple[int, int, int] | None:
+    """Where the previous pass over a source stopped, if its sessions can be extended.
+
+    Returns:
+        (visit time, visit id, visits seen) of the last visit the pass
+        read, or None if the sessions have to be rebuilt
+    """
+    row = writer.execute(
+        "SELECT idle_minutes, visit_time, visit_id, visits_seen FROM session_state "
+        "WHERE source_id = ?",
+        (source_id,),
+    ).fetchone()
+    if row is None or row[0] != idle_minutes:
+        return None
+    _, visit_time, visit_id, visits_seen = row
+    # Both counts are ranges of index_visits_time
+    (at_or_before,) = writer.execute(
+        "SELECT (SELECT COUNT(*) FROM index_visits WHERE source_id = ? AND visit_time < ?) "
+        "+ (SELECT COUNT(*) FROM index_visits "
+        "WHERE source_id = ? AND visit_time = ? AND source_visit_id <= ?)",
+        (source_id, visit_time, source_id, visit_time, visit_id),
+    ).fetchone()
+    if at_or_before != visits_seen:
+        return None
+    return visit_time, visit_id, visits_seen
+
+
+def _visit_rows(
+    writer: sqlite3.Connection, source_id: int, condition: str, params: tuple[Any, ...]
+) -> sqlite3.Cursor:
+    """A source's index visits matching ``condition``, in time order, with their hosts."""
+    # nosec B608 - condition is built by this module
+    return writer.execute(
+        "SELECT v.source_visit_id, v.visit_time, v.from_visit, v.transition, "  # nosec B608
+        "v.source_url_id, u.host FROM index_visits v LEFT JOIN index_urls u "
+        "ON u.source_id = v.source_id AND u.source_url_id = v.source_url_id "
+        f"WHERE v.source_id = ? AND {condition} "
+        "ORDER BY v.visit_time, v.source_visit_id",
+        (source_id, *params),
+    )
+
+
+def remove_session_visits(
+    writer: sqlite3.Connection, source_id: int, visit_ids: list[int], idle_minutes: int
+) -> list[tuple[int, int]]:
+    """Take visits out of the stored sessions before they are deleted from the index.
+
+    The visits are taken out of the count of visits seen, so the next pass
+    still extends the sessions, and the sessions they fell in are dropped
+    to be regrouped by ``regroup_sessions`` once the visits are deleted.
+
+    Args:
+        writer: Index writer connection, inside the ingest transaction
+        source_id: Index source id
+        visit_ids: Source visit ids about to be deleted
+        idle_minutes: Longest pause between visits of one session
+
+    Returns:
+        (start time, end time) of the dropped sessions
+    """
+    state = writer.execute(
+        "SELECT idle_minutes, visit_time, visit_id FROM session_state WHERE source_id = ?",
+        (source_id,),
+    ).fetchone()
+    if state is None or state[0] != idle_minutes:
+        # Rebuilt by the next pass anyway
+        return []
+    resume = (state[1], state[2])
+    placeholders = ", ".join("?" * len(visit_ids))
+    rows = writer.execute(
+        "SELECT visit_time, source_visit_id FROM index_visits "  # nosec B608
+        f"WHERE source_id = ? AND visit_time IS NOT NULL AND source_visit_id IN ({placeholders})",
+        (source_id, *visit_ids),
+    ).fetchall()
+    seen = sum(1 for row in rows if row <= resume)
+    if seen:
+        writer.execute(
+            "UPDATE session_state SET visits_seen = visits_seen - ? WHERE source_id = ?",
+            (seen, source_id),
+        )
+
+    spans = []
+    for visit_time, _ in rows:
+        session = writer.execute(
+            "SELECT start_time, first_visit_id, end_time FROM sessions "
+            "WHERE source_id = ? AND start_time <= ? "
+            "ORDER BY start_time DESC, first_visit_id DESC LIMIT 1",
+            (source_id, visit_time),
+        ).fetchone()
+        if session is None or session[2] < visit_time:
+            # Subframe visits, or a session already dropped
+            continue
+        writer.execute(
+            "DELETE FROM sessions WHERE source_id = ? AND start_time = ? AND first_visit_id = ?",
+            (source_id, session[0], session[1]),
+        )
+        spans.append((session[0], session[2]))
+    return spans
+
+
+def regroup_sessions(
+    writer: sqlite3.Connection, source_id: int, spans: list[tuple[int, int]], idle_minutes: int
+) -> None:
+    """Store the sessions left in the spans of sessions that lost visits.
+
+    Taking visits out of a session only widens its gaps, so its remaining
+    visits regroup into one or more sessions within the same span.
+
+    Args:
+        writer: Index writer connection, inside the ingest transaction
+        source_id: Index source id
+        spans: (start time, end time) from ``remove_session_visits``
+        idle_minutes: Longest pause between visits of one session
+    """
+    if not spans:
+        return
+    (schema,) = writer.execute("SELECT schema FROM sources WHERE id = ?", (source_id,)).fetchone()
+    for start_time, end_time in spans:
+        builder = SessionBuilder(idle_minutes, schema or "chrome")
+        regrouped = []
+        rows = _visit_rows(
+            writer, source_id, "v.visit_time BETWEEN ? AND ?", (start_time, end_time)
+        )
+        for visit_id, visit_time, from_visit, transition, url_id, host in rows:
+            session = builder.add(visit_id, visit_time, from_visit, transition, host, url_id)
+            if session is not None:
+                regrouped.append(session)
+        if builder.current is not None:
+            regrouped.append(builder.current)
+        _store(writer, source_id, regrouped)
+
+
+def update_sessions(
+    writer: sqlite3.Connection,
+    source_id: int,
+    idle_minutes: int = DEFAULT_IDLE_MINUTES,
+    batch_size: int = 1000,
+) -> None:
+    """Extend a source's stored sessions with the visits ingested since the last pass.
+
+    Must run after the urls of those visits have been ingested, since the
+    hosts of a session come from them.
+
+    Args:
+        writer: Index writer connection, inside the ingest transaction
+        source_id: Index source id
+        idle_minutes: Longest pause between visits of one session
+        batch_size: Visits read, and closed sessions written, per batch
+    """
+    resume = _resume_point(writer, source_id, idle_minutes)
+    current = None
+    if resume is None:
+        clear_sessions(writer, source_id)
+        visit_time, visit_id, visits_seen = -1, 0, 0
+    else:
+        visit_time, visit_id, visits_seen = resume
+        row = writer.execute(
+            "SELECT start_time, end_time, first_visit_id, last_visit_id, visits, "
+            "entry_url_id, hosts FROM sessions WHERE source_id = ? "
+            "ORDER BY start_time DESC, first_visit_id DESC LIMIT 1",
+            (source_id,),
+        ).fetchone()
+        if row is not None:
+            current = _load(row)
+
+    (schema,) = writer.execute("SELECT schema FROM sources WHERE id = ?", (source_id,)).fetchone()
+    builder = SessionBuilder(idle_minutes, schema or "chrome", current)
+    rows = _visit_rows(
+        writer,
+        source_id,
+        "v.visit_time >= ? AND (v.visit_time > ? OR v.source_visit_id > ?)",
+        (visit_time, visit_time, visit_id),
+    )
+    while batch := rows.fetchmany(batch_size):
+        closed = []
+        for row_visit_id, row_time, from_visit, transition, url_id, host in batch:
+            session = builder.add(row_visit_id, row_time, from_visit, transition, host, url_id)
+            if session is not None:
+                closed.append(session)
+        _store(writer, source_id, closed)
+        visits_seen += len(batch)
+        visit_id, visit_time = batch[-1][0], batch[-1][1]
+
+    if builder.current is not None:
+        _store(writer, source_id, [builder.current])
+    writer.execute(
+        "INSERT OR REPLACE INTO session_state "
+        "(source_id, idle_minutes, visit_time, visit_id, visits_seen) VALUES (?, ?, ?, ?, ?)",
+        (source_id, idle_minutes, visit_time, visit_id, visits_seen),
+    )
+
+
+def _summary(session: Session, title: str | None, url: str | None) -> dict[str, Any]:
+    """Session summary, with its busiest hosts first."""
+    hosts = sorted(session.hosts.items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "start": format_chrome_timestamp(session.start_time),
+        "end": format_chrome_timestamp(session.end_time),
+        "duration_minutes": (session.end_time - session.start_time) // MINUTE_MICROSECONDS,
+        "visits": session.visits,
+        "entry_title": title,
+        "entry_url": sanitize_url(url) if url else None,
+        "top_hosts": hosts[:SUMMARY_HOSTS],
+    }
+
+
+def _stored_sessions(
+    conn: sqlite3.Connection, source_id: int, since: int | None, limit: int, idle_minutes: int
+) -> list[dict[str, Any]] | None:
+    """Summaries of a source's stored sessions, or None if they cannot answer the query.
+
+    Sources without visit rows have none stored, and sessions stored with
+    another idle gap are stale until the next ingest rebuilds them.
+    """
+    state = conn.execute(
+        "SELECT idle_minutes, visits_seen FROM main.session_state WHERE source_id = ?",
+        (source_id,),
+    ).fetchone()
+    if state is None or state[0] != idle_minutes or not state[1]:
+        return None
+    rows = conn.execute(
+        "SELECT s.start_time, s.end_time, s.first_visit_id, s.last_visit_id, s.visits, "
+        "s.entry_url_id, s.hosts, u.title, u.url FROM main.sessions s LEFT JOIN main.index_urls u "
+        "ON u.source_id = s.source_id AND u.source_url_id = s.entry_url_id "
+        "WHERE s.source_id = ? AND s.end_time >= ? "
+        "ORDER BY s.start_time DESC, s.first_visit_id DESC LIMIT ?",
+        (source_id, since if since is not None else 0, limit),
+    )
+    return [_summary(_load(row), *row[7:]) for row in rows]
+
+
+def _chain_columns(conn: sqlite3.Connection, layout: VisitLayout) -> tuple[str, str, str, str]:
+    """Visit id, from-visit and transition columns of a layout, and the schema of their values.
+
+    Sources read one row per url (no visit rows) have no visit chains.
+    """
+    source_id = getattr(conn, "source_id", None)
+    if source_id is not None:
+        if not layout.join:
+            return "NULL", "NULL", "NULL", layout.schema
+        row = conn.execute("SELECT schema FROM main.sources WHERE id = ?", (int(source_id),))
+        schema = (row.fetchone() or (None,))[0] or layout.schema
+        return "v.source_visit_id", "v.from_visit", "v.transition", schema
+    if not layout.join:
+        return "NULL", "NULL", "NULL", layout.schema
+    source_layout = resolve_layout(conn, layout.schema)
+    return "v.id", source_layout.from_visit, source_layout.transition, layout.schema
+
+
+def get_sessions(
+    conn: sqlite3.Connection,
+    since: int | None = None,
+    limit: int = 20,
+    idle_minutes: int = DEFAULT_IDLE_MINUTES,
+) -> list[dict[str, Any]]:
+    """Browsing sessions, newest first.
+
+    Index connections read the sessions stored at ingest. Other
+    connections group their visits on the fly, reading them in time order
+    and keeping only the newest ``limit`` sessions.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+        since: Only sessions still running at or after this Chrome timestamp
+        limit: Maximum number of sessions
+        idle_minutes: Longest pause between visits of one session
+
+    Returns:
+        List of session summaries with ``start``, ``end``,
+        ``duration_minutes``, ``visits``, ``entry_title``, ``entry_url``
+        and ``top_hosts`` ((host, visits) pairs, busiest first)
+    """
+    source_id = getattr(conn, "source_id", None)
+    if source_id is not None:
+        stored = _stored_sessions(conn, int(source_id), since, limit, idle_minutes)
+        if stored is not None:
+            return stored
+
+    layout = visit_layout(conn)
+    visit_id, from_visit, transition, schema = _chain_columns(conn, layout)
+    conditions = [layout.scope, f"{layout.time} IS NOT NULL"]
+    params: list[Any] = list(layout.scope_params)
+    if since is not None:
+        # A session running at ``since`` has a visit at most a linked gap before it
+        start = since - idle_minutes * MINUTE_MICROSECONDS * LINKED_GAP_FACTOR
+        conditions.append(f"{layout.time} >= ?")
+        params.append(native_timestamp(layout.schema, start))
+    order = layout.time if visit_id == "NULL" else f"{layout.time}, {visit_id}"
+    # nosec B608 - the fragments are constants and resolved column names
+    rows = conn.execute(
+        f"SELECT {visit_id}, {layout.chrome_time}, {from_visit}, {transition}, "  # nosec B608
+        f"{layout.title}, {layout.url} FROM {layout.visits} {layout.join} "
+        f"WHERE {' AND '.join(conditions)} ORDER BY {order}",
+        params,
+    )
+
+    builder = SessionBuilder(idle_minutes, schema)
+    newest: deque[Session] = deque(maxlen=limit)
+    for row_visit_id, row_time, row_from, row_transition, title, url in rows:
+        closed = builder.add(
+            row_visit_id, row_time, row_from, row_transition, url_host(url), (title, url)
+        )
+        if closed is not None and (since is None or closed.end_time >= since):
+            newest.append(closed)
+    if builder.current is not None and (since is None or builder.current.end_time >= since):
+        newest.append(builder.current)
+    return [_summary(session, *session.entry) for session in reversed(newest)]
@@ -0,0 +1,1192 @@
+"""Snapshot management for browser history databases.
+
+Browsers keep their history databases open while running, so ChronicleMCP
+queries a private copy (a snapshot) instead of the live file. Copying a
+multi-hundred-megabyte History file on every request is expensive, so this
+module keeps one reference-counted snapshot per browser/profile and only
+refreshes it when the source database changes or becomes too old.
+"""
+
+import atexit
+import errno
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from chronicle_mcp.config import SnapshotConfig, apply_env_overrides, load_config
+from chronicle_mcp.paths import split_browser
+
+logger = logging.getLogger(__name__)
+
+WAL_SUFFIX = "-wal"
+JOURNAL_SUFFIX = "-journal"
+
+SNAPSHOT_STRATEGIES = ("copy", "backup", "uri", "incremental")
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+
+# Kernel-assisted file copy methods, cheapest first
+COPY_METHODS = ("reflink", "copy_file_range", "sendfile", "userspace")
+
+# ioctl request number of FICLONE (_IOW(0x94, 9, int)) on Linux
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Connection.serialize/deserialize were added in Python 3.11
+MEMORY_SNAPSHOTS_SUPPORTED = hasattr(sqlite3.Connection, "deserialize")
+
+
+class SnapshotBudgetError(OSError):
+    """Raised when a snapshot does not fit in the configured disk budget."""
+
+
+class SourceFingerprint(NamedTuple):
+    """Identity of a source database file and its write-ahead log."""
+
+    size: int
+    mtime_ns: int
+    wal_size: int
+    wal_mtime_ns: int
+
+
+def fingerprint_source(source_path: str) -> SourceFingerprint:
+    """Fingerprint a database file so that changes can be detected cheaply.
+
+    Args:
+        source_path: Path to the browser's history database
+
+    Returns:
+        SourceFingerprint covering the main file and its -wal file (if any)
+
+    Raises:
+        OSError: If the main database file cannot be stat'ed
+    """
+    st = os.stat(source_path)
+    try:
+        wal_st = os.stat(source_path + WAL_SUFFIX)
+        wal_size, wal_mtime_ns = wal_st.st_size, wal_st.st_mtime_ns
+    except OSError:
+        wal_size, wal_mtime_ns = 0, 0
+    return SourceFingerprint(st.st_size, st.st_mtime_ns, wal_size, wal_mtime_ns)
+
+
+@dataclass
+class PageMap:
+    """Page digests of a snapshot, used to refresh it incrementally.
+
+    ``digests`` hold one digest per page of the copied main database file.
+    ``wal_header`` and ``wal_offset`` record the source WAL generation and
+    how far into it committed frames have been copied.
+    """
+
+    page_size: int
+    digests: list[bytes]
+    main_size: int
+    main_mtime_ns: int
+    wal_header: bytes = b""
+    wal_offset: int = 0
+
+
+@dataclass
+class Snapshot:
+    """A point-in-time copy of a browser history database."""
+
+    browser: str
+    source_path: str
+    path: str
+    fingerprint: SourceFingerprint
+    size_bytes: int
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    refcount: int = 0
+    retired: bool = False
+    schema: str | None = None
+    strategy: str = "copy"
+    immutable: bool = False
+    page_map: PageMap | None = None
+    copy_method: str | None = None
+    version: int = 0
+
+    @property
+    def direct(self) -> bool:
+        """True if the snapshot reads the source database in place."""
+        return self.strategy == "uri"
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was taken."""
+        return time.monotonic() - self.created_at
+
+
+def readonly_uri(path: str, immutable: bool = False) -> str:
+    """Build an SQLite URI that opens a database file read-only.
+
+    Args:
+        path: Path to the database file
+        immutable: Also tell SQLite the file cannot change (skips all locking)
+
+    Returns:
+        ``file:`` URI for ``sqlite3.connect(..., uri=True)``
+    """
+    params = "mode=ro&immutable=1" if immutable else "mode=ro"
+    return f"{Path(path).resolve().as_uri()}?{params}"
+
+
+def probe_direct_access(source_path: str) -> bool | None:
+    """Check whether the source database can be read in place.
+
+    Browsers hold an exclusive lock on their history database while running,
+    in which case reading it directly fails and a copy is needed.
+
+    Args:
+        source_path: Path to the browser's history database
+
+    Returns:
+        None if the database is locked; otherwise whether it may be opened
+        with ``immutable=1`` (no hot journal or WAL next to it)
+    """
+    try:
+        conn = sqlite3.connect(readonly_uri(source_path), uri=True, timeout=0)
+        try:
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError as e:
+        logger.debug(f"Direct access to {source_path} unavailable: {e}")
+        return None
+    return not any(os.path.exists(source_path + suffix) for suffix in (WAL_SUFFIX, JOURNAL_SUFFIX))
+
+
+def _copy_reflink(src_fd: int, dst_fd: int, size: int) -> None:
+    import fcntl
+
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+        if copied == 0:
+            break
+        offset += copied
+
+
+def _copy_sendfile(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
+
+def _copy_userspace(src_fd: int, dst_fd: int, size: int) -> None:
+    while chunk := os.read(src_fd, COPY_CHUNK_SIZE):
+        os.write(dst_fd, chunk)
+
+
+_COPIERS = {
+    "reflink": _copy_reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile": _copy_sendfile,
+    "userspace": _copy_userspace,
+}
+
+# Copy method that last worked for a (source device, destination device) pair
+_probed_methods: dict[tuple[int, int], str] = {}
+_probed_methods_lock = threading.Lock()
+
+
+def available_copy_methods() -> list[str]:
+    """Returns the copy methods this platform supports, cheapest first."""
+    methods = []
+    if sys.platform.startswith("linux"):
+        methods.append("reflink")
+        if hasattr(os, "copy_file_range"):
+            methods.append("copy_file_range")
+        if hasattr(os, "sendfile"):
+            methods.append("sendfile")
+    methods.append("userspace")
+    return methods
+
+
+def _drop_page_cache(fd: int) -> None:
+    """Advise the kernel that the pages just read will not be needed again."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError as e:
+            logger.debug(f"posix_fadvise failed: {e}")
+
+
+def fast_copy_file(source_path: str, dest_path: str, method: str = "auto") -> str:
+    """Copy a file with the cheapest method the filesystems support.
+
+    With ``method="auto"`` the methods in ``COPY_METHODS`` are probed in
+    order (reflink clone, ``copy_file_range``, ``sendfile``, then a plain
+    userspace copy) and the first one that works is remembered for the
+    source/destination device pair. Afterwards the kernel is advised to drop
+    the source pages from its cache, so snapshots do not evict the browser's
+    working set.
+
+    Args:
+        source_path: File to copy
+        dest_path: Destination file, created or truncated
+        method: One of ``COPY_METHODS`` or ``"auto"``
+
+    Returns:
+        Name of the copy method that was used
+
+    Raises:
+        ValueError: If the method is unknown
+        OSError: If the file cannot be copied
+    """
+    if method != "auto" and method not in COPY_METHODS:
+        raise ValueError(f"Unknown copy method '{method}'. Valid: auto, {', '.join(COPY_METHODS)}")
+
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        device_key = (os.fstat(src_fd).st_dev, os.fstat(dst_fd).st_dev)
+        size = os.fstat(src_fd).st_size
+
+        if method == "auto":
+            candidates = available_copy_methods()
+            with _probed_methods_lock:
+                probed = _probed_methods.get(device_key)
+            if probed in candidates:
+                candidates = candidates[candidates.index(probed) :]
+        else:
+            candidates = [method, "userspace"] if method != "userspace" else [method]
+
+        for name in candidates:
+            try:
+                _COPIERS[name](src_fd, dst_fd, size)
+            except OSError as e:
+                if name == "userspace" or e.errno in (errno.ENOSPC, errno.EIO):
+                    raise
+                logger.debug(f"{name} copy of {source_path} unavailable: {e}")
+                os.ftruncate(dst_fd, 0)
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                continue
+            break
+
+        if method == "auto":
+            with _probed_methods_lock:
+                _probed_methods[device_key] = name
+        if name != "reflink":
+            _drop_page_cache(src_fd)
+    return name
+
+
+def copy_database(
+    source_path: str, dest_path: str, attempts: int = 3, method: str = "auto"
+) -> tuple[SourceFingerprint, str]:
+    """Copy a database file together with its -wal file.
+
+    The copy is retried if the source changes while it is being copied, so
+    that the main file and WAL come from the same state where possible.
+
+    Args:
+        source_path: Path to the source database
+        dest_path: Path of the copy to create
+        attempts: Maximum number of copy attempts
+        method: File copy method passed to ``fast_copy_file``
+
+    Returns:
+        Tuple of (fingerprint of the source state that was copied, copy method used)
+    """
+    fingerprint = fingerprint_source(source_path)
+    for attempt in range(attempts):
+        used = fast_copy_file(source_path, dest_path, method)
+        if fingerprint.wal_size:
+            fast_copy_file(source_path + WAL_SUFFIX, dest_path + WAL_SUFFIX, method)
+        elif os.path.exists(dest_path + WAL_SUFFIX):
+            os.remove(dest_path + WAL_SUFFIX)
+
+        after = fingerprint_source(source_path)
+        if after == fingerprint:
+            break
+        logger.debug(f"{source_path} changed during copy (attempt {attempt + 1})")
+        fingerprint = after
+    return fingerprint, used
+
+
+def backup_database(source_path: str, dest_path: str) -> SourceFingerprint:
+    """Copy a database with SQLite's online backup API.
+
+    The backup reads inside a single transaction, so the copy is consistent
+    and includes committed WAL content.
+
+    Args:
+        source_path: Path to the source database
+        dest_path: Path of the copy to create
+
+    Returns:
+        Fingerprint of the source taken before the backup
+
+    Raises:
+        sqlite3.OperationalError: If the source database is locked
+    """
+    fingerprint = fingerprint_source(source_path)
+    src = sqlite3.connect(readonly_uri(source_path), uri=True, timeout=0, isolation_level=None)
+    try:
+        # Hold a read transaction so the backup fails fast instead of retrying
+        # forever if the browser owns an exclusive lock.
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        dst = sqlite3.connect(dest_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return fingerprint
+
+
+def _page_digest(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=16).digest()
+
+
+def _read_page_size(header: bytes) -> int:
+    """Read the page size from a database file header."""
+    if len(header) < 100 or not header.startswith(SQLITE_HEADER):
+        raise ValueError("Not an SQLite database file")
+    page_size = int.from_bytes(header[16:18], "big")
+    return 65536 if page_size == 1 else page_size
+
+
+def _sync_main_file(
+    source_path: str, dest_path: str, previous: PageMap | None
+) -> tuple[PageMap, int]:
+    """Rewrite the pages of ``dest_path`` whose digest differs from the source.
+
+    Returns:
+        Tuple of (PageMap describing ``dest_path``, number of pages written);
+        the ``wal_*`` fields are carried over from ``previous``
+    """
+    st = os.stat(source_path)
+    if (
+        previous is not None
+        and previous.main_size == st.st_size
+        and previous.main_mtime_ns == st.st_mtime_ns
+    ):
+        return previous, 0
+
+    pages_written = 0
+    digests: list[bytes] = []
+    with open(source_path, "rb") as src:
+        page_size = _read_page_size(src.read(100))
+        src.seek(0)
+        old = previous.digests if previous and previous.page_size == page_size else []
+        with open(dest_path, "r+b" if old and os.path.exists(dest_path) else "wb") as dst:
+            while page := src.read(page_size):
+                digest = _page_digest(page)
+                index = len(digests)
+                if index >= len(old) or old[index] != digest:
+                    dst.seek(index * page_size)
+                    dst.write(page)
+                    pages_written += 1
+                digests.append(digest)
+            dst.truncate(len(digests) * page_size)
+
+    logger.debug(f"Rewrote {pages_written} of {len(digests)} pages of {dest_path}")
+    page_map = PageMap(
+        page_size=page_size,
+        digests=digests,
+        main_size=st.st_size,
+        main_mtime_ns=st.st_mtime_ns,
+        wal_header=previous.wal_header if previous else b"",
+        wal_offset=previous.wal_offset if previous else 0,
+    )
+    return page_map, pages_written
+
+
+def _sync_wal_file(source_path: str, dest_path: str, page_map: PageMap) -> tuple[PageMap, int]:
+    """Copy committed WAL frames that are not yet in the snapshot.
+
+    Frames are only appended while the source WAL keeps the same header
+    (salt); after the browser restarts its WAL the whole log is recopied.
+    A trailing, not yet committed transaction is left out.
+
+    Returns:
+        Tuple of (updated PageMap, number of frames copied)
+    """
+    src_wal = source_path + WAL_SUFFIX
+    dst_wal = dest_path + WAL_SUFFIX
+    try:
+        wal_size = os.path.getsize(src_wal)
+    except OSError:
+        wal_size = 0
+    if wal_size < WAL_HEADER_SIZE:
+        if os.path.exists(dst_wal):
+            os.remove(dst_wal)
+        return replace(page_map, wal_header=b"", wal_offset=0), 0
+
+    with open(src_wal, "rb") as src:
+        header = src.read(WAL_HEADER_SIZE)
+        appending = header == page_map.wal_header and os.path.exists(dst_wal)
+        offset = page_map.wal_offset if appending else WAL_HEADER_SIZE
+        frame_size = WAL_FRAME_HEADER_SIZE + int.from_bytes(header[8:12], "big")
+        salt = header[16:24]
+
+        frames = 0
+        committed = offset
+        with open(dst_wal, "r+b" if appending else "wb") as dst:
+            if not appending:
+                dst.write(header)
+            src.seek(offset)
+            dst.seek(offset)
+            while len(frame := src.read(frame_size)) == frame_size:
+                if frame[8:16] != salt:
+                    break
+                dst.write(frame)
+                frames += 1
+                if int.from_bytes(frame[4:8], "big"):
+                    committed = src.tell()
+            dst.truncate(committed)
+
+    return replace(page_map, wal_header=header, wal_offset=committed), frames
+
+
+def sync_database(
+    source_path: str, dest_path: str, previous: PageMap | None = None, attempts: int = 3
+) -> tuple[SourceFingerprint, PageMap, int]:
+    """Bring a copy of a database up to date by rewriting only changed pages.
+
+    Pages of the main file are compared by digest against ``previous`` and
+    only differing pages are written; new committed WAL frames are appended.
+    With ``previous=None`` this is a full copy that also records the digests.
+    The destination must not be open while it is synced.
+
+    Args:
+        source_path: Path to the source database
+        dest_path: Path of the copy to create or update
+        previous: PageMap returned by the last sync of ``dest_path``
+        attempts: Maximum number of passes if the source changes meanwhile
+
+    Returns:
+        Tuple of (source fingerprint, new PageMap, pages and frames written)
+
+    Raises:
+        ValueError: If the source is not an SQLite database file
+    """
+    fingerprint = fingerprint_source(source_path)
+    page_map, written = _sync_main_file(source_path, dest_path, previous)
+    page_map, frames = _sync_wal_file(source_path, dest_path, page_map)
+    written += frames
+    for attempt in range(1, attempts):
+        after = fingerprint_source(source_path)
+        if after == fingerprint:
+            break
+        logger.debug(f"{source_path} changed during sync (attempt {attempt})")
+        fingerprint = after
+        page_map, pages = _sync_main_file(source_path, dest_path, page_map)
+        page_map, frames = _sync_wal_file(source_path, dest_path, page_map)
+        written += pages + frames
+
+    # The wal-index must be rebuilt from the updated WAL
+    shm_path = dest_path + "-shm"
+    if os.path.exists(shm_path):
+        os.remove(shm_path)
+    return fingerprint, page_map, written
+
+
+def default_snapshot_dir() -> str:
+    """Returns the default directory for snapshot files."""
+    return os.path.join(tempfile.gettempdir(), "chronicle-mcp", "snapshots")
+
+
+def remove_snapshot_files(path: str) -> None:
+    """Safely remove a snapshot file and its SQLite side files.
+
+    Args:
+        path: Path to the snapshot database file
+    """
+    for candidate in (path, path + WAL_SUFFIX, path + "-shm", path + JOURNAL_SUFFIX):
+        try:
+            if os.path.exists(candidate):
+                os.remove(candidate)
+                logger.debug(f"Removed snapshot file: {candidate}")
+        except OSError as e:
+            logger.warning(f"Failed to remove snapshot file {candidate}: {e}")
+
+
+def prepare_private_database(path: str) -> None:
+    """Create a database file, and its directory, readable by the current user only.
+
+    Persistent copies of history get the same protection as snapshots: a
+    new directory is created 0700 and the file 0600. SQLite gives the WAL
+    and shared-memory files the mode of the database file. Files left with
+    wider permissions by earlier versions are tightened.
+
+    Args:
+        path: Path to the database file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    if sys.platform != "win32":
+        for candidate in (path, path + WAL_SUFFIX, path + "-shm"):
+            if os.path.exists(candidate) and os.stat(candidate).st_mode & 0o077:
+                os.chmod(candidate, 0o600)
+
+
+class SnapshotManager:
+    """Keeps one reusable, reference-counted snapshot per browser/profile.
+
+    A snapshot is reused while the source database's size, mtime and WAL
+    state are unchanged and it is younger than ``max_staleness_seconds``.
+    When a refresh is needed while readers still hold the old snapshot, the
+    old one is retired and deleted once its last reader releases it.
+
+    Snapshots are taken with one of ``SNAPSHOT_STRATEGIES``:
+
+    - ``copy``: file copy of the database and its -wal file
+    - ``backup``: SQLite online backup (falls back to ``copy`` when locked)
+    - ``uri``: read the source in place when the browser is not holding a
+      lock (falls back to ``copy`` when locked)
+    - ``incremental``: page-level copy; an idle snapshot is refreshed in
+      place by rewriting only pages whose digest changed and appending new
+      WAL frames, so refresh cost follows the amount of new history
+
+    Full file copies use ``copy_method`` (see ``fast_copy_file``).
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        max_staleness_seconds: float = 60.0,
+        disk_budget_bytes: int = 2048 * 1024 * 1024,
+        reuse: bool = True,
+        strategy: str = "copy",
+        memory_browsers: list[str] | None = None,
+        memory_cap_bytes: int = 512 * 1024 * 1024,
+        copy_method: str = "auto",
+    ):
+        if strategy not in SNAPSHOT_STRATEGIES:
+            raise ValueError(
+                f"Unknown snapshot strategy '{strategy}'. Valid: {', '.join(SNAPSHOT_STRATEGIES)}"
+            )
+        if copy_method != "auto" and copy_method not in COPY_METHODS:
+            raise ValueError(
+                f"Unknown copy method '{copy_method}'. Valid: auto, {', '.join(COPY_METHODS)}"
+            )
+        self.reuse = reuse
+        self.strategy = strategy
+        self.copy_method = copy_method
+        self.directory = directory or default_snapshot_dir()
+        self.max_staleness_seconds = max_staleness_seconds
+        self.disk_budget_bytes = disk_budget_bytes
+        self._snapshots: dict[tuple[str, str], Snapshot] = {}
+        self._retired: list[Snapshot] = []
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._refreshes = 0
+        self._evictions = 0
+        self._incremental_refreshes = 0
+        self._pages_written = 0
+        self._strategy_counts: dict[str, int] = {}
+        self._copy_method_counts: dict[str, int] = {}
+        self._listeners: list[Callable[[Snapshot], None]] = []
+        self.memory = MemorySnapshotCache(self, memory_browsers or [], memory_cap_bytes)
+
+    @classmethod
+    def from_config(cls, config: SnapshotConfig) -> "SnapshotManager":
+        """Create a manager from a SnapshotConfig."""
+        strategy = config.strategy
+        if strategy not in SNAPSHOT_STRATEGIES:
+            logger.warning(f"Unknown snapshot strategy '{strategy}', using 'copy'")
+            strategy = "copy"
+        copy_method = config.copy_method
+        if copy_method != "auto" and copy_method not in COPY_METHODS:
+            logger.warning(f"Unknown snapshot copy method '{copy_method}', using 'auto'")
+            copy_method = "auto"
+        if config.memory_browsers and not MEMORY_SNAPSHOTS_SUPPORTED:
+            logger.warning("In-memory snapshots need Python 3.11+, serving from disk")
+        return cls(
+            directory=config.directory,
+            max_staleness_seconds=config.max_staleness_seconds,
+            disk_budget_bytes=config.disk_budget_mb * 1024 * 1024,
+            reuse=config.reuse,
+            strategy=strategy,
+            memory_browsers=config.memory_browsers,
+            memory_cap_bytes=config.memory_cap_mb * 1024 * 1024,
+            copy_method=copy_method,
+        )
+
+    def add_listener(self, callback: Callable[[Snapshot], None]) -> None:
+        """Register a callback run before a snapshot's files are removed or rewritten.
+
+        Callbacks run while the manager's lock is held and must not call back
+        into the manager.
+
+        Args:
+            callback: Function called with the affected snapshot
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, snapshot: Snapshot) -> None:
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.warning(f"Snapshot listener failed: {e}")
+
+    def _snapshot_path(self, browser: str, source_path: str) -> str:
+        """Generate a unique snapshot filename for a browser/profile."""
+        digest = hashlib.sha1(source_path.encode(), usedforsecurity=False).hexdigest()[:12]
+        self._generation += 1
+        # The digest tells profiles apart; profile names may not be valid in filenames
+        return os.path.join(
+            self.directory,
+            f"chronicle_{split_browser(browser)[0]}_{os.getpid()}_{digest}_{self._generation}.db",
+        )
+
+    def _is_fresh(self, snapshot: Snapshot, fingerprint: SourceFingerprint) -> bool:
+        return snapshot.fingerprint == fingerprint and snapshot.age < self.max_staleness_seconds
+
+    def _materialize(
+        self, source_path: str, dest_path: str
+    ) -> tuple[SourceFingerprint, str, PageMap | None, str | None]:
+        """Write a snapshot of ``source_path`` to ``dest_path``.
+
+        Returns:
+            Tuple of (source fingerprint, strategy actually used, page map for
+            incremental refresh, file copy method used)
+        """
+        if self.strategy == "backup":
+            try:
+                return backup_database(source_path, dest_path), "backup", None, None
+            except sqlite3.OperationalError as e:
+                logger.debug(f"Backup of {source_path} failed ({e}), falling back to copy")
+                remove_snapshot_files(dest_path)
+        if self.strategy == "incremental":
+            try:
+                fingerprint, page_map, written = sync_database(source_path, dest_path)
+                with self._lock:
+                    self._pages_written += written
+                return fingerprint, "incremental", page_map, None
+            except ValueError as e:
+                logger.debug(f"Page copy of {source_path} failed ({e}), falling back to copy")
+                remove_snapshot_files(dest_path)
+        fingerprint, copy_method = copy_database(source_path, dest_path, method=self.copy_method)
+        return fingerprint, "copy", None, copy_method
+
+    def _refresh_in_place(self, snapshot: Snapshot) -> bool:
+        """Incrementally bring an idle snapshot claimed by the caller up to date.
+
+        Returns:
+            True on success; on failure the snapshot is retired
+        """
+        with self._lock:
+            snapshot.version += 1
+            self._notify(snapshot)
+        try:
+            fingerprint, page_map, written = sync_database(
+                snapshot.source_path, snapshot.path, snapshot.page_map
+            )
+        except (OSError, ValueError) as e:
+            logger.debug(f"Incremental refresh of {snapshot.path} failed: {e}")
+            with self._lock:
+                snapshot.refcount -= 1
+                key = (snapshot.browser, snapshot.source_path)
+                if self._snapshots.get(key) is snapshot:
+                    del self._snapshots[key]
+                self._retire(snapshot)
+            return False
+
+        with self._lock:
+            snapshot.fingerprint = fingerprint
+            snapshot.page_map = page_map
+            snapshot.size_bytes = _files_size(snapshot.path)
+            snapshot.created_at = snapshot.last_used = time.monotonic()
+            self._refreshes += 1
+            self._incremental_refreshes += 1
+            self._pages_written += written
+        logger.debug(f"Refreshed {snapshot.path} in place ({written} pages/frames written)")
+        return True
+
+    def _install(self, key: tuple[str, str], snapshot: Snapshot) -> None:
+        """Make ``snapshot`` current for ``key`` (caller holds ``_lock``)."""
+        self._refreshes += 1
+        self._strategy_counts[snapshot.strategy] = (
+            self._strategy_counts.get(snapshot.strategy, 0) + 1
+        )
+        if snapshot.copy_method is not None:
+            self._copy_method_counts[snapshot.copy_method] = (
+                self._copy_method_counts.get(snapshot.copy_method, 0) + 1
+            )
+        previous = self._snapshots.get(key)
+        self._snapshots[key] = snapshot
+        if previous is not None:
+            self._retire(previous)
+
+    def _acquire_direct(
+        self, key: tuple[str, str], fingerprint: SourceFingerprint
+    ) -> Snapshot | None:
+        """Acquire a snapshot that reads the source in place, if it is unlocked."""
+        immutable = probe_direct_access(key[1])
+        if immutable is None:
+            return None
+
+        with self._lock:
+            current = self._snapshots.get(key)
+            if (
+                current is not None
+                and current.direct
+                and current.immutable == immutable
+                and self._is_fresh(current, fingerprint)
+            ):
+                current.refcount += 1
+                current.last_used = time.monotonic()
+                self._hits += 1
+                return current
+
+            snapshot = Snapshot(
+                browser=key[0],
+                source_path=key[1],
+                path=key[1],
+                fingerprint=fingerprint,
+                size_bytes=0,
+                refcount=1,
+                strategy="uri",
+                immutable=immutable,
+            )
+            self._install(key, snapshot)
+            return snapshot
+
+    def acquire(self, browser: str, source_path: str) -> Snapshot:
+        """Get a snapshot of the source database, refreshing it if needed.
+
+        The caller must call ``release`` once it no longer reads the snapshot.
+
+        Args:
+            browser: Browser name
+            source_path: Path to the browser's history database
+
+        Returns:
+            Snapshot with its reference count incremented
+
+        Raises:
+            SnapshotBudgetError: If the snapshot does not fit in the disk budget
+            OSError: If the source database cannot be copied
+        """
+        key = (browser, source_path)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            fingerprint = fingerprint_source(source_path)
+            if self.strategy == "uri":
+                direct = self._acquire_direct(key, fingerprint)
+                if direct is not None:
+                    return direct
+
+            with self._lock:
+                current = self._snapshots.get(key)
+                if (
+                    current is not None
+                    and not current.direct
+                    and self._is_fresh(current, fingerprint)
+                ):
+                    current.refcount += 1
+                    current.last_used = time.monotonic()
+                    self._hits += 1
+                    return current
+                self._reserve(fingerprint.size + fingerprint.wal_size, key)
+                # Readers of an idle snapshot are gone, so it can be updated in place
+                incremental = (
+                    current is not None and current.page_map is not None and current.refcount == 0
+                )
+                if incremental and current is not None:
+                    current.refcount = 1
+                dest_path = self._snapshot_path(browser, source_path)
+
+            if incremental and current is not None and self._refresh_in_place(current):
+                return current
+
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            try:
+                logger.debug(f"Snapshotting {browser} history to {dest_path}")
+                fingerprint, strategy, page_map, copy_method = self._materialize(
+                    source_path, dest_path
+                )
+            except BaseException:
+                remove_snapshot_files(dest_path)
+                raise
+
+            snapshot = Snapshot(
+                browser=browser,
+                source_path=source_path,
+                path=dest_path,
+                fingerprint=fingerprint,
+                size_bytes=_files_size(dest_path),
+                refcount=1,
+                strategy=strategy,
+                page_map=page_map,
+                copy_method=copy_method,
+            )
+            with self._lock:
+                self._install(key, snapshot)
+            return snapshot
+
+    def release(self, snapshot: Snapshot) -> None:
+        """Release a snapshot obtained from ``acquire``."""
+        with self._lock:
+            snapshot.refcount = max(0, snapshot.refcount - 1)
+            snapshot.last_used = time.monotonic()
+            if snapshot.retired and snapshot.refcount == 0:
+                self._discard(snapshot)
+
+    @contextmanager
+    def snapshot(self, browser: str, source_path: str) -> Generator[Snapshot, None, None]:
+        """Context manager that acquires and releases a snapshot."""
+        snap = self.acquire(browser, source_path)
+        try:
+            yield snap
+        finally:
+            self.release(snap)
+
+    def _retire(self, snapshot: Snapshot) -> None:
+        """Retire a snapshot; its files are removed once it has no readers."""
+        snapshot.retired = True
+        self._notify(snapshot)
+        if snapshot.refcount == 0:
+            self._delete_files(snapshot)
+        else:
+            self._retired.append(snapshot)
+
+    def _discard(self, snapshot: Snapshot) -> None:
+        if snapshot in self._retired:
+            self._retired.remove(snapshot)
+        self._delete_files(snapshot)
+
+    @staticmethod
+    def _delete_files(snapshot: Snapshot) -> None:
+        # Direct snapshots point at the browser's own database - never delete it
+        if not snapshot.direct:
+            remove_snapshot_files(snapshot.path)
+
+    def _disk_usage(self) -> int:
+        live = sum(s.size_bytes for s in self._snapshots.values())
+        return live + sum(s.size_bytes for s in self._retired)
+
+    def _reserve(self, incoming_bytes: int, key: tuple[str, str]) -> None:
+        """Evict idle snapshots until ``incoming_bytes`` fit in the disk budget.
+
+        The snapshot currently stored under ``key`` is about to be replaced, so
+        its size does not count against the budget unless readers still hold it.
+        """
+        current = self._snapshots.get(key)
+        usage = self._disk_usage()
+        if current is not None and current.refcount == 0:
+            usage -= current.size_bytes
+
+        idle = sorted(
+            ((k, s) for k, s in self._snapshots.items() if k != key and s.refcount == 0),
+            key=lambda item: item[1].last_used,
+        )
+        for idle_key, idle_snapshot in idle:
+            if usage + incoming_bytes <= self.disk_budget_bytes:
+                break
+            del self._snapshots[idle_key]
+            self._retire(idle_snapshot)
+            usage -= idle_snapshot.size_bytes
+            self._evictions += 1
+            logger.debug(f"Evicted idle snapshot {idle_snapshot.path}")
+
+        if usage + incoming_bytes > self.disk_budget_bytes:
+            raise SnapshotBudgetError(
+                f"Snapshot of {incoming_bytes} bytes exceeds disk budget "
+                f"({usage} of {self.disk_budget_bytes} bytes in use)"
+            )
+
+    def invalidate(self, browser: str | None = None, source_path: str | None = None) -> None:
+        """Drop cached snapshots so the next access takes a fresh copy.
+
+        Args:
+            browser: Only invalidate this browser's snapshots; all if None
+            source_path: Only invalidate the snapshot of this profile database
+        """
+        with self._lock:
+            for key in [
+                k
+                for k in self._snapshots
+                if (browser is None or k[0] == browser)
+                and (source_path is None or k[1] == source_path)
+            ]:
+                self._retire(self._snapshots.pop(key))
+
+    def close(self) -> None:
+        """Remove every snapshot file owned by this manager."""
+        self.memory.close()
+        with self._lock:
+            for snapshot in list(self._snapshots.values()) + self._retired:
+                snapshot.retired = True
+                self._notify(snapshot)
+                self._delete_files(snapshot)
+            self._snapshots.clear()
+            self._retired.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get snapshot statistics."""
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "retired": len(self._retired),
+                "disk_usage_bytes": self._disk_usage(),
+                "disk_budget_bytes": self.disk_budget_bytes,
+                "hits": self._hits,
+                "refreshes": self._refreshes,
+                "evictions": self._evictions,
+                "incremental_refreshes": self._incremental_refreshes,
+                "pages_written": self._pages_written,
+                "strategy": self.strategy,
+                "strategies_used": dict(self._strategy_counts),
+                "copy_method": self.copy_method,
+                "copy_methods_used": dict(self._copy_method_counts),
+                "memory": self.memory.get_stats(),
+            }
+
+
+@dataclass
+class MemorySnapshot:
+    """A browser history database held in an in-memory SQLite connection."""
+
+    browser: str
+    source_path: str
+    conn: sqlite3.Connection
+    fingerprint: SourceFingerprint
+    size_bytes: int
+    created_at: float = field(default_factory=time.monotonic)
+    refcount: int = 0
+    retired: bool = False
+    schema: str | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was loaded."""
+        return time.monotonic() - self.created_at
+
+
+def load_into_memory(
+    path: str, immutable: bool = False, factory: type[sqlite3.Connection] = sqlite3.Connection
+) -> tuple[sqlite3.Connection, int]:
+    """Load a database file into a read-only ``:memory:`` connection.
+
+    Args:
+        path: Path to the database file
+        immutable: Open the file with ``immutable=1``
+        factory: Connection class for the in-memory connection
+
+    Returns:
+        Tuple of (in-memory connection, size of the database image in bytes)
+    """
+    src = sqlite3.connect(readonly_uri(path, immutable), uri=True)
+    try:
+        image = bytearray(src.serialize())  # type: ignore[attr-defined]
+    finally:
+        src.close()
+
+    # In-memory databases cannot use WAL; mark the image as a rollback-journal database
+    if len(image) >= 20:
+        image[18] = image[19] = 1
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False, factory=factory)
+    conn.deserialize(bytes(image))  # type: ignore[attr-defined]
+    conn.execute("PRAGMA query_only=1")
+    return conn, len(image)
+
+
+class MemorySnapshotCache:
+    """LRU cache of in-memory snapshots for frequently queried browsers.
+
+    Only browsers listed in ``browsers`` are kept in memory. The database is
+    serialized once from a disk snapshot (or the source itself with the
+    ``uri`` strategy) and deserialized into a ``:memory:`` connection, which
+    is reloaded when the source changes. Queries on one in-memory snapshot
+    are serialized by its lock. Entries are evicted least-recently-used first
+    to stay within ``max_bytes``; a database larger than the cap is served
+    from disk instead.
+    """
+
+    def __init__(
+        self,
+        manager: SnapshotManager,
+        browsers: list[str],
+        max_bytes: int,
+    ):
+        self.manager = manager
+        self.browsers = {b.lower() for b in browsers}
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], MemorySnapshot] = OrderedDict()
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._too_large: dict[tuple[str, str], SourceFingerprint] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+
+    def enabled_for(self, browser: str) -> bool:
+        """True if ``browser`` should be served from memory."""
+        return MEMORY_SNAPSHOTS_SUPPORTED and split_browser(browser)[0] in self.browsers
+
+    def acquire(
+        self,
+        browser: str,
+        source_path: str,
+        factory: type[sqlite3.Connection] = sqlite3.Connection,
+    ) -> MemorySnapshot | None:
+        """Get the in-memory snapshot of a database, loading or refreshing it.
+
+        Args:
+            browser: Browser name
+            source_path: Path to the browser's history database
+            factory: Connection class used when the database is (re)loaded
+
+        Returns:
+            MemorySnapshot with its reference count incremented, or None if the
+            database does not fit in the memory cap
+        """
+        key = (browser, source_path)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            fingerprint = fingerprint_source(source_path)
+            with self._lock:
+                current = self._entries.get(key)
+                if (
+                    current is not None
+                    and current.fingerprint == fingerprint
+                    and current.age < self.manager.max_staleness_seconds
+                ):
+                    current.refcount += 1
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return current
+                if self._too_large.get(key) == fingerprint:
+                    return None
+
+            with self.manager.snapshot(browser, source_path) as disk_snapshot:
+                conn, size = load_into_memory(disk_snapshot.path, disk_snapshot.immutable, factory)
+                fingerprint = disk_snapshot.fingerprint
+            # The disk copy is no longer needed once the database is in memory,
+            # unless it can be refreshed incrementally for the next reload
+            if self.manager.strategy != "incremental":
+                self.manager.invalidate(browser, source_path)
+
+            with self._lock:
+                if not self._make_room(size, key):
+                    conn.close()
+                    self._too_large[key] = fingerprint
+                    logger.info(
+                        f"{browser} history ({size} bytes) exceeds the in-memory cap, "
+                        "serving it from disk"
+                    )
+                    return None
+
+                self._too_large.pop(key, None)
+                entry = MemorySnapshot(
+                    browser=browser,
+                    source_path=source_path,
+                    conn=conn,
+                    fingerprint=fingerprint,
+                    size_bytes=size,
+                    refcount=1,
+                )
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._retire(previous)
+                self._entries[key] = entry
+                self._loads += 1
+                return entry
+
+    def release(self, entry: MemorySnapshot) -> None:
+        """Release an in-memory snapshot obtained from ``acquire``."""
+        with self._lock:
+            entry.refcount = max(0, entry.refcount - 1)
+            if entry.retired and entry.refcount == 0:
+                entry.conn.close()
+
+    def _retire(self, entry: MemorySnapshot) -> None:
+        entry.retired = True
+        if entry.refcount == 0:
+            entry.conn.close()
+
+    def _make_room(self, incoming_bytes: int, key: tuple[str, str]) -> bool:
+        """Evict LRU entries until ``incoming_bytes`` fit (caller holds ``_lock``)."""
+        if incoming_bytes > self.max_bytes:
+            return False
+        usage = sum(e.size_bytes for k, e in self._entries.items() if k != key)
+        for lru_key in [k for k in self._entries if k != key]:
+            if usage + incoming_bytes <= self.max_bytes:
+                break
+            evicted = self._entries.pop(lru_key)
+            usage -= evicted.size_bytes
+            self._retire(evicted)
+            self._evictions += 1
+            logger.debug(f"Evicted in-memory snapshot of {evicted.browser}")
+        return usage + incoming_bytes <= self.max_bytes
+
+    def close(self) -> None:
+        """Close every in-memory snapshot."""
+        with self._lock:
+            for entry in self._entries.values():
+                self._retire(entry)
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get in-memory snapshot statistics."""
+        with self._lock:
+            return {
+                "browsers": sorted(self.browsers),
+                "entries": len(self._entries),
+                "memory_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "memory_cap_bytes": self.max_bytes,
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+            }
+
+
+def _files_size(path: str) -> int:
+    """Total size of a database file and its -wal file."""
+    size = os.path.getsize(path)
+    if os.path.exists(path + WAL_SUFFIX):
+        size += os.path.getsize(path + WAL_SUFFIX)
+    return size
+
+
+_default_manager: SnapshotManager | None = None
+_default_manager_lock = threading.Lock()
+
+
+def get_snapshot_manager() -> SnapshotManager:
+    """Returns the process-wide snapshot manager, creating it from config."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            config = apply_env_overrides(load_config())
+            _default_manager = SnapshotManager.from_config(config.snapshot)
+            atexit.register(_default_manager.close)
+        return _default_manager
@@ -0,0 +1,223 @@
+"""Merging one browser's history into another's.
+
+Source pages are streamed from a cursor into a temporary ``sync_incoming``
+table on the target connection, keyed by URL, so duplicates within the
+source collapse as they arrive. One pass over the target's own table then
+records which incoming URLs it already has (``sync_matches``). The merge
+walks the incoming URLs in key order, a chunk at a time: each chunk is
+planned in Python and written with ``executemany`` in its own transaction,
+so memory and transaction size stay bounded however large the source is.
+
+Merge strategies decide what happens to URLs present in both histories:
+
+- ``latest``: the more recently visited copy wins; its title and last
+  visit time replace the target's, visit counts are left alone
+- ``combine``: visit counts are added up, and the title and last visit
+  time come from the more recent copy
+- ``dedupe``: the target's copy is kept as is
+
+URLs the target does not have are inserted under every strategy.
+
+Chrome and Firefox histories can be written to. Safari keeps titles and
+times on its visit rows, which have no page-level equivalent to write.
+"""
+
+import sqlite3
+from typing import Any, NamedTuple
+
+from chronicle_mcp.database import detect_schema, urls_source
+from chronicle_mcp.domains import reverse_host, url_host
+from chronicle_mcp.schemas import TIMESTAMP_CONVERSIONS, native_timestamp, table_columns
+
+# Source rows staged, and target rows written, per batch
+SYNC_BATCH_SIZE = 5000
+
+# Schemas whose page table can be written to
+SYNC_TARGET_SCHEMAS = ("chrome", "firefox")
+
+
+class TargetTable(NamedTuple):
+    """Page table of a target database and its columns."""
+
+    table: str
+    title: str
+    visit_count: str
+    last_visit: str
+    schema: str
+    rev_host: bool
+
+
+class SyncCounts(NamedTuple):
+    """Outcome of a merge: pages read from the source, inserted and updated."""
+
+    source_entries: int
+    new_entries: int
+    updated_entries: int
+
+
+def target_table(conn: sqlite3.Connection) -> TargetTable:
+    """Works out the page table of a target connection.
+
+    Raises:
+        ValueError: If the schema has no page table that can be written
+    """
+    schema = detect_schema(conn)
+    if schema == "chrome":
+        return TargetTable("urls", "title", "visit_count", "last_visit_time", schema, False)
+    if schema == "firefox":
+        rev_host = "rev_host" in table_columns(conn, "moz_places")
+        return TargetTable(
+            "moz_places", "title", "visit_count", "last_visit_date", schema, rev_host
+        )
+    raise ValueError(f"Cannot sync into {schema} history")
+
+
+def _stage(source: sqlite3.Connection, target: sqlite3.Connection, batch_size: int) -> int:
+    """Copy the source's pages into ``sync_incoming``; returns the number of rows read."""
+    target.execute("DROP TABLE IF EXISTS temp.sync_incoming")
+    target.execute(
+        "CREATE TEMP TABLE sync_incoming (url TEXT PRIMARY KEY, title TEXT, "
+        "visit_count INTEGER NOT NULL, last_visit_time INTEGER NOT NULL) WITHOUT ROWID"
+    )
+    # nosec B608 - the FROM source is a resolved table expression
+    rows = source.execute(
+        "SELECT url, title, COALESCE(visit_count, 0), COALESCE(last_visit_time, 0) "  # nosec B608
+        f"FROM {urls_source(source)} WHERE url IS NOT NULL"
+    )
+    read = 0
+    while batch := rows.fetchmany(batch_size):
+        # The same URL twice (e.g. a merged profile) counts once, with both visit counts
+        target.executemany(
+            "INSERT INTO temp.sync_incoming VALUES (?, ?, ?, ?) ON CONFLICT (url) DO UPDATE "
+            "SET visit_count = visit_count + excluded.visit_count, "
+            "title = CASE WHEN excluded.last_visit_time > last_visit_time "
+            "THEN COALESCE(excluded.title, title) ELSE COALESCE(title, excluded.title) END, "
+            "last_visit_time = MAX(last_visit_time, excluded.last_visit_time)",
+            batch,
+        )
+        read += len(batch)
+    target.commit()
+    return read
+
+
+def _match(target: sqlite3.Connection, table: TargetTable) -> None:
+    """Record the target's copy of every incoming URL it has in ``sync_matches``."""
+    target.execute("DROP TABLE IF EXISTS temp.sync_matches")
+    target.execute(
+        "CREATE TEMP TABLE sync_matches (url TEXT PRIMARY KEY, target_id INTEGER NOT NULL, "
+        "title TEXT, visit_count INTEGER NOT NULL, last_visit_time INTEGER NOT NULL) "
+        "WITHOUT ROWID"
+    )
+    last_visit = TIMESTAMP_CONVERSIONS[table.schema].format(f"t.{table.last_visit}")
+    # One scan of the target, probing the incoming URLs by key
+    # nosec B608 - table and columns are module constants
+    target.execute(
+        "INSERT OR IGNORE INTO temp.sync_matches "  # nosec B608
+        f"SELECT t.url, t.id, t.{table.title}, COALESCE(t.{table.visit_count}, 0), "
+        f"COALESCE({last_visit}, 0) FROM {table.table} t "
+        "WHERE t.url IN (SELECT url FROM temp.sync_incoming)"
+    )
+    target.commit()
+
+
+def _native_time(schema: str, timestamp: int) -> int | float | None:
+    """A Chrome timestamp in the target's epoch; Firefox leaves unvisited pages NULL."""
+    if schema == "firefox" and not timestamp:
+        return None
+    return native_timestamp(schema, timestamp)
+
+
+def _plan(strategy: str, row: tuple[Any, ...]) -> tuple[str | None, int, int] | None:
+    """New (title, visit count, last visit) of a URL both histories have, or None to keep it."""
+    _, title, visit_count, last_visit, _, own_title, own_count, own_last = row
+    newer = last_visit > own_last
+    if strategy == "dedupe" or (strategy == "latest" and not newer):
+        return None
+    merged_title = (title or own_title) if newer else (own_title or title)
+    if strategy == "latest":
+        return merged_title, own_count, last_visit
+    if not visit_count and not newer:
+        return None
+    return merged_title, own_count + visit_count, max(last_visit, own_last)
+
+
+def merge_history(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    strategy: str = "latest",
+    apply: bool = True,
+    batch_size: int = SYNC_BATCH_SIZE,
+) -> SyncCounts:
+    """Merge the pages of one history into another.
+
+    Args:
+        source: Connection to read pages from, in any supported schema
+        target: Connection to write pages to; only read unless ``apply``
+        strategy: 'latest', 'combine' or 'dedupe'
+        apply: If False, count what would change without writing
+        batch_size: Rows per staging batch and per write transaction
+
+    Returns:
+        SyncCounts of the merge
+
+    Raises:
+        ValueError: If the target's schema cannot be written to
+    """
+    table = target_table(target)
+    insert_columns = f"url, {table.title}, {table.visit_count}, {table.last_visit}"
+    if table.rev_host:
+        insert_columns += ", rev_host"
+    placeholders = ", ".join("?" * len(insert_columns.split(", ")))
+    # nosec B608 - table and columns are module constants
+    insert = f"INSERT INTO {table.table} ({insert_columns}) VALUES ({placeholders})"  # nosec B608
+    update = (
+        f"UPDATE {table.table} SET {table.title} = ?, "  # nosec B608
+        f"{table.visit_count} = ?, {table.last_visit} = ? WHERE id = ?"
+    )
+
+    try:
+        read = _stage(source, target, batch_size)
+        _match(target, table)
+        new_entries = updated_entries = 0
+        after = ""
+        while rows := target.execute(
+            "SELECT i.url, i.title, i.visit_count, i.last_visit_time, m.target_id, m.title, "
+            "m.visit_count, m.last_visit_time FROM temp.sync_incoming i "
+            "LEFT JOIN temp.sync_matches m ON m.url = i.url "
+            "WHERE i.url > ? ORDER BY i.url LIMIT ?",
+            (after, batch_size),
+        ).fetchall():
+            inserts = []
+            updates = []
+            for row in rows:
+                url, title, visit_count, last_visit, target_id = row[:5]
+                if target_id is None:
+                    values = [url, title, visit_count, _native_time(table.schema, last_visit)]
+                    if table.rev_host:
+                        host = url_host(url)
+                        values.append(f"{reverse_host(host)}." if host else "")
+                    inserts.append(values)
+                elif (merged := _plan(strategy, row)) is not None:
+                    merged_title, merged_count, merged_last = merged
+                    updates.append(
+                        (
+                            merged_title,
+                            merged_count,
+                            _native_time(table.schema, merged_last),
+                            target_id,
+                        )
+                    )
+            if apply:
+                target.executemany(insert, inserts)
+                target.executemany(update, updates)
+                target.commit()
+            new_entries += len(inserts)
+            updated_entries += len(updates)
+            after = rows[-1][0]
+        return SyncCounts(read, new_entries, updated_entries)
+    except BaseException:
+        target.rollback()
+        raise
+    finally:
+        target.execute("DROP TABLE IF EXISTS temp.sync_incoming")
+        target.execute("DROP TABLE IF EXISTS temp.sync_matches")
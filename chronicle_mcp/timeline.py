@@ -0,0 +1,334 @@
+"""Visit-level history: timelines and time-of-day histograms.
+
+The other queries read one row per page, dated by its last visit, so a
+page visited on Tuesday afternoon and again on Friday only shows up on
+Friday. The functions here read the visit rows instead: Chrome's
+``visits``, Firefox's ``moz_historyvisits`` and Safari's
+``history_visits``, or the copies of them in the history index. Time
+windows filter the raw visit time column, so they are range scans of the
+visit time index of each database.
+
+Sources without visit rows (browsers that only keep per-page counts) fall
+back to one visit per page, at its last visit time.
+
+Histograms count visits per hour of the day and per day of the week,
+either at a fixed UTC offset or in the machine's time zone. In the time
+zone, each visit is shifted by the offset in force when it happened, so
+visits from summer and winter are both counted at their wall-clock hour.
+With NumPy installed (``pip install chronicle-mcp[analytics]``) the visit
+times are bucketed as one array; otherwise in a Python loop.
+"""
+
+import bisect
+import sqlite3
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+
+from chronicle_mcp.database import detect_schema, format_chrome_timestamp, sanitize_url
+from chronicle_mcp.schemas import (
+    TIMESTAMP_CONVERSIONS,
+    UNIX_EPOCH_OFFSET_SECONDS,
+    get_native_history,
+    native_timestamp,
+    resolve_layout,
+)
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None  # type: ignore[assignment]
+
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86_400
+
+# 1970-01-01 was a Thursday; weekdays count from Monday = 0 as in datetime
+UNIX_EPOCH_WEEKDAY = 3
+
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+CHROME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+
+
+class VisitLayout(NamedTuple):
+    """Where a connection's visit rows live, as SQL fragments.
+
+    ``time`` is the raw visit time column, which windows filter and sort
+    on so that its index is used, and ``schema`` the schema whose epoch
+    and unit it is in. ``chrome_time`` is the same time as a Chrome
+    timestamp.
+    """
+
+    visits: str
+    join: str
+    title: str
+    url: str
+    time: str
+    chrome_time: str
+    scope: str
+    scope_params: tuple[int, ...]
+    schema: str
+
+
+def visit_layout(conn: sqlite3.Connection) -> VisitLayout:
+    """Works out where a connection's visits live.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+
+    Returns:
+        VisitLayout for the connection
+    """
+    source_id = getattr(conn, "source_id", None)
+    if source_id is not None:
+        source_id = int(source_id)
+        has_visits = conn.execute(
+            "SELECT 1 FROM main.index_visits WHERE source_id = ? LIMIT 1", (source_id,)
+        ).fetchone()
+        if has_visits:
+            return VisitLayout(
+                visits="main.index_visits v",
+                join=(
+                    "JOIN main.index_urls u "
+                    "ON u.source_id = v.source_id AND u.source_url_id = v.source_url_id"
+                ),
+                title="u.title",
+                url="u.url",
+                time="v.visit_time",
+                chrome_time="v.visit_time",
+                scope="v.source_id = ?",
+                scope_params=(source_id,),
+                schema="chrome",
+            )
+        return VisitLayout(
+            visits="main.index_urls v",
+            join="",
+            title="v.title",
+            url="v.url",
+            time="v.last_visit_time",
+            chrome_time="v.last_visit_time",
+            scope="v.source_id = ?",
+            scope_params=(source_id,),
+            schema="chrome",
+        )
+
+    schema = detect_schema(conn)
+    layout = resolve_layout(conn, schema)
+    if layout.visits_table is not None:
+        time = f"v.{layout.visit_time_column}"
+        return VisitLayout(
+            visits=f"{layout.visits_table} v",
+            join=f"JOIN {layout.urls_table} u ON u.id = v.{layout.visit_url_column}",
+            title=layout.title,
+            url="u.url",
+            time=time,
+            chrome_time=TIMESTAMP_CONVERSIONS[schema].format(time),
+            scope="1",
+            scope_params=(),
+            schema=schema,
+        )
+
+    native = get_native_history(conn)
+    return VisitLayout(
+        visits=f"{'urls' if native is None else native.relation} v",
+        join="",
+        title="v.title",
+        url="v.url",
+        time="v.last_visit_time",
+        chrome_time="v.last_visit_time",
+        scope="1",
+        scope_params=(),
+        schema="chrome",
+    )
+
+
+def _window(layout: VisitLayout, start: int | None, end: int | None) -> tuple[str, tuple[Any, ...]]:
+    """WHERE clause selecting the visits from ``start`` up to, not including, ``end``."""
+    conditions = [layout.scope, f"{layout.time} IS NOT NULL"]
+    params: list[Any] = list(layout.scope_params)
+    if start is not None:
+        conditions.append(f"{layout.time} >= ?")
+        params.append(native_timestamp(layout.schema, start))
+    if end is not None:
+        conditions.append(f"{layout.time} < ?")
+        params.append(native_timestamp(layout.schema, end))
+    return " AND ".join(conditions), tuple(params)
+
+
+def to_chrome_timestamp(value: str) -> int:
+    """Converts an ISO 8601 date or time to a Chrome timestamp.
+
+    Times without a UTC offset are taken as local time.
+
+    Args:
+        value: ISO 8601 string, e.g. '2024-03-05T14:00' or '2024-03-05'
+
+    Returns:
+        Microseconds since 1601-01-01 UTC
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or time
+    """
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return int((moment - CHROME_EPOCH).total_seconds() * 1_000_000)
+
+
+def local_offset_seconds(unix_seconds: int) -> int:
+    """UTC offset of the machine's time zone at a moment, in seconds."""
+    try:
+        offset = datetime.fromtimestamp(unix_seconds, timezone.utc).astimezone().utcoffset()
+    except (OverflowError, OSError, ValueError):
+        # Outside what the platform's time functions cover
+        return 0
+    return int(offset.total_seconds()) if offset is not None else 0
+
+
+def local_offset_steps(days: Iterable[int]) -> tuple[list[int], list[int]]:
+    """The machine's UTC offsets over some UTC days, as a step function.
+
+    The offset is looked up at the start and the end of each day, and a
+    day on which it changes is bisected to the second of the transition,
+    so the number of lookups grows with the days, not the visits.
+
+    Args:
+        days: Days since 1970-01-01 UTC, ascending
+
+    Returns:
+        (start of each step in Unix seconds, offset in seconds from then on)
+    """
+    starts: list[int] = []
+    offsets: list[int] = []
+    for day in days:
+        first = day * SECONDS_PER_DAY
+        last = first + SECONDS_PER_DAY - 1
+        before, after = local_offset_seconds(first), local_offset_seconds(last)
+        if not offsets or offsets[-1] != before:
+            starts.append(first)
+            offsets.append(before)
+        if after != before:
+            # Find the first second of the new offset
+            low, high = first, last
+            while high - low > 1:
+                middle = (low + high) // 2
+                if local_offset_seconds(middle) == before:
+                    low = middle
+                else:
+                    high = middle
+            starts.append(high)
+            offsets.append(after)
+    return starts, offsets
+
+
+def get_visits(
+    conn: sqlite3.Connection,
+    start: int,
+    end: int,
+    query: str | None = None,
+    limit: int = 100,
+) -> list[tuple[str, str, str]]:
+    """Visits in a time window, newest first, one row per visit.
+
+    A page visited several times in the window appears once per visit.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+        start: Start of the window, as a Chrome timestamp (inclusive)
+        end: End of the window, as a Chrome timestamp (exclusive)
+        query: Optional term the title or URL must contain
+        limit: Maximum results
+
+    Returns:
+        List of (title, url, timestamp) tuples
+    """
+    layout = visit_layout(conn)
+    where, params = _window(layout, start, end)
+    if query:
+        where += f" AND ({layout.title} LIKE ? OR {layout.url} LIKE ?)"
+        params = (*params, f"%{query}%", f"%{query}%")
+    # nosec B608 - the fragments are constants and resolved column names
+    rows = conn.execute(
+        f"SELECT {layout.title}, {layout.url}, {layout.chrome_time} "  # nosec B608
+        f"FROM {layout.visits} {layout.join} WHERE {where} ORDER BY {layout.time} DESC LIMIT ?",
+        (*params, limit),
+    )
+    return [(title, sanitize_url(url), format_chrome_timestamp(ts)) for title, url, ts in rows]
+
+
+# Rows of one visit time each, as Chrome timestamps
+TimeRows = list[tuple[int]]
+
+
+def _bucket_python(times: TimeRows, offset_seconds: int | None) -> tuple[list[int], list[int]]:
+    """Hour-of-day and day-of-week counts, one visit at a time."""
+    hours = [0] * HOURS_PER_DAY
+    weekdays = [0] * DAYS_PER_WEEK
+    utc = [ts // 1_000_000 - UNIX_EPOCH_OFFSET_SECONDS for (ts,) in times]
+    if offset_seconds is None:
+        starts, offsets = local_offset_steps(sorted({t // SECONDS_PER_DAY for t in utc}))
+        local = [t + offsets[bisect.bisect_right(starts, t) - 1] for t in utc]
+    else:
+        local = [t + offset_seconds for t in utc]
+    for t in local:
+        days, seconds = divmod(t, SECONDS_PER_DAY)
+        hours[seconds // SECONDS_PER_HOUR] += 1
+        weekdays[(days + UNIX_EPOCH_WEEKDAY) % DAYS_PER_WEEK] += 1
+    return hours, weekdays
+
+
+def _bucket_numpy(times: TimeRows, offset_seconds: int | None) -> tuple[list[int], list[int]]:
+    """Hour-of-day and day-of-week counts, computed over all visits at once."""
+    utc = numpy.array(times, dtype=numpy.int64).reshape(-1) // 1_000_000 - UNIX_EPOCH_OFFSET_SECONDS
+    if offset_seconds is None:
+        starts, offsets = local_offset_steps(numpy.unique(utc // SECONDS_PER_DAY).tolist())
+        steps = numpy.searchsorted(numpy.array(starts, dtype=numpy.int64), utc, side="right") - 1
+        local = utc + numpy.array(offsets, dtype=numpy.int64)[steps]
+    else:
+        local = utc + offset_seconds
+    days, seconds = numpy.divmod(local, SECONDS_PER_DAY)
+    hours = numpy.bincount(seconds // SECONDS_PER_HOUR, minlength=HOURS_PER_DAY)
+    weekdays = numpy.bincount((days + UNIX_EPOCH_WEEKDAY) % DAYS_PER_WEEK, minlength=DAYS_PER_WEEK)
+    return hours.tolist(), weekdays.tolist()
+
+
+def visit_histogram(
+    conn: sqlite3.Connection,
+    start: int | None = None,
+    end: int | None = None,
+    utc_offset_minutes: int | None = 0,
+) -> dict[str, Any]:
+    """Visits per hour of the day and per day of the week.
+
+    Args:
+        conn: Connection from ``HistoryIndex.connection`` or a snapshot
+        start: Only count visits at or after this Chrome timestamp
+        end: Only count visits before this Chrome timestamp
+        utc_offset_minutes: Fixed UTC offset the hours and days are counted
+            at, or None for the machine's time zone, with each visit at the
+            offset in force when it happened
+
+    Returns:
+        Dictionary with ``total_visits``, ``hour_of_day`` (24 counts,
+        midnight first), ``day_of_week`` (7 counts, Monday first), and
+        ``utc_offset_minutes`` (None in the machine's time zone)
+    """
+    layout = visit_layout(conn)
+    where, params = _window(layout, start, end)
+    # Times only: on the index this reads the visit time index alone
+    # nosec B608 - the fragments are constants and resolved column names
+    times = conn.execute(
+        f"SELECT {layout.chrome_time} FROM {layout.visits} WHERE {where}",  # nosec B608
+        params,
+    ).fetchall()
+    bucket = _bucket_python if numpy is None else _bucket_numpy
+    offset_seconds = None if utc_offset_minutes is None else utc_offset_minutes * 60
+    hours, weekdays = bucket(times, offset_seconds)
+    return {
+        "total_visits": len(times),
+        "hour_of_day": hours,
+        "day_of_week": weekdays,
+        "utc_offset_minutes": utc_offset_minutes,
+    }
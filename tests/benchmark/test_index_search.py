@@ -0,0 +1,146 @@
+"""Benchmarks comparing search paths over a large history index.
+
+The ``like`` path is today's ``title LIKE '%q%' OR url LIKE '%q%'`` scan;
+the ``fts`` path answers the same word query from the full-text index, and
+the ``trigram`` path answers substring queries from the trigram index. Domain
+counts compare the ``url LIKE '%domain%'`` scan with the reversed-host range,
+fuzzy search compares the full scan with vocabulary lookups, and regex
+search compares the streaming REGEXP scan with trigram candidates.
+"""
+
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.database import (
+    count_domain_visits,
+    query_history,
+    search_with_fuzzy,
+    search_with_regex,
+)
+from chronicle_mcp.index import (
+    HistoryIndex,
+    count_host_visits,
+    search_fulltext,
+    search_fuzzy,
+    search_regex,
+    search_substring,
+)
+
+ROWS = 50_000
+
+
+@pytest.fixture(scope="module")
+def large_index(tmp_path_factory):
+    """Ingests a large Chrome-style history into a fresh index."""
+    from chronicle_mcp import connection
+
+    directory = tmp_path_factory.mktemp("index")
+    db_path = str(directory / "History")
+    writer = sqlite3.connect(db_path)
+    writer.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER)"
+    )
+    writer.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"https://site{i % 5000}.example.com/issues/PROJ-{i}",
+                f"Page {i} about topic{i % 997}",
+                i % 50,
+                13_300_000_000_000_000 + i,
+            )
+            for i in range(ROWS)
+        ),
+    )
+    writer.commit()
+    writer.close()
+
+    history_index = HistoryIndex(str(directory / "index.db"), batch_size=5000)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connection, "get_browser_path", lambda browser: db_path)
+        history_index.refresh("chrome")
+        yield history_index, mp
+    history_index.close()
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["like", "fts"])
+def test_word_search(benchmark, large_index, mode):
+    history_index, _ = large_index
+
+    def search() -> list:
+        with history_index.connection("chrome") as conn:
+            if mode == "fts":
+                return search_fulltext(conn, "topic42", 20)
+            return query_history(conn, "topic42", 20)
+
+    results = benchmark(search)
+
+    assert len(results) == 20
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["like", "trigram"])
+def test_substring_search(benchmark, large_index, mode):
+    history_index, _ = large_index
+    search_func = search_substring if mode == "trigram" else query_history
+
+    def search() -> list:
+        with history_index.connection("chrome") as conn:
+            return search_func(conn, "PROJ-4242", 20)
+
+    results = benchmark(search)
+
+    with history_index.connection("chrome") as conn:
+        assert results == query_history(conn, "PROJ-4242", 20)
+    assert len(results) == 11
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["like", "host"])
+def test_domain_count(benchmark, large_index, mode):
+    history_index, _ = large_index
+    count_func = count_host_visits if mode == "host" else count_domain_visits
+
+    def count() -> int:
+        with history_index.connection("chrome") as conn:
+            return count_func(conn, "site4242.example.com")
+
+    total = benchmark(count)
+
+    assert total == sum(i % 50 for i in range(4242, ROWS, 5000))
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["scan", "vocabulary"])
+def test_fuzzy_search(benchmark, large_index, mode):
+    history_index, _ = large_index
+    search_func = search_fuzzy if mode == "vocabulary" else search_with_fuzzy
+    with history_index.connection("chrome") as conn:
+        search_fuzzy(conn, "warm", 0.6, 1)  # loads the vocabulary outside the timing
+
+    def search() -> list:
+        with history_index.connection("chrome") as conn:
+            return search_func(conn, "tpoic42", 0.6, 20)
+
+    results = benchmark(search)
+
+    assert len(results) == 20
+    assert all(title.endswith("topic42") for title, _, _, _ in results)
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["scan", "trigram"])
+def test_regex_search(benchmark, large_index, mode):
+    history_index, _ = large_index
+    search_func = search_regex if mode == "trigram" else search_with_regex
+
+    def search() -> list:
+        with history_index.connection("chrome") as conn:
+            return search_func(conn, r"/PROJ-4242\d*$", 20)
+
+    results = benchmark(search)
+
+    assert len(results) == 11
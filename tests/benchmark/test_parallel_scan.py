@@ -0,0 +1,81 @@
+"""Benchmarks for full-history fuzzy and regex scans, serial and across processes.
+
+Parallel scans scale with the number of CPU cores; on a single core they
+only add the cost of starting the chunks in worker processes.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.config import ScanConfig
+from chronicle_mcp.database import search_with_fuzzy, search_with_regex
+from chronicle_mcp.parallel import search_fuzzy_parallel, search_regex_parallel, shutdown_scan_pool
+
+ROWS = 50_000
+
+SCAN = ScanConfig(processes=max(2, os.cpu_count() or 1), chunk_rows=5_000, min_rows=1)
+
+
+@pytest.fixture(scope="module")
+def large_history(tmp_path_factory):
+    """Creates a large Chrome-style history."""
+    db_path = str(tmp_path_factory.mktemp("scan") / "History")
+    writer = sqlite3.connect(db_path)
+    writer.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER)"
+    )
+    writer.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"https://site{i % 5000}.example.com/issues/PROJ-{i}",
+                f"Page {i} about topic{i % 997}",
+                i % 50,
+                13_300_000_000_000_000 + i,
+            )
+            for i in range(ROWS)
+        ),
+    )
+    writer.commit()
+    writer.close()
+    yield db_path
+    shutdown_scan_pool()
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["serial", "parallel"])
+def test_fuzzy_scan(benchmark, large_history, mode):
+    conn = sqlite3.connect(large_history)
+
+    def search() -> list:
+        if mode == "parallel":
+            return search_fuzzy_parallel(conn, "tpoic42", 0.6, 20, SCAN)
+        return search_with_fuzzy(conn, "tpoic42", 0.6, 20)
+
+    try:
+        results = benchmark(search)
+    finally:
+        conn.close()
+
+    assert len(results) == 20
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["serial", "parallel"])
+def test_regex_scan(benchmark, large_history, mode):
+    conn = sqlite3.connect(large_history)
+
+    def search() -> list:
+        if mode == "parallel":
+            return search_regex_parallel(conn, r"topic9\d\d$|PROJ-99\d\d$", 20, SCAN)
+        return search_with_regex(conn, r"topic9\d\d$|PROJ-99\d\d$", 20)
+
+    try:
+        results = benchmark(search)
+    finally:
+        conn.close()
+
+    assert len(results) == 20
@@ -0,0 +1,87 @@
+"""Benchmarks for time-window statistics over a large history index.
+
+The ``visits`` path aggregates the visit rows of the window on every
+request; the ``rollup`` path reads the hourly and daily rollups.
+"""
+
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.database import chrome_cutoff
+from chronicle_mcp.index import HistoryIndex, get_top_hosts
+
+URLS = 20_000
+VISITS = 200_000
+DAYS = 90
+
+
+@pytest.fixture(scope="module")
+def visit_index(tmp_path_factory):
+    """Ingests a Chrome-style history with visits spread over 90 days."""
+    from chronicle_mcp import connection
+
+    directory = tmp_path_factory.mktemp("rollups")
+    db_path = str(directory / "History")
+    now = chrome_cutoff(0)
+    writer = sqlite3.connect(db_path)
+    writer.executescript("""
+        CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT,
+            visit_count INTEGER DEFAULT 0, last_visit_time INTEGER);
+        CREATE TABLE visits (id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,
+            from_visit INTEGER, transition INTEGER);
+    """)
+    writer.executemany(
+        "INSERT INTO urls (id, url, title, visit_count, last_visit_time) VALUES (?, ?, ?, 0, ?)",
+        (
+            (i, f"https://site{i % 500}.example.com/page/{i}", f"Page {i}", now)
+            for i in range(1, URLS + 1)
+        ),
+    )
+    step = DAYS * 24 * 3_600_000_000 // VISITS
+    writer.executemany(
+        "INSERT INTO visits (url, visit_time, from_visit, transition) VALUES (?, ?, 0, 0)",
+        ((i * 7919 % URLS + 1, now - i * step) for i in range(VISITS)),
+    )
+    writer.commit()
+    writer.close()
+
+    history_index = HistoryIndex(str(directory / "index.db"), batch_size=10_000)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connection, "get_browser_path", lambda browser: db_path)
+        history_index.refresh("chrome")
+        yield history_index
+    history_index.close()
+
+
+def _top_hosts_from_visits(conn: sqlite3.Connection, since: int, limit: int) -> list:
+    """Top hosts aggregated from the visit rows of the window."""
+    rows = conn.execute(
+        "SELECT u.host, COUNT(*) AS total FROM main.index_visits v JOIN main.index_urls u "
+        "ON u.source_id = v.source_id AND u.source_url_id = v.source_url_id "
+        "WHERE v.source_id = ? AND v.visit_time >= ? AND u.host IS NOT NULL "
+        "GROUP BY u.host ORDER BY total DESC, u.host LIMIT ?",
+        (conn.source_id, since, limit),  # type: ignore[attr-defined]
+    )
+    return rows.fetchall()
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("mode", ["visits", "rollup"])
+def test_top_domains_last_7_days(benchmark, visit_index, mode):
+    # A window starting on a day boundary, so both paths count the same visits
+    since = chrome_cutoff(24 * 7)
+    since -= since % (24 * 3_600_000_000)
+
+    def top() -> list:
+        with visit_index.connection("chrome") as conn:
+            if mode == "rollup":
+                return get_top_hosts(conn, 10, since=since)
+            return _top_hosts_from_visits(conn, since, 10)
+
+    results = benchmark(top)
+
+    with visit_index.connection("chrome") as conn:
+        assert [tuple(row) for row in results] == [
+            tuple(row) for row in _top_hosts_from_visits(conn, since, 10)
+        ]
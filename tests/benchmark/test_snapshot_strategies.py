@@ -0,0 +1,124 @@
+"""Benchmarks comparing snapshot strategies on a large WAL-mode history database.
+
+Each benchmark round takes a fresh snapshot and runs the first query against it,
+so the timings cover copy time plus first-query latency. Every round also checks
+that rows which only exist in the -wal file are visible (consistency).
+"""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.connection import connect_readonly
+from chronicle_mcp.snapshot import SnapshotManager
+
+BASE_ROWS = 200_000
+WAL_ROWS = 20_000
+
+
+@pytest.fixture(scope="module")
+def large_history_db(tmp_path_factory):
+    """Creates a large Chrome-style database with recent rows left in the WAL."""
+    db_path = str(tmp_path_factory.mktemp("large") / "History")
+    writer = sqlite3.connect(db_path)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER)"
+    )
+    writer.execute("CREATE INDEX urls_last_visit ON urls(last_visit_time)")
+    writer.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"https://site{i % 5000}.example.com/page/{i}",
+                f"Page {i}",
+                i % 50,
+                13_300_000_000_000_000 + i,
+            )
+            for i in range(BASE_ROWS)
+        ),
+    )
+    writer.commit()
+    writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    writer.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        (
+            (f"https://recent.example.com/{i}", f"Recent {i}", 1, 13_400_000_000_000_000 + i)
+            for i in range(WAL_ROWS)
+        ),
+    )
+    writer.commit()
+    assert os.path.getsize(db_path + "-wal") > 0
+    yield db_path
+    writer.close()
+
+
+def _snapshot_and_query(manager: SnapshotManager, db_path: str) -> tuple[int, str]:
+    with manager.snapshot("chrome", db_path) as snap:
+        conn = connect_readonly(snap.path, snap.immutable)
+        try:
+            newest = conn.execute(
+                "SELECT title FROM urls ORDER BY last_visit_time DESC LIMIT 1"
+            ).fetchone()[0]
+            total = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        finally:
+            conn.close()
+    return total, newest
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("strategy", ["copy", "backup", "uri"])
+def test_snapshot_strategy(benchmark, tmp_path, large_history_db, strategy):
+    manager = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy=strategy)
+    try:
+        total, newest = benchmark.pedantic(
+            _snapshot_and_query,
+            args=(manager, large_history_db),
+            setup=manager.invalidate,
+            rounds=5,
+        )
+    finally:
+        manager.close()
+
+    assert total == BASE_ROWS + WAL_ROWS
+    assert newest == f"Recent {WAL_ROWS - 1}"
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("strategy", ["copy", "incremental"])
+def test_snapshot_refresh_after_small_change(benchmark, tmp_path, large_history_db, strategy):
+    """Refresh cost after a few new visits; incremental should not recopy the file."""
+    db_path = str(tmp_path / "History")
+    for suffix in ("", "-wal"):
+        shutil.copy2(large_history_db + suffix, db_path + suffix)
+    manager = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy=strategy)
+    writer = sqlite3.connect(db_path)
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    added = 0
+
+    def add_visits() -> None:
+        nonlocal added
+        writer.executemany(
+            "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+            [
+                (f"https://new.example.com/{added + i}", "New", 1, 13_500_000_000_000_000)
+                for i in range(10)
+            ],
+        )
+        writer.commit()
+        added += 10
+
+    try:
+        _snapshot_and_query(manager, db_path)
+        total, _ = benchmark.pedantic(
+            _snapshot_and_query, args=(manager, db_path), setup=add_visits, rounds=5
+        )
+    finally:
+        writer.close()
+        manager.close()
+
+    assert total == BASE_ROWS + WAL_ROWS + added
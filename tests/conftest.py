@@ -16,6 +16,39 @@ def generate_chrome_timestamp(days_ago: int = 0, hours_ago: int = 0) -> int:
     return int((cutoff - chrome_epoch).total_seconds() * 1_000_000)
 
 
+@pytest.fixture(autouse=True)
+def isolated_history_index(monkeypatch, tmp_path):
+    """Points the history index at a per-test database instead of the user's data dir."""
+    from chronicle_mcp import index
+
+    history_index = index.HistoryIndex(str(tmp_path / "index.db"))
+    monkeypatch.setattr(index, "_default_index", history_index)
+    yield history_index
+    history_index.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_query_cache(monkeypatch):
+    """Gives each test an empty query result cache."""
+    from chronicle_mcp import cache
+
+    query_cache = cache.QueryCache()
+    monkeypatch.setattr(cache, "_query_cache", query_cache)
+    return query_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_coalescing(monkeypatch):
+    """Gives each test its own request coalescers."""
+    from chronicle_mcp import coalesce
+
+    single_flight = coalesce.SingleFlight()
+    monkeypatch.setattr(coalesce, "_coalesce_enabled", True)
+    monkeypatch.setattr(coalesce, "_single_flight", single_flight)
+    monkeypatch.setattr(coalesce, "_async_single_flight", coalesce.AsyncSingleFlight())
+    return single_flight
+
+
 @pytest.fixture
 def temp_dir():
     """Provides a temporary directory for test artifacts."""
@@ -0,0 +1,121 @@
+"""Tests for the async service facade.
+
+These tests verify that service calls run off the event loop, concurrently,
+and that cancellation reaches running SQLite queries.
+"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from chronicle_mcp.core import AsyncHistoryService
+from chronicle_mcp.core.async_services import run_blocking
+
+ENDLESS_QUERY = (
+    "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT COUNT(*) FROM r"
+)
+
+
+class TestAsyncHistoryService:
+    """Tests for AsyncHistoryService."""
+
+    @pytest.mark.asyncio
+    async def test_delegates_to_history_service(self, monkeypatch):
+        from chronicle_mcp.core import services
+
+        calls = []
+
+        def fake_search(query, limit=5, browser="chrome", format_type="markdown"):
+            calls.append(threading.current_thread().name)
+            return {"query": query, "limit": limit}
+
+        monkeypatch.setattr(services.HistoryService, "search_history", fake_search)
+
+        result = await AsyncHistoryService.search_history(query="github", limit=3)
+
+        assert result == {"query": "github", "limit": 3}
+        assert calls[0].startswith("chronicle-worker")
+
+    @pytest.mark.asyncio
+    async def test_calls_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def blocking() -> int:
+            return barrier.wait()
+
+        results = await asyncio.gather(run_blocking(blocking), run_blocking(blocking))
+
+        assert sorted(results) == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self):
+        release = threading.Event()
+        task = asyncio.ensure_future(run_blocking(release.wait, 5))
+
+        # The loop can still run other coroutines while the worker blocks
+        await asyncio.sleep(0.01)
+        assert not task.done()
+
+        release.set()
+        assert await task is True
+
+
+class TestCancellation:
+    """Tests for cancellation of running service calls."""
+
+    @pytest.mark.asyncio
+    async def test_cancel_interrupts_running_query(self, mock_chrome_path):
+        from chronicle_mcp.connection import get_history_connection
+
+        started = threading.Event()
+        outcome: list[BaseException] = []
+        finished = threading.Event()
+
+        def endless_query() -> None:
+            try:
+                with get_history_connection("chrome") as conn:
+                    started.set()
+                    conn.execute(ENDLESS_QUERY).fetchone()
+            except BaseException as e:
+                outcome.append(e)
+                raise
+            finally:
+                finished.set()
+
+        task = asyncio.ensure_future(run_blocking(endless_query))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await asyncio.get_running_loop().run_in_executor(None, finished.wait, 5)
+        assert isinstance(outcome[0], sqlite3.OperationalError)
+        assert "interrupted" in str(outcome[0])
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_service_call(self, monkeypatch):
+        from chronicle_mcp.protocols import http
+
+        class DisconnectedRequest:
+            class url:
+                path = "/api/search"
+
+            async def is_disconnected(self) -> bool:
+                return True
+
+        cancelled = asyncio.Event()
+
+        async def slow_call() -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(http, "DISCONNECT_POLL_SECONDS", 0.01)
+
+        with pytest.raises(http.ClientDisconnected):
+            await http.call_service(DisconnectedRequest(), slow_call)  # type: ignore[arg-type]
+        await asyncio.wait_for(cancelled.wait(), 1)
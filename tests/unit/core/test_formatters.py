@@ -266,13 +266,18 @@ class TestFormatSyncPreview:
         assert "firefox" in result
         assert "latest" in result
 
+    def test_breakdown(self):
+        result = format_sync_preview("chrome", "firefox", 100, "latest", 60, 40)
+        assert "100 entries (60 new, 40 updated)" in result
+
 
 class TestFormatSyncResult:
     """Tests for format_sync_result function."""
 
     def test_format(self):
         result = format_sync_result("chrome", "firefox", 100, "latest")
-        assert "Synced 100" in result
+        assert "Merge plan: 100" in result
+        assert "Nothing was written" in result
         assert "chrome" in result
         assert "firefox" in result
 
@@ -167,3 +167,117 @@ class TestGetDownloads:
         assert "count" in result
         assert "browser" in result
         assert "message" in result
+
+
+class TestFederatedSearch:
+    """Tests for searching several browsers at once."""
+
+    def test_all_browsers_merge_newest_first(self, mock_all_browsers):
+        result = HistoryService.get_recent_history(hours=24 * 365 * 100, limit=10, browser="all")
+
+        timestamps = [ts for _, _, ts in result["results"]]
+        assert timestamps == sorted(timestamps, reverse=True)
+        assert result["browsers"] == ["chrome", "firefox"]
+        assert result["sources"][0] == "chrome"
+        assert result["sources"][-1] == "firefox"
+        assert result["failed"] == {}
+
+    def test_limit_applies_across_browsers(self, mock_all_browsers):
+        result = HistoryService.get_recent_history(
+            hours=24 * 365 * 100, limit=6, browser=["chrome", "firefox"]
+        )
+
+        assert result["count"] == 6
+        assert result["sources"] == ["chrome"] * 5 + ["firefox"]
+
+    def test_unreadable_browser_is_reported(self, mock_chrome_path):
+        result = HistoryService.search_history("python", browser="chrome,edge", limit=10)
+
+        assert result["count"] == 2
+        assert set(result["sources"]) == {"chrome"}
+        assert "edge" in result["failed"]
+        assert "Browser: chrome" in result["message"]
+
+    def test_every_browser_unreadable(self, mock_chrome_path):
+        with pytest.raises(BrowserNotFoundError):
+            HistoryService.search_history("python", browser=["edge", "safari"])
+
+    def test_single_browser_has_no_sources(self, mock_chrome_path):
+        result = HistoryService.search_history("python", browser="chrome")
+
+        assert "sources" not in result
+
+    def test_sequential_without_fanout_pool(self, monkeypatch, mock_all_browsers):
+        from chronicle_mcp.core import services
+
+        monkeypatch.setattr(services, "get_fanout_executor", lambda: None)
+        result = HistoryService.search_history_advanced(
+            "o", browser="all", limit=20, sort_by="title"
+        )
+
+        titles = [title for title, _, _ in result["results"]]
+        assert titles == sorted(titles, key=str.lower)
+        assert "firefox" in result["sources"]
+
+    def test_fuzzy_results_merge_by_score(self, mock_all_browsers):
+        result = HistoryService.search_history_advanced(
+            "mozila", browser="all", use_fuzzy=True, fuzzy_threshold=0.8
+        )
+
+        assert [title for title, _, _ in result["results"]] == ["Mozilla"]
+        assert result["sources"] == ["firefox"]
+
+
+@pytest.fixture
+def chrome_profiles(monkeypatch, tmp_path, sample_chrome_db):
+    """Two Chrome profiles, Personal (the sample history) and Work, with their own snapshots."""
+    import json
+    import shutil
+    import sqlite3
+
+    from chronicle_mcp import paths, snapshot
+
+    os_name = paths.get_os_name()
+    root = tmp_path / "google-chrome"
+    for directory in ("Default", "Profile 1"):
+        (root / directory).mkdir(parents=True)
+        shutil.copy(sample_chrome_db, root / directory / "History")
+    conn = sqlite3.connect(root / "Profile 1" / "History")
+    conn.execute("UPDATE urls SET title = 'Work: ' || title, last_visit_time = last_visit_time + 1")
+    conn.commit()
+    conn.close()
+    info_cache = {"Default": {"name": "Personal"}, "Profile 1": {"name": "Work"}}
+    (root / "Local State").write_text(json.dumps({"profile": {"info_cache": info_cache}}))
+
+    monkeypatch.setitem(paths.PROFILE_ROOTS, "chrome", {os_name: str(root)})
+    monkeypatch.setitem(paths.BROWSER_PATHS, "chrome", {os_name: str(root / "Default" / "History")})
+    manager = snapshot.SnapshotManager(directory=str(tmp_path / "snapshots"))
+    monkeypatch.setattr(snapshot, "_default_manager", manager)
+    paths.clear_profile_cache()
+    yield manager
+    paths.clear_profile_cache()
+    manager.close()
+
+
+class TestProfileSearch:
+    """Tests for searching every profile of a browser."""
+
+    def test_profiles_merge_with_tags(self, chrome_profiles):
+        result = HistoryService.search_history("python", browser="chrome:*", limit=10)
+
+        assert result["browsers"] == ["chrome", "chrome:Profile 1"]
+        assert result["count"] == 4
+        # Each Work entry is one microsecond newer than its Personal copy
+        assert result["sources"] == ["chrome:Profile 1", "chrome"] * 2
+        assert result["results"][0][0].startswith("Work: ")
+
+    def test_one_snapshot_per_profile(self, chrome_profiles):
+        for _ in range(3):
+            HistoryService.get_recent_history(hours=24, browser="chrome:*")
+
+        assert chrome_profiles.get_stats()["snapshots"] == 2
+
+    def test_profile_by_display_name(self, chrome_profiles):
+        result = HistoryService.search_history("python", browser="chrome:Work")
+
+        assert all(title.startswith("Work: ") for title, _, _ in result["results"])
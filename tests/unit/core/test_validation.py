@@ -8,16 +8,21 @@ from chronicle_mcp.core.exceptions import (
 )
 from chronicle_mcp.core.validation import (
     validate_browser,
+    validate_browsers,
     validate_browsers_different,
     validate_date_range,
+    validate_days,
     validate_domain,
     validate_exclude_domains,
     validate_format_type,
     validate_fuzzy_threshold,
+    validate_group_by,
     validate_hours,
     validate_limit,
     validate_merge_strategy,
     validate_query,
+    validate_regex,
+    validate_search_mode,
     validate_search_options,
     validate_sort_by,
 )
@@ -61,6 +66,28 @@ class TestValidateBrowser:
         assert "Browser cannot be empty" in str(exc_info.value)
 
 
+class TestValidateBrowsers:
+    """Tests for validate_browsers function."""
+
+    def test_single_browser(self):
+        assert validate_browsers("Chrome") == ["chrome"]
+
+    def test_comma_separated(self):
+        assert validate_browsers("chrome, firefox") == ["chrome", "firefox"]
+
+    def test_list_is_deduplicated(self):
+        assert validate_browsers(["firefox", "chrome", "Firefox"]) == ["firefox", "chrome"]
+
+    def test_invalid_browser_in_list(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_browsers(["chrome", "netscape"])
+        assert exc_info.value.field == "browser"
+
+    def test_empty_list(self):
+        with pytest.raises(ValidationError):
+            validate_browsers([])
+
+
 class TestValidateQuery:
     """Tests for validate_query function."""
 
@@ -123,6 +150,19 @@ class TestValidateLimit:
         assert result == 5
 
 
+class TestValidateDays:
+    """Tests for validate_days function."""
+
+    def test_valid_days(self):
+        assert validate_days(None) is None
+        assert validate_days(7) == 7
+
+    @pytest.mark.parametrize("days", [0, -1, "7", True])
+    def test_invalid_days(self, days):
+        with pytest.raises(ValidationError):
+            validate_days(days)
+
+
 class TestValidateHours:
     """Tests for validate_hours function."""
 
@@ -285,6 +325,49 @@ class TestValidateSearchOptions:
             validate_search_options(True, True)
         assert "Cannot use both regex and fuzzy" in str(exc_info.value)
 
+    def test_fts_with_regex(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_search_options(True, False, "fts")
+        assert "Cannot combine search_mode 'fts'" in str(exc_info.value)
+
+
+class TestValidateRegex:
+    """Tests for validate_regex function."""
+
+    def test_valid_pattern(self):
+        assert validate_regex(r"github\.com/\w+") == r"github\.com/\w+"
+
+    def test_invalid_pattern(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_regex("(unclosed")
+        assert exc_info.value.field == "query"
+
+
+class TestValidateSearchMode:
+    """Tests for validate_search_mode function."""
+
+    def test_valid_modes(self):
+        assert validate_search_mode("like") == "like"
+        assert validate_search_mode("FTS") == "fts"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_search_mode("semantic")
+        assert "Invalid search_mode" in str(exc_info.value)
+
+
+class TestValidateGroupBy:
+    """Tests for validate_group_by function."""
+
+    def test_valid_groupings(self):
+        assert validate_group_by("host") == "host"
+        assert validate_group_by("Domain") == "domain"
+
+    def test_invalid_grouping(self):
+        with pytest.raises(ValidationError) as exc_info:
+            validate_group_by("tld")
+        assert "Invalid group_by" in str(exc_info.value)
+
 
 class TestValidateMergeStrategy:
     """Tests for validate_merge_strategy function."""
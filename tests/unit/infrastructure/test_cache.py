@@ -0,0 +1,248 @@
+"""Tests for the query result cache."""
+
+import os
+import sqlite3
+
+import pytest
+
+from chronicle_mcp import cache
+from chronicle_mcp.cache import (
+    SKETCH_SAMPLE_FACTOR,
+    FrequencySketch,
+    QueryCache,
+    cached_query,
+    source_state,
+)
+from chronicle_mcp.config import CacheConfig
+from chronicle_mcp.core import HistoryService
+from chronicle_mcp.core import services as services_module
+
+
+@pytest.fixture
+def substring_calls(monkeypatch):
+    """Counts the substring searches that reach a database."""
+    calls: list[str] = []
+    search = services_module.search_substring
+
+    def counting(conn, query, limit):
+        calls.append(query)
+        return search(conn, query, limit)
+
+    monkeypatch.setattr(services_module, "search_substring", counting)
+    return calls
+
+
+def _revisit_first_url(db_path: str, title: str, touch: bool = True) -> None:
+    """Revisit the first page under a new title, leaving the file size unchanged."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "UPDATE urls SET title = ?, last_visit_time = last_visit_time + 1 WHERE id = 1",
+        (title,),
+    )
+    conn.commit()
+    conn.close()
+    if touch:
+        # The index refreshes on a new mtime, which a coarse clock may not give
+        st = os.stat(db_path)
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestSourceState:
+    """Tests for detecting changes to a source database."""
+
+    def test_commits_change_the_state(self, sample_chrome_db):
+        before = source_state(sample_chrome_db)
+        st = os.stat(sample_chrome_db)
+        _revisit_first_url(sample_chrome_db, "Renamed", touch=False)
+        os.utime(sample_chrome_db, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        assert source_state(sample_chrome_db) != before
+
+    def test_unchanged_database(self, sample_chrome_db):
+        assert source_state(sample_chrome_db) == source_state(sample_chrome_db)
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(OSError):
+            source_state(str(tmp_path / "missing"))
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestQueryCache:
+    """Tests for the cache itself."""
+
+    def test_from_config(self):
+        config = CacheConfig(ttl_seconds=60, max_entries=2, max_size_mb=1)
+        query_cache = QueryCache.from_config(config)
+
+        stats = query_cache.get_stats()
+        assert (stats["size"], stats["max_size"], stats["ttl_seconds"]) == (0, 2, 60)
+        assert stats["max_bytes"] == 1024 * 1024
+
+    def test_keys_ignore_dict_order(self):
+        query_cache = QueryCache()
+        query_cache.set("search", {"query": "x", "browser": ["chrome"]}, "result")
+
+        assert query_cache.get("search", {"browser": ["chrome"], "query": "x"}) == "result"
+        assert query_cache.get("search", {"browser": ["firefox"], "query": "x"}) is None
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        query_cache = QueryCache(ttl_seconds=30, timer=clock)
+        query_cache.set("search", {"q": "x"}, "result")
+
+        clock.now = 29
+        assert query_cache.get("search", {"q": "x"}) == "result"
+        clock.now = 31
+        assert query_cache.get("search", {"q": "x"}) is None
+        assert query_cache.get_stats()["expirations"] == 1
+
+    def test_counters(self):
+        query_cache = QueryCache()
+        query_cache.get("search", {"q": "x"})
+        query_cache.set("search", {"q": "x"}, "x" * 1000)
+        query_cache.get("search", {"q": "x"})
+
+        stats = query_cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["bytes"] > 1000
+
+    def test_invalidate_by_tag_and_operation(self):
+        query_cache = QueryCache()
+        query_cache.set("search", {"q": 1}, "a", tags=["chrome"])
+        query_cache.set("search", {"q": 2}, "b", tags=["firefox"])
+        query_cache.set("stats", {"q": 1}, "c", tags=["chrome"])
+
+        assert query_cache.invalidate(tag="chrome") == 2
+        assert query_cache.get("search", {"q": 2}) == "b"
+        assert query_cache.invalidate("search") == 1
+        assert query_cache.get_stats()["size"] == 0
+
+    def test_observe_drops_entries_of_changed_sources(self):
+        query_cache = QueryCache()
+        query_cache.observe("chrome", 1)
+        query_cache.set("search", {"q": 1}, "a", tags=["chrome"])
+
+        assert query_cache.observe("chrome", 1) == 0
+        assert query_cache.observe("chrome", 2) == 1
+        assert query_cache.get("search", {"q": 1}) is None
+
+    def test_frequent_entries_are_not_displaced_by_one_offs(self):
+        query_cache = QueryCache(max_size=2)
+        for q in ("hot", "warm"):
+            for _ in range(3):
+                query_cache.get("search", {"q": q})
+            query_cache.set("search", {"q": q}, q)
+
+        query_cache.get("export", {})
+        admitted = query_cache.set("export", {}, "x" * 100_000)
+
+        assert admitted is False
+        assert query_cache.get("search", {"q": "hot"}) == "hot"
+        assert query_cache.get_stats()["rejections"] == 1
+
+    def test_more_frequent_entries_displace_the_least_recently_used(self):
+        query_cache = QueryCache(max_size=2)
+        for q in ("a", "b", "c"):
+            query_cache.get("search", {"q": q})
+            query_cache.set("search", {"q": q}, q)
+        query_cache.get("search", {"q": "c"})
+        query_cache.set("search", {"q": "c"}, "c")
+
+        assert query_cache.get("search", {"q": "a"}) is None
+        assert query_cache.get("search", {"q": "c"}) == "c"
+        assert query_cache.get_stats()["evictions"] == 1
+
+    def test_byte_budget(self):
+        query_cache = QueryCache(max_bytes=10_000)
+
+        assert query_cache.set("export", {}, "x" * 20_000) is False
+        assert query_cache.set("export", {"small": True}, "x" * 100) is True
+
+    def test_sketch_ages(self):
+        sketch = FrequencySketch(capacity=1)
+        for _ in range(SKETCH_SAMPLE_FACTOR - 1):
+            sketch.increment("key")
+        before = sketch.frequency("key")
+        sketch.increment("other")
+
+        assert sketch.frequency("key") == before // 2
+
+    def test_cached_query_keys_on_arguments(self):
+        calls = []
+
+        @cached_query()
+        def lookup(value, scale=1):
+            calls.append(value)
+            return value * scale
+
+        assert lookup(2) == lookup(2) == 2
+        assert lookup(2, scale=3) == 6
+        assert lookup([1]) == lookup([1]) == [1]
+        assert calls == [2, 2, [1]]
+
+    def test_disabled_by_config(self, monkeypatch):
+        from chronicle_mcp.config import Config
+
+        config = Config()
+        config.cache.enabled = False
+        monkeypatch.setattr(cache, "_query_cache", None)
+        monkeypatch.setattr(cache, "load_config", lambda: config)
+
+        assert cache.get_query_cache() is None
+
+
+class TestServiceCache:
+    """Tests for caching service results."""
+
+    def test_repeated_query_is_served_from_cache(self, mock_chrome_path, substring_calls):
+        first = HistoryService.search_history("python", limit=5)
+        second = HistoryService.search_history(query="python")
+
+        assert substring_calls == ["python"]
+        assert second == first
+
+    def test_different_parameters_miss(self, mock_chrome_path, substring_calls):
+        HistoryService.search_history("python", limit=5)
+        HistoryService.search_history("python", limit=6)
+
+        assert len(substring_calls) == 2
+
+    def test_source_change_invalidates(self, mock_chrome_path, sample_chrome_db, substring_calls):
+        HistoryService.search_history("claude")
+        _revisit_first_url(sample_chrome_db, "Claude renamed")
+        result = HistoryService.search_history("claude")
+
+        assert len(substring_calls) == 2
+        assert result["results"][0][0] == "Claude renamed"
+
+    def test_disabled_cache(self, mock_chrome_path, substring_calls, monkeypatch):
+        monkeypatch.setattr(services_module, "get_query_cache", lambda: None)
+        HistoryService.search_history("python")
+        HistoryService.search_history("python")
+
+        assert len(substring_calls) == 2
+
+    def test_errors_are_not_cached(self, mock_chrome_path):
+        from chronicle_mcp.core.exceptions import BrowserNotFoundError
+
+        for _ in range(2):
+            with pytest.raises(BrowserNotFoundError):
+                HistoryService.search_history("python", browser="edge")
+
+    def test_cache_stats(self, mock_chrome_path):
+        HistoryService.search_history("python")
+
+        HistoryService.search_history("python")
+        stats = HistoryService.get_cache_stats()
+
+        assert stats["enabled"] is True
+        assert (stats["size"], stats["hits"], stats["misses"]) == (1, 1, 1)
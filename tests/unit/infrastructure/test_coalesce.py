@@ -0,0 +1,281 @@
+"""Tests for coalescing identical concurrent operations."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from chronicle_mcp.coalesce import AsyncSingleFlight, OperationCancelledError, SingleFlight
+from chronicle_mcp.connection import cancellation_scope
+from chronicle_mcp.core import AsyncHistoryService, HistoryService
+from chronicle_mcp.core import services as services_module
+
+WAIT_SECONDS = 5
+
+
+def _wait_for(condition, timeout: float = WAIT_SECONDS) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _run_threads(count: int, target) -> tuple[list[object], list[threading.Thread]]:
+    outcomes: list[object] = []
+
+    def run() -> None:
+        try:
+            outcomes.append(target())
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return outcomes, threads
+
+
+class TestSingleFlight:
+    """Tests for coalescing threads."""
+
+    def test_followers_share_the_leaders_result(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        runs: list[int] = []
+
+        def compute() -> dict:
+            runs.append(1)
+            release.wait(WAIT_SECONDS)
+            return {"count": 3}
+
+        outcomes, threads = _run_threads(4, lambda: flights.do("key", compute))
+        _wait_for(lambda: flights.get_stats()["shared"] == 3)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert runs == [1]
+        assert outcomes == [{"count": 3}] * 4
+        assert flights.get_stats() == {"in_flight": 0, "executions": 1, "shared": 3}
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def compute() -> None:
+            release.wait(WAIT_SECONDS)
+            raise ValueError("broken")
+
+        outcomes, threads = _run_threads(3, lambda: flights.do("key", compute))
+        _wait_for(lambda: flights.get_stats()["shared"] == 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+    def test_different_keys_run_separately(self):
+        flights = SingleFlight()
+
+        assert [flights.do(key, lambda key=key: key) for key in ("a", "b")] == ["a", "b"]
+        assert flights.get_stats()["executions"] == 2
+
+    def test_followers_of_a_cancelled_leader_start_over(self):
+        flights = SingleFlight()
+        cancel = threading.Event()
+        started = threading.Event()
+
+        def cancelled_leader() -> None:
+            def compute() -> None:
+                started.set()
+                cancel.wait(WAIT_SECONDS)
+                raise RuntimeError("interrupted")
+
+            with cancellation_scope(cancel):
+                flights.do("key", compute)
+
+        leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, cancelled_leader))
+        leader.start()
+        started.wait(WAIT_SECONDS)
+        outcomes, followers = _run_threads(1, lambda: flights.do("key", lambda: "fresh"))
+        _wait_for(lambda: flights.get_stats()["shared"] == 1)
+        cancel.set()
+        leader.join()
+        followers[0].join()
+
+        assert outcomes == ["fresh"]
+        assert flights.get_stats()["executions"] == 2
+
+    def test_cancelled_follower_stops_waiting(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        cancel = threading.Event()
+        leader = threading.Thread(target=flights.do, args=("key", lambda: release.wait(5)))
+        leader.start()
+        _wait_for(lambda: flights.get_stats()["in_flight"] == 1)
+
+        def follow() -> object:
+            with cancellation_scope(cancel):
+                return flights.do("key", lambda: None)
+
+        outcomes, followers = _run_threads(1, follow)
+        _wait_for(lambda: flights.get_stats()["shared"] == 1)
+        cancel.set()
+        followers[0].join(WAIT_SECONDS)
+        release.set()
+        leader.join()
+
+        assert isinstance(outcomes[0], OperationCancelledError)
+
+
+class TestAsyncSingleFlight:
+    """Tests for coalescing coroutines."""
+
+    @pytest.mark.asyncio
+    async def test_waiters_share_one_computation(self):
+        flights = AsyncSingleFlight()
+        runs: list[int] = []
+
+        async def compute() -> str:
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+        assert results == ["done"] * 5
+        assert runs == [1]
+        assert flights.get_stats() == {"in_flight": 0, "executions": 1, "shared": 4}
+
+    @pytest.mark.asyncio
+    async def test_cancelling_one_waiter_keeps_the_computation(self):
+        flights = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def compute() -> str:
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("key", compute))
+        second = asyncio.ensure_future(flights.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_cancelling_every_waiter_cancels_the_computation(self):
+        flights = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def compute() -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flights.do("key", compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        await asyncio.wait_for(cancelled.wait(), WAIT_SECONDS)
+        assert flights.get_stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def slow_stats(monkeypatch):
+    """Makes browser stats block until released, counting the computations, with no cache."""
+    release = threading.Event()
+    runs: list[int] = []
+    get_history_stats = services_module.get_history_stats
+
+    def slow(conn, since=None):
+        runs.append(1)
+        release.wait(WAIT_SECONDS)
+        return get_history_stats(conn, since)
+
+    monkeypatch.setattr(services_module, "get_history_stats", slow)
+    monkeypatch.setattr(services_module, "get_query_cache", lambda: None)
+    return release, runs
+
+
+class TestServiceCoalescing:
+    """Tests for coalescing service calls."""
+
+    def test_concurrent_threads(self, mock_chrome_path, slow_stats, isolated_coalescing):
+        release, runs = slow_stats
+
+        outcomes, threads = _run_threads(3, lambda: HistoryService.get_browser_stats("chrome"))
+        _wait_for(lambda: isolated_coalescing.get_stats()["shared"] == 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert runs == [1]
+        assert outcomes[0] == outcomes[1] == outcomes[2]
+        assert outcomes[0] is not outcomes[1]
+
+    def test_sequential_calls_are_not_shared(self, mock_chrome_path, slow_stats):
+        release, runs = slow_stats
+        release.set()
+
+        HistoryService.get_browser_stats("chrome")
+        HistoryService.get_browser_stats("chrome")
+
+        assert len(runs) == 2
+
+    def test_disabled(self, mock_chrome_path, slow_stats, monkeypatch):
+        release, runs = slow_stats
+        monkeypatch.setattr(services_module, "get_single_flight", lambda: None)
+
+        outcomes, threads = _run_threads(2, lambda: HistoryService.get_browser_stats())
+        _wait_for(lambda: len(runs) == 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(outcomes) == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_coroutines(self, mock_chrome_path, slow_stats):
+        from chronicle_mcp import coalesce
+
+        release, runs = slow_stats
+        calls = [
+            asyncio.ensure_future(AsyncHistoryService.get_browser_stats(browser="chrome"))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*calls)
+
+        assert runs == [1]
+        assert all(result == results[0] for result in results)
+        assert coalesce.get_async_single_flight().get_stats()["shared"] == 3
+
+    @pytest.mark.asyncio
+    async def test_keys_are_built_off_the_loop(self, mock_chrome_path, monkeypatch):
+        threads: list[int] = []
+        source_state = services_module.source_state
+
+        def recording(path):
+            threads.append(threading.get_ident())
+            return source_state(path)
+
+        monkeypatch.setattr(services_module, "source_state", recording)
+        await AsyncHistoryService.get_browser_stats(browser="chrome")
+
+        assert threads
+        assert threading.get_ident() not in threads
+
+    def test_stats(self):
+        stats = HistoryService.get_cache_stats()["coalescing"]
+
+        assert stats["enabled"] is True
+        assert stats["threads"]["executions"] == 0
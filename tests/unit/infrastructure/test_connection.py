@@ -6,16 +6,20 @@ These tests verify the temp file handling and connection lifecycle.
 import os
 import platform
 import tempfile
+import threading
 import time
 
 import pytest
 
 from chronicle_mcp.connection import (
     BrowserNotFoundError,
+    ConnectionPool,
+    PoolTimeoutError,
     cleanup_temp_file,
     get_history_connection,
     get_temp_filename,
 )
+from chronicle_mcp.snapshot import SnapshotManager
 
 
 class TestTempFileLifecycle:
@@ -178,3 +182,97 @@ class TestConnectionUtilityFunctions:
 
         filename = get_temp_filename("firefox")
         assert "firefox" in filename
+
+
+@pytest.fixture
+def snapshot_manager(tmp_path):
+    """Provides a snapshot manager writing into a temporary directory."""
+    mgr = SnapshotManager(directory=str(tmp_path / "snapshots"))
+    yield mgr
+    mgr.close()
+
+
+@pytest.fixture
+def pool(snapshot_manager):
+    """Provides a connection pool that follows the snapshot manager's refreshes."""
+    connection_pool = ConnectionPool(max_connections=2, checkout_timeout=0.2)
+    snapshot_manager.add_listener(connection_pool.discard_snapshot)
+    yield connection_pool
+    connection_pool.close()
+
+
+class TestConnectionPool:
+    """Tests for the read-only connection pool."""
+
+    def test_connection_reused_for_same_snapshot(self, pool, snapshot_manager, sample_chrome_db):
+        with snapshot_manager.snapshot("chrome", sample_chrome_db) as snap:
+            first = pool.checkout(snap)
+            pool.checkin(first)
+            second = pool.checkout(snap)
+            pool.checkin(second)
+
+        stats = pool.get_stats()
+        assert second is first
+        assert stats["created"] == 1
+        assert stats["reused"] == 1
+        assert stats["checkouts"] == 2
+
+    def test_refreshed_snapshot_retires_pooled_connections(
+        self, pool, snapshot_manager, sample_chrome_db
+    ):
+        with snapshot_manager.snapshot("chrome", sample_chrome_db) as snap:
+            pool.checkin(pool.checkout(snap))
+
+        snapshot_manager.invalidate("chrome")
+        assert pool.get_stats()["idle"] == 0
+        assert pool.get_stats()["closed"] == 1
+
+        with snapshot_manager.snapshot("chrome", sample_chrome_db) as fresh:
+            conn = pool.checkout(fresh)
+            assert conn.snapshot is fresh
+            pool.checkin(conn)
+
+    def test_checkout_times_out_when_exhausted(self, pool, snapshot_manager, sample_chrome_db):
+        with snapshot_manager.snapshot("chrome", sample_chrome_db) as snap:
+            held = [pool.checkout(snap), pool.checkout(snap)]
+            with pytest.raises(PoolTimeoutError):
+                pool.checkout(snap)
+            for conn in held:
+                pool.checkin(conn)
+
+        stats = pool.get_stats()
+        assert stats["timeouts"] == 1
+        assert stats["in_use"] == 0
+
+    def test_waiting_checkout_served_from_other_thread(self, snapshot_manager, sample_chrome_db):
+        pool = ConnectionPool(max_connections=1, checkout_timeout=5)
+        with snapshot_manager.snapshot("chrome", sample_chrome_db) as snap:
+            held = pool.checkout(snap)
+            timer = threading.Timer(0.05, pool.checkin, args=(held,))
+            timer.start()
+            conn = pool.checkout(snap)
+            count = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            pool.checkin(conn)
+            timer.join()
+        pool.close()
+
+        stats = pool.get_stats()
+        assert count == 5
+        assert conn is held
+        assert stats["waits"] == 1
+        assert stats["max_wait_seconds"] > 0
+
+    def test_history_connection_uses_pool(
+        self, monkeypatch, pool, snapshot_manager, mock_chrome_path
+    ):
+        from chronicle_mcp import connection
+
+        monkeypatch.setattr(connection, "get_snapshot_manager", lambda: snapshot_manager)
+        monkeypatch.setattr(connection, "get_connection_pool", lambda: pool)
+
+        for _ in range(3):
+            with get_history_connection("chrome") as conn:
+                conn.execute("SELECT COUNT(*) FROM urls").fetchone()
+
+        assert pool.get_stats()["created"] == 1
+        assert pool.get_stats()["reused"] == 2
@@ -1,12 +1,16 @@
 import json
 import sqlite3
 
+import pytest
+
 from chronicle_mcp.database import (
     count_domain_visits,
     format_results,
     get_top_domains,
     query_history,
+    regex_literal,
     sanitize_url,
+    search_with_regex,
 )
 
 
@@ -43,6 +47,86 @@ class TestQueryHistory:
             conn.close()
 
 
+class TestSearchWithRegex:
+    """Tests for REGEXP-based regex search."""
+
+    def test_matches_oldest_rows(self, sample_chrome_db):
+        """Test that matches are found beyond the newest `limit` rows."""
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            rows = search_with_regex(conn, r"token=\w+", limit=1)
+            assert [r[0] for r in rows] == ["Test Site with Token"]
+        finally:
+            conn.close()
+
+    def test_newest_first_and_limit(self, sample_chrome_db):
+        """Test that results are newest first and stop at the limit."""
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            rows = search_with_regex(conn, r"^python", limit=5)
+            assert [r[0] for r in rows] == ["Python SQLite Tutorial", "Python Tutorial"]
+            assert len(search_with_regex(conn, "github\\.com/(anthropics|microsoft)", 1)) == 1
+        finally:
+            conn.close()
+
+    def test_case_insensitive_without_literal(self, sample_chrome_db):
+        """Test patterns the LIKE pre-filter cannot help with."""
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            rows = search_with_regex(conn, r"[VX]S\s+CODE", limit=5)
+            assert [r[0] for r in rows] == ["VS Code - Microsoft"]
+        finally:
+            conn.close()
+
+    def test_invalid_pattern(self, sample_chrome_db):
+        """Test that an invalid pattern raises ValueError."""
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            with pytest.raises(ValueError, match="Invalid regex pattern"):
+                search_with_regex(conn, "(unclosed", limit=5)
+        finally:
+            conn.close()
+
+    def test_quantifier_bodies_are_not_literals(self, sample_chrome_db):
+        """Test that the digits inside {m,n} do not become the pre-filter."""
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            conn.execute(
+                "INSERT INTO urls (url, title, visit_count, last_visit_time) "
+                "VALUES ('https://x.com/2023-01-15', 'Dated', 1, 0)"
+            )
+            rows = search_with_regex(conn, r"[0-9]{4}-[0-9]{2}", limit=5)
+            assert [r[0] for r in rows] == ["Dated"]
+            rows = search_with_regex(conn, r"questions/[0-9]{2,3}$", limit=5)
+            assert [r[0] for r in rows] == ["Python SQLite Tutorial"]
+        finally:
+            conn.close()
+
+    @pytest.mark.parametrize(
+        "pattern,literal",
+        [
+            (r"github\.com/\w+", "github.com/"),
+            ("pyth?on", "pyt"),
+            ("(optional)?tutorial", "tutorial"),
+            ("abc[a-z]+defg", "defg"),
+            (r"\d{3}-PROJ", "-PROJ"),
+            ("100%_done", "done"),
+            ("python|rust", None),
+            ("(?i)abc", None),
+            ("[abc]", None),
+            (r"\d{4}", None),
+            ("x{2,5}abc", "abc"),
+            ("[0-9]{4}-[0-9]{2}", "-"),
+            ("claude{0,3}-code", "claud"),
+            ("claude{,3}-code", "claud"),
+            ("a{}bc", "a{}bc"),
+        ],
+    )
+    def test_regex_literal(self, pattern, literal):
+        """Test extraction of the literal every match contains."""
+        assert regex_literal(pattern) == literal
+
+
 class TestSanitizeUrl:
     """Tests for URL sanitization."""
 
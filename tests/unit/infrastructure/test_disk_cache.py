@@ -0,0 +1,228 @@
+"""Tests for the persistent query result cache."""
+
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+from chronicle_mcp.cache import QueryCache
+from chronicle_mcp.config import CacheConfig
+from chronicle_mcp.disk_cache import DiskCache
+
+RESULT = {
+    "results": [("Title", "https://example.com", "2024-03-05T14:00:00+00:00")],
+    "count": 1,
+    "histogram": {"hour_of_day": [0, 1], 3: None},
+    "message": "found",
+}
+
+
+class FakeClock:
+    """Wall clock advanced by hand."""
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "results.db")
+
+
+@pytest.fixture
+def disk_cache(cache_path):
+    disk = DiskCache(cache_path)
+    yield disk
+    disk.close()
+
+
+class TestDiskCache:
+    """Tests for storing results on disk."""
+
+    def test_results_round_trip(self, disk_cache):
+        assert disk_cache.set("search", {"query": "x"}, RESULT, tags=["chrome"])
+
+        stored = disk_cache.get("search", {"query": "x"})
+
+        assert stored.result == RESULT
+        assert stored.tags == ("chrome",)
+        assert 0 < stored.remaining_seconds <= disk_cache.ttl_seconds
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+    def test_database_is_private(self, disk_cache, cache_path):
+        disk_cache.set("search", {"query": "x"}, RESULT)
+
+        assert stat.S_IMODE(os.stat(os.path.dirname(cache_path)).st_mode) & 0o077 == 0
+        assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+    def test_shared_between_processes(self, disk_cache, cache_path):
+        disk_cache.set("search", {"query": "x", "limit": 5}, RESULT)
+        other = DiskCache(cache_path)
+        try:
+            stored = other.get("search", {"limit": 5, "query": "x"})
+        finally:
+            other.close()
+
+        assert stored.result == RESULT
+
+    def test_results_expire(self, cache_path):
+        clock = FakeClock()
+        disk = DiskCache(cache_path, ttl_seconds=30, clock=clock)
+        try:
+            disk.set("search", {}, RESULT)
+            clock.now += 31
+            stored = disk.get("search", {})
+        finally:
+            disk.close()
+
+        assert stored is None
+
+    def test_results_that_are_not_plain_data_are_skipped(self, disk_cache):
+        assert disk_cache.set("search", {}, {"value": object()}) is False
+        assert disk_cache.get("search", {}) is None
+
+    def test_invalidate_by_tag_and_operation(self, disk_cache):
+        disk_cache.set("search", {"q": 1}, RESULT, tags=["chrome"])
+        disk_cache.set("search", {"q": 2}, RESULT, tags=["firefox"])
+        disk_cache.set("stats", {"q": 1}, RESULT, tags=["chrome"])
+
+        assert disk_cache.invalidate(tag="chrome") == 2
+        assert disk_cache.invalidate("search") == 1
+        assert disk_cache.get_stats()["size"] == 0
+
+    def test_changed_source_drops_entries_of_other_processes(self, disk_cache, cache_path):
+        disk_cache.observe("chrome", ("/History", 1))
+        disk_cache.set("search", {}, RESULT, tags=["chrome"])
+        other = DiskCache(cache_path)
+        try:
+            unchanged = other.observe("chrome", ("/History", 1))
+            changed = other.observe("chrome", ("/History", 2))
+        finally:
+            other.close()
+
+        assert (unchanged, changed) == (0, 1)
+        assert disk_cache.get("search", {}) is None
+
+    def test_size_budget_drops_the_oldest(self, cache_path):
+        clock = FakeClock()
+        disk = DiskCache(cache_path, max_bytes=250, clock=clock)
+        try:
+            for q in range(3):
+                disk.set("search", {"q": q}, "x" * 100)
+                clock.now += 1
+            stats = disk.get_stats()
+            oldest = disk.get("search", {"q": 0})
+        finally:
+            disk.close()
+
+        assert (stats["size"], stats["evictions"]) == (2, 1)
+        assert oldest is None
+
+    def test_concurrent_writers(self, cache_path):
+        errors: list[int] = []
+
+        def write(worker: int) -> None:
+            disk = DiskCache(cache_path)
+            try:
+                for q in range(20):
+                    disk.set("search", {"worker": worker, "q": q}, RESULT, tags=["chrome"])
+                    disk.get("search", {"worker": 0, "q": q})
+                errors.append(disk.get_stats()["errors"])
+            finally:
+                disk.close()
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        disk = DiskCache(cache_path)
+        try:
+            size = disk.get_stats()["size"]
+        finally:
+            disk.close()
+
+        assert errors == [0, 0, 0, 0]
+        assert size == 80
+
+    def test_unusable_path_is_a_miss(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        disk = DiskCache(str(blocker / "results.db"))
+
+        assert disk.set("search", {}, RESULT) is False
+        assert disk.get("search", {}) is None
+        assert disk.get_stats()["errors"] >= 2
+
+
+class TestLayeredCache:
+    """Tests for the disk cache under the in-memory cache."""
+
+    def test_restart_reads_results_from_disk(self, cache_path):
+        first = QueryCache(disk=DiskCache(cache_path))
+        first.set("search", {"q": 1}, RESULT, tags=["chrome"])
+        first.close()
+
+        restarted = QueryCache(disk=DiskCache(cache_path))
+        try:
+            assert restarted.get("search", {"q": 1}) == RESULT
+            # Now served from memory, with its tags
+            assert restarted.get("search", {"q": 1}) == RESULT
+            assert restarted.invalidate(tag="chrome") == 1
+            stats = restarted.get_stats()
+        finally:
+            restarted.close()
+
+        assert (stats["hits"], stats["disk_hits"]) == (1, 1)
+        assert stats["disk"]["size"] == 0
+
+    def test_disk_keeps_results_memory_declines(self, cache_path):
+        query_cache = QueryCache(max_size=1, disk=DiskCache(cache_path))
+        try:
+            query_cache.get("search", {"q": 1})
+            query_cache.set("search", {"q": 1}, RESULT)
+            query_cache.get("search", {"q": 1})
+
+            admitted = query_cache.set("export", {}, RESULT)
+            from_disk = query_cache.disk.get("export", {})
+        finally:
+            query_cache.close()
+
+        assert admitted is False
+        assert from_disk.result == RESULT
+
+    def test_from_config(self, cache_path):
+        config = CacheConfig(persistent=True, persistent_path=cache_path, persistent_max_mb=1)
+        query_cache = QueryCache.from_config(config)
+        try:
+            stats = query_cache.get_stats()["disk"]
+        finally:
+            query_cache.close()
+
+        assert (stats["path"], stats["max_bytes"]) == (cache_path, 1024 * 1024)
+        assert QueryCache.from_config(CacheConfig()).disk is None
+
+    def test_services_share_results_across_processes(
+        self, mock_chrome_path, cache_path, monkeypatch
+    ):
+        from chronicle_mcp import cache
+        from chronicle_mcp.core import HistoryService
+
+        first_process = QueryCache(disk=DiskCache(cache_path))
+        monkeypatch.setattr(cache, "_query_cache", first_process)
+        first = HistoryService.search_history("python")
+        first_process.close()
+        # A sibling process, with an empty memory cache
+        second_process = QueryCache(disk=DiskCache(cache_path))
+        monkeypatch.setattr(cache, "_query_cache", second_process)
+        second = HistoryService.search_history("python")
+        stats = second_process.get_stats()
+        second_process.close()
+
+        assert second == first
+        assert stats["disk_hits"] == 1
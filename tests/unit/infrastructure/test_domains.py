@@ -0,0 +1,78 @@
+"""Tests for host and registrable-domain parsing."""
+
+import pytest
+
+from chronicle_mcp.domains import (
+    host_matches,
+    normalize_domain,
+    registrable_domain,
+    reverse_host,
+    url_host,
+)
+
+
+class TestUrlHost:
+    """Tests for url_host."""
+
+    @pytest.mark.parametrize(
+        ("url", "host"),
+        [
+            ("https://GitHub.com/anthropics", "github.com"),
+            ("http://user:pw@example.com:8080/x", "example.com"),
+            ("https://example.com./", "example.com"),
+            ("http://[::1]:8000/", "::1"),
+            ("file:///home/user/notes.txt", None),
+            ("chrome://settings", None),
+            ("not a url", None),
+            ("", None),
+        ],
+    )
+    def test_parses_http_hosts(self, url, host):
+        assert url_host(url) == host
+
+    def test_reverse_host(self):
+        assert reverse_host("gist.github.com") == "moc.buhtig.tsig"
+
+
+class TestRegistrableDomain:
+    """Tests for registrable_domain."""
+
+    @pytest.mark.parametrize(
+        ("host", "domain"),
+        [
+            ("github.com", "github.com"),
+            ("gist.github.com", "github.com"),
+            ("news.bbc.co.uk", "bbc.co.uk"),
+            ("bbc.co.uk", "bbc.co.uk"),
+            ("user.github.io", "user.github.io"),
+            ("a.b.user.github.io", "user.github.io"),
+            ("localhost", "localhost"),
+            ("192.168.1.10", "192.168.1.10"),
+        ],
+    )
+    def test_registrable_domain(self, host, domain):
+        assert registrable_domain(host) == domain
+
+
+class TestMatching:
+    """Tests for domain normalisation and host matching."""
+
+    @pytest.mark.parametrize(
+        ("value", "domain"),
+        [
+            (" GitHub.com ", "github.com"),
+            ("https://github.com/anthropics", "github.com"),
+            (".github.com", "github.com"),
+            ("github.com/anthropics", "github.com"),
+        ],
+    )
+    def test_normalize_domain(self, value, domain):
+        assert normalize_domain(value) == domain
+
+    def test_host_matches_subdomains_only(self):
+        assert host_matches("github.com", "github.com")
+        assert host_matches("gist.github.com", "github.com")
+        assert not host_matches("hub.com", "github.com")
+        assert not host_matches("github.com", "hub.com")
+        assert not host_matches("x-github.com", "github.com")
+        assert not host_matches(None, "github.com")
@@ -0,0 +1,114 @@
+"""Tests for typo-tolerant term matching."""
+
+import random
+
+import pytest
+
+from chronicle_mcp.fuzzy import (
+    TermIndex,
+    bounded_edit_distance,
+    fuzzy_terms,
+    max_edits,
+    term_score,
+)
+
+
+def _osa_distance(a: str, b: str) -> int:
+    """Unbounded optimal string alignment distance, for reference."""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(
+                d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1])
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+
+def _random_words(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice("abcde") for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+class TestEditDistance:
+    """Tests for bounded_edit_distance."""
+
+    @pytest.mark.parametrize(
+        "a,b,expected",
+        [
+            ("python", "python", 0),
+            ("python", "pyhton", 1),
+            ("github", "githbu", 1),
+            ("python", "pythn", 1),
+            ("kitten", "sitting", 3),
+            ("", "abc", 3),
+        ],
+    )
+    def test_known_distances(self, a, b, expected):
+        assert bounded_edit_distance(a, b, 3) == expected
+
+    def test_gives_up_beyond_bound(self):
+        assert bounded_edit_distance("python", "java", 2) is None
+        assert bounded_edit_distance("a", "abcd", 2) is None
+
+    def test_matches_reference(self):
+        words = _random_words(120, seed=7)
+        for a in words:
+            for b in words[:40]:
+                expected = _osa_distance(a, b)
+                for bound in range(4):
+                    result = bounded_edit_distance(a, b, bound)
+                    assert result == (expected if expected <= bound else None), (a, b, bound)
+
+
+class TestTermIndex:
+    """Tests for candidate lookup in the bigram index."""
+
+    def test_finds_typos(self):
+        index = TermIndex(["github", "python", "tutorial", "gitlab"])
+
+        assert index.search("githbu", 2) == {"github": 1}
+        assert index.search("pyhton", 1) == {"python": 1}
+        assert index.search("rust", 1) == {}
+
+    def test_same_matches_as_full_scan(self):
+        words = _random_words(400, seed=11)
+        index = TermIndex(words)
+        for term in _random_words(60, seed=13):
+            for bound in range(4):
+                expected = {
+                    word: distance
+                    for word in set(words)
+                    if (distance := _osa_distance(term, word)) <= bound
+                }
+                assert index.search(term, bound) == expected, (term, bound)
+
+    def test_add_text_splits_like_fulltext_index(self):
+        index = TermIndex()
+        index.add_text("Éditeur ÉTÉ", "https://example.com/a_b")
+
+        for word in ("editeur", "ete", "https", "example", "com", "a", "b"):
+            assert index.search(word, 0) == {word: 0}
+        assert len(index) == 7
+
+
+class TestScoring:
+    """Tests for edit budgets and scores."""
+
+    def test_fuzzy_terms_fold_case_and_accents(self):
+        assert fuzzy_terms("Café-Society_2") == ["cafe", "society", "2"]
+        assert fuzzy_terms(None) == []
+
+    def test_budget_follows_threshold(self):
+        assert max_edits("python", 0.6) == 2
+        assert max_edits("python", 1.0) == 0
+        assert max_edits("internationalization", 0.0) == 3
+
+    def test_score(self):
+        assert term_score("python", 0) == 1.0
+        assert term_score("python", 1) == pytest.approx(5 / 6)
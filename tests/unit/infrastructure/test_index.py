@@ -0,0 +1,662 @@
+"""Tests for the local history index.
+
+These tests verify incremental ingestion, timestamp normalisation across
+browser schemas, and that the history service reads through the index.
+"""
+
+import os
+import sqlite3
+import stat
+import sys
+import threading
+
+import pytest
+
+from chronicle_mcp.database import (
+    detect_schema,
+    query_history,
+    query_recent_history,
+    search_with_fuzzy,
+    search_with_regex,
+)
+from chronicle_mcp.index import (
+    HistoryIndex,
+    build_match_expression,
+    count_host_visits,
+    default_index_path,
+    get_top_hosts,
+    search_by_host,
+    search_fulltext,
+    search_fuzzy,
+    search_regex,
+    search_substring,
+)
+
+FIREFOX_EPOCH_OFFSET = 11644473600000000
+
+
+def _add_url(db_path: str, url: str, title: str, last_visit_time: int = 0) -> None:
+    """Insert a Chrome url row and bump the file's mtime so the change is noticed."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, 1, ?)",
+        (url, title, last_visit_time),
+    )
+    conn.commit()
+    conn.close()
+    st = os.stat(db_path)
+    os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def _change_source(db_path: str, *statements: str) -> None:
+    """Run statements on a source database and bump the file's mtime."""
+    conn = sqlite3.connect(db_path)
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+    st = os.stat(db_path)
+    os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def firefox_with_visits(tmp_path, monkeypatch):
+    """Creates a Firefox places database with a visits table and mocks its path."""
+    from chronicle_mcp import connection
+
+    db_path = str(tmp_path / "places.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE moz_places (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT,
+            visit_count INTEGER DEFAULT 0, last_visit_date INTEGER
+        );
+        CREATE TABLE moz_historyvisits (
+            id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+            visit_date INTEGER, visit_type INTEGER
+        );
+        INSERT INTO moz_places VALUES (1, 'https://firefox.com/', 'Firefox', 2, 1700000000000000);
+        INSERT INTO moz_historyvisits VALUES (1, 0, 1, 1699999000000000, 1);
+        INSERT INTO moz_historyvisits VALUES (2, 1, 1, 1700000000000000, 5);
+    """)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(
+        connection, "get_browser_path", lambda browser: db_path if browser == "firefox" else None
+    )
+    return db_path
+
+
+class TestIngestion:
+    """Tests for ingesting source databases."""
+
+    def test_default_path_is_under_user_data_dir(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("sys.platform", "linux")
+        monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+        assert default_index_path() == str(tmp_path / "chronicle-mcp" / "index.db")
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+    def test_index_is_private(self, tmp_path, mock_chrome_path):
+        path = tmp_path / "data" / "index.db"
+        history_index = HistoryIndex(str(path))
+        try:
+            history_index.refresh("chrome")
+        finally:
+            history_index.close()
+
+        assert stat.S_IMODE(path.parent.stat().st_mode) & 0o077 == 0
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+    def test_chrome_rows_are_queryable(self, isolated_history_index, mock_chrome_path):
+        with isolated_history_index.connection("chrome") as conn:
+            assert detect_schema(conn) == "chrome"
+            results = query_history(conn, "github", 10)
+
+        assert len(results) == 2
+        assert isolated_history_index.get_stats()["urls"] == 5
+
+    def test_unchanged_source_is_not_reingested(self, isolated_history_index, mock_chrome_path):
+        isolated_history_index.refresh("chrome")
+        isolated_history_index.refresh("chrome")
+
+        stats = isolated_history_index.get_stats()
+        assert stats["refreshes"] == 1
+        assert stats["skipped"] == 1
+
+    def test_refresh_only_reads_new_rows(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        first = isolated_history_index.refresh("chrome")
+        assert first.url_watermark == 5
+
+        _add_url(sample_chrome_db, "https://new.example.com/", "Brand New")
+        second = isolated_history_index.refresh("chrome")
+
+        assert second.url_watermark == 6
+        assert isolated_history_index.get_stats()["urls"] == 6
+        with isolated_history_index.connection("chrome") as conn:
+            assert query_history(conn, "Brand New", 10)[0][0] == "Brand New"
+
+    def test_updated_rows_follow_time_watermark(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        isolated_history_index.refresh("chrome")
+        conn = sqlite3.connect(sample_chrome_db)
+        conn.execute(
+            "UPDATE urls SET title = 'Renamed', last_visit_time = last_visit_time + 1 WHERE id = 1"
+        )
+        conn.commit()
+        conn.close()
+        _add_url(sample_chrome_db, "https://other.example.com/", "Other")
+
+        isolated_history_index.refresh("chrome")
+
+        with isolated_history_index.connection("chrome") as conn:
+            assert conn.execute("SELECT title FROM urls WHERE id = 1").fetchone()[0] == "Renamed"
+
+    def test_deleted_rows_are_removed(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        isolated_history_index.refresh("chrome")
+        # Chrome never reuses the ids of deleted rows
+        _change_source(
+            sample_chrome_db,
+            "DELETE FROM urls WHERE url LIKE '%github%' OR id = 5",
+            "INSERT INTO urls (id, url, title) VALUES (6, 'https://after.example.com/', 'After')",
+        )
+
+        isolated_history_index.refresh("chrome")
+
+        stats = isolated_history_index.get_stats()
+        assert (stats["resets"], stats["deleted"]) == (0, 3)
+        with isolated_history_index.connection("chrome") as conn:
+            assert query_history(conn, "github", 10) == []
+            assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 3
+            assert search_fulltext(conn, "token", 10) == []
+
+    @pytest.mark.parametrize(
+        "statements",
+        [
+            # The file was replaced by another history
+            ["UPDATE urls SET url = 'https://replaced.example.com/' WHERE id = 5"],
+            # Rows reappeared below the watermark
+            ["INSERT INTO urls (id, url, title) VALUES (3, 'https://back.example.com/', 'Back')"],
+        ],
+    )
+    def test_rewritten_source_is_reingested(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db, statements
+    ):
+        _change_source(sample_chrome_db, "DELETE FROM urls WHERE id = 3")
+        isolated_history_index.refresh("chrome")
+        _change_source(sample_chrome_db, *statements)
+
+        isolated_history_index.refresh("chrome")
+
+        assert isolated_history_index.get_stats()["resets"] == 1
+        with isolated_history_index.connection("chrome") as conn:
+            indexed = conn.execute("SELECT url FROM urls ORDER BY id").fetchall()
+        source = sqlite3.connect(sample_chrome_db)
+        try:
+            assert indexed == source.execute("SELECT url FROM urls ORDER BY id").fetchall()
+        finally:
+            source.close()
+
+    def test_index_path_is_escaped(self, tmp_path, mock_chrome_path):
+        history_index = HistoryIndex(str(tmp_path / "odd?#%dir" / "index.db"))
+        try:
+            with history_index.connection("chrome") as conn:
+                assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 5
+            assert history_index.sources()[0]["urls"] == 5
+        finally:
+            history_index.close()
+
+    def test_firefox_timestamps_and_visits_are_normalised(
+        self, isolated_history_index, firefox_with_visits
+    ):
+        with isolated_history_index.connection("firefox") as conn:
+            last_visit = conn.execute("SELECT last_visit_time FROM urls").fetchone()[0]
+            visits = conn.execute(
+                "SELECT id, url, visit_time, from_visit, transition FROM visits ORDER BY id"
+            ).fetchall()
+
+        assert last_visit == 1700000000000000 + FIREFOX_EPOCH_OFFSET
+        assert visits[1] == (2, 1, 1700000000000000 + FIREFOX_EPOCH_OFFSET, 1, 5)
+
+    def test_safari_last_visit_is_derived_from_visits(
+        self, isolated_history_index, tmp_path, monkeypatch
+    ):
+        from chronicle_mcp import connection
+
+        db_path = str(tmp_path / "History.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE history_items (id INTEGER PRIMARY KEY, url TEXT, visit_count INTEGER);
+            CREATE TABLE history_visits (
+                id INTEGER PRIMARY KEY, history_item INTEGER, visit_time REAL, title TEXT
+            );
+            INSERT INTO history_items VALUES (1, 'https://apple.com/', 1);
+            INSERT INTO history_visits VALUES (1, 1, 700000000.0, 'Apple');
+        """)
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(connection, "get_browser_path", lambda browser: db_path)
+
+        with isolated_history_index.connection("safari") as conn:
+            row = conn.execute("SELECT title, last_visit_time FROM urls").fetchone()
+
+        assert row == ("Apple", (700000000 + 978307200 + 11644473600) * 1_000_000)
+
+    def test_sources_are_kept_apart(self, isolated_history_index, mock_all_browsers):
+        with isolated_history_index.connection("chrome") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 5
+        with isolated_history_index.connection("firefox") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 2
+
+        assert [s["browser"] for s in isolated_history_index.sources()] == ["chrome", "firefox"]
+
+    def test_sources_are_snapshotted_in_parallel(
+        self, isolated_history_index, mock_all_browsers, monkeypatch
+    ):
+        from chronicle_mcp import index
+
+        open_source = index.get_history_connection
+        copying = threading.Event()
+        release = threading.Event()
+
+        def slow_chrome(browser):
+            if browser == "chrome":
+                copying.set()
+                release.wait(10)
+            return open_source(browser)
+
+        monkeypatch.setattr(index, "get_history_connection", slow_chrome)
+        chrome = threading.Thread(target=isolated_history_index.refresh, args=("chrome",))
+        chrome.start()
+        try:
+            assert copying.wait(10)
+            # Firefox is ingested while Chrome's snapshot is still being taken
+            assert isolated_history_index.refresh("firefox").url_watermark == 2
+        finally:
+            release.set()
+            chrome.join()
+
+        assert isolated_history_index.get_stats()["refreshes"] == 2
+
+
+class TestServiceReads:
+    """Tests for HistoryService reading through the index."""
+
+    def test_service_reads_from_index(self, isolated_history_index, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.search_history(query="github", limit=10, browser="chrome")
+
+        assert result["count"] == 2
+        assert isolated_history_index.get_stats()["refreshes"] == 1
+
+    def test_firefox_queries_work_through_index(self, mock_all_browsers):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.get_most_visited_pages(limit=5, browser="firefox")
+
+        assert result["pages"][0][0] == "Firefox Browser"
+
+    def test_index_can_be_disabled(self, monkeypatch, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        monkeypatch.setattr("chronicle_mcp.core.services.get_history_index", lambda: None)
+
+        result = HistoryService.search_history(query="github", limit=10, browser="chrome")
+
+        assert result["count"] == 2
+
+    def test_recent_history_uses_normalised_times(self, tmp_path, mock_chrome_path):
+        history_index = HistoryIndex(str(tmp_path / "other.db"))
+        try:
+            with history_index.connection("chrome") as conn:
+                assert len(query_recent_history(conn, hours=24, limit=10)) == 5
+        finally:
+            history_index.close()
+
+
+class TestFullTextSearch:
+    """Tests for full-text search over the index."""
+
+    def test_match_expression_quotes_user_input(self):
+        assert build_match_expression("claude-code") == '"claude code"'
+        assert build_match_expression('doc* OR "x') == '"doc" * AND "OR" AND "x"'
+        assert build_match_expression("--") == ""
+
+    def test_title_matches_rank_above_url_matches(self, isolated_history_index, mock_chrome_path):
+        with isolated_history_index.connection("chrome") as conn:
+            results = search_fulltext(conn, "github", 10)
+
+        # Both rows have github in the url; neither title mentions it
+        assert len(results) == 2
+        with isolated_history_index.connection("chrome") as conn:
+            results = search_fulltext(conn, "microsoft", 10)
+        assert results[0][0] == "VS Code - Microsoft"
+        assert results[0][3] == "VS Code - **Microsoft**"
+
+    def test_prefix_queries(self, isolated_history_index, mock_chrome_path):
+        with isolated_history_index.connection("chrome") as conn:
+            assert search_fulltext(conn, "tutor", 10) == []
+            assert len(search_fulltext(conn, "tutor*", 10)) == 2
+
+    def test_relevance_ordering(self, isolated_history_index, mock_chrome_path, sample_chrome_db):
+        _add_url(sample_chrome_db, "https://sqlite.org/", "SQLite SQLite SQLite")
+        with isolated_history_index.connection("chrome") as conn:
+            titles = [row[0] for row in search_fulltext(conn, "sqlite", 10)]
+
+        assert titles == ["SQLite SQLite SQLite", "Python SQLite Tutorial"]
+
+    def test_index_follows_incremental_updates(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        isolated_history_index.refresh("chrome")
+        conn = sqlite3.connect(sample_chrome_db)
+        conn.execute(
+            "UPDATE urls SET title = 'Renamed Page', last_visit_time = last_visit_time + 1 "
+            "WHERE id = 1"
+        )
+        conn.commit()
+        conn.close()
+        _add_url(sample_chrome_db, "https://new.example.com/", "Zeppelin")
+
+        with isolated_history_index.connection("chrome") as conn:
+            assert search_fulltext(conn, "zeppelin", 10)[0][0] == "Zeppelin"
+            assert search_fulltext(conn, "renamed", 10)[0][0] == "Renamed Page"
+            assert search_fulltext(conn, "claude", 10)[0][0] == "Renamed Page"
+            assert search_fulltext(conn, "anthropic", 10) == []
+
+    def test_sources_do_not_leak(self, isolated_history_index, mock_all_browsers):
+        with isolated_history_index.connection("chrome") as conn:
+            search_fulltext(conn, "github", 10)
+        with isolated_history_index.connection("firefox") as conn:
+            assert search_fulltext(conn, "github", 10) == []
+            assert len(search_fulltext(conn, "mozilla", 10)) == 1
+
+    def test_falls_back_to_like_without_index(self, sample_chrome_db):
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            results = search_fulltext(conn, "github", 10)
+        finally:
+            conn.close()
+
+        assert len(results) == 2
+        assert all(snippet is None for *_, snippet in results)
+
+    def test_service_fulltext_mode(self, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.search_history_advanced(
+            query="python", sort_by="relevance", search_mode="fts", exclude_domains=["docs"]
+        )
+
+        assert result["count"] == 1
+        assert result["results"][0][0] == "Python SQLite Tutorial"
+        assert "Match: **Python** SQLite Tutorial" in result["message"]
+
+    def test_existing_index_is_upgraded(self, tmp_path, mock_chrome_path):
+        path = str(tmp_path / "v1.db")
+        history_index = HistoryIndex(path)
+        history_index.refresh("chrome")
+        history_index.close()
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            DROP TRIGGER index_urls_fts_insert;
+            DROP TRIGGER index_urls_fts_delete;
+            DROP TRIGGER index_urls_fts_update;
+            DROP TABLE index_fts;
+            PRAGMA user_version = 1;
+        """)
+        conn.close()
+
+        upgraded = HistoryIndex(path)
+        try:
+            with upgraded.connection("chrome") as conn:
+                assert conn.fulltext
+                assert len(search_fulltext(conn, "github", 10)) == 2
+        finally:
+            upgraded.close()
+
+
+class TestSubstringSearch:
+    """Tests for trigram-backed substring search."""
+
+    @pytest.fixture
+    def ticket_history(self, sample_chrome_db, mock_chrome_path):
+        """Adds rows with ticket ids, mixed case and non-ASCII titles."""
+        conn = sqlite3.connect(sample_chrome_db)
+        conn.executemany(
+            "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, 1, ?)",
+            [
+                ("https://jira.example.com/browse/PROJ-1234", "Fix login", 13_300_000_000_000_001),
+                ("https://jira.example.com/browse/PROJ-12345", "Crash", 13_300_000_000_000_002),
+                ("https://wiki.example.com/Ébauche", "Éditeur ÉTÉ", 13_300_000_000_000_003),
+                ("https://example.com/a_b", "under_score", 13_300_000_000_000_004),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        return sample_chrome_db
+
+    @pytest.mark.parametrize(
+        "query",
+        ["proj-1234", "PROJ-12345", "JIRA", "Tutorial", "été", "ÉTÉ", "a_b", "p%j-1", "gi", "zzz"],
+    )
+    def test_same_results_as_like_scan(self, isolated_history_index, ticket_history, query):
+        with isolated_history_index.connection("chrome") as conn:
+            assert conn.substring
+            assert search_substring(conn, query, 50) == query_history(conn, query, 50)
+
+    def test_matches_fragments_fulltext_misses(self, isolated_history_index, ticket_history):
+        with isolated_history_index.connection("chrome") as conn:
+            assert search_fulltext(conn, "OJ-123", 10) == []
+            assert len(search_substring(conn, "OJ-123", 10)) == 2
+
+    def test_uses_trigram_index(self, isolated_history_index, ticket_history):
+        statements: list[str] = []
+        with isolated_history_index.connection("chrome") as conn:
+            conn.set_trace_callback(statements.append)
+            search_substring(conn, "PROJ-1234", 10)
+
+        assert any("FROM main.index_trigram" in sql for sql in statements)
+
+    @pytest.mark.parametrize(
+        "pattern", [r"proj-\d{4}$", r"jira\..*PROJ", "ÉTÉ", r"a_b", r"^https?://", "zzz+"]
+    )
+    def test_regex_same_results_as_scan(self, isolated_history_index, ticket_history, pattern):
+        with isolated_history_index.connection("chrome") as conn:
+            assert search_regex(conn, pattern, 50) == search_with_regex(conn, pattern, 50)
+
+    def test_regex_uses_trigram_index(self, isolated_history_index, ticket_history):
+        statements: list[str] = []
+        with isolated_history_index.connection("chrome") as conn:
+            conn.set_trace_callback(statements.append)
+            results = search_regex(conn, r"browse/PROJ-\d+5$", 10)
+
+        assert [row[0] for row in results] == ["Crash"]
+        assert any("FROM main.index_trigram" in sql for sql in statements)
+
+    def test_regex_service_reads_whole_history(self, ticket_history):
+        from chronicle_mcp.core import HistoryService, ValidationError
+
+        result = HistoryService.search_history_advanced(
+            query=r"anthropic|microsoft", use_regex=True, limit=1
+        )
+        assert result["count"] == 1
+        with pytest.raises(ValidationError):
+            HistoryService.search_history_advanced(query="(", use_regex=True)
+
+    def test_delete_preview_counts_substring_matches(self, ticket_history):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.delete_history(query="PROJ-1234", browser="chrome")
+
+        assert result["preview"] is True
+        assert result["count"] == 2
+
+
+class TestDomainQueries:
+    """Tests for host-based domain queries."""
+
+    @pytest.fixture
+    def host_history(self, sample_chrome_db, mock_chrome_path):
+        """Adds subdomains, a look-alike host and a multi-label public suffix."""
+        conn = sqlite3.connect(sample_chrome_db)
+        conn.executemany(
+            "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+            [
+                ("https://gist.github.com/a/1", "Gist", 4, 13_300_000_000_000_001),
+                ("https://GitHub.com:443/login", "Sign in", 1, 13_300_000_000_000_002),
+                ("https://x-github.com/", "Look-alike", 20, 13_300_000_000_000_003),
+                ("https://hub.com/", "Hub", 30, 13_300_000_000_000_004),
+                ("https://news.bbc.co.uk/1", "News", 6, 13_300_000_000_000_005),
+                ("https://www.bbc.co.uk/", "BBC", 7, 13_300_000_000_000_006),
+                ("file:///home/user/github.com.txt", "Local file", 50, 13_300_000_000_000_007),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        return sample_chrome_db
+
+    def test_count_matches_host_and_subdomains(self, isolated_history_index, host_history):
+        with isolated_history_index.connection("chrome") as conn:
+            assert count_host_visits(conn, "github.com") == 10 + 8 + 4 + 1
+            assert count_host_visits(conn, "gist.github.com") == 4
+            assert count_host_visits(conn, "hub.com") == 30
+            assert count_host_visits(conn, "https://GitHub.com/") == 23
+
+    def test_same_results_without_index(self, isolated_history_index, host_history):
+        from chronicle_mcp.connection import get_history_connection
+
+        with isolated_history_index.connection("chrome") as conn:
+            indexed = (
+                count_host_visits(conn, "github.com"),
+                search_by_host(conn, "github.com", exclude_domains=["gist.github.com"]),
+                get_top_hosts(conn, 3, "domain"),
+            )
+        with get_history_connection("chrome") as conn:
+            direct = (
+                count_host_visits(conn, "github.com"),
+                search_by_host(conn, "github.com", exclude_domains=["gist.github.com"]),
+                get_top_hosts(conn, 3, "domain"),
+            )
+
+        assert indexed == direct
+
+    def test_search_excludes_subdomains(self, isolated_history_index, host_history):
+        with isolated_history_index.connection("chrome") as conn:
+            titles = [row[0] for row in search_by_host(conn, "github.com")]
+            without_gist = search_by_host(conn, "github.com", exclude_domains=["gist.github.com"])
+            with_query = search_by_host(conn, "github.com", query="vscode")
+
+        assert titles == ["Claude - Anthropic", "VS Code - Microsoft", "Sign in", "Gist"]
+        assert "Gist" not in [row[0] for row in without_gist]
+        assert [row[0] for row in with_query] == ["VS Code - Microsoft"]
+
+    def test_top_hosts_and_registrable_domains(self, isolated_history_index, host_history):
+        with isolated_history_index.connection("chrome") as conn:
+            hosts = dict(get_top_hosts(conn, 50))
+            domains = dict(get_top_hosts(conn, 50, "domain"))
+
+        assert hosts["github.com"] == 19
+        assert hosts["gist.github.com"] == 4
+        assert domains["github.com"] == 23
+        assert domains["bbc.co.uk"] == 13
+        assert "home" not in hosts
+
+    def test_domain_queries_use_host_index(self, isolated_history_index, host_history):
+        with isolated_history_index.connection("chrome") as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT SUM(u.visit_count) FROM main.index_urls u "
+                "WHERE u.source_id = ? AND (u.rev_host >= ? AND u.rev_host < ? "
+                "AND (u.rev_host = ? OR u.rev_host >= ?))",
+                (1, "moc.buhtig", "moc.buhtig/", "moc.buhtig", "moc.buhtig."),
+            ).fetchall()
+
+        assert "COVERING INDEX index_urls_rev_host" in plan[0][3]
+
+    def test_existing_rows_are_backfilled(self, tmp_path, host_history):
+        path = str(tmp_path / "v3.db")
+        history_index = HistoryIndex(path)
+        history_index.refresh("chrome")
+        history_index.close()
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            UPDATE index_urls SET host = NULL, rev_host = NULL, registrable_domain = NULL;
+            PRAGMA user_version = 3;
+        """)
+        conn.close()
+
+        upgraded = HistoryIndex(path)
+        try:
+            with upgraded.connection("chrome") as conn:
+                assert count_host_visits(conn, "bbc.co.uk") == 13
+        finally:
+            upgraded.close()
+
+    def test_service_domain_tools(self, host_history):
+        from chronicle_mcp.core import HistoryService
+
+        assert HistoryService.count_visits("github.com")["count"] == 23
+        result = HistoryService.list_top_domains(limit=1, group_by="domain")
+        assert result["domains"] == [("hub.com", 30)]
+
+
+class TestFuzzySearch:
+    """Tests for vocabulary-backed fuzzy search."""
+
+    @pytest.mark.parametrize("query", ["githbu", "pyhton tutorail", "micrsoft", "claude"])
+    def test_same_results_as_scan(self, isolated_history_index, mock_chrome_path, query):
+        with isolated_history_index.connection("chrome") as conn:
+            assert conn.fulltext
+            indexed = search_fuzzy(conn, query, 0.6, 50)
+            scanned = search_with_fuzzy(conn, query, 0.6, 50)
+
+        assert indexed
+        assert sorted(indexed) == sorted(scanned)
+        assert [row[3] for row in indexed] == sorted((row[3] for row in indexed), reverse=True)
+
+    def test_finds_typos_like_misses(self, isolated_history_index, mock_chrome_path):
+        with isolated_history_index.connection("chrome") as conn:
+            assert query_history(conn, "pyhton", 10) == []
+            results = search_fuzzy(conn, "pyhton", 0.6, 10)
+
+        # Newest first among equal scores
+        assert [row[0] for row in results] == ["Python SQLite Tutorial", "Python Tutorial"]
+        assert results[0][3] == pytest.approx(0.833)
+
+    def test_exact_matches_rank_first(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        _add_url(sample_chrome_db, "https://tutorials.dev/", "Tutorials", 1)
+        with isolated_history_index.connection("chrome") as conn:
+            results = search_fuzzy(conn, "tutorial", 0.6, 50)
+
+        assert [row[3] for row in results] == [1.0, 1.0, 0.875]
+        assert results[2][0] == "Tutorials"
+
+    def test_vocabulary_follows_ingestion(
+        self, isolated_history_index, mock_chrome_path, sample_chrome_db
+    ):
+        with isolated_history_index.connection("chrome") as conn:
+            assert search_fuzzy(conn, "zeppelin", 0.6, 10) == []
+
+        _add_url(sample_chrome_db, "https://zeppelin.apache.org/", "Apache Zeppelin")
+        with isolated_history_index.connection("chrome") as conn:
+            results = search_fuzzy(conn, "zepelin", 0.6, 10)
+
+        assert [row[0] for row in results] == ["Apache Zeppelin"]
+
+    def test_service_returns_scores(self, isolated_history_index, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.search_history_advanced(query="githbu", use_fuzzy=True)
+        with isolated_history_index.connection("chrome") as conn:
+            expected = search_fuzzy(conn, "githbu", 0.6, 20)
+
+        assert result["count"] == len(expected) > 0
+        assert result["results"] == [row[:3] for row in expected]
+        assert result["scores"] == [row[3] for row in expected]
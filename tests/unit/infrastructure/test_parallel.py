@@ -0,0 +1,145 @@
+"""Tests for parallel full-history scans."""
+
+import sqlite3
+
+import pytest
+
+from chronicle_mcp import parallel
+from chronicle_mcp.config import ScanConfig
+from chronicle_mcp.database import search_with_fuzzy, search_with_regex
+from chronicle_mcp.parallel import (
+    _plan_chunks,
+    search_fuzzy_parallel,
+    search_regex_parallel,
+    shutdown_scan_pool,
+)
+
+ROWS = 2_000
+WORDS = ["python", "pyhton", "tutorial", "github", "gihtub", "docs", "rust", "guide"]
+
+SCAN = ScanConfig(processes=2, chunk_rows=300, min_rows=1)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def scan_pool():
+    """Shuts the worker processes down after the module."""
+    yield
+    shutdown_scan_pool()
+
+
+@pytest.fixture
+def large_history(tmp_path, monkeypatch):
+    """Creates a Chrome history with repeated titles and some equal timestamps."""
+    from chronicle_mcp import connection
+
+    db_path = str(tmp_path / "History")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, 1, ?)",
+        (
+            (
+                f"https://site{i % 37}.example.com/{WORDS[i % 8]}/{i}",
+                f"{WORDS[(i * 3) % 8]} {WORDS[(i * 5) % 8]} page {i}",
+                13_300_000_000_000_000 + i // 3,
+            )
+            for i in range(ROWS)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "get_browser_path", lambda browser: db_path)
+    return db_path
+
+
+class TestParallelScan:
+    """Tests that parallel scans return what serial scans return."""
+
+    @pytest.mark.parametrize("query", ["python tutorial", "githbu", "rust", "zzzz"])
+    def test_fuzzy_matches_serial(self, large_history, query):
+        conn = sqlite3.connect(large_history)
+        try:
+            expected = search_with_fuzzy(conn, query, 0.6, 25)
+            assert search_fuzzy_parallel(conn, query, 0.6, 25, SCAN) == expected
+        finally:
+            conn.close()
+
+    @pytest.mark.parametrize("pattern", [r"site1\d\.", r"/(rust|docs)/\d+5$", "nomatch"])
+    def test_regex_matches_serial(self, large_history, pattern):
+        conn = sqlite3.connect(large_history)
+        try:
+            expected = search_with_regex(conn, pattern, 25)
+            results = search_regex_parallel(conn, pattern, 25, SCAN)
+        finally:
+            conn.close()
+
+        assert sorted(results) == sorted(expected)
+        assert [row[2] for row in results] == [row[2] for row in expected]
+
+    def test_index_connection(self, isolated_history_index, large_history):
+        with isolated_history_index.connection("chrome") as conn:
+            expected = search_with_fuzzy(conn, "pyhton guide", 0.6, 30)
+            assert search_fuzzy_parallel(conn, "pyhton guide", 0.6, 30, SCAN) == expected
+
+    def test_chunks_cover_all_rows(self, large_history):
+        conn = sqlite3.connect(large_history)
+        try:
+            chunks = _plan_chunks(conn, "fuzzy", "python", 0.6, 10, SCAN)
+        finally:
+            conn.close()
+
+        assert chunks is not None
+        assert len(chunks) == 7
+        assert chunks[0].first_id == 1 and chunks[-1].last_id == ROWS
+        assert all(a.last_id + 1 == b.first_id for a, b in zip(chunks, chunks[1:]))
+
+
+class TestSerialFallback:
+    """Tests for scans that stay in the calling process."""
+
+    def test_small_history(self, large_history, monkeypatch):
+        monkeypatch.setattr(parallel, "get_scan_pool", pytest.fail)
+        conn = sqlite3.connect(large_history)
+        try:
+            config = ScanConfig(processes=2, min_rows=ROWS + 1)
+            expected = search_with_fuzzy(conn, "python", 0.6, 5)
+            assert search_fuzzy_parallel(conn, "python", 0.6, 5, config) == expected
+        finally:
+            conn.close()
+
+    def test_in_memory_database(self, large_history, monkeypatch):
+        monkeypatch.setattr(parallel, "get_scan_pool", pytest.fail)
+        source = sqlite3.connect(large_history)
+        conn = sqlite3.connect(":memory:")
+        source.backup(conn)
+        source.close()
+        try:
+            expected = search_with_regex(conn, "rust", 5)
+            assert search_regex_parallel(conn, "rust", 5, SCAN) == expected
+        finally:
+            conn.close()
+
+    def test_invalid_pattern(self, large_history):
+        conn = sqlite3.connect(large_history)
+        try:
+            with pytest.raises(ValueError):
+                search_regex_parallel(conn, "(", 5, SCAN)
+        finally:
+            conn.close()
+
+    def test_service_option(self, large_history):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.search_history_advanced(
+            query="githbu", use_fuzzy=True, limit=100, parallel=True
+        )
+        indexed = HistoryService.search_history_advanced(query="githbu", use_fuzzy=True, limit=100)
+
+        assert result["options"]["parallel"] is True
+        assert result["count"] == 100
+        assert sorted(zip(result["results"], result["scores"])) == sorted(
+            zip(indexed["results"], indexed["scores"])
+        )
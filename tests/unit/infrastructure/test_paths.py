@@ -1,10 +1,15 @@
+import json
 import os
 from pathlib import Path
 
+import pytest
+
 from chronicle_mcp.paths import (
     BOOKMARK_PATHS,
     BROWSER_PATHS,
     DOWNLOAD_PATHS,
+    clear_profile_cache,
+    discover_profiles,
     expand_path,
     find_glob_path,
     get_all_browser_paths,
@@ -14,6 +19,9 @@ from chronicle_mcp.paths import (
     get_bookmark_path,
     get_browser_path,
     get_download_path,
+    get_os_name,
+    get_profile_targets,
+    split_browser,
 )
 
 
@@ -135,3 +143,155 @@ class TestDownloadPathDetection:
         for browser in DOWNLOAD_PATHS:
             assert browser in DOWNLOAD_PATHS
             assert isinstance(DOWNLOAD_PATHS[browser], dict)
+
+
+@pytest.fixture
+def profile_roots(monkeypatch, tmp_path):
+    """Points Chrome and Firefox profile discovery at temporary directories."""
+    import chronicle_mcp.paths as paths
+
+    os_name = get_os_name()
+    chrome_root = tmp_path / "google-chrome"
+    firefox_root = tmp_path / "firefox"
+    monkeypatch.setitem(paths.PROFILE_ROOTS, "chrome", {os_name: str(chrome_root)})
+    monkeypatch.setitem(paths.PROFILE_ROOTS, "firefox", {os_name: str(firefox_root)})
+    monkeypatch.setitem(
+        paths.BROWSER_PATHS, "chrome", {os_name: str(chrome_root / "Default" / "History")}
+    )
+    monkeypatch.setitem(
+        paths.BROWSER_PATHS, "firefox", {os_name: str(firefox_root / "*.default" / "places.sqlite")}
+    )
+    clear_profile_cache()
+    yield chrome_root, firefox_root
+    clear_profile_cache()
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def _write_local_state(root, profiles):
+    info_cache = {directory: {"name": name} for directory, name in profiles.items()}
+    (root / "Local State").write_text(json.dumps({"profile": {"info_cache": info_cache}}))
+
+
+class TestProfileDiscovery:
+    """Tests for discovering browser profiles."""
+
+    def test_split_browser(self):
+        assert split_browser("Chrome") == ("chrome", None)
+        assert split_browser("Chrome:Profile 1") == ("chrome", "Profile 1")
+        assert split_browser("firefox:") == ("firefox", None)
+
+    def test_chrome_profiles_from_local_state(self, profile_roots):
+        chrome_root, _ = profile_roots
+        for directory in ("Default", "Profile 1", "Profile 2"):
+            _touch(chrome_root / directory / "History")
+        # Listed without a history database, so not a usable profile
+        _write_local_state(
+            chrome_root,
+            {"Default": "Personal", "Profile 1": "Work", "Profile 2": "Side", "Profile 3": "Empty"},
+        )
+
+        profiles = discover_profiles("chrome")
+
+        assert [(p.directory, p.name, p.default) for p in profiles] == [
+            ("Default", "Personal", True),
+            ("Profile 1", "Work", False),
+            ("Profile 2", "Side", False),
+        ]
+        assert get_profile_targets("chrome") == ["chrome", "chrome:Profile 1", "chrome:Profile 2"]
+
+    def test_chrome_profiles_without_local_state(self, profile_roots):
+        chrome_root, _ = profile_roots
+        _touch(chrome_root / "Default" / "History")
+        _touch(chrome_root / "Profile 4" / "History")
+
+        assert get_profile_targets("chrome") == ["chrome", "chrome:Profile 4"]
+
+    def test_profile_path_by_directory_or_name(self, profile_roots):
+        chrome_root, _ = profile_roots
+        for directory in ("Default", "Profile 1"):
+            _touch(chrome_root / directory / "History")
+        _write_local_state(chrome_root, {"Default": "Personal", "Profile 1": "Work"})
+        expected = str(chrome_root / "Profile 1" / "History")
+
+        assert get_browser_path("chrome:Profile 1") == expected
+        assert get_browser_path("CHROME:work") == expected
+        assert get_browser_path("chrome:Nope") is None
+
+    def test_firefox_profiles_from_profiles_ini(self, profile_roots):
+        _, firefox_root = profile_roots
+        _touch(firefox_root / "Profiles" / "a1.default" / "places.sqlite")
+        _touch(firefox_root / "Profiles" / "b2.default-release" / "places.sqlite")
+        (firefox_root / "profiles.ini").write_text(
+            "[Install4F96D1932A9F858E]\n"
+            "Default=Profiles/b2.default-release\n\n"
+            "[Profile1]\nName=default\nIsRelative=1\nPath=Profiles/a1.default\nDefault=1\n\n"
+            "[Profile0]\nName=default-release\nIsRelative=1\nPath=Profiles/b2.default-release\n"
+        )
+
+        profiles = discover_profiles("firefox")
+
+        # The installation's default profile wins over the Default=1 entry
+        assert [(p.directory, p.default) for p in profiles] == [
+            ("b2.default-release", True),
+            ("a1.default", False),
+        ]
+        assert get_browser_path("firefox") == profiles[0].path
+        assert get_browser_path("firefox:default") == profiles[1].path
+
+    def test_firefox_default_comes_from_profiles_ini(self, profile_roots, monkeypatch):
+        import chronicle_mcp.paths as paths
+
+        _, firefox_root = profile_roots
+        # Both match the *.default pattern; the installation uses the second
+        _touch(firefox_root / "a1.default" / "places.sqlite")
+        _touch(firefox_root / "b2.default" / "places.sqlite")
+        (firefox_root / "profiles.ini").write_text(
+            "[Install4F96D1932A9F858E]\nDefault=b2.default\n\n"
+            "[Profile0]\nName=old\nIsRelative=1\nPath=a1.default\n\n"
+            "[Profile1]\nName=main\nIsRelative=1\nPath=b2.default\n"
+        )
+        main = str(firefox_root / "b2.default" / "places.sqlite")
+        # Whatever order the directory lists them in, the glob is not consulted
+        monkeypatch.setattr(
+            paths,
+            "find_glob_path",
+            lambda pattern: str(firefox_root / "a1.default" / "places.sqlite"),
+        )
+
+        assert get_browser_path("firefox") == get_browser_path("firefox:main") == main
+        assert get_profile_targets("firefox") == ["firefox", "firefox:a1.default"]
+
+    def test_discovery_is_cached_until_listing_changes(self, profile_roots, monkeypatch):
+        import chronicle_mcp.paths as paths
+
+        chrome_root, _ = profile_roots
+        for directory in ("Default", "Profile 1"):
+            _touch(chrome_root / directory / "History")
+        _write_local_state(chrome_root, {"Default": "Personal"})
+        assert len(discover_profiles("chrome")) == 1
+
+        reads = []
+        original = paths._chromium_profiles
+        monkeypatch.setattr(
+            paths, "_chromium_profiles", lambda *args: reads.append(args) or original(*args)
+        )
+        discover_profiles("chrome")
+        assert reads == []
+
+        _write_local_state(chrome_root, {"Default": "Personal", "Profile 1": "Work"})
+        st = os.stat(chrome_root / "Local State")
+        os.utime(chrome_root / "Local State", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert len(discover_profiles("chrome")) == 2
+        assert len(reads) == 1
+
+    def test_browser_without_profiles(self, monkeypatch):
+        import chronicle_mcp.paths as paths
+
+        monkeypatch.setattr(paths, "get_browser_path", lambda b: "/tmp/History.db")
+
+        assert get_profile_targets("safari") == ["safari"]
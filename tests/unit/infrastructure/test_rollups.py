@@ -0,0 +1,262 @@
+"""Tests for the time-bucketed visit rollups in the history index."""
+
+import os
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.database import chrome_cutoff
+from chronicle_mcp.index import HistoryIndex, get_top_hosts
+from chronicle_mcp.rollups import get_history_stats, get_top_pages
+
+URLS = [
+    (1, "https://github.com/anthropics", "Anthropic"),
+    (2, "https://gist.github.com/a/1", "Gist"),
+    (3, "https://news.bbc.co.uk/1", "News"),
+    (4, "https://www.bbc.co.uk/", "BBC"),
+    (5, "file:///tmp/notes.txt", "Notes"),
+]
+
+# (url id, hours ago) for each visit
+VISITS = [
+    (1, 1),
+    (1, 2),
+    (1, 30),
+    (2, 3),
+    (3, 5),
+    (3, 50),
+    (3, 60),
+    (4, 200),
+    (5, 1),
+]
+
+
+def _add_visits(db_path: str, visits: list[tuple[int, float]]) -> None:
+    """Append visit rows, keeping urls.visit_count in step, and bump the file's mtime."""
+    conn = sqlite3.connect(db_path)
+    for url_id, hours_ago in visits:
+        visit_time = chrome_cutoff(hours_ago)
+        conn.execute(
+            "INSERT INTO visits (url, visit_time, from_visit, transition) VALUES (?, ?, 0, 0)",
+            (url_id, visit_time),
+        )
+        conn.execute(
+            "UPDATE urls SET visit_count = visit_count + 1, "
+            "last_visit_time = MAX(last_visit_time, ?) WHERE id = ?",
+            (visit_time, url_id),
+        )
+    conn.commit()
+    conn.close()
+    st = os.stat(db_path)
+    os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def visit_history(tmp_path, monkeypatch):
+    """Creates a Chrome history with a visits table and mocks its path."""
+    from chronicle_mcp import connection
+
+    db_path = str(tmp_path / "History")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE urls (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT,
+            visit_count INTEGER DEFAULT 0, last_visit_time INTEGER DEFAULT 0
+        );
+        CREATE TABLE visits (
+            id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,
+            from_visit INTEGER, transition INTEGER
+        );
+    """)
+    conn.executemany("INSERT INTO urls (id, url, title) VALUES (?, ?, ?)", URLS)
+    conn.commit()
+    conn.close()
+    _add_visits(db_path, VISITS)
+    monkeypatch.setattr(connection, "get_browser_path", lambda browser: db_path)
+    return db_path
+
+
+def _visits_since(conn: sqlite3.Connection, since: int) -> dict[str, int]:
+    """Visits per host since a timestamp, aggregated directly from the visit rows."""
+    rows = conn.execute(
+        "SELECT u.host, COUNT(*) FROM main.index_visits v JOIN main.index_urls u "
+        "ON u.source_id = v.source_id AND u.source_url_id = v.source_url_id "
+        "WHERE v.source_id = ? AND v.visit_time >= ? AND u.host IS NOT NULL GROUP BY u.host",
+        (conn.source_id, since),  # type: ignore[attr-defined]
+    )
+    return dict(rows.fetchall())
+
+
+class TestRollups:
+    """Tests for building and querying rollups."""
+
+    @pytest.mark.parametrize("hours", [24, 36, 72, 24 * 30])
+    def test_windows_match_visit_rows(self, isolated_history_index, visit_history, hours):
+        since = chrome_cutoff(hours)
+        with isolated_history_index.connection("chrome") as conn:
+            assert dict(get_top_hosts(conn, 50, since=since)) == _visits_since(conn, since)
+
+    def test_top_domains_last_days(self, isolated_history_index, visit_history):
+        since = chrome_cutoff(24 * 7)
+        with isolated_history_index.connection("chrome") as conn:
+            hosts = get_top_hosts(conn, 10, since=since)
+            domains = get_top_hosts(conn, 10, "domain", since)
+
+        assert hosts == [("github.com", 3), ("news.bbc.co.uk", 3), ("gist.github.com", 1)]
+        assert domains == [("github.com", 4), ("bbc.co.uk", 3)]
+
+    def test_top_pages_count_visits_in_window(self, isolated_history_index, visit_history):
+        with isolated_history_index.connection("chrome") as conn:
+            pages = get_top_pages(conn, 10, chrome_cutoff(24))
+
+        assert [(title, visits) for title, _, visits in pages] == [
+            ("Anthropic", 2),
+            ("Gist", 1),
+            ("News", 1),
+        ]
+
+    def test_windowed_stats(self, isolated_history_index, visit_history):
+        with isolated_history_index.connection("chrome") as conn:
+            day = get_history_stats(conn, chrome_cutoff(24))
+            everything = get_history_stats(conn)
+
+        assert day["total_visits"] == 5
+        assert day["unique_urls"] == 3
+        assert everything["total_entries"] == 5
+        assert everything["total_visits"] == len(VISITS)
+        assert everything["unique_urls"] == 4
+
+    def test_new_visits_are_added_once(self, isolated_history_index, visit_history):
+        since = chrome_cutoff(24)
+        isolated_history_index.refresh("chrome")
+        _add_visits(visit_history, [(2, 0.5), (4, 0.5)])
+        isolated_history_index.refresh("chrome")
+        isolated_history_index.refresh("chrome")
+
+        with isolated_history_index.connection("chrome") as conn:
+            hosts = dict(get_top_hosts(conn, 10, since=since))
+
+        assert hosts == {
+            "github.com": 2,
+            "gist.github.com": 2,
+            "news.bbc.co.uk": 1,
+            "www.bbc.co.uk": 1,
+        }
+
+    def test_concurrent_writers_add_visits_once(
+        self, isolated_history_index, visit_history, monkeypatch
+    ):
+        from chronicle_mcp import index
+
+        other = HistoryIndex(isolated_history_index.path)
+        other.refresh("chrome")
+        isolated_history_index.refresh("chrome")
+        _add_visits(visit_history, [(2, 0.5), (4, 0.5)])
+        open_source = index.get_history_connection
+        raced: list[bool] = []
+
+        def racing(browser):
+            # The other writer ingests after this one has read its watermarks
+            if not raced:
+                raced.append(True)
+                other.refresh(browser)
+            return open_source(browser)
+
+        monkeypatch.setattr(index, "get_history_connection", racing)
+        try:
+            isolated_history_index.refresh("chrome")
+        finally:
+            other.close()
+
+        with isolated_history_index.connection("chrome") as conn:
+            visits = conn.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+            (rolled_up,) = conn.execute(
+                "SELECT SUM(visits) FROM rollup_totals WHERE source_id = ? AND resolution = 'day'",
+                (conn.source_id,),
+            ).fetchone()
+
+        assert visits == rolled_up == len(VISITS) + 2
+
+    def test_deleted_visits_leave_rollups(self, isolated_history_index, visit_history):
+        since = chrome_cutoff(24 * 30)
+        isolated_history_index.refresh("chrome")
+        conn = sqlite3.connect(visit_history)
+        conn.execute("DELETE FROM visits WHERE url = 1")
+        conn.execute("DELETE FROM urls WHERE id = 1")
+        conn.commit()
+        conn.close()
+        _add_visits(visit_history, [(2, 0.5)])
+
+        with isolated_history_index.connection("chrome") as conn:
+            hosts = dict(get_top_hosts(conn, 10, since=since))
+            assert hosts == _visits_since(conn, since)
+            (rolled_up,) = conn.execute(
+                "SELECT SUM(visits) FROM rollup_totals WHERE source_id = ? AND resolution = 'hour'",
+                (conn.source_id,),
+            ).fetchone()
+
+        assert isolated_history_index.get_stats()["resets"] == 0
+        assert "github.com" not in hosts
+        assert rolled_up == len(VISITS) - 3 + 1
+
+    def test_windowed_query_reads_rollups(self, isolated_history_index, visit_history):
+        statements: list[str] = []
+        with isolated_history_index.connection("chrome") as conn:
+            conn.set_trace_callback(statements.append)
+            get_top_hosts(conn, 10, since=chrome_cutoff(24 * 7))
+
+        assert any("rollup_hosts" in sql for sql in statements)
+        assert not any("index_visits v" in sql for sql in statements)
+
+    def test_existing_index_is_upgraded(self, tmp_path, visit_history):
+        path = str(tmp_path / "v4.db")
+        history_index = HistoryIndex(path)
+        history_index.refresh("chrome")
+        history_index.close()
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            DROP TABLE rollup_totals;
+            DROP TABLE rollup_hosts;
+            DROP TABLE rollup_pages;
+            DROP TABLE source_stats;
+            PRAGMA user_version = 4;
+        """)
+        conn.close()
+
+        upgraded = HistoryIndex(path)
+        try:
+            with upgraded.connection("chrome") as conn:
+                since = chrome_cutoff(24 * 30)
+                assert dict(get_top_hosts(conn, 10, since=since)) == _visits_since(conn, since)
+        finally:
+            upgraded.close()
+
+
+class TestServiceWindows:
+    """Tests for the days parameter of the statistics services."""
+
+    def test_service_windows(self, visit_history):
+        from chronicle_mcp.core import HistoryService
+
+        domains = HistoryService.list_top_domains(days=1, group_by="domain")
+        pages = HistoryService.get_most_visited_pages(days=1)
+        stats = HistoryService.get_browser_stats(days=1)
+
+        assert domains["domains"] == [("github.com", 3), ("bbc.co.uk", 1)]
+        assert domains["days"] == 1
+        assert pages["pages"][0][0] == "Anthropic"
+        assert stats["stats"]["total_visits"] == 5
+
+    def test_sources_without_visits_use_last_visit_time(self, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.list_top_domains(days=1)
+        everything = HistoryService.list_top_domains()
+
+        assert result["domains"] == everything["domains"]
+
+    def test_invalid_days(self, visit_history):
+        from chronicle_mcp.core import HistoryService, ValidationError
+
+        with pytest.raises(ValidationError):
+            HistoryService.get_browser_stats(days=0)
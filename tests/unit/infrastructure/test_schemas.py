@@ -0,0 +1,264 @@
+"""Tests for native-schema history queries on Firefox and Safari databases."""
+
+import sqlite3
+import time
+
+import pytest
+
+from chronicle_mcp.database import (
+    chrome_cutoff,
+    get_browser_stats,
+    get_most_visited_pages,
+    query_history,
+    query_recent_history,
+    search_by_date,
+)
+from chronicle_mcp.schemas import (
+    SAFARI_EPOCH_OFFSET_SECONDS,
+    FirefoxHistory,
+    SafariHistory,
+    get_native_history,
+)
+
+NOW = time.time()
+
+# (id, url, title, visit_count, hours ago, origin id)
+PLACES = [
+    (1, "https://github.com/anthropics", "Anthropic", 12, 1, 1),
+    (2, "https://gist.github.com/a/1", "Gist", 3, 5, 2),
+    (3, "https://news.bbc.co.uk/1", "News", 7, 30, 3),
+    (4, "https://www.bbc.co.uk/", "BBC", 2, 200, 4),
+    (5, "https://notgithub.com/", "Not GitHub", 40, 2, 5),
+    (6, "place:sort=8", None, 0, 1.5, None),
+]
+
+ORIGINS = [
+    (1, "https://", "github.com"),
+    (2, "https://", "gist.github.com"),
+    (3, "https://", "news.bbc.co.uk"),
+    (4, "https://", "www.bbc.co.uk"),
+    (5, "https://", "notgithub.com"),
+]
+
+# (url, title, hours ago of each visit)
+SAFARI_ITEMS = [
+    ("https://github.com/anthropics", "Anthropic", [1, 20]),
+    ("https://docs.python.org/3/", "Python docs", [3, 100]),
+    ("https://www.bbc.co.uk/", "BBC", [300]),
+]
+
+
+def _firefox_time(hours_ago: float) -> int:
+    """Firefox timestamp (microseconds since 1970) of a moment N hours ago."""
+    return int((NOW - hours_ago * 3600) * 1_000_000)
+
+
+def _safari_time(hours_ago: float) -> float:
+    """Safari timestamp (seconds since 2001) of a moment N hours ago."""
+    return NOW - hours_ago * 3600 - SAFARI_EPOCH_OFFSET_SECONDS
+
+
+@pytest.fixture
+def firefox_db(tmp_path):
+    """Creates a places.sqlite with Firefox's own indexes and origins."""
+    db_path = str(tmp_path / "places.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE moz_origins (
+            id INTEGER PRIMARY KEY, prefix TEXT NOT NULL, host TEXT NOT NULL,
+            frecency INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE moz_places (
+            id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+            rev_host LONGVARCHAR, visit_count INTEGER DEFAULT 0,
+            last_visit_date INTEGER, origin_id INTEGER
+        );
+        CREATE INDEX moz_places_hostindex ON moz_places (rev_host);
+        CREATE INDEX moz_places_visitcount ON moz_places (visit_count);
+        CREATE INDEX moz_places_lastvisitdateindex ON moz_places (last_visit_date);
+        CREATE TABLE moz_historyvisits (
+            id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+            visit_date INTEGER, visit_type INTEGER
+        );
+    """)
+    conn.executemany("INSERT INTO moz_origins (id, prefix, host) VALUES (?, ?, ?)", ORIGINS)
+    for place_id, url, title, count, hours_ago, origin_id in PLACES:
+        host = url.split("/")[2] if url.startswith("http") else ""
+        conn.execute(
+            "INSERT INTO moz_places VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (place_id, url, title, host[::-1] + ".", count, _firefox_time(hours_ago), origin_id),
+        )
+        conn.execute(
+            "INSERT INTO moz_historyvisits (place_id, visit_date, visit_type) VALUES (?, ?, 1)",
+            (place_id, _firefox_time(hours_ago)),
+        )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def safari_db(tmp_path):
+    """Creates a Safari History.db, whose titles and times live on the visits."""
+    db_path = str(tmp_path / "History.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE history_items (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, visit_count INTEGER NOT NULL
+        );
+        CREATE TABLE history_visits (
+            id INTEGER PRIMARY KEY, history_item INTEGER NOT NULL,
+            visit_time REAL NOT NULL, title TEXT
+        );
+        CREATE INDEX history_visits__time ON history_visits (visit_time);
+    """)
+    for url, title, visits in SAFARI_ITEMS:
+        item_id = conn.execute(
+            "INSERT INTO history_items (url, visit_count) VALUES (?, ?)", (url, len(visits))
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO history_visits (history_item, visit_time, title) VALUES (?, ?, ?)",
+            [(item_id, _safari_time(hours_ago), title) for hours_ago in visits],
+        )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def native_browsers(monkeypatch, firefox_db, safari_db):
+    """Serves the native databases to the services, with the history index disabled."""
+    from chronicle_mcp import connection, paths
+
+    def mock_get_browser_path(browser):
+        return {"firefox": firefox_db, "safari": safari_db}.get(browser.lower())
+
+    monkeypatch.setattr(paths, "get_browser_path", mock_get_browser_path)
+    monkeypatch.setattr(connection, "get_browser_path", mock_get_browser_path)
+    monkeypatch.setattr("chronicle_mcp.core.services.get_history_index", lambda: None)
+
+
+class TestNativeHistory:
+    """Tests for the schema adapters."""
+
+    def test_adapter_per_schema(self, firefox_db, safari_db, sample_chrome_db):
+        with sqlite3.connect(firefox_db) as conn:
+            assert isinstance(get_native_history(conn), FirefoxHistory)
+        with sqlite3.connect(safari_db) as conn:
+            assert isinstance(get_native_history(conn), SafariHistory)
+        with sqlite3.connect(sample_chrome_db) as conn:
+            assert get_native_history(conn) is None
+
+    def test_firefox_recent_history(self, firefox_db):
+        conn = sqlite3.connect(firefox_db)
+        try:
+            rows = query_recent_history(conn, hours=24, limit=10)
+        finally:
+            conn.close()
+
+        assert [title for title, _, _ in rows] == ["Anthropic", None, "Not GitHub", "Gist"]
+
+    def test_firefox_domain_uses_rev_host_index(self, firefox_db):
+        conn = sqlite3.connect(firefox_db)
+        native = get_native_history(conn)
+        assert native is not None
+        try:
+            statements: list[str] = []
+            conn.set_trace_callback(statements.append)
+            urls = [url for _, url, _, _ in native.host_candidates("github.com")]
+            conn.set_trace_callback(None)
+            plan = " ".join(str(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {statements[0]}"))
+        finally:
+            conn.close()
+
+        assert urls == ["https://github.com/anthropics", "https://gist.github.com/a/1"]
+        assert "moz_places_hostindex" in plan
+
+    def test_firefox_windowed_queries_use_date_index(self, firefox_db):
+        conn = sqlite3.connect(firefox_db)
+        try:
+            statements: list[str] = []
+            conn.set_trace_callback(statements.append)
+            query_recent_history(conn, hours=24, limit=5)
+            conn.set_trace_callback(None)
+            plan = " ".join(
+                str(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {statements[-1]}")
+            )
+            rows = search_by_date(conn, "bbc", "2000-01-01", "2100-01-01")
+        finally:
+            conn.close()
+
+        assert "moz_places_lastvisitdateindex" in plan
+        assert [title for title, _, _ in rows] == ["News", "BBC"]
+
+    def test_firefox_top_domains_from_origins(self, firefox_db):
+        from chronicle_mcp.index import get_top_hosts
+
+        conn = sqlite3.connect(firefox_db)
+        try:
+            hosts = get_top_hosts(conn, 3)
+            domains = get_top_hosts(conn, 3, "domain", chrome_cutoff(24))
+        finally:
+            conn.close()
+
+        assert hosts == [("notgithub.com", 40), ("github.com", 12), ("news.bbc.co.uk", 7)]
+        assert domains == [("notgithub.com", 40), ("github.com", 15)]
+
+    def test_firefox_stats_and_pages(self, firefox_db):
+        conn = sqlite3.connect(firefox_db)
+        try:
+            stats = get_browser_stats(conn)
+            pages = get_most_visited_pages(conn, 2)
+        finally:
+            conn.close()
+
+        assert stats["total_entries"] == len(PLACES)
+        assert stats["total_visits"] == sum(place[3] for place in PLACES)
+        assert stats["unique_urls"] == 5
+        assert pages == [
+            ("Not GitHub", "https://notgithub.com/", 40),
+            ("Anthropic", "https://github.com/anthropics", 12),
+        ]
+
+    def test_safari_times_come_from_visits(self, safari_db):
+        conn = sqlite3.connect(safari_db)
+        try:
+            recent = query_recent_history(conn, hours=24, limit=10)
+            matches = query_history(conn, "python")
+            dated = search_by_date(conn, "github", "2000-01-01", "2100-01-01")
+        finally:
+            conn.close()
+
+        assert [title for title, _, _ in recent] == ["Anthropic", "Python docs"]
+        assert matches[0][:2] == ("Python docs", "https://docs.python.org/3/")
+        assert dated[0][2] == recent[0][2]
+
+
+class TestNativeServices:
+    """Tests for the services on native databases, without the history index."""
+
+    def test_firefox_services(self, native_browsers):
+        from chronicle_mcp.core import HistoryService
+
+        recent = HistoryService.get_recent_history(hours=24, limit=10, browser="firefox")
+        domain = HistoryService.search_by_domain("bbc.co.uk", browser="firefox")
+        count = HistoryService.count_visits("github.com", browser="firefox")
+        top = HistoryService.list_top_domains(limit=2, browser="firefox")
+        export = HistoryService.export_history(format_type="json", browser="firefox")
+
+        assert recent["count"] == 4
+        assert [title for title, _, _ in domain["results"]] == ["News", "BBC"]
+        assert count["count"] == 15
+        assert top["domains"] == [("notgithub.com", 40), ("github.com", 12)]
+        assert '"exported_entries": 6' in export["content"]
+
+    def test_safari_services(self, native_browsers):
+        from chronicle_mcp.core import HistoryService
+
+        recent = HistoryService.get_recent_history(hours=48, limit=10, browser="safari")
+        search = HistoryService.search_history("bbc", browser="safari")
+        stats = HistoryService.get_browser_stats(browser="safari")
+
+        assert [title for title, _, _ in recent["results"]] == ["Anthropic", "Python docs"]
+        assert search["count"] == 1
+        assert stats["stats"]["total_visits"] == 5
@@ -0,0 +1,311 @@
+"""Tests for browsing sessions reconstructed from visit chains."""
+
+import os
+import sqlite3
+
+import pytest
+
+from chronicle_mcp import sessions
+from chronicle_mcp.database import chrome_cutoff
+from chronicle_mcp.index import HistoryIndex
+from chronicle_mcp.sessions import MINUTE_MICROSECONDS, get_sessions
+from chronicle_mcp.timeline import CHROME_EPOCH
+
+URLS = [
+    (1, "https://github.com/anthropics", "Anthropic"),
+    (2, "https://github.com/anthropics/x", "Repo"),
+    (3, "https://ads.example.com/frame", "Ad"),
+    (4, "https://docs.python.org/", "Python docs"),
+    (5, "https://docs.python.org/3/", "Python 3"),
+    (6, "https://www.bbc.co.uk/", "BBC"),
+    (7, "https://www.bbc.co.uk/news", "News"),
+    (8, "https://www.bbc.co.uk/sport", "Sport"),
+]
+
+# Chrome transitions: LINK = 0, TYPED = 1, AUTO_SUBFRAME = 3, with qualifier bits
+LINK, TYPED, SUBFRAME = 0x30000000, 0x30000001, 0x10000003
+
+# (visit id, url id, minutes after BASE, from_visit, Chrome transition, Firefox visit type)
+VISITS = [
+    (1, 1, 0, 0, TYPED, 2),
+    (2, 2, 5, 1, LINK, 1),
+    (3, 3, 6, 2, SUBFRAME, 4),
+    (4, 4, 20, 0, TYPED, 2),
+    # 70 idle minutes, but followed from a link on visit 4
+    (5, 5, 90, 4, LINK, 1),
+    # 60 idle minutes: a new session
+    (6, 6, 150, 0, TYPED, 2),
+    (7, 7, 160, 6, LINK, 1),
+    # Linked, but after more than LINKED_GAP_FACTOR idle gaps
+    (8, 8, 360, 7, LINK, 1),
+]
+
+BASE = chrome_cutoff(48)
+
+
+def _time(minutes: float) -> int:
+    return BASE + int(minutes * MINUTE_MICROSECONDS)
+
+
+def _add_visits(db_path: str, visits: list[tuple[int, int, float, int, int, int]]) -> None:
+    """Append Chrome visit rows and bump the file's mtime."""
+    conn = sqlite3.connect(db_path)
+    for visit_id, url_id, minutes, from_visit, transition, _ in visits:
+        conn.execute(
+            "INSERT INTO visits (id, url, visit_time, from_visit, transition) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (visit_id, url_id, _time(minutes), from_visit, transition),
+        )
+        conn.execute(
+            "UPDATE urls SET visit_count = visit_count + 1, "
+            "last_visit_time = MAX(last_visit_time, ?) WHERE id = ?",
+            (_time(minutes), url_id),
+        )
+    conn.commit()
+    conn.close()
+    st = os.stat(db_path)
+    os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def session_history(tmp_path, monkeypatch):
+    """Creates a Chrome history with visit chains and mocks its path."""
+    from chronicle_mcp import connection, paths
+
+    db_path = str(tmp_path / "History")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE urls (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT,
+            visit_count INTEGER DEFAULT 0, last_visit_time INTEGER DEFAULT 0
+        );
+        CREATE TABLE visits (
+            id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,
+            from_visit INTEGER, transition INTEGER
+        );
+    """)
+    conn.executemany("INSERT INTO urls (id, url, title) VALUES (?, ?, ?)", URLS)
+    conn.commit()
+    conn.close()
+    _add_visits(db_path, VISITS)
+
+    def mock_get_browser_path(browser):
+        return db_path if browser.lower() == "chrome" else None
+
+    monkeypatch.setattr(paths, "get_browser_path", mock_get_browser_path)
+    monkeypatch.setattr(connection, "get_browser_path", mock_get_browser_path)
+    return db_path
+
+
+@pytest.fixture
+def firefox_sessions(tmp_path):
+    """Creates a places.sqlite with the same visit chains, in Firefox's epoch."""
+    db_path = str(tmp_path / "places.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE moz_places (
+            id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+            visit_count INTEGER DEFAULT 0, last_visit_date INTEGER
+        );
+        CREATE TABLE moz_historyvisits (
+            id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+            visit_date INTEGER, visit_type INTEGER
+        );
+    """)
+    conn.executemany("INSERT INTO moz_places (id, url, title) VALUES (?, ?, ?)", URLS)
+    epoch_offset = int((CHROME_EPOCH.replace(year=1970) - CHROME_EPOCH).total_seconds())
+    conn.executemany(
+        "INSERT INTO moz_historyvisits VALUES (?, ?, ?, ?, ?)",
+        [
+            (visit_id, from_visit, url_id, _time(minutes) - epoch_offset * 1_000_000, visit_type)
+            for visit_id, url_id, minutes, from_visit, _, visit_type in VISITS
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _shape(found: list[dict]) -> list[tuple[int, str, int]]:
+    """(visits, entry url, duration) of each session."""
+    return [(s["visits"], s["entry_url"], s["duration_minutes"]) for s in found]
+
+
+EXPECTED = [
+    (1, "https://www.bbc.co.uk/sport", 0),
+    (2, "https://www.bbc.co.uk/", 10),
+    (4, "https://github.com/anthropics", 90),
+]
+
+
+class TestSessionBoundaries:
+    """Tests for how visits are grouped."""
+
+    def test_idle_gaps_links_and_subframes(self, isolated_history_index, session_history):
+        with isolated_history_index.connection("chrome") as conn:
+            found = get_sessions(conn)
+
+        assert _shape(found) == EXPECTED
+        assert found[2]["top_hosts"] == [("docs.python.org", 2), ("github.com", 2)]
+        assert found[2]["entry_title"] == "Anthropic"
+
+    @pytest.mark.parametrize("database", ["session_history", "firefox_sessions"])
+    def test_browser_databases_match_the_index(self, request, database):
+        conn = sqlite3.connect(request.getfixturevalue(database))
+        try:
+            found = get_sessions(conn)
+        finally:
+            conn.close()
+
+        assert _shape(found) == EXPECTED
+
+    def test_since_keeps_sessions_running_at_the_cutoff(
+        self, isolated_history_index, session_history
+    ):
+        with isolated_history_index.connection("chrome") as conn:
+            stored = get_sessions(conn, since=_time(155))
+        conn = sqlite3.connect(session_history)
+        try:
+            computed = get_sessions(conn, since=_time(155))
+        finally:
+            conn.close()
+
+        assert _shape(stored) == _shape(computed) == EXPECTED[:2]
+
+    def test_limit_keeps_the_newest(self, session_history):
+        conn = sqlite3.connect(session_history)
+        try:
+            found = get_sessions(conn, limit=1)
+        finally:
+            conn.close()
+
+        assert _shape(found) == EXPECTED[:1]
+
+
+class TestStoredSessions:
+    """Tests for sessions persisted in the history index."""
+
+    def test_refresh_extends_the_open_session(
+        self, isolated_history_index, session_history, monkeypatch
+    ):
+        isolated_history_index.refresh("chrome")
+        rebuilds: list[int] = []
+        clear = sessions.clear_sessions
+        monkeypatch.setattr(
+            sessions,
+            "clear_sessions",
+            lambda writer, source: rebuilds.append(source) or clear(writer, source),
+        )
+        _add_visits(session_history, [(9, 6, 365, 8, LINK, 1), (10, 1, 600, 0, TYPED, 2)])
+
+        with isolated_history_index.connection("chrome") as conn:
+            found = get_sessions(conn)
+
+        assert rebuilds == []
+        assert _shape(found)[:2] == [
+            (1, "https://github.com/anthropics", 0),
+            (2, EXPECTED[0][1], 5),
+        ]
+        assert _shape(found)[2:] == EXPECTED[1:]
+
+    def test_deleted_visits_regroup_their_session(
+        self, isolated_history_index, session_history, monkeypatch
+    ):
+        isolated_history_index.refresh("chrome")
+        rebuilds: list[int] = []
+        clear = sessions.clear_sessions
+        monkeypatch.setattr(
+            sessions,
+            "clear_sessions",
+            lambda writer, source: rebuilds.append(source) or clear(writer, source),
+        )
+        # Expired by the browser: the oldest visit, and the one that linked visit 5 in
+        conn = sqlite3.connect(session_history)
+        conn.execute("DELETE FROM visits WHERE id IN (1, 4)")
+        conn.commit()
+        conn.close()
+        _add_visits(session_history, [(9, 6, 365, 8, LINK, 1)])
+
+        with isolated_history_index.connection("chrome") as conn:
+            found = get_sessions(conn)
+
+        assert rebuilds == []
+        assert _shape(found) == [
+            (2, EXPECTED[0][1], 5),
+            *EXPECTED[1:2],
+            (1, "https://docs.python.org/3/", 0),
+            (1, "https://github.com/anthropics/x", 0),
+        ]
+
+    def test_earlier_visits_rebuild_the_sessions(self, isolated_history_index, session_history):
+        isolated_history_index.refresh("chrome")
+        # Synced from another device: a higher id, dated inside the first session
+        _add_visits(session_history, [(9, 5, 10, 0, TYPED, 2)])
+
+        with isolated_history_index.connection("chrome") as conn:
+            found = get_sessions(conn)
+
+        assert [s["visits"] for s in found] == [1, 2, 5]
+
+    def test_idle_gap_change(self, tmp_path, session_history):
+        path = str(tmp_path / "gap.db")
+        HistoryIndex(path).refresh("chrome")
+        wider = HistoryIndex(path, session_idle_minutes=90)
+        try:
+            # Stored with the old gap, so grouped from the index's visits instead
+            with wider.connection("chrome") as conn:
+                computed = get_sessions(conn, idle_minutes=90)
+            _add_visits(session_history, [])
+            with wider.connection("chrome") as conn:
+                stored = get_sessions(conn, idle_minutes=90)
+        finally:
+            wider.close()
+
+        assert _shape(computed) == _shape(stored) == [(7, "https://github.com/anthropics", 360)]
+
+    def test_existing_index_is_upgraded(self, tmp_path, session_history):
+        path = str(tmp_path / "v5.db")
+        history_index = HistoryIndex(path)
+        history_index.refresh("chrome")
+        history_index.close()
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            DROP TABLE sessions;
+            DROP TABLE session_state;
+            PRAGMA user_version = 5;
+        """)
+        conn.close()
+
+        upgraded = HistoryIndex(path)
+        try:
+            with upgraded.connection("chrome") as conn:
+                stored = conn.execute("SELECT COUNT(*) FROM main.sessions").fetchone()[0]
+                found = get_sessions(conn)
+        finally:
+            upgraded.close()
+
+        assert stored == len(EXPECTED)
+        assert _shape(found) == EXPECTED
+
+
+class TestSessionService:
+    """Tests for the sessions service."""
+
+    def test_sessions(self, session_history):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.get_browsing_sessions(days=7, format_type="json")
+        markdown = HistoryService.get_browsing_sessions(limit=2)
+
+        assert result["count"] == 3
+        assert '"sessions"' in result["message"]
+        assert "Top sites: www.bbc.co.uk (2)" in markdown["message"]
+        assert markdown["count"] == 2
+
+    def test_without_visit_rows(self, mock_chrome_path):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.get_browsing_sessions()
+
+        assert result["count"] >= 1
+        assert sum(s["visits"] for s in result["sessions"]) > 0
@@ -0,0 +1,475 @@
+"""Tests for snapshot management.
+
+These tests verify snapshot reuse, refresh, reference counting and the disk budget.
+"""
+
+import errno
+import os
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.snapshot import (
+    MEMORY_SNAPSHOTS_SUPPORTED,
+    SnapshotBudgetError,
+    SnapshotManager,
+    available_copy_methods,
+    fast_copy_file,
+    fingerprint_source,
+)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """Provides a snapshot manager writing into a temporary directory."""
+    mgr = SnapshotManager(directory=str(tmp_path / "snapshots"))
+    yield mgr
+    mgr.close()
+
+
+def _touch_history(db_path: str) -> None:
+    """Write a new row so the source database's fingerprint changes."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        ("https://example.com/new", "New Page", 1, 0),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestSnapshotReuse:
+    """Tests for snapshot reuse and refresh."""
+
+    def test_unchanged_source_reuses_snapshot(self, manager, sample_chrome_db):
+        with manager.snapshot("chrome", sample_chrome_db) as first:
+            pass
+        with manager.snapshot("chrome", sample_chrome_db) as second:
+            pass
+
+        assert first is second
+        assert os.path.exists(second.path)
+        stats = manager.get_stats()
+        assert stats["refreshes"] == 1
+        assert stats["hits"] == 1
+
+    def test_changed_source_refreshes_snapshot(self, manager, sample_chrome_db):
+        with manager.snapshot("chrome", sample_chrome_db) as first:
+            pass
+
+        _touch_history(sample_chrome_db)
+
+        with manager.snapshot("chrome", sample_chrome_db) as second:
+            conn = sqlite3.connect(second.path)
+            count = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            conn.close()
+
+        assert second is not first
+        assert count == 6
+        assert not os.path.exists(first.path)
+
+    def test_staleness_bound_forces_refresh(self, tmp_path, sample_chrome_db):
+        mgr = SnapshotManager(directory=str(tmp_path), max_staleness_seconds=0)
+        try:
+            with mgr.snapshot("chrome", sample_chrome_db) as first:
+                pass
+            with mgr.snapshot("chrome", sample_chrome_db) as second:
+                pass
+            assert second is not first
+        finally:
+            mgr.close()
+
+    def test_fingerprint_tracks_wal_file(self, sample_chrome_db):
+        before = fingerprint_source(sample_chrome_db)
+        with open(sample_chrome_db + "-wal", "wb") as f:
+            f.write(b"\0" * 32)
+        after = fingerprint_source(sample_chrome_db)
+
+        assert before.wal_size == 0
+        assert after.wal_size == 32
+        assert before != after
+
+
+class TestSnapshotReferenceCounting:
+    """Tests for snapshot lifetimes while readers hold them."""
+
+    def test_refresh_keeps_held_snapshot_until_release(self, manager, sample_chrome_db):
+        held = manager.acquire("chrome", sample_chrome_db)
+        _touch_history(sample_chrome_db)
+
+        with manager.snapshot("chrome", sample_chrome_db) as fresh:
+            assert fresh is not held
+            assert held.retired
+            assert os.path.exists(held.path)
+
+        manager.release(held)
+        assert not os.path.exists(held.path)
+
+    def test_invalidate_drops_snapshot(self, manager, sample_chrome_db):
+        with manager.snapshot("chrome", sample_chrome_db) as first:
+            pass
+        manager.invalidate("chrome")
+
+        assert not os.path.exists(first.path)
+        assert manager.get_stats()["snapshots"] == 0
+
+
+class TestSnapshotDiskBudget:
+    """Tests for disk budget enforcement."""
+
+    def test_idle_snapshots_are_evicted(self, tmp_path, sample_chrome_db, sample_firefox_db):
+        budget = max(os.path.getsize(sample_chrome_db), os.path.getsize(sample_firefox_db))
+        mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), disk_budget_bytes=budget)
+        try:
+            with mgr.snapshot("chrome", sample_chrome_db) as chrome_snapshot:
+                pass
+            with mgr.snapshot("firefox", sample_firefox_db):
+                pass
+
+            assert not os.path.exists(chrome_snapshot.path)
+            assert mgr.get_stats()["evictions"] == 1
+        finally:
+            mgr.close()
+
+    def test_budget_exceeded_raises(self, tmp_path, sample_chrome_db):
+        mgr = SnapshotManager(directory=str(tmp_path), disk_budget_bytes=1)
+        with pytest.raises(SnapshotBudgetError):
+            mgr.acquire("chrome", sample_chrome_db)
+
+
+class TestSnapshotConnections:
+    """Tests for connections opened through get_history_connection."""
+
+    def test_schema_cached_per_snapshot(self, mock_chrome_path):
+        from chronicle_mcp.connection import get_history_connection
+        from chronicle_mcp.database import detect_schema
+
+        with get_history_connection("chrome") as conn:
+            assert detect_schema(conn) == "chrome"
+            assert conn.snapshot.schema == "chrome"
+
+    def test_snapshot_connection_is_read_only(self, mock_chrome_path):
+        from chronicle_mcp.connection import get_history_connection
+
+        with get_history_connection("chrome") as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM urls")
+
+    def test_writable_connection_uses_private_copy(self, mock_chrome_path, sample_chrome_db):
+        from chronicle_mcp.connection import get_history_connection
+
+        with get_history_connection("chrome", writable=True) as conn:
+            conn.execute("DELETE FROM urls")
+            conn.commit()
+
+        source = sqlite3.connect(sample_chrome_db)
+        assert source.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 5
+        source.close()
+
+
+@pytest.fixture
+def wal_chrome_db(tmp_path):
+    """Creates a WAL-mode history database whose newest rows live only in the -wal file."""
+    db_path = str(tmp_path / "History")
+    writer = sqlite3.connect(db_path)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER)"
+    )
+    writer.executemany(
+        "INSERT INTO urls (url, title) VALUES (?, ?)",
+        [(f"https://example.com/{i}", f"Page {i}") for i in range(10)],
+    )
+    writer.commit()
+    writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    writer.executemany(
+        "INSERT INTO urls (url, title) VALUES (?, ?)",
+        [(f"https://example.com/wal/{i}", f"WAL Page {i}") for i in range(5)],
+    )
+    writer.commit()
+    yield db_path
+    writer.close()
+
+
+def _count_rows(snapshot) -> int:
+    from chronicle_mcp.connection import connect_readonly
+
+    conn = connect_readonly(snapshot.path, snapshot.immutable)
+    try:
+        return int(conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0])
+    finally:
+        conn.close()
+
+
+class TestSnapshotStrategies:
+    """Tests for the copy, backup and uri snapshot strategies."""
+
+    @pytest.mark.parametrize("strategy", ["copy", "backup", "uri"])
+    def test_strategy_includes_wal_content(self, tmp_path, wal_chrome_db, strategy):
+        mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy=strategy)
+        try:
+            with mgr.snapshot("chrome", wal_chrome_db) as snap:
+                assert snap.strategy == strategy
+                assert _count_rows(snap) == 15
+        finally:
+            mgr.close()
+
+    def test_unknown_strategy_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            SnapshotManager(directory=str(tmp_path), strategy="rsync")
+
+    def test_uri_strategy_reads_source_in_place(self, tmp_path, sample_chrome_db):
+        mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy="uri")
+        with mgr.snapshot("chrome", sample_chrome_db) as snap:
+            assert snap.path == sample_chrome_db
+            assert snap.immutable
+            assert snap.size_bytes == 0
+
+        mgr.invalidate()
+        mgr.close()
+        assert os.path.exists(sample_chrome_db)
+
+    @pytest.mark.parametrize("strategy", ["backup", "uri"])
+    def test_locked_source_falls_back_to_copy(self, tmp_path, sample_chrome_db, strategy):
+        browser = sqlite3.connect(sample_chrome_db)
+        browser.execute("PRAGMA locking_mode=EXCLUSIVE")
+        browser.execute("UPDATE urls SET visit_count = visit_count + 1")
+        browser.commit()
+
+        mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy=strategy)
+        try:
+            with mgr.snapshot("chrome", sample_chrome_db) as snap:
+                assert snap.strategy == "copy"
+                assert _count_rows(snap) == 5
+            assert mgr.get_stats()["strategies_used"] == {"copy": 1}
+        finally:
+            mgr.close()
+            browser.close()
+
+
+@pytest.fixture
+def memory_manager(tmp_path):
+    """Provides a snapshot manager that keeps Chrome history in memory."""
+    mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), memory_browsers=["chrome"])
+    yield mgr
+    mgr.close()
+
+
+@pytest.mark.skipif(not MEMORY_SNAPSHOTS_SUPPORTED, reason="requires Python 3.11+")
+class TestMemorySnapshots:
+    """Tests for in-memory snapshots."""
+
+    def test_loaded_once_and_reused(self, memory_manager, wal_chrome_db):
+        first = memory_manager.memory.acquire("chrome", wal_chrome_db)
+        memory_manager.memory.release(first)
+        second = memory_manager.memory.acquire("chrome", wal_chrome_db)
+        memory_manager.memory.release(second)
+
+        assert first is second
+        assert second.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 15
+        stats = memory_manager.get_stats()
+        assert stats["memory"]["loads"] == 1
+        assert stats["memory"]["hits"] == 1
+        assert stats["snapshots"] == 0
+
+    def test_changed_source_reloads(self, memory_manager, sample_chrome_db):
+        first = memory_manager.memory.acquire("chrome", sample_chrome_db)
+        memory_manager.memory.release(first)
+        _touch_history(sample_chrome_db)
+        second = memory_manager.memory.acquire("chrome", sample_chrome_db)
+        memory_manager.memory.release(second)
+
+        assert second is not first
+        assert first.retired
+        assert second.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 6
+
+    def test_memory_snapshot_is_read_only(self, memory_manager, sample_chrome_db):
+        entry = memory_manager.memory.acquire("chrome", sample_chrome_db)
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                entry.conn.execute("DELETE FROM urls")
+        finally:
+            memory_manager.memory.release(entry)
+
+    def test_lru_eviction_under_cap(self, tmp_path, sample_chrome_db, sample_firefox_db):
+        cap = max(os.path.getsize(sample_chrome_db), os.path.getsize(sample_firefox_db))
+        mgr = SnapshotManager(
+            directory=str(tmp_path / "snapshots"),
+            memory_browsers=["chrome", "firefox"],
+            memory_cap_bytes=cap,
+        )
+        try:
+            chrome = mgr.memory.acquire("chrome", sample_chrome_db)
+            mgr.memory.release(chrome)
+            firefox = mgr.memory.acquire("firefox", sample_firefox_db)
+            mgr.memory.release(firefox)
+
+            stats = mgr.memory.get_stats()
+            assert chrome.retired
+            assert not firefox.retired
+            assert stats["entries"] == 1
+            assert stats["evictions"] == 1
+        finally:
+            mgr.close()
+
+    def test_database_larger_than_cap_not_loaded(self, tmp_path, sample_chrome_db):
+        mgr = SnapshotManager(
+            directory=str(tmp_path / "snapshots"), memory_browsers=["chrome"], memory_cap_bytes=1
+        )
+        try:
+            assert mgr.memory.acquire("chrome", sample_chrome_db) is None
+            assert mgr.memory.get_stats()["entries"] == 0
+        finally:
+            mgr.close()
+
+    def test_history_connection_served_from_memory(
+        self, monkeypatch, memory_manager, mock_chrome_path
+    ):
+        from chronicle_mcp import connection
+        from chronicle_mcp.database import detect_schema
+
+        monkeypatch.setattr(connection, "get_snapshot_manager", lambda: memory_manager)
+
+        with connection.get_history_connection("chrome") as conn:
+            assert detect_schema(conn) == "chrome"
+            assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 5
+            assert conn.snapshot.schema == "chrome"
+
+        assert memory_manager.get_stats()["memory"]["entries"] == 1
+
+
+def _append_wal_rows(db_path: str, count: int, checkpoint: bool = False) -> None:
+    """Write rows through a WAL-mode connection, optionally restarting the WAL first."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    if checkpoint:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.executemany(
+        "INSERT INTO urls (url, title) VALUES (?, ?)",
+        [(f"https://example.com/more/{i}", f"More {i}") for i in range(count)],
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def incremental_manager(tmp_path):
+    """Provides a snapshot manager using the incremental strategy."""
+    mgr = SnapshotManager(directory=str(tmp_path / "snapshots"), strategy="incremental")
+    yield mgr
+    mgr.close()
+
+
+class TestIncrementalRefresh:
+    """Tests for page-level incremental snapshot refresh."""
+
+    def test_changed_main_file_rewrites_only_changed_pages(
+        self, incremental_manager, sample_chrome_db
+    ):
+        conn = sqlite3.connect(sample_chrome_db)
+        conn.executemany(
+            "INSERT INTO urls (url, title) VALUES (?, ?)",
+            [(f"https://example.com/bulk/{i}", "x" * 200) for i in range(500)],
+        )
+        conn.commit()
+        conn.close()
+
+        with incremental_manager.snapshot("chrome", sample_chrome_db) as first:
+            page_count = len(first.page_map.digests)
+            assert _count_rows(first) == 505
+        _touch_history(sample_chrome_db)
+        written_before = incremental_manager.get_stats()["pages_written"]
+
+        with incremental_manager.snapshot("chrome", sample_chrome_db) as second:
+            assert _count_rows(second) == 506
+
+        stats = incremental_manager.get_stats()
+        assert second is first
+        assert stats["incremental_refreshes"] == 1
+        assert 0 < stats["pages_written"] - written_before < page_count
+
+    def test_new_wal_frames_are_appended(self, incremental_manager, wal_chrome_db):
+        with incremental_manager.snapshot("chrome", wal_chrome_db) as first:
+            assert _count_rows(first) == 15
+            wal_offset = first.page_map.wal_offset
+        _append_wal_rows(wal_chrome_db, 3)
+
+        with incremental_manager.snapshot("chrome", wal_chrome_db) as second:
+            assert second is first
+            assert second.page_map.wal_offset > wal_offset
+            assert _count_rows(second) == 18
+
+    def test_restarted_wal_is_recopied(self, incremental_manager, wal_chrome_db):
+        with incremental_manager.snapshot("chrome", wal_chrome_db):
+            pass
+        _append_wal_rows(wal_chrome_db, 4, checkpoint=True)
+
+        with incremental_manager.snapshot("chrome", wal_chrome_db) as snap:
+            assert _count_rows(snap) == 19
+
+    def test_held_snapshot_is_not_updated_in_place(self, incremental_manager, sample_chrome_db):
+        held = incremental_manager.acquire("chrome", sample_chrome_db)
+        _touch_history(sample_chrome_db)
+
+        with incremental_manager.snapshot("chrome", sample_chrome_db) as fresh:
+            assert fresh is not held
+            assert _count_rows(fresh) == 6
+        assert _count_rows(held) == 5
+        incremental_manager.release(held)
+
+    def test_sync_database_matches_source(self, tmp_path, wal_chrome_db):
+        from chronicle_mcp.snapshot import sync_database
+
+        dest = str(tmp_path / "copy.db")
+        _, page_map, _ = sync_database(wal_chrome_db, dest)
+        _append_wal_rows(wal_chrome_db, 2)
+        _, _, written = sync_database(wal_chrome_db, dest, page_map)
+
+        conn = sqlite3.connect(dest)
+        assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 17
+        conn.close()
+        assert written <= 2
+
+
+class TestCopyMethods:
+    """Tests for kernel-assisted file copies."""
+
+    @pytest.mark.parametrize("method", available_copy_methods())
+    def test_copy_method_copies_file(self, tmp_path, sample_chrome_db, method):
+        dest = str(tmp_path / "copy.db")
+        used = fast_copy_file(sample_chrome_db, dest, method)
+
+        assert used in (method, "userspace")
+        with open(sample_chrome_db, "rb") as src, open(dest, "rb") as dst:
+            assert src.read() == dst.read()
+
+    def test_auto_falls_back_and_remembers_method(self, tmp_path, sample_chrome_db, monkeypatch):
+        from chronicle_mcp import snapshot
+
+        def unsupported(src_fd, dst_fd, size):
+            raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+        monkeypatch.setattr(snapshot, "_probed_methods", {})
+        monkeypatch.setitem(snapshot._COPIERS, "reflink", unsupported)
+        monkeypatch.setitem(snapshot._COPIERS, "copy_file_range", unsupported)
+        monkeypatch.setitem(snapshot._COPIERS, "sendfile", unsupported)
+
+        used = fast_copy_file(sample_chrome_db, str(tmp_path / "copy.db"))
+
+        assert used == "userspace"
+        assert list(snapshot._probed_methods.values()) == ["userspace"]
+        assert os.path.getsize(tmp_path / "copy.db") == os.path.getsize(sample_chrome_db)
+
+    def test_unknown_copy_method_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            SnapshotManager(directory=str(tmp_path), copy_method="rsync")
+
+    def test_copy_method_reported_in_stats(self, manager, sample_chrome_db):
+        with manager.snapshot("chrome", sample_chrome_db) as snap:
+            pass
+
+        stats = manager.get_stats()
+        assert snap.copy_method in available_copy_methods()
+        assert stats["copy_methods_used"] == {snap.copy_method: 1}
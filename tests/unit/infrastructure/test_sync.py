@@ -0,0 +1,201 @@
+"""Tests for merging one browser's history into another's."""
+
+import sqlite3
+
+import pytest
+
+from chronicle_mcp.database import chrome_cutoff
+from chronicle_mcp.schemas import UNIX_EPOCH_OFFSET_SECONDS
+from chronicle_mcp.sync import merge_history
+
+FIREFOX_OFFSET = UNIX_EPOCH_OFFSET_SECONDS * 1_000_000
+
+# (url, title, visit count, hours ago)
+SOURCE = [
+    ("https://github.com/anthropics", "Anthropic (new title)", 4, 1),
+    ("https://docs.python.org/3/", "Python docs", 2, 30),
+    ("https://news.bbc.co.uk/", "News", 3, 5),
+    ("https://www.bbc.co.uk/", None, 1, 200),
+]
+
+TARGET = [
+    ("https://github.com/anthropics", "Anthropic", 10, 10),
+    ("https://docs.python.org/3/", "Python 3 docs", 7, 2),
+    ("https://example.com/", "Example", 1, 50),
+]
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """Creates a Chrome history to sync from."""
+    conn = sqlite3.connect(tmp_path / "History")
+    conn.execute(
+        "CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT, "
+        "visit_count INTEGER DEFAULT 0, last_visit_time INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.executemany(
+        "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        [(url, title, count, chrome_cutoff(hours)) for url, title, count, hours in SOURCE],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def target_db(tmp_path):
+    """Creates a Firefox places database to sync into."""
+    conn = sqlite3.connect(tmp_path / "places.sqlite")
+    conn.execute(
+        "CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR, "
+        "rev_host LONGVARCHAR, visit_count INTEGER DEFAULT 0, last_visit_date INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO moz_places (url, title, visit_count, last_visit_date) VALUES (?, ?, ?, ?)",
+        [
+            (url, title, count, chrome_cutoff(hours) - FIREFOX_OFFSET)
+            for url, title, count, hours in TARGET
+        ],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _places(conn: sqlite3.Connection) -> dict[str, tuple]:
+    """url -> (title, visit count, hours since the last visit) of every place."""
+    now = chrome_cutoff(0) - FIREFOX_OFFSET
+    return {
+        url: (title, count, round((now - last) / 3_600_000_000) if last else None)
+        for url, title, count, last in conn.execute(
+            "SELECT url, title, visit_count, last_visit_date FROM moz_places"
+        )
+    }
+
+
+class TestMergeHistory:
+    """Tests for the merge strategies."""
+
+    def test_latest(self, source_db, target_db):
+        counts = merge_history(source_db, target_db, "latest")
+        places = _places(target_db)
+
+        assert counts == (4, 2, 1)
+        assert places["https://github.com/anthropics"] == ("Anthropic (new title)", 10, 1)
+        assert places["https://docs.python.org/3/"] == ("Python 3 docs", 7, 2)
+        assert places["https://news.bbc.co.uk/"] == ("News", 3, 5)
+        assert len(places) == 5
+
+    def test_combine(self, source_db, target_db):
+        counts = merge_history(source_db, target_db, "combine")
+        places = _places(target_db)
+
+        assert counts == (4, 2, 2)
+        assert places["https://github.com/anthropics"] == ("Anthropic (new title)", 14, 1)
+        assert places["https://docs.python.org/3/"] == ("Python 3 docs", 9, 2)
+
+    def test_dedupe(self, source_db, target_db):
+        counts = merge_history(source_db, target_db, "dedupe")
+        places = _places(target_db)
+
+        assert counts == (4, 2, 0)
+        assert places["https://github.com/anthropics"] == ("Anthropic", 10, 10)
+
+    def test_new_places_get_firefox_columns(self, source_db, target_db):
+        merge_history(source_db, target_db, "latest")
+        rev_host = target_db.execute(
+            "SELECT rev_host FROM moz_places WHERE url = 'https://news.bbc.co.uk/'"
+        ).fetchone()[0]
+
+        assert rev_host == "ku.oc.cbb.swen."
+
+    def test_dry_run_does_not_write(self, source_db, target_db):
+        before = _places(target_db)
+        counts = merge_history(source_db, target_db, "combine", apply=False)
+
+        assert counts == (4, 2, 2)
+        assert _places(target_db) == before
+        assert not target_db.execute(
+            "SELECT name FROM sqlite_temp_master WHERE name LIKE 'sync_%'"
+        ).fetchall()
+
+    def test_small_batches_match(self, source_db, target_db, tmp_path):
+        whole = sqlite3.connect(tmp_path / "copy.sqlite")
+        target_db.backup(whole)
+        try:
+            merge_history(source_db, whole, "combine")
+            merge_history(source_db, target_db, "combine", batch_size=1)
+            assert _places(target_db) == _places(whole)
+        finally:
+            whole.close()
+
+    def test_duplicate_source_urls_collapse(self, source_db, target_db):
+        source_db.execute(
+            "INSERT INTO urls (url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+            ("https://news.bbc.co.uk/", "Newer news", 2, chrome_cutoff(0.25)),
+        )
+        merge_history(source_db, target_db, "combine")
+
+        assert _places(target_db)["https://news.bbc.co.uk/"] == ("Newer news", 5, 0)
+
+    def test_chrome_target(self, source_db, tmp_path, sample_chrome_db):
+        target = sqlite3.connect(sample_chrome_db)
+        try:
+            before = target.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            counts = merge_history(source_db, target, "dedupe")
+            after = target.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        finally:
+            target.close()
+
+        assert after == before + counts.new_entries == before + len(SOURCE)
+
+    def test_safari_target_is_rejected(self, source_db, tmp_path):
+        target = sqlite3.connect(tmp_path / "History.db")
+        target.execute("CREATE TABLE history_items (id INTEGER PRIMARY KEY, url TEXT)")
+        try:
+            with pytest.raises(ValueError):
+                merge_history(source_db, target)
+        finally:
+            target.close()
+
+
+@pytest.fixture
+def sync_browsers(mock_all_browsers, monkeypatch):
+    """Serves the sample Chrome and Firefox histories to the sync service."""
+    from chronicle_mcp import paths
+
+    monkeypatch.setattr("chronicle_mcp.core.services.get_browser_path", paths.get_browser_path)
+
+
+class TestSyncService:
+    """Tests for the sync service."""
+
+    def test_dry_run_counts_against_target(self, sync_browsers):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.sync_history("chrome", "firefox", "dedupe", dry_run=True)
+
+        assert result["dry_run"] is True
+        assert result["new_entries"] == result["source_entries"] == 5
+        assert "5 new, 0 updated" in result["message"]
+
+    def test_apply_reports_the_plan(self, sync_browsers, monkeypatch):
+        from chronicle_mcp import connection
+        from chronicle_mcp.core import HistoryService
+
+        preview = HistoryService.sync_history("firefox", "chrome", "latest", dry_run=True)
+        monkeypatch.setattr(connection, "_private_copy_connection", None)
+        result = HistoryService.sync_history("firefox", "chrome", "latest", dry_run=False)
+
+        assert result["dry_run"] is False
+        assert result["entries_count"] == preview["entries_count"] == 2
+        assert result["written"] is False
+        assert result["message"].startswith("Merge plan: 2 entries")
+        assert "Nothing was written to chrome's history" in result["message"]
+
+    def test_safari_target_is_rejected(self, sync_browsers):
+        from chronicle_mcp.core import HistoryService
+        from chronicle_mcp.core.exceptions import ValidationError
+
+        with pytest.raises(ValidationError):
+            HistoryService.sync_history("chrome", "safari")
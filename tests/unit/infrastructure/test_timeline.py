@@ -0,0 +1,293 @@
+"""Tests for visit-level timelines and histograms."""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from chronicle_mcp import timeline
+from chronicle_mcp.timeline import (
+    CHROME_EPOCH,
+    get_visits,
+    local_offset_steps,
+    to_chrome_timestamp,
+    visit_histogram,
+)
+
+URLS = [
+    (1, "https://github.com/anthropics", "Anthropic"),
+    (2, "https://docs.python.org/3/", "Python docs"),
+    (3, "https://news.bbc.co.uk/", "News"),
+]
+
+# (url id, UTC time) of each visit; Anthropic is visited again on Friday
+VISITS = [
+    (1, datetime(2024, 3, 5, 14, 10, tzinfo=timezone.utc)),  # Tuesday
+    (2, datetime(2024, 3, 5, 14, 45, tzinfo=timezone.utc)),
+    (3, datetime(2024, 3, 5, 16, 30, tzinfo=timezone.utc)),
+    (1, datetime(2024, 3, 8, 9, 0, tzinfo=timezone.utc)),  # Friday
+    (2, datetime(2024, 3, 10, 23, 30, tzinfo=timezone.utc)),  # Sunday
+]
+
+TUESDAY_2PM = "2024-03-05T14:00:00+00:00"
+TUESDAY_4PM = "2024-03-05T16:00:00+00:00"
+
+
+def _chrome_time(moment: datetime) -> int:
+    return int((moment - CHROME_EPOCH).total_seconds() * 1_000_000)
+
+
+@pytest.fixture
+def visit_db(tmp_path, monkeypatch):
+    """Creates a Chrome history with Chrome's visit time index and mocks its path."""
+    from chronicle_mcp import connection, paths
+
+    db_path = str(tmp_path / "History")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE urls (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT,
+            visit_count INTEGER DEFAULT 0, last_visit_time INTEGER DEFAULT 0
+        );
+        CREATE TABLE visits (
+            id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,
+            from_visit INTEGER, transition INTEGER
+        );
+        CREATE INDEX visits_time_index ON visits (visit_time);
+    """)
+    conn.executemany("INSERT INTO urls (id, url, title) VALUES (?, ?, ?)", URLS)
+    for url_id, moment in VISITS:
+        conn.execute(
+            "INSERT INTO visits (url, visit_time, from_visit, transition) VALUES (?, ?, 0, 0)",
+            (url_id, _chrome_time(moment)),
+        )
+        conn.execute(
+            "UPDATE urls SET visit_count = visit_count + 1, "
+            "last_visit_time = MAX(last_visit_time, ?) WHERE id = ?",
+            (_chrome_time(moment), url_id),
+        )
+    conn.commit()
+    conn.close()
+
+    def mock_get_browser_path(browser):
+        return db_path if browser.lower() == "chrome" else None
+
+    monkeypatch.setattr(paths, "get_browser_path", mock_get_browser_path)
+    monkeypatch.setattr(connection, "get_browser_path", mock_get_browser_path)
+    return db_path
+
+
+@pytest.fixture
+def firefox_visits(tmp_path):
+    """Creates a places.sqlite with the same visits, in Firefox's epoch."""
+    db_path = str(tmp_path / "places.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE moz_places (
+            id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+            visit_count INTEGER DEFAULT 0, last_visit_date INTEGER
+        );
+        CREATE TABLE moz_historyvisits (
+            id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+            visit_date INTEGER, visit_type INTEGER
+        );
+        CREATE INDEX moz_historyvisits_dateindex ON moz_historyvisits (visit_date);
+    """)
+    conn.executemany("INSERT INTO moz_places (id, url, title) VALUES (?, ?, ?)", URLS)
+    conn.executemany(
+        "INSERT INTO moz_historyvisits (place_id, visit_date, visit_type) VALUES (?, ?, 1)",
+        [(url_id, int(moment.timestamp() * 1_000_000)) for url_id, moment in VISITS],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+class TestVisitTimeline:
+    """Tests for visit-granular time windows."""
+
+    def test_revisited_pages_appear_in_earlier_window(self, isolated_history_index, visit_db):
+        start, end = to_chrome_timestamp(TUESDAY_2PM), to_chrome_timestamp(TUESDAY_4PM)
+        with isolated_history_index.connection("chrome") as conn:
+            rows = get_visits(conn, start, end)
+
+        assert [title for title, _, _ in rows] == ["Python docs", "Anthropic"]
+        assert rows[1][2] == "2024-03-05T14:10:00+00:00"
+
+    def test_every_visit_is_a_row(self, isolated_history_index, visit_db):
+        start = to_chrome_timestamp("2024-03-01T00:00:00+00:00")
+        end = to_chrome_timestamp("2024-03-31T00:00:00+00:00")
+        with isolated_history_index.connection("chrome") as conn:
+            rows = get_visits(conn, start, end, query="github")
+
+        assert [ts for _, _, ts in rows] == [
+            "2024-03-08T09:00:00+00:00",
+            "2024-03-05T14:10:00+00:00",
+        ]
+
+    def test_index_window_is_a_range_scan(self, isolated_history_index, visit_db):
+        start, end = to_chrome_timestamp(TUESDAY_2PM), to_chrome_timestamp(TUESDAY_4PM)
+        with isolated_history_index.connection("chrome") as conn:
+            statements: list[str] = []
+            conn.set_trace_callback(statements.append)
+            get_visits(conn, start, end)
+            conn.set_trace_callback(None)
+            plan = " ".join(
+                str(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {statements[-1]}")
+            )
+
+        assert "index_visits_time (source_id=? AND visit_time>? AND visit_time<?)" in plan
+
+    @pytest.mark.parametrize("database", ["visit_db", "firefox_visits"])
+    def test_browser_databases(self, request, database):
+        conn = sqlite3.connect(request.getfixturevalue(database))
+        try:
+            start, end = to_chrome_timestamp(TUESDAY_2PM), to_chrome_timestamp(TUESDAY_4PM)
+            rows = get_visits(conn, start, end)
+            statements: list[str] = []
+            conn.set_trace_callback(statements.append)
+            get_visits(conn, start, end)
+            conn.set_trace_callback(None)
+            plan = " ".join(
+                str(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {statements[-1]}")
+            )
+        finally:
+            conn.close()
+
+        assert [title for title, _, _ in rows] == ["Python docs", "Anthropic"]
+        assert "visits_time_index" in plan or "moz_historyvisits_dateindex" in plan
+
+    def test_sources_without_visits_use_last_visit_time(self, sample_chrome_db):
+        conn = sqlite3.connect(sample_chrome_db)
+        try:
+            rows = get_visits(conn, 0, to_chrome_timestamp("2100-01-01T00:00:00+00:00"), limit=100)
+            count = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        finally:
+            conn.close()
+
+        assert len(rows) == count
+
+    def test_naive_times_are_local(self):
+        local = datetime(2024, 3, 5, 14, 0).astimezone()
+
+        assert to_chrome_timestamp("2024-03-05T14:00") == _chrome_time(local)
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Switches the process time zone to one whose DST starts on 2024-03-10."""
+    if not hasattr(time, "tzset") or not os.path.exists("/usr/share/zoneinfo/America/New_York"):
+        pytest.skip("needs tzset and the system time zone database")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+class TestVisitHistogram:
+    """Tests for visits per hour of day and day of week."""
+
+    def test_buckets(self, isolated_history_index, visit_db):
+        with isolated_history_index.connection("chrome") as conn:
+            histogram = visit_histogram(conn)
+
+        assert histogram["total_visits"] == len(VISITS)
+        assert histogram["hour_of_day"][14] == 2
+        assert histogram["hour_of_day"][16] == 1
+        assert histogram["day_of_week"] == [0, 3, 0, 0, 1, 0, 1]
+
+    def test_utc_offset_moves_visits_across_days(self, isolated_history_index, visit_db):
+        with isolated_history_index.connection("chrome") as conn:
+            histogram = visit_histogram(conn, utc_offset_minutes=60)
+
+        # Sunday 23:30 UTC is Monday 00:30 an hour east
+        assert histogram["hour_of_day"][0] == 1
+        assert histogram["day_of_week"] == [1, 3, 0, 0, 1, 0, 0]
+
+    def test_window(self, isolated_history_index, visit_db):
+        start = to_chrome_timestamp("2024-03-06T00:00:00+00:00")
+        with isolated_history_index.connection("chrome") as conn:
+            histogram = visit_histogram(conn, start)
+
+        assert histogram["total_visits"] == 2
+
+    @pytest.mark.parametrize("offset", [0, -300, 330])
+    def test_python_fallback_matches_numpy(
+        self, isolated_history_index, visit_db, monkeypatch, offset
+    ):
+        pytest.importorskip("numpy")
+        with isolated_history_index.connection("chrome") as conn:
+            vectorised = visit_histogram(conn, utc_offset_minutes=offset)
+            monkeypatch.setattr(timeline, "numpy", None)
+            looped = visit_histogram(conn, utc_offset_minutes=offset)
+
+        assert looped == vectorised
+
+    def test_local_time_follows_dst(self, isolated_history_index, visit_db, new_york):
+        with isolated_history_index.connection("chrome") as conn:
+            histogram = visit_histogram(conn, utc_offset_minutes=None)
+
+        # EST (UTC-5) until Sunday 07:00 UTC, EDT (UTC-4) after
+        hours = {hour: count for hour, count in enumerate(histogram["hour_of_day"]) if count}
+        assert hours == {4: 1, 9: 2, 11: 1, 19: 1}
+        assert histogram["utc_offset_minutes"] is None
+
+    def test_local_offset_steps(self, new_york):
+        day = int(datetime(2024, 3, 10, tzinfo=timezone.utc).timestamp()) // 86_400
+
+        starts, offsets = local_offset_steps([day - 1, day])
+
+        transition = int(datetime(2024, 3, 10, 7, tzinfo=timezone.utc).timestamp())
+        assert starts == [(day - 1) * 86_400, transition]
+        assert offsets == [-5 * 3600, -4 * 3600]
+
+    def test_local_time_python_fallback_matches_numpy(
+        self, isolated_history_index, visit_db, new_york, monkeypatch
+    ):
+        pytest.importorskip("numpy")
+        with isolated_history_index.connection("chrome") as conn:
+            vectorised = visit_histogram(conn, utc_offset_minutes=None)
+            monkeypatch.setattr(timeline, "numpy", None)
+            looped = visit_histogram(conn, utc_offset_minutes=None)
+
+        assert looped == vectorised
+
+    def test_firefox_visits(self, firefox_visits):
+        conn = sqlite3.connect(firefox_visits)
+        try:
+            histogram = visit_histogram(conn)
+        finally:
+            conn.close()
+
+        assert histogram["day_of_week"] == [0, 3, 0, 0, 1, 0, 1]
+
+
+class TestVisitServices:
+    """Tests for the timeline and histogram services."""
+
+    def test_timeline(self, visit_db):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.get_visit_timeline(TUESDAY_2PM, TUESDAY_4PM, format_type="json")
+
+        assert result["count"] == 2
+        assert '"visits"' in result["message"]
+
+    def test_timeline_rejects_reversed_window(self, visit_db):
+        from chronicle_mcp.core import HistoryService
+        from chronicle_mcp.core.exceptions import InvalidDateRangeError
+
+        with pytest.raises(InvalidDateRangeError):
+            HistoryService.get_visit_timeline(TUESDAY_4PM, TUESDAY_2PM)
+
+    def test_histogram(self, visit_db):
+        from chronicle_mcp.core import HistoryService
+
+        result = HistoryService.get_visit_histogram()
+
+        assert result["histogram"]["total_visits"] == len(VISITS)
+        assert len(result["histogram"]["hour_of_day"]) == 24
+        assert "By day of week" in result["message"]
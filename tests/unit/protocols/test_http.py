@@ -53,6 +53,18 @@ class TestMetricsEndpoints:
         assert "requests_per_second" in data
         assert "average_latency_seconds" in data
         assert "browsers_available" in data
+        assert "copy_methods_used" in data["snapshots"]
+        assert "enabled" in data["connection_pool"]
+        assert data["index"]["enabled"] is True
+
+    def test_metrics_do_not_wait_for_an_ingest(self, http_client, isolated_history_index):
+        """Test that metrics are served while the index writer is busy."""
+        isolated_history_index.refresh("chrome")
+        with isolated_history_index._lock:
+            response = http_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.json()["index"]["sources"][0]["urls"] == 5
 
     def test_prometheus_metrics(self, http_client):
         """Test Prometheus metrics endpoint."""
@@ -62,6 +74,9 @@ class TestMetricsEndpoints:
         content = response.text
         assert "chronicle_uptime_seconds" in content
         assert "chronicle_requests_total" in content
+        assert "chronicle_snapshot_refreshes_total" in content
+        assert "chronicle_pool_checkouts_total" in content
+        assert "chronicle_cache_lookups_total" in content
 
 
 class TestBrowserEndpoints:
@@ -95,6 +110,17 @@ class TestSearchEndpoints:
         assert "results" in data
         assert "count" in data
 
+    def test_search_fulltext_returns_snippets(self, http_client):
+        """Test full-text search mode returns highlighted snippets."""
+        response = http_client.post(
+            "/api/search",
+            json={"query": "python", "limit": 5, "format": "json", "search_mode": "fts"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert all("**Python**" in snippet for snippet in data["snippets"])
+
     def test_recent_endpoint(self, http_client):
         """Test recent history endpoint."""
         response = http_client.post("/api/recent", json={"hours": 24, "limit": 10})
@@ -118,6 +144,32 @@ class TestSearchEndpoints:
         data = response.json()
         assert "domains" in data
 
+    def test_timeline_endpoint(self, http_client):
+        """Test visit timeline endpoint."""
+        response = http_client.post(
+            "/api/timeline", json={"start": "2000-01-01", "end": "2100-01-01", "limit": 3}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        assert len(data["visits"]) == 3
+
+    def test_histogram_endpoint(self, http_client):
+        """Test visit histogram endpoint."""
+        response = http_client.post("/api/histogram", json={})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["hour_of_day"]) == 24
+        assert len(data["day_of_week"]) == 7
+
+    def test_sessions_endpoint(self, http_client):
+        """Test browsing sessions endpoint."""
+        response = http_client.post("/api/sessions", json={"limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == len(data["sessions"])
+        assert all("top_hosts" in session for session in data["sessions"])
+
 
 class TestAdvancedSearchEndpoints:
     """Tests for advanced search endpoints."""
@@ -3,6 +3,8 @@
 These tests verify the MCP tool functions for bookmarks and downloads.
 """
 
+import pytest
+
 from chronicle_mcp.core.exceptions import BrowserNotFoundError
 from chronicle_mcp.protocols.mcp import (
     get_bookmarks,
@@ -15,13 +17,15 @@ from chronicle_mcp.protocols.mcp import (
 class TestListAvailableBookmarksMCP:
     """Tests for list_available_bookmarks MCP tool."""
 
-    def test_list_available_bookmarks(self):
+    @pytest.mark.asyncio
+    async def test_list_available_bookmarks(self):
         """Test listing available bookmarks."""
         # Access the underlying function via .fn attribute
-        result = list_available_bookmarks.fn()
+        result = await list_available_bookmarks.fn()
         assert isinstance(result, str)
 
-    def test_list_available_bookmarks_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_list_available_bookmarks_error(self, monkeypatch):
         """Test error handling for list_available_bookmarks."""
         from chronicle_mcp.core import services
 
@@ -32,19 +36,21 @@ class TestListAvailableBookmarksMCP:
             services.HistoryService, "list_available_bookmarks", mock_list_available_bookmarks
         )
 
-        result = list_available_bookmarks.fn()
+        result = await list_available_bookmarks.fn()
         assert "error" in result.lower() or "Error" in result
 
 
 class TestListAvailableDownloadsMCP:
     """Tests for list_available_downloads MCP tool."""
 
-    def test_list_available_downloads(self):
+    @pytest.mark.asyncio
+    async def test_list_available_downloads(self):
         """Test listing available downloads."""
-        result = list_available_downloads.fn()
+        result = await list_available_downloads.fn()
         assert isinstance(result, str)
 
-    def test_list_available_downloads_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_list_available_downloads_error(self, monkeypatch):
         """Test error handling for list_available_downloads."""
         from chronicle_mcp.core import services
 
@@ -55,14 +61,15 @@ class TestListAvailableDownloadsMCP:
             services.HistoryService, "list_available_downloads", mock_list_available_downloads
         )
 
-        result = list_available_downloads.fn()
+        result = await list_available_downloads.fn()
         assert "error" in result.lower() or "Error" in result
 
 
 class TestGetBookmarksMCP:
     """Tests for get_bookmarks MCP tool."""
 
-    def test_get_bookmarks_not_found(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_bookmarks_not_found(self, monkeypatch):
         """Test get_bookmarks when browser not found."""
         from chronicle_mcp.core import services
 
@@ -71,10 +78,11 @@ class TestGetBookmarksMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_bookmarks", mock_get_bookmarks)
 
-        result = get_bookmarks.fn(browser="chrome")
+        result = await get_bookmarks.fn(browser="chrome")
         assert "could not find" in result.lower()
 
-    def test_get_bookmarks_validation_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_bookmarks_validation_error(self, monkeypatch):
         """Test get_bookmarks with validation error."""
         from chronicle_mcp.core import validation
 
@@ -83,10 +91,11 @@ class TestGetBookmarksMCP:
 
         monkeypatch.setattr(validation, "validate_browser", mock_validate_browser)
 
-        result = get_bookmarks.fn(browser="invalid")
+        result = await get_bookmarks.fn(browser="invalid")
         assert "invalid" in result.lower() or "Invalid" in result
 
-    def test_get_bookmarks_with_query(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_bookmarks_with_query(self, monkeypatch):
         """Test get_bookmarks with query parameter."""
         from chronicle_mcp.core import services
 
@@ -100,10 +109,11 @@ class TestGetBookmarksMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_bookmarks", mock_get_bookmarks)
 
-        result = get_bookmarks.fn(query="github", browser="chrome")
+        result = await get_bookmarks.fn(query="github", browser="chrome")
         assert isinstance(result, str)
 
-    def test_get_bookmarks_unexpected_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_bookmarks_unexpected_error(self, monkeypatch):
         """Test get_bookmarks with unexpected error."""
         from chronicle_mcp.core import services
 
@@ -112,14 +122,15 @@ class TestGetBookmarksMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_bookmarks", mock_get_bookmarks)
 
-        result = get_bookmarks.fn(browser="chrome")
+        result = await get_bookmarks.fn(browser="chrome")
         assert "error" in result.lower() or "Error" in result
 
 
 class TestGetDownloadsMCP:
     """Tests for get_downloads MCP tool."""
 
-    def test_get_downloads_not_found(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_downloads_not_found(self, monkeypatch):
         """Test get_downloads when browser not found."""
         from chronicle_mcp.core import services
 
@@ -128,10 +139,11 @@ class TestGetDownloadsMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_downloads", mock_get_downloads)
 
-        result = get_downloads.fn(browser="chrome")
+        result = await get_downloads.fn(browser="chrome")
         assert "could not find" in result.lower()
 
-    def test_get_downloads_validation_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_downloads_validation_error(self, monkeypatch):
         """Test get_downloads with validation error."""
         from chronicle_mcp.core import validation
 
@@ -140,10 +152,11 @@ class TestGetDownloadsMCP:
 
         monkeypatch.setattr(validation, "validate_browser", mock_validate_browser)
 
-        result = get_downloads.fn(browser="invalid")
+        result = await get_downloads.fn(browser="invalid")
         assert "invalid" in result.lower() or "Invalid" in result
 
-    def test_get_downloads_with_query(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_downloads_with_query(self, monkeypatch):
         """Test get_downloads with query parameter."""
         from chronicle_mcp.core import services
 
@@ -157,10 +170,11 @@ class TestGetDownloadsMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_downloads", mock_get_downloads)
 
-        result = get_downloads.fn(query="pdf", browser="chrome")
+        result = await get_downloads.fn(query="pdf", browser="chrome")
         assert isinstance(result, str)
 
-    def test_get_downloads_unexpected_error(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_get_downloads_unexpected_error(self, monkeypatch):
         """Test get_downloads with unexpected error."""
         from chronicle_mcp.core import services
 
@@ -169,5 +183,5 @@ class TestGetDownloadsMCP:
 
         monkeypatch.setattr(services.HistoryService, "get_downloads", mock_get_downloads)
 
-        result = get_downloads.fn(browser="chrome")
+        result = await get_downloads.fn(browser="chrome")
         assert "error" in result.lower() or "Error" in result